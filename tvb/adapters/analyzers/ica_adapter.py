@@ -52,6 +52,8 @@ class ICAAdapter(ABCAsynchronous):
     _ui_name = "Independent Component Analysis"
     _ui_description = "ICA for a TimeSeries input DataType."
     _ui_subsection = "ica"
+    # FastICA starts from a random un-mixing matrix
+    cacheable_results = False
     
     
     def get_input_tree(self):
@@ -68,6 +68,7 @@ class ExportManager:
     export_folder = None
     EXPORT_FOLDER_NAME = "EXPORT_TMP"
     ZIP_FILE_EXTENSION = "zip"
+    PARALLEL_EXPORT_WORKERS = 4
     
     def __init__(self):
         # Here we register all available data type exporters
@@ -230,11 +231,13 @@ class ExportManager:
         zip_file.writestr(os.path.basename(bursts_file_name), json.dumps(burst_info))
 
 
-    def export_project(self, project, optimize_size=False):
+    def export_project(self, project, optimize_size=False, parallel=False):
         """
         Given a project root and the TVB storage_path, create a ZIP
         ready for export.
         :param project: project object which identifies project to be exported
+        :param parallel: when True, operation folders are compressed concurrently, each into its own
+                         archive member, and the result starts with an index of them (see ImportService)
         """
         if project is None:
             raise ExportException("Please provide project to be exported")
@@ -268,6 +271,14 @@ class ExportManager:
 
         with TvbZip(result_path, "w") as zip_file:
             # Pack project [filtered] content into a ZIP file:
+            if parallel:
+                operation_folders, to_be_exported_folders, single_files = self._split_operation_folders(
+                    to_be_exported_folders)
+                LOG.debug("Done preparing, now we will write operation folders " + str(len(operation_folders)))
+                zip_file.write_indexed_folders(operation_folders, export_folder, self.PARALLEL_EXPORT_WORKERS)
+                for file_path, archive_path in single_files:
+                    zip_file.write(file_path, archive_path)
+
             LOG.debug("Done preparing, now we will write folders " + str(len(to_be_exported_folders)))
             LOG.debug(str(to_be_exported_folders))
             for pack in to_be_exported_folders:
@@ -285,6 +296,37 @@ class ExportManager:
         return result_path
 
 
+    @staticmethod
+    def _split_operation_folders(to_be_exported_folders):
+        """
+        Separate operation folders, to be written as indexed archive members, from the rest of the exported content.
+        :returns: dictionary {operation folder name in archive: folder path}, the remaining folders to write
+                  and a list of (file path, archive path) for the single files found at the top of a project folder
+        """
+        operation_folders, remaining_folders, single_files = {}, [], []
+
+        for pack in to_be_exported_folders:
+            prefix = pack['archive_path_prefix']
+            if os.path.exists(os.path.join(pack['folder'], FilesHelper.TVB_OPERARATION_FILE)):
+                operation_folders[prefix.rstrip(os.sep)] = pack['folder']
+                continue
+
+            exclude = pack.get('exclude', [])
+            for entry in os.listdir(pack['folder']):
+                full_path = os.path.join(pack['folder'], entry)
+                if entry in exclude:
+                    continue
+                if os.path.isfile(full_path):
+                    single_files.append((full_path, prefix + entry))
+                elif os.path.exists(os.path.join(full_path, FilesHelper.TVB_OPERARATION_FILE)):
+                    operation_folders[prefix + entry] = full_path
+                else:
+                    remaining_folders.append({'folder': full_path, 'archive_path_prefix': prefix + entry + os.sep,
+                                              'exclude': exclude})
+
+        return operation_folders, remaining_folders, single_files
+
+
     @staticmethod
     def _gather_project_datatypes(project, only_visible):
 
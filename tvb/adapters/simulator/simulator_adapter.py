@@ -63,6 +63,8 @@ class SimulatorAdapter(ABCAsynchronous):
     Interface between the Simulator and the Framework.
     """
     _ui_name = "Simulation Core"
+    # Noise makes results stochastic
+    cacheable_results = False
 
     algorithm = None
 
@@ -187,6 +189,25 @@ class SimulatorAdapter(ABCAsynchronous):
         return self.algorithm.storage_requirement(self.simulation_length) / 2 ** 10
     
     
+    def get_size_features(self, **kwargs):
+        """
+        Number of nodes (regions or vertices), of integration steps and of monitors.
+        """
+        nodes = 0
+        for key, size_attribute in (('connectivity', 'number_of_regions'), ('surface', 'number_of_vertices')):
+            entity = kwargs.get(key)
+            if isinstance(entity, basestring) and entity:
+                entity = dao.get_datatype_by_gid(entity)
+            if entity is not None and entity != '':
+                nodes = getattr(entity, size_attribute, None) or nodes
+        integrator_dt = float(kwargs['integrator_parameters']['dt']) or 1.0
+        monitors = kwargs.get('monitors') or []
+        if isinstance(monitors, basestring):
+            monitors = [monitors]
+        return {'nodes': nodes, 'steps': float(kwargs['simulation_length']) / integrator_dt,
+                'monitors': len(monitors)}
+
+
     def get_execution_time_approximation(self, **kwargs):
         """
         Method should approximate based on input arguments, the time it will take for the operation 
@@ -41,6 +41,7 @@ from tvb.core.entities import model
 from tvb.core.adapters.abcadapter import ABCSynchronous
 from tvb.core.entities.transient.structure_entities import DataTypeMetaData
 from tvb.core.entities.storage import dao
+from tvb.core.utils import read_text_matrix
 
 
 class ABCUploader(ABCSynchronous):
@@ -48,6 +49,8 @@ class ABCUploader(ABCSynchronous):
     Base class of the uploaders
     """
     LOGGER = get_logger(__name__)
+    # Results depend on the content of the uploaded files, not on the submitted parameters
+    cacheable_results = False
 
     def get_input_tree(self):
         """
@@ -116,9 +119,15 @@ class ABCUploader(ABCSynchronous):
     def read_list_data(full_path, dimensions=None, dtype=numpy.float64, skiprows=0, usecols=None):
         """
         Read numpy.array from a text file.
+        Plain numeric files, read entirely, go through the faster `read_text_matrix`.
         """
         try:
-            array_result = numpy.loadtxt(full_path, dtype=dtype, skiprows=skiprows, usecols=usecols)
+            if (usecols is None and skiprows == 0 and numpy.dtype(dtype).kind in 'iuf'
+                    and not full_path.endswith(('.gz', '.bz2'))):
+                # same result shape as numpy.loadtxt gives by default
+                array_result = numpy.squeeze(read_text_matrix(full_path, dtype=dtype))
+            else:
+                array_result = numpy.loadtxt(full_path, dtype=dtype, skiprows=skiprows, usecols=usecols)
             if dimensions:
                 return array_result.reshape(dimensions)
             return array_result
@@ -34,6 +34,7 @@
 """
 
 import os
+import numpy
 import nibabel as nib
 from tvb.basic.logger.builder import get_logger
 from tvb.core.adapters.exceptions import ParseException
@@ -44,6 +45,8 @@ class NIFTIParser():
     """
     This class reads content of a NIFTI file and writes a 4D array [time, x, y, z].
     """
+    ## Approximate size (in Bytes) of the blocks of volumes read and written at once
+    VOLUMES_BLOCK_BYTES = 64 * 2 ** 20
 
 
     def __init__(self, data_file):
@@ -87,12 +90,17 @@ class NIFTIParser():
         # In NIFTI format time is the 4th dimension, while our TimeSeries has
         # it as first dimension, so we have to adapt imported data
 
-        nifti_data = self.nifti_image.get_data()
-
         if self.has_time_dimension:
-            for i in range(self.time_dim_size):
-                result_dt.write_data_slice([nifti_data[:, :, :, i, ...]])
+            nifti_data = self._get_data_proxy()
+            volumes_per_block = self._get_volumes_per_block()
+            for start in xrange(0, self.time_dim_size, volumes_per_block):
+                stop = min(start + volumes_per_block, self.time_dim_size)
+                ## Time axis first, written as a single contiguous chunk
+                block = numpy.rollaxis(numpy.asarray(nifti_data[:, :, :, start:stop, ...]), 3)
+                result_dt.write_data_slice(numpy.ascontiguousarray(block))
+                self.logger.debug("Imported %d of %d volumes" % (stop, self.time_dim_size))
         else:
+            nifti_data = self.nifti_image.get_data()
             if keep_result_4d:
                 result_dt.write_data_slice([nifti_data])
             else:
@@ -100,3 +108,20 @@ class NIFTIParser():
 
         result_dt.close_file()  # Force closing HDF5 file
 
+
+    def _get_data_proxy(self):
+        """
+        :returns: the image array proxy, which reads from file (memory-mapped when not compressed) only the
+            sliced volumes; or the full array, with nibabel versions without sliceable proxies
+        """
+        proxy = getattr(self.nifti_image, 'dataobj', None)
+        if proxy is None or not hasattr(proxy, '__getitem__'):
+            return self.nifti_image.get_data()
+        return proxy
+
+
+    def _get_volumes_per_block(self):
+        shape = self.nifti_image.get_header().get_data_shape()
+        volume_bytes = numpy.prod([shape[0], shape[1], shape[2]] + list(shape[4:])) * 8
+        return int(max(1, min(self.time_dim_size, self.VOLUMES_BLOCK_BYTES // max(1, volume_bytes))))
+
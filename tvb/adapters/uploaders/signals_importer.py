@@ -43,10 +43,53 @@ from scipy.io import loadmat
 from StringIO import StringIO
 from tvb.adapters.uploaders.abcuploader import ABCUploader
 from tvb.basic.logger.builder import get_logger
+from tvb.core.adapters.exceptions import LaunchException
 from tvb.datatypes.time_series import TimeSeriesEEG
 from tvb.datatypes.sensors import SensorsEEG
 
 
+## Approximate size (in Bytes) of the blocks of samples read and written at once
+BLOCK_BYTES = 32 * 2 ** 20
+
+
+
+def iter_signal_blocks(data, scales=None, block_samples=None):
+    """
+    Read a (samples x channels) array, usually a numpy.memmap over a binary file, in blocks of consecutive samples,
+    thus only one block is in memory at a time.
+
+    :param scales: optional factor for each channel (e.g. the resolution of integer samples)
+    :returns: generator of float32 arrays (block samples x channels)
+    """
+    if block_samples is None:
+        block_samples = max(1, BLOCK_BYTES // (4 * max(1, data.shape[1])))
+    for start in xrange(0, data.shape[0], block_samples):
+        block = data[start: start + block_samples].astype(numpy.float32)
+        if scales is not None:
+            block *= scales
+        yield block
+
+
+
+def write_signal_blocks(time_series, blocks, sample_rate):
+    """
+    Append blocks of (samples x channels) to an EEG TimeSeries, as (time, 1, channels, 1), together with
+    their time points, then fill in its header.
+    """
+    nsamp, nchan = 0, 0
+    for block in blocks:
+        time_series.write_data_slice(block[:, numpy.newaxis, :, numpy.newaxis])
+        time_series.write_time_slice(numpy.arange(nsamp, nsamp + block.shape[0]) * 1.0 / sample_rate)
+        nsamp, nchan = nsamp + block.shape[0], block.shape[1]
+
+    time_series.length_1d, time_series.length_2d, time_series.length_3d, time_series.length_4d = nsamp, 1, nchan, 1
+    time_series.labels_ordering = 'Time 1 Channel 1'.split()
+    time_series.start_time = 0.0
+    time_series.sample_period_unit = 's'
+    time_series.sample_period = 1.0 / float(sample_rate)
+    time_series.close_file()
+
+
 class FieldTripUploader(ABCUploader):
     """
     Upload time series and sensor data via a MAT file containing 
@@ -113,6 +156,8 @@ class VHDR(ABCUploader):
     _ui_subsection = "signals"
     _ui_description = "Upload continuous EEG data from a BrainVision file"
 
+    BINARY_FORMATS = {'IEEE_FLOAT_32': '<f4', 'INT_16': '<i2', 'UINT_16': '<u2', 'INT_32': '<i4'}
+
 
     def get_upload_input_tree(self):
         return [{'name': 'vhdr',
@@ -134,6 +179,32 @@ class VHDR(ABCUploader):
 
     def launch(self, vhdr, dat):
 
+        self.read_header(vhdr, dat)
+        self.read_data()
+
+        # create TVB datatypes
+        ch = SensorsEEG(
+            storage_path=self.storage_path,
+            labels=self.labels,
+            number_of_sensors=len(self.labels)
+        )
+        uid = vhdr + '-sensors'
+        self._capture_operation_results([ch], uid=uid)
+
+        ts = TimeSeriesEEG(
+            sensors=ch,
+            storage_path=self.storage_path
+        )
+        write_signal_blocks(ts, iter_signal_blocks(self.data, self.resolutions), self.fs)
+        del self.data
+
+        return ts
+
+
+    def read_header(self, vhdr, dat=None):
+        """
+        Read the VHDR file, into attributes of this importer.
+        """
         self.filename = vhdr
         self.wd, _ = os.path.split(vhdr)
 
@@ -158,55 +229,39 @@ class VHDR(ABCUploader):
 
         self.binaryformat = self.cp.get('Binary Infos', 'BinaryFormat')
 
-        self.labels = [self.cp.get('Channel Infos', o).split(',')[0]
-                       for o in self.cp.options('Channel Infos')]
+        # Ch<n>=<label>,<reference>,<resolution>,<unit>
+        channel_infos = [self.cp.get('Channel Infos', o).split(',') for o in self.cp.options('Channel Infos')]
+        self.labels = [info[0] for info in channel_infos]
+        self.resolutions = numpy.array([float(info[2]) if len(info) > 2 and info[2].strip() else 1.0
+                                        for info in channel_infos], dtype=numpy.float32)
 
         self.fs = self.srate = 1e6 / float(self.samplinginterval)
         self.nchan = int(self.numberofchannels)
 
-        # important if not in same directory
-        self.datafile = os.path.join(self.wd, self.datafile)
-
-        self.read_data()
-
-        # create TVB datatypes
-        ch = SensorsEEG(
-            storage_path=self.storage_path,
-            labels=self.labels,
-            number_of_sensors=len(self.labels)
-        )
-        uid = vhdr + '-sensors'
-        self._capture_operation_results([ch], uid=uid)
-
-        ts = TimeSeriesEEG(
-            sensors=ch,
-            storage_path=self.storage_path
-        )
-        dat = self.data.T[:, numpy.newaxis, :, numpy.newaxis]
-        ts.write_data_slice(dat)
-        ts.length_1d, ts.length_2d, ts.length_3d, ts.length_4d = dat.shape
-        ts.labels_ordering = 'Time 1 Channel 1'.split()
-        ts.write_time_slice(numpy.r_[:dat.shape[0]] * 1.0 / self.fs)
-        ts.start_time = 0.0
-        ts.sample_period_unit = 's'
-        ts.sample_period = 1.0 / float(self.fs)
-        ts.close_file()
-
-        return ts
+        # important if not in same directory; the uploaded DAT file does not keep its original name
+        if dat is not None and os.path.exists(dat):
+            self.datafile = dat
+        else:
+            self.datafile = os.path.join(self.wd, self.datafile)
 
 
-    def read_data(self, mmap=False, dt='float32', mode='r'):
+    def read_data(self, mode='r'):
         """
-        VHDR stores data in channel contiguous way such that reading disparate pieces
-        in time is fast, when using memmap.
+        Map the binary file, with the type and orientation declared in the header, without reading it.
+        Afterwards self.data is a (samples x channels) view: multiplexed files (all channels of one sample stored
+        together, the default) are read fast in time blocks, vectorized files (one channel after the other)
+        are read fast by channel.
         """
-
-        if mmap:
-            ary = numpy.memmap(self.datafile, dt, mode)
+        binary_format = self.binaryformat.strip().upper()
+        if binary_format not in self.BINARY_FORMATS:
+            raise LaunchException("Unsupported BrainVision binary format %s" % self.binaryformat)
+        dtype = numpy.dtype(self.BINARY_FORMATS[binary_format])
+        self.nsamp = os.path.getsize(self.datafile) // (dtype.itemsize * self.nchan)
+
+        if getattr(self, 'dataorientation', 'MULTIPLEXED').strip().upper() == 'VECTORIZED':
+            self.data = numpy.memmap(self.datafile, dtype, mode, shape=(self.nchan, self.nsamp)).T
         else:
-            ary = numpy.fromfile(self.datafile, dt)
-        self.data = ary.reshape((-1, self.nchan)).T
-        self.nsamp = self.data.shape[1]
+            self.data = numpy.memmap(self.datafile, dtype, mode, shape=(self.nsamp, self.nchan))
 
 
 
@@ -238,13 +293,7 @@ class EEGLAB(ABCUploader):
 
     def launch(self, matfile, fdtfile):
 
-        self.mat = loadmat(matfile)
-        self.fs = self.mat['EEG']['srate'][0, 0][0, 0]
-        self.nsamp = self.mat['EEG']['pnts'][0, 0][0, 0]
-        self.data = numpy.fromfile(fdtfile, dtype=numpy.float32)
-        self.data = self.data.reshape((self.nsamp, -1)).T
-        self.nchan = self.data.shape[0]
-        self.labels = [c[0] for c in self.mat['EEG']['chanlocs'][0, 0]['labels'][0]]
+        self.read_files(matfile, fdtfile)
 
         ch = SensorsEEG(
             storage_path=self.storage_path,
@@ -258,19 +307,20 @@ class EEGLAB(ABCUploader):
             storage_path=self.storage_path
         )
 
-        # (nchan x ntime) -> (t, sv, ch, mo)
-        dat = self.data.T[:, numpy.newaxis, :, numpy.newaxis]
+        write_signal_blocks(ts, iter_signal_blocks(self.data), self.fs)
+        del self.data
 
-        # write data
-        ts.write_data_slice(dat)
+        return ts
 
-        # fill in header info
-        ts.length_1d, ts.length_2d, ts.length_3d, ts.length_4d = dat.shape
-        ts.labels_ordering = 'Time 1 Channel 1'.split()
-        ts.write_time_slice(numpy.r_[:dat.shape[0]] * 1.0 / self.fs)
-        ts.start_time = 0.0
-        ts.sample_period_unit = 's'
-        ts.sample_period = 1.0 / float(self.fs)
-        ts.close_file()
 
-        return ts
+    def read_files(self, matfile, fdtfile):
+        """
+        Read the SET header, and map the FDT file without reading it: self.data is a (samples x channels) view.
+        """
+        self.mat = loadmat(matfile)
+        self.fs = self.mat['EEG']['srate'][0, 0][0, 0]
+        self.nsamp = int(self.mat['EEG']['pnts'][0, 0][0, 0])
+        # FDT files hold float32 samples, with all the channels of a sample stored together
+        self.nchan = os.path.getsize(fdtfile) // (numpy.dtype(numpy.float32).itemsize * self.nsamp)
+        self.data = numpy.memmap(fdtfile, numpy.float32, 'r', shape=(self.nsamp, self.nchan))
+        self.labels = [c[0] for c in self.mat['EEG']['chanlocs'][0, 0]['labels'][0]]
@@ -37,6 +37,7 @@ from tvb.adapters.uploaders.abcuploader import ABCUploader
 from tvb.core.adapters.exceptions import LaunchException
 from tvb.core.entities.file.files_helper import TvbZip
 from tvb.core.entities.storage import transactional
+from tvb.core.utils import read_text_matrix
 from tvb.datatypes.tracts import Tracts
 
 
@@ -72,7 +73,7 @@ class TractsImporter(ABCUploader):
             # todo sort tract8 before tract74 parse ints out of file names
             for tractf in zipf.namelist():
                 vertices_file = zipf.open(tractf)
-                tract_vertices = numpy.loadtxt(vertices_file, dtype=numpy.float32)
+                tract_vertices = read_text_matrix(vertices_file, dtype=numpy.float32, columns=3)
                 tracts.append(tract_vertices)
                 max_tract_count = max(max_tract_count, len(tract_vertices))
                 vertices_file.close()
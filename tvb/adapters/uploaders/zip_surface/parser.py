@@ -34,7 +34,9 @@
 import os
 import re
 import numpy
+from multiprocessing.pool import ThreadPool
 from tvb.core.entities.file.files_helper import TvbZip
+from tvb.core.utils import count_text_rows, read_text_matrix
 
 
 class ZipSurfaceParser(object):
@@ -53,11 +55,12 @@ class ZipSurfaceParser(object):
 
     RIGHT_SUFFIX_RE = re.compile('^(right|rh|r).*')
 
+    MAX_PARSING_THREADS = 4
+
     def __init__(self, path):
         self.bi_hemispheric = False
         self.vertices, self.normals, self.triangles = [], [], []
         self.hemisphere_mask = []
-        self._read_vertices = 0
 
         with TvbZip(path) as self._zipf:
             self._read()
@@ -83,26 +86,18 @@ class ZipSurfaceParser(object):
         )
 
         if self.bi_hemispheric:
-            self._read_files(vertices_lh, normals_lh, triangles_lh)
-            vertices_in_lh = self._read_vertices
-            self._read_files(vertices_rh, normals_rh, triangles_rh)
-            self._stack_arrays()
+            # left hemisphere files come first, so the concatenated arrays hold the left part at the beginning
+            vertices_counts = self._read_files(vertices_lh + vertices_rh, normals_lh + normals_rh,
+                                               triangles_lh + triangles_rh)
+            vertices_in_lh = sum(vertices_counts[:len(vertices_lh)])
 
             self.hemisphere_mask = numpy.ones(len(self.vertices), dtype=numpy.bool)
             self.hemisphere_mask[0:vertices_in_lh] = 0
         else:
             self._read_files(vertices, normals, triangles)
-            self._stack_arrays()
             self.hemisphere_mask = numpy.zeros(len(self.vertices), dtype=numpy.bool)
 
 
-    def _stack_arrays(self):
-        self.vertices = numpy.vstack(self.vertices)
-        self.triangles = numpy.vstack(self.triangles)
-        if self.normals:
-            self.normals = numpy.vstack(self.normals)
-
-
     def _group_by_type(self, names):
         vertices, normals, triangles = [], [], []
 
@@ -140,29 +135,64 @@ class ZipSurfaceParser(object):
     def _read_files(self, vertices_files, normals_files, triangles_files):
         """
         Read vertices, normals and triangles from files.
-        All files of a type are concatenated.
-        """
-        # we need to process vertices in parallel with triangles, so that we can offset triangle indices
-        for vertices_file, triangles_file in zip(vertices_files, triangles_files):
-            vertices_file = self._zipf.open(vertices_file)
-            triangles_file = self._zipf.open(triangles_file)
-
-            current_vertices = numpy.loadtxt(vertices_file, dtype=numpy.float32)
-            self.vertices.append(current_vertices)
-
-            current_triangles = numpy.loadtxt(triangles_file, dtype=numpy.int32)
-            # offset triangles by amount of previously read vertices
-            current_triangles += self._read_vertices
-            self.triangles.append(current_triangles)
+        All files of a type are concatenated: each file is decoded by a pool of threads,
+        straight into its own slice of the final array.
 
-            self._read_vertices += len(current_vertices)
-            vertices_file.close()
-            triangles_file.close()
+        :returns: the number of vertices read from each of the vertices files
+        """
+        pool = ThreadPool(min(self.MAX_PARSING_THREADS, len(vertices_files + normals_files + triangles_files)))
+        try:
+            vertices = self._schedule_parsing(pool, vertices_files, numpy.float32)
+            triangles = self._schedule_parsing(pool, triangles_files, numpy.int32)
+            normals = self._schedule_parsing(pool, normals_files, numpy.float32)
+
+            self.vertices, vertices_counts = self._collect_parsed(*vertices)
+            self.triangles, triangles_counts = self._collect_parsed(*triangles)
+            if normals_files:
+                self.normals, _ = self._collect_parsed(*normals)
+        finally:
+            pool.close()
+            pool.join()
+
+        # offset triangles of each file by amount of previously read vertices
+        vertices_offset = 0
+        triangles_start = 0
+        for vertices_count, triangles_count in zip(vertices_counts, triangles_counts):
+            self.triangles[triangles_start:triangles_start + triangles_count] += vertices_offset
+            vertices_offset += vertices_count
+            triangles_start += triangles_count
+
+        return vertices_counts
+
+
+    def _schedule_parsing(self, pool, file_names, dtype):
+        """
+        Preallocate the concatenated result for all the given files and submit one parsing task per file.
+        The slice reserved for a file is an upper bound of its row count; blank lines are compacted afterwards.
+        """
+        contents = [self._zipf.read(file_name) for file_name in file_names]
+        offsets = numpy.cumsum([0] + [count_text_rows(content) for content in contents])
+        result = numpy.empty((offsets[-1], 3), dtype=dtype)
 
-        for normals_file in normals_files:
-            normals_file = self._zipf.open(normals_file)
+        tasks = []
+        for i, content in enumerate(contents):
+            kwargs = {'dtype': dtype, 'columns': 3, 'out': result[offsets[i]:offsets[i + 1]]}
+            tasks.append(pool.apply_async(read_text_matrix, (content,), kwargs))
+        return result, offsets, tasks
 
-            current_normals = numpy.loadtxt(normals_file, dtype=numpy.float32)
-            self.normals.append(current_normals)
 
-            normals_file .close()
\ No newline at end of file
+    @staticmethod
+    def _collect_parsed(result, offsets, tasks):
+        """
+        Wait for the parsing tasks of one file type.
+        :returns: the concatenated array and the number of rows read from each file
+        """
+        counts = []
+        rows = 0
+        for i, task in enumerate(tasks):
+            count = len(task.get())
+            if rows != offsets[i]:
+                result[rows:rows + count] = result[offsets[i]:offsets[i] + count]
+            counts.append(count)
+            rows += count
+        return result[:rows], counts
@@ -34,15 +34,21 @@
 .. moduleauthor:: Bogdan Neacsa <bogdan.neacsa@codemart.ro>
 """
 
+import os
 import json
+import uuid
+import threading
 import numpy
 from tvb.adapters.visualizers.eeg_monitor import EegMonitor
 from tvb.adapters.visualizers.surface_view import prepare_shell_surface_urls
 from tvb.adapters.visualizers.sensors import prepare_sensors_as_measure_points_params
 from tvb.adapters.visualizers.sensors import prepare_mapped_sensors_as_measure_points_params
 from tvb.basic.filters.chain import FilterChain
+from tvb.basic.logger.builder import get_logger
 from tvb.core.entities.storage import dao
 from tvb.core.adapters.abcdisplayer import ABCDisplayer
+from tvb.core.entities.file.files_helper import FilesHelper
+from tvb.core.entities.file.hdf5_storage_manager import HDF5StorageManager
 from tvb.datatypes.surfaces import EEGCap
 from tvb.datatypes.region_mapping import RegionMapping
 from tvb.datatypes.surfaces_data import SurfaceData
@@ -51,6 +57,252 @@ from tvb.datatypes.time_series import TimeSeries, TimeSeriesSurface, TimeSeriesS
 
 MAX_MEASURE_POINTS_LENGTH = 235
 
+RESOLUTION_VERTICES = 'vertices'
+
+## Region level data being computed in background threads, by cache file path (see RegionAggregation.prepare)
+_RUNNING_AGGREGATIONS = {}
+_AGGREGATIONS_LOCK = threading.Lock()
+
+
+
+def aggregate_regions(data, weights, region_starts, regions_order, number_of_regions):
+    """
+    Reduce the space dimension of a block of TimeSeries data, from vertices to regions.
+
+    :param data: array (time, state variables, vertices, modes)
+    :param weights: array (state variables, vertices, modes), the weight of each vertex in its region value
+    :param region_starts: for each non empty region, its first position in `regions_order`
+    :param regions_order: vertices indices sorted by region
+    :returns: array (time, state variables, regions, modes), with the weighted sums of the region vertices;
+        regions without any vertex are 0
+    """
+    weighted = (data * weights[numpy.newaxis])[:, :, regions_order, :]
+    result = numpy.zeros(data.shape[:2] + (number_of_regions, data.shape[3]))
+    non_empty = numpy.diff(numpy.append(region_starts, len(regions_order))) > 0
+    result[:, :, non_empty, :] = numpy.add.reduceat(weighted, region_starts[non_empty], axis=2)
+    return result
+
+
+
+class RegionAggregation(object):
+    """
+    Region level version of a surface TimeSeries, built through a RegionMapping, for playing it in the brain viewer
+    with one value per region instead of one per vertex.
+
+    Each region value is either the mean of its vertices (METHOD_MEAN), or the projection of its vertices on their
+    first principal component (METHOD_PCA), scaled such that a region with all vertices in phase gets their mean.
+    The result is computed once, reading the TimeSeries in blocks of CHUNK_SIZE time points, and kept in a cache
+    file next to the TimeSeries, thus it is removed together with it. The viewer launch only starts computing it
+    in background (see prepare); the data requests wait for it.
+    """
+    METHOD_MEAN = 'mean'
+    METHOD_PCA = 'pca'
+    METHODS = {METHOD_MEAN: 'Regions (mean of the vertices)',
+               METHOD_PCA: 'Regions (first principal component of the vertices)'}
+    CHUNK_SIZE = 1000
+    ## Bytes for the covariance matrices of the regions processed in one pass over the TimeSeries (PCA only).
+    ## A region needing more gets a pass of its own.
+    PCA_MEMORY_BUDGET = 256 * 2 ** 20
+    DATASET_NAME = 'data'
+    ## Methods which can be called from the web client, as for a TimeSeries
+    EXPOSED_METHODS = ('read_data_page', 'read_data_shape', 'get_min_max_values')
+
+
+    def __init__(self, time_series, region_map, method=METHOD_MEAN):
+        if method not in self.METHODS:
+            raise ValueError("Invalid aggregation method %s, expected one of %s" % (method, self.METHODS.keys()))
+        self.logger = get_logger(self.__class__.__module__)
+        self.time_series = time_series
+        self.region_map = region_map
+        self.method = method
+        self.number_of_regions = region_map.connectivity.number_of_regions
+        cache_name = "regions-%s-%s" % (method, region_map.gid)
+        self.cache_path = FilesHelper().get_datatype_cache_path(time_series, cache_name)
+
+
+    def read_data_shape(self):
+        shape = self.time_series.read_data_shape()
+        return shape[0], shape[1], self.number_of_regions, shape[3]
+
+
+    def get_min_max_values(self):
+        metadata = self._get_storage().get_metadata()
+        return float(metadata['minimum']), float(metadata['maximum'])
+
+
+    def read_data_page(self, from_idx, to_idx, step=None, specific_slices=None):
+        """
+        Same as TimeSeries.read_data_page: a 2D array (time, regions) for one state variable and mode.
+        """
+        from_idx, to_idx = int(from_idx), int(to_idx)
+        step = 1 if step is None else int(step)
+        if isinstance(specific_slices, basestring):
+            specific_slices = json.loads(specific_slices)
+        shape = self.read_data_shape()
+        slices = [slice(from_idx, min(to_idx, shape[0]), step), None, slice(shape[2]), None]
+        for i in (1, 3):
+            if specific_slices is None:
+                slices[i] = slice(0, 1)
+            else:
+                slices[i] = slice(specific_slices[i], min(specific_slices[i] + 1, shape[i]), 1)
+        data = self._get_storage().get_data(self.DATASET_NAME, tuple(slices))
+        return data.reshape((data.shape[0], data.shape[2]))
+
+
+    def prepare(self):
+        """
+        Start computing the region level data in a background thread, when not in cache yet.
+
+        :returns: True when the data is already computed
+        """
+        if self._get_cached_storage() is not None:
+            return True
+        with _AGGREGATIONS_LOCK:
+            if self.cache_path not in _RUNNING_AGGREGATIONS:
+                thread = threading.Thread(target=self._build_in_background, name="RegionAggregation")
+                thread.daemon = True
+                _RUNNING_AGGREGATIONS[self.cache_path] = thread
+                thread.start()
+        return False
+
+
+    def _build_in_background(self):
+        try:
+            self._build()
+        except Exception:
+            self.logger.exception("Could not compute the %s of regions for %s" % (self.method, self.cache_path))
+        finally:
+            with _AGGREGATIONS_LOCK:
+                _RUNNING_AGGREGATIONS.pop(self.cache_path, None)
+
+
+    def _get_cached_storage(self):
+        folder, file_name = os.path.split(self.cache_path)
+        storage = HDF5StorageManager(folder, file_name)
+        if storage.is_valid_hdf5_file() and 'maximum' in storage.get_metadata():
+            return storage
+        return None
+
+
+    def _get_storage(self):
+        """
+        :returns: HDF5StorageManager for the cache file, computed first if missing (or waited for, when
+            being computed in background)
+        """
+        storage = self._get_cached_storage()
+        if storage is not None:
+            return storage
+        with _AGGREGATIONS_LOCK:
+            running = _RUNNING_AGGREGATIONS.get(self.cache_path)
+        if running is not None:
+            running.join()
+        storage = self._get_cached_storage()
+        if storage is None:
+            self._build()
+            storage = self._get_cached_storage()
+        return storage
+
+
+    def _read_chunks(self):
+        time_length = self.time_series.read_data_shape()[0]
+        for start in xrange(0, time_length, self.CHUNK_SIZE):
+            yield self.time_series.get_data(self.DATASET_NAME, (slice(start, min(start + self.CHUNK_SIZE,
+                                                                                 time_length)),))
+
+
+    def _compute_weights(self, mapping, regions_order, region_starts):
+        """
+        :returns: (weights of the vertices, offsets of the regions), such that the value of a region is
+            the sum of its weighted vertices, plus its offset
+        """
+        shape = self.time_series.read_data_shape()
+        counts = numpy.bincount(mapping, minlength=self.number_of_regions).astype(numpy.float64)
+        vertex_counts = counts[mapping]
+        weights = numpy.tile(1.0 / vertex_counts[numpy.newaxis, :, numpy.newaxis], (shape[1], 1, shape[3]))
+        offsets = numpy.zeros((shape[1], self.number_of_regions, shape[3]))
+        if self.method == self.METHOD_MEAN:
+            return weights, offsets
+
+        ## First principal component of each region, from the sums and products of its vertices over time.
+        ## Memory use grows with the squared number of vertices in a region, thus the regions are processed
+        ## in batches which fit PCA_MEMORY_BUDGET, with one pass over the TimeSeries for each batch.
+        regions = [regions_order[start: start + int(counts[region])]
+                   for region, start in enumerate(region_starts) if counts[region] > 0]
+        for batch in self._split_in_batches(regions, shape[1] * shape[3] * 8):
+            sums = [numpy.zeros((shape[1], len(vertices), shape[3])) for vertices in batch]
+            products = [numpy.zeros((shape[1], shape[3], len(vertices), len(vertices))) for vertices in batch]
+            for chunk in self._read_chunks():
+                for vertices, region_sum, region_products in zip(batch, sums, products):
+                    values = chunk[:, :, vertices, :]
+                    region_sum += values.sum(axis=0)
+                    region_products += numpy.einsum('tsvm,tswm->smvw', values, values)
+
+            for vertices, region_sum, region_products in zip(batch, sums, products):
+                means = region_sum / shape[0]
+                for var in xrange(shape[1]):
+                    for mode in xrange(shape[3]):
+                        centered_mean = means[var, :, mode]
+                        covariance = (region_products[var, mode] / shape[0]
+                                      - numpy.outer(centered_mean, centered_mean))
+                        component = numpy.linalg.eigh(covariance)[1][:, -1]
+                        if component.sum() < 0:
+                            component = -component
+                        component /= numpy.sqrt(len(vertices))
+                        weights[var, vertices, mode] = component
+                        offsets[var, mapping[vertices[0]], mode] = (centered_mean.mean()
+                                                                    - centered_mean.dot(component))
+            del sums, products
+        return weights, offsets
+
+
+    def _split_in_batches(self, regions, bytes_per_product):
+        """
+        Group consecutive regions, such that the products matrices of a group fit PCA_MEMORY_BUDGET.
+        """
+        batch, batch_size = [], 0
+        for vertices in regions:
+            region_size = bytes_per_product * len(vertices) ** 2
+            if batch and batch_size + region_size > self.PCA_MEMORY_BUDGET:
+                yield batch
+                batch, batch_size = [], 0
+            batch.append(vertices)
+            batch_size += region_size
+        if batch:
+            yield batch
+
+
+    def _build(self):
+        """
+        Compute the region level data into a temporary file, then move it in place.
+        """
+        mapping = numpy.asarray(self.region_map.array_data, dtype=numpy.int64)
+        regions_order = numpy.argsort(mapping, kind='mergesort')
+        counts = numpy.bincount(mapping, minlength=self.number_of_regions)
+        region_starts = numpy.cumsum(counts) - counts
+        weights, offsets = self._compute_weights(mapping, regions_order, region_starts)
+
+        folder, file_name = os.path.split(self.cache_path)
+        temporary_name = file_name + "." + uuid.uuid4().hex
+        storage = HDF5StorageManager(folder, temporary_name)
+        self.logger.info("Computing %s of %s regions for %s" % (self.method, self.number_of_regions, self.cache_path))
+        minimum, maximum = numpy.inf, -numpy.inf
+        try:
+            for chunk in self._read_chunks():
+                regions_data = aggregate_regions(chunk, weights, region_starts, regions_order, self.number_of_regions)
+                regions_data += offsets[numpy.newaxis]
+                minimum, maximum = min(minimum, regions_data.min()), max(maximum, regions_data.max())
+                storage.append_data(self.DATASET_NAME, regions_data, grow_dimension=0, close_file=False)
+            storage.close_file()
+            storage.set_metadata({'minimum': minimum, 'maximum': maximum, 'method': self.method,
+                                  'region_mapping': self.region_map.gid})
+            if os.path.exists(self.cache_path):
+                os.remove(self.cache_path)
+            os.rename(os.path.join(folder, temporary_name), self.cache_path)
+        finally:
+            storage.close_file()
+            if os.path.exists(os.path.join(folder, temporary_name)):
+                os.remove(os.path.join(folder, temporary_name))
+
 
 
 class BrainViewer(ABCDisplayer):
@@ -61,6 +313,8 @@ class BrainViewer(ABCDisplayer):
     """
     _ui_name = "Brain Activity Visualizer"
     PAGE_SIZE = 500
+    ## Read the region level data of a surface TimeSeries (see RegionAggregation), with the same page URLs
+    REGION_AGGREGATE_URL_PREFIX = "/flow/read_region_aggregate/"
 
 
     def get_input_tree(self):
@@ -72,10 +326,18 @@ class BrainViewer(ABCDisplayer):
                                            values=[['TimeSeriesRegion', 'TimeSeriesSurface'], True])},
 
                 {'name': 'shell_surface', 'label': 'Shell Surface', 'type': SurfaceData, 'required': False,
-                 'description': "Surface to be displayed semi-transparently, for visual purposes only."}]
+                 'description': "Surface to be displayed semi-transparently, for visual purposes only."},
+
+                {'name': 'resolution', 'label': 'Resolution', 'type': 'select', 'required': False,
+                 'default': RESOLUTION_VERTICES,
+                 'options': [{'name': 'Vertices', 'value': RESOLUTION_VERTICES}] +
+                            [{'name': RegionAggregation.METHODS[method], 'value': method}
+                             for method in sorted(RegionAggregation.METHODS)],
+                 'description': "For a Surface Time Series with a Region Mapping, play it with one value per region "
+                                "instead of one per vertex, transferring much less data."}]
 
 
-    def get_required_memory_size(self, time_series, shell_surface=None):
+    def get_required_memory_size(self, time_series, shell_surface=None, resolution=None):
         """
         Assume one page doesn't get 'dumped' in time and it is highly probably that
         two consecutive pages will be in the same time in memory.
@@ -112,11 +374,11 @@ class BrainViewer(ABCDisplayer):
         return self.build_display_result("brain/portlet_preview", params)
 
 
-    def launch(self, time_series, shell_surface=None):
+    def launch(self, time_series, shell_surface=None, resolution=None):
         """
         Build visualizer's page.
         """
-        params = self.compute_parameters(time_series, shell_surface)
+        params = self.compute_parameters(time_series, shell_surface, resolution)
         return self.build_display_result("brain/view", params, pages=dict(controlPage="brain/controls"))
 
 
@@ -162,10 +424,13 @@ class BrainViewer(ABCDisplayer):
                 'noOfMeasurePoints': self.measure_points_no}
 
 
-    def compute_parameters(self, time_series, shell_surface=None):
+    def compute_parameters(self, time_series, shell_surface=None, resolution=None):
         """
         Create the required parameter dictionary for the HTML/JS viewer.
 
+        :param resolution: one of RegionAggregation.METHODS, for playing a surface TimeSeries at region level;
+            ignored for other TimeSeries, or when the surface has no RegionMapping
+
         :rtype: `dict`
         :raises Exception: when
                     * number of measure points exceeds the maximum allowed
@@ -173,6 +438,11 @@ class BrainViewer(ABCDisplayer):
 
         """
         self.populate_surface_fields(time_series)
+        aggregation = None
+        if self.one_to_one_map and resolution in RegionAggregation.METHODS and self.region_map is not None:
+            aggregation = RegionAggregation(time_series, self.region_map, resolution)
+            self.one_to_one_map = False
+            self.PAGE_SIZE = BrainViewer.PAGE_SIZE
 
         url_vertices, url_normals, url_lines, url_triangles, url_region_map = self.surface.get_urls_for_rendering(True, self.region_map)
         hemisphere_chunk_mask = self.surface.get_slices_to_hemisphere_mask()
@@ -183,7 +453,16 @@ class BrainViewer(ABCDisplayer):
             raise Exception("Max number of measure points " + str(MAX_MEASURE_POINTS_LENGTH) + " exceeded.")
 
         base_activity_url, time_urls = self._prepare_data_slices(time_series)
-        min_val, max_val = time_series.get_min_max_values()
+        if aggregation is None:
+            min_val, max_val = time_series.get_min_max_values()
+        else:
+            base_activity_url = self.REGION_AGGREGATE_URL_PREFIX + "/".join([time_series.gid, resolution,
+                                                                             self.region_map.gid])
+            if aggregation.prepare():
+                min_val, max_val = aggregation.get_min_max_values()
+            else:
+                ## Still being computed; region means stay within the range of the vertices
+                min_val, max_val = time_series.get_min_max_values()
         legend_labels = self._compute_legend_labels(min_val, max_val)
 
         data_shape = time_series.read_data_shape()
@@ -205,7 +484,8 @@ class BrainViewer(ABCDisplayer):
                            biHemispheric=self.surface.bi_hemispheric,
                            hemisphereChunkMask=json.dumps(hemisphere_chunk_mask),
                            time_series=time_series, pageSize=self.PAGE_SIZE, urlRegionBoundaries=boundary_url,
-                           measurePointsLabels=time_series.get_space_labels(),
+                           measurePointsLabels=(time_series.get_space_labels() if aggregation is None
+                                                else list(self.connectivity.region_labels)),
                            measurePointsTitle=time_series.title))
 
         params.update(self.build_template_params_for_subselectable_datatype(time_series))
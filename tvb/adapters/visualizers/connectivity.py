@@ -33,15 +33,18 @@
 .. moduleauthor:: Bogdan Neacsa <bogdan.neacsa@codemart.ro>
 """
 
+import os
 import json
 import math
+import uuid
 import numpy
 import pylab
-from copy import copy
 from tvb.basic.profile import TvbProfile
+from tvb.basic.logger.builder import get_logger
 from tvb.config import CONNECTIVITY_CREATOR_MODULE, CONNECTIVITY_CREATOR_CLASS
 from tvb.core.adapters.abcdisplayer import ABCDisplayer
 from tvb.core.adapters.exceptions import LaunchException
+from tvb.core.entities.file.files_helper import FilesHelper
 from tvb.basic.filters.chain import FilterChain
 from tvb.core.services.flow_service import FlowService
 from tvb.datatypes.connectivity import Connectivity
@@ -49,6 +52,50 @@ from tvb.datatypes.graph import ConnectivityMeasure
 from tvb.datatypes.surfaces import CorticalSurface
 
 
+LOGGER = get_logger(__name__)
+DERIVED_PARAMETERS_CACHE = "connectivity-viewer"
+
+
+
+def get_derived_parameters(connectivity, key, compute_function):
+    """
+    Parameters depending only on the Connectivity data are kept in a JSON cache file next to its H5 file,
+    thus computed once per Connectivity GID. The file is removed together with the Connectivity.
+
+    :param key: name of the parameters group in the cache file
+    :param compute_function: called without arguments when the group is not yet cached; returns JSON-able data
+    """
+    try:
+        cache_path = FilesHelper().get_datatype_cache_path(connectivity, DERIVED_PARAMETERS_CACHE)
+    except Exception:
+        # Not yet stored Connectivity
+        return compute_function()
+
+    cached = {}
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path) as cache_file:
+                cached = json.load(cache_file)
+        except (IOError, ValueError), excep:
+            LOGGER.warning("Ignoring invalid cache file %s: %s" % (cache_path, str(excep)))
+    if key in cached:
+        return cached[key]
+
+    cached[key] = compute_function()
+    temporary_path = cache_path + "." + uuid.uuid4().hex
+    try:
+        with open(temporary_path, 'w') as cache_file:
+            json.dump(cached, cache_file)
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+        os.rename(temporary_path, cache_path)
+    except (IOError, OSError), excep:
+        LOGGER.warning("Could not write cache file %s: %s" % (cache_path, str(excep)))
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+    return cached[key]
+
+
 class ConnectivityViewer(ABCDisplayer):
     """ 
     Given a Connectivity Matrix and a Surface data the viewer will display the matrix 'inside' the surface data. 
@@ -141,18 +188,12 @@ class ConnectivityViewer(ABCDisplayer):
     @staticmethod
     def _compute_matrix_extrema(m):
         """Returns the min max and the minimal nonzero value from ``m``"""
-        minv = float('inf')
-        min_nonzero = float('inf')
-        maxv = - float('inf')
-
-        for data in m:
-            for d in data:
-                minv = min(minv, d)
-                maxv = max(maxv, d)
-                if d != 0:
-                    min_nonzero = min(min_nonzero, d)
-
-        return minv, maxv, min_nonzero
+        m = numpy.asarray(m, dtype=numpy.float64)
+        if m.size == 0:
+            return float('inf'), - float('inf'), float('inf')
+        non_zero = m[m != 0]
+        min_nonzero = float(non_zero.min()) if non_zero.size else float('inf')
+        return float(m.min()), float(m.max()), min_nonzero
 
 
     def compute_connectivity_global_params(self, input_data, surface_data=None):
@@ -180,8 +221,10 @@ class ConnectivityViewer(ABCDisplayer):
         submit_url = '/flow/%d/%d' % (group.fk_category, group.id)
         global_pages = dict(controlPage="connectivity/top_right_controls")
 
-        minimum, maximum, minimum_non_zero = self._compute_matrix_extrema(input_data.ordered_weights)
-        minimum_t, maximum_t, minimum_non_zero_t = self._compute_matrix_extrema(input_data.ordered_tracts)
+        extrema = get_derived_parameters(input_data, 'extrema',
+                                         lambda: [self._compute_matrix_extrema(input_data.ordered_weights),
+                                                  self._compute_matrix_extrema(input_data.ordered_tracts)])
+        (minimum, maximum, minimum_non_zero), (minimum_t, maximum_t, minimum_non_zero_t) = extrema
 
         global_params = dict(urlWeights=path_weights, urlPositions=path_pos,
                              urlTracts=path_tracts, urlLabels=path_labels,
@@ -273,6 +316,8 @@ class Connectivity2DViewer(object):
     MAX_RAY = 40
     MIN_WEIGHT_VALUE = 0.0
     MAX_WEIGHT_VALUE = 0.6
+    # Only the strongest edges of a node are displayed, for large connectivities
+    MAX_EDGES_PER_NODE = 100
 
 
     def compute_parameters(self, input_data, colors=None, rays=None, step=None):
@@ -285,19 +330,16 @@ class Connectivity2DViewer(object):
             raise LaunchException('The connectivity matrix you selected has fewer nodes than acceptable for display!')
 
         half = input_data.number_of_regions / 2
-        normalized_weights = self._normalize_weights(input_data.ordered_weights)
-        weights = Connectivity2DViewer._get_weights(normalized_weights)
+        nodes = get_derived_parameters(input_data, '2d_nodes_%d' % self.MAX_EDGES_PER_NODE,
+                                       lambda: self._compute_hemispheres_nodes(input_data))
 
         ## Compute shapes and colors ad adjacent data
         norm_rays, min_ray, max_ray = self._normalize_rays(rays, input_data.number_of_regions)
         colors, step = self._prepare_colors(colors, input_data.number_of_regions, step)
 
-        right_json = self._get_json(input_data.ordered_labels[half:], input_data.ordered_centres[half:], weights[1],
-                                    math.pi, 1, 2, norm_rays[half:], colors[half:], X_CANVAS_SMALL, Y_CANVAS_SMALL)
-        left_json = self._get_json(input_data.ordered_labels[:half], input_data.ordered_centres[:half], weights[0],
-                                   math.pi, 1, 2, norm_rays[:half], colors[:half], X_CANVAS_SMALL, Y_CANVAS_SMALL)
-        full_json = self._get_json(input_data.ordered_labels, input_data.ordered_centres, normalized_weights,
-                                   math.pi, 0, 1, norm_rays, colors, X_CANVAS_FULL, Y_CANVAS_FULL)
+        right_json = self._nodes2json(nodes['right'], norm_rays[half:], colors[half:])
+        left_json = self._nodes2json(nodes['left'], norm_rays[:half], colors[:half])
+        full_json = self._nodes2json(nodes['both'], norm_rays, colors)
 
         params = dict(bothHemisphereJson=full_json, rightHemisphereJson=right_json, leftHemisphereJson=left_json,
                       stepValue=step or max_ray, firstColor=self.DEFAULT_COLOR,
@@ -325,32 +367,82 @@ class Connectivity2DViewer(object):
         return params, {}
 
 
+    def _compute_hemispheres_nodes(self, input_data):
+        """
+        Compute the nodes of the 3 charts (both hemispheres, left and right) which do not depend on the
+        colors and rays given by the user.
+        """
+        half = input_data.number_of_regions / 2
+        labels = input_data.ordered_labels
+        positions = input_data.ordered_centres
+        normalized_weights = self._normalize_weights(input_data.ordered_weights)
+        left_weights, right_weights = Connectivity2DViewer._get_weights(normalized_weights)
+        return {'right': self._compute_nodes(labels[half:], positions[half:], right_weights, math.pi, 1, 2,
+                                             X_CANVAS_SMALL, Y_CANVAS_SMALL),
+                'left': self._compute_nodes(labels[:half], positions[:half], left_weights, math.pi, 1, 2,
+                                            X_CANVAS_SMALL, Y_CANVAS_SMALL),
+                'both': self._compute_nodes(labels, positions, normalized_weights, math.pi, 0, 1,
+                                            X_CANVAS_FULL, Y_CANVAS_FULL)}
+
+
     def _get_json(self, labels, positions, weights, rotate_angle, coord_idx1,
                   coord_idx2, dimensions_list, colors_list, x_canvas, y_canvas):
         """
         Method used for creating a valid JSON for an entire chart.
         """
-        max_y = max(positions[:, coord_idx2])
-        min_y = min(positions[:, coord_idx2])
-        max_x = max(positions[:, coord_idx1])
-        min_x = min(positions[:, coord_idx1])
+        nodes = self._compute_nodes(labels, positions, weights, rotate_angle, coord_idx1, coord_idx2,
+                                    x_canvas, y_canvas)
+        return self._nodes2json(nodes, dimensions_list, colors_list)
+
+
+    def _compute_nodes(self, labels, positions, weights, rotate_angle, coord_idx1, coord_idx2, x_canvas, y_canvas):
+        """
+        Compute the nodes of a chart, with their polar coordinates and edges, but without the custom shape.
+        """
+        positions = numpy.asarray(positions, dtype=numpy.float64)
+        x_values, y_values = positions[:, coord_idx1], positions[:, coord_idx2]
+        max_y, min_y = y_values.max(), y_values.min()
+        max_x, min_x = x_values.max(), x_values.min()
         y_scale = 2 * y_canvas / (max_y - min_y)
         x_scale = 2 * x_canvas / (max_x - min_x)
-        mid_x_value = (max_x + min_x) / 2
-        mid_y_value = (max_y + min_y) / 2
+        x_coords = (x_values - (max_x + min_x) / 2) * x_scale
+        y_coords = (y_values - (max_y + min_y) / 2) * y_scale
+        angles = (rotate_angle + numpy.arctan2(y_coords, x_coords)).tolist()
+        radiuses = numpy.sqrt(x_coords ** 2 + y_coords ** 2).tolist()
 
-        result_json = []
+        weights = numpy.asarray(weights, dtype=numpy.float64)
+        labels = list(labels)
+        nodes = []
+        for i, targets in enumerate(self._get_edges(weights)):
+            adjacencies = [{"nodeTo": labels[j], "data": {"weight": weight}}
+                           for j, weight in zip(targets.tolist(), weights[i, targets].tolist())]
+            nodes.append(self.point2json(labels[i], angles[i], radiuses[i], adjacencies))
+        return nodes
 
-        for i in xrange(len(positions)):
-            x_coord = (positions[i][coord_idx1] - mid_x_value) * x_scale
-            y_coord = (positions[i][coord_idx2] - mid_y_value) * y_scale
-            adjacencies = Connectivity2DViewer._get_adjacencies_json(weights[i], labels)
 
-            r = self.point2json(labels[i], x_coord, y_coord, adjacencies,
-                                rotate_angle, dimensions_list[i], colors_list[i])
-            result_json.append(r)
+    def _get_edges(self, weights):
+        """
+        :returns: for each node, the indices of the nodes with a non-zero edge to it, in ascending order.
+            When a node has more than MAX_EDGES_PER_NODE such edges, only the strongest ones are kept.
+        """
+        mask = weights != 0
+        crowded = numpy.nonzero(mask.sum(axis=1) > self.MAX_EDGES_PER_NODE)[0]
+        if len(crowded):
+            strongest = numpy.argsort(numpy.abs(weights[crowded]), axis=1)[:, -self.MAX_EDGES_PER_NODE:]
+            mask[crowded] = False
+            mask[crowded[:, numpy.newaxis], strongest] = True
+        return [numpy.nonzero(row)[0] for row in mask]
+
+
+    def _nodes2json(self, nodes, dimensions_list, colors_list):
+        """
+        Add the custom shape of each node, and serialize a chart.
+        """
+        for node, shape_dimension, shape_color in zip(nodes, dimensions_list, colors_list):
+            node["data"]["customShapeDimension"] = shape_dimension
+            node["data"]["customShapeColor"] = shape_color
+        return json.dumps(nodes)
 
-        return json.dumps(result_json)
 
     @staticmethod
     def _get_weights(weights):
@@ -359,48 +451,26 @@ class Connectivity2DViewer(object):
         left hemispheres. Those matrixes are obtained from
         a weights matrix which contains data related to both hemispheres.
         """
+        weights = numpy.asarray(weights)
         half = len(weights) / 2
-        l_aux, r_aux = weights[:half], weights[half:]
-        r_weights = []
-        l_weights = []
-        for i in range(half):
-            l_weights.append(l_aux[i][:half])
-        for i in range(half, len(weights)):
-            r_weights.append(r_aux[i - half][half:])
-        return l_weights, r_weights
+        return weights[:half, :half], weights[half:, half:]
 
 
-    def point2json(self, node_lbl, x_coord, y_coord, adjacencies, angle, shape_dimension, shape_color):
+    def point2json(self, node_lbl, angle, radius, adjacencies):
         """
         Method used for creating a valid JSON for a certain point.
         """
-        form = "circle"
-        default_dimension = 6
-        angle += math.atan2(y_coord, x_coord)
-        radius = math.sqrt(math.pow(x_coord, 2) + math.pow(y_coord, 2))
-
         return {
             "id": node_lbl, "name": node_lbl,
             "data": {
-                "$dim": default_dimension, "$type": form,
-                "$color": self.DEFAULT_COLOR, "customShapeDimension": shape_dimension,
-                "customShapeColor": shape_color, "angle": angle,
+                "$dim": 6, "$type": "circle",
+                "$color": self.DEFAULT_COLOR, "customShapeDimension": None,
+                "customShapeColor": None, "angle": angle,
                 "radius": radius
             },
             "adjacencies": adjacencies
         }
 
-    @staticmethod
-    def _get_adjacencies_json(point_weights, points_labels):
-        """
-        Method used for obtaining a valid JSON which will contain all the edges of a certain node.
-        """
-        adjacencies = []
-        for weight, label in zip(point_weights, points_labels):
-            if weight:
-                adjacencies.append({"nodeTo": label, "data": {"weight": weight}})
-        return adjacencies
-
 
     def _prepare_colors(self, colors, expected_size, step=None):
         """
@@ -450,17 +520,15 @@ class Connectivity2DViewer(object):
         Normalize the weights matrix. The values should be between 
         MIN_WEIGHT_VALUE and MAX_WEIGHT_VALUE
         """
-        weights = copy(weights)
+        weights = numpy.array(weights, dtype=numpy.float64)
         min_value = numpy.min(weights)
         max_value = numpy.max(weights)
         if min_value < self.MIN_WEIGHT_VALUE or max_value > self.MAX_WEIGHT_VALUE:
-            for i, row in enumerate(weights):
-                for j in xrange(len(row)):
-                    if min_value == max_value:
-                        weights[i][j] = self.MAX_WEIGHT_VALUE
-                    else:
-                        weights[i][j] = (self.MIN_WEIGHT_VALUE + ((weights[i][j] - min_value) / (max_value - min_value))
-                                         * (self.MAX_WEIGHT_VALUE - self.MIN_WEIGHT_VALUE))
+            if min_value == max_value:
+                weights[:] = self.MAX_WEIGHT_VALUE
+            else:
+                weights = (self.MIN_WEIGHT_VALUE + ((weights - min_value) / (max_value - min_value))
+                           * (self.MAX_WEIGHT_VALUE - self.MIN_WEIGHT_VALUE))
         return weights
 
 
@@ -50,7 +50,6 @@ class CovarianceVisualizer(MappedArrayVisualizer):
 
     def launch(self, datatype):
         """Construct data for visualization and launch it."""
-        # get data from corr datatype
-        matrix = datatype.get_data('array_data')
-        pars = self.compute_params(matrix, 'Covariance matrix plot')
+        pars = self.compute_tiled_params(datatype, 'Covariance matrix plot')
+        del pars['overview']
         return self.build_display_result("matrix/svg_view", pars)
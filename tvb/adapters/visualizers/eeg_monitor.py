@@ -34,12 +34,94 @@
 """
 import json
 import numpy
+from tvb.basic.logger.builder import get_logger
 from tvb.core.adapters.abcdisplayer import ABCDisplayer
 from tvb.datatypes.time_series import TimeSeries
 from tvb.core.adapters.exceptions import LaunchException
 
 
 
+class TimeSeriesStatistics(object):
+    """
+    Minimum, maximum and number of NaN (or infinite) values, for each (state variable, space, mode) of a TimeSeries,
+    over all time points.
+
+    They are computed once, in blocks of about CHUNK_ELEMENTS values, with NaN values masked out, and stored as
+    small data sets next to the TimeSeries data, in its H5 file. The number of time points covered is kept in their
+    metadata, thus statistics of a TimeSeries which grew meanwhile are computed again.
+    """
+    WHERE = "/statistics/"
+    MINIMUM = 'minimum'
+    MAXIMUM = 'maximum'
+    NAN_COUNT = 'nan_count'
+    KEY_TIME_LENGTH = 'time_length'
+    CHUNK_ELEMENTS = 2 ** 22
+
+
+    def __init__(self, time_series, data_shape=None):
+        self.logger = get_logger(self.__class__.__module__)
+        self.time_series = time_series
+        self.data_shape = data_shape or time_series.read_data_shape()
+
+
+    def get(self):
+        """
+        :returns: dictionary with the MINIMUM, MAXIMUM and NAN_COUNT arrays, of shape data_shape[1:]
+        """
+        statistics = self._read()
+        if statistics is None:
+            statistics = self.compute()
+            try:
+                for name, values in statistics.iteritems():
+                    self.time_series.store_data(name, values, where=self.WHERE)
+                self.time_series.set_metadata({self.KEY_TIME_LENGTH: self.data_shape[0]}, self.MINIMUM,
+                                              where=self.WHERE)
+            except Exception, excep:
+                self.logger.warning("Could not store statistics for TimeSeries %s" % self.time_series.gid)
+                self.logger.exception(excep)
+        return statistics
+
+
+    def _read(self):
+        """
+        :returns: the stored statistics, or None when missing or computed for fewer time points
+        """
+        try:
+            metadata = self.time_series.get_metadata(self.MINIMUM, where=self.WHERE)
+            if int(metadata.get(self.KEY_TIME_LENGTH, -1)) != self.data_shape[0]:
+                return None
+            return dict((name, self.time_series.get_data(name, where=self.WHERE))
+                        for name in (self.MINIMUM, self.MAXIMUM, self.NAN_COUNT))
+        except Exception:
+            return None
+
+
+    def compute(self):
+        """
+        Single pass over the TimeSeries data. Channels with only NaN values get 0 as minimum and maximum.
+        """
+        minimum = numpy.empty(self.data_shape[1:])
+        minimum.fill(numpy.inf)
+        maximum = numpy.empty(self.data_shape[1:])
+        maximum.fill(-numpy.inf)
+        nan_count = numpy.zeros(self.data_shape[1:], dtype=numpy.int64)
+
+        chunk_length = max(1, self.CHUNK_ELEMENTS // max(1, int(numpy.prod(self.data_shape[1:]))))
+        for start in xrange(0, self.data_shape[0], chunk_length):
+            data = self.time_series.get_data('data', (slice(start, min(start + chunk_length, self.data_shape[0])),))
+            invalid = ~numpy.isfinite(data)
+            nan_count += invalid.sum(axis=0)
+            masked = numpy.ma.masked_array(data, mask=invalid)
+            minimum = numpy.minimum(minimum, masked.min(axis=0).filled(numpy.inf))
+            maximum = numpy.maximum(maximum, masked.max(axis=0).filled(-numpy.inf))
+
+        all_invalid = nan_count == self.data_shape[0]
+        minimum[all_invalid] = 0
+        maximum[all_invalid] = 0
+        return {self.MINIMUM: minimum, self.MAXIMUM: maximum, self.NAN_COUNT: nan_count}
+
+
+
 class EegMonitor(ABCDisplayer):
     """
     This viewer takes as inputs at least one ArrayWrapper and at most 3 
@@ -56,6 +138,11 @@ class EegMonitor(ABCDisplayer):
     current_page = 0
 
 
+    def __init__(self):
+        ABCDisplayer.__init__(self)
+        self._data_shapes = {}
+
+
     def get_input_tree(self):
         """ Accept as input Array of any size"""
         return [{'name': 'input_data', 'label': 'Input Data', 'required': True,
@@ -141,9 +228,9 @@ class EegMonitor(ABCDisplayer):
 
         # Hardcoded now 1st dimension is time
         if not is_preview:
-            max_chunck_length = max([timeseries.read_data_shape()[0] for timeseries in original_timeseries])
+            max_chunck_length = max([self._read_data_shape(timeseries)[0] for timeseries in original_timeseries])
         else:
-            max_chunck_length = min(self.preview_page_size, original_timeseries[0].read_data_shape()[0])
+            max_chunck_length = min(self.preview_page_size, self._read_data_shape(original_timeseries[0])[0])
         # compute how many elements will be visible on the screen
         points_visible = min(max_chunck_length, 500)
 
@@ -202,7 +289,7 @@ class EegMonitor(ABCDisplayer):
         ts_names, graph_labels, grouped_labels  = [], [], []
 
         for timeseries in timeseries_list:
-            shape = timeseries.read_data_shape()
+            shape = self._read_data_shape(timeseries)
             no_of_lines += shape[self.selected_dimensions[1]]
             max_length = max(max_length, shape[0])
 
@@ -229,7 +316,7 @@ class EegMonitor(ABCDisplayer):
 
     def _fill_graph_labels(self, timeseries, graph_labels, mult_inp):
         """ Fill graph labels in the graph_labels parameter """
-        shape = timeseries.read_data_shape()
+        shape = self._read_data_shape(timeseries)
         space_labels = timeseries.get_space_labels()
         for j in range(shape[self.selected_dimensions[1]]):
             if space_labels:
@@ -246,19 +333,18 @@ class EegMonitor(ABCDisplayer):
             graph_labels.append(this_label)
 
 
-    @staticmethod
-    def _replace_nan_values(input_data):
-        """ Replace NAN values with a given values"""
-        is_any_value_nan = False
-        if not numpy.isfinite(input_data).all():
-            for idx in xrange(len(input_data)):
-                input_data[idx] = numpy.nan_to_num(input_data[idx])
-            is_any_value_nan = True
-        return is_any_value_nan
+    def _read_data_shape(self, timeseries):
+        """ Read the shape of a TimeSeries only once per launch """
+        if timeseries.gid not in self._data_shapes:
+            self._data_shapes[timeseries.gid] = timeseries.read_data_shape()
+        return self._data_shapes[timeseries.gid]
 
 
     def compute_required_info(self, list_of_timeseries):
-        """Compute average difference between Max and Min."""
+        """
+        Compute average difference between Max and Min, for the channels of the first state variable and mode
+        (as read by the client), from the statistics of each TimeSeries (see TimeSeriesStatistics).
+        """
         # The values computed by this function will be serialized to json and passed to the client.
         # The time series might be of numpy.float32 a data type that is not serializable.
         # To overcome this we convert numpy scalars to python floats
@@ -267,24 +353,18 @@ class EegMonitor(ABCDisplayer):
         translations = []
         channels_per_set = []
         for timeseries in list_of_timeseries:
-            data_shape = timeseries.read_data_shape()
-            resulting_shape = []
-            for idx, shape in enumerate(data_shape):
-                if idx in self.selected_dimensions:
-                    resulting_shape.append(shape)
-
-            page_chunk_data = timeseries.read_data_page(self.current_page * self.page_size,
-                                                        (self.current_page + 1) * self.page_size)
-            channels_per_set.append(int(resulting_shape[1]))
-
-            for idx in range(resulting_shape[1]):
-                self.has_nan = self.has_nan or self._replace_nan_values(page_chunk_data[:, idx])
-                array_max = numpy.max(page_chunk_data[:, idx])
-                array_min = numpy.min(page_chunk_data[:, idx])
-                translations.append( float( (array_max + array_min) / 2 ) )
-                if array_max == array_min:
-                    array_max += 1
-                step.append(abs(array_max - array_min))
+            data_shape = self._read_data_shape(timeseries)
+            channels_per_set.append(int(data_shape[self.selected_dimensions[1]]))
+
+            statistics = TimeSeriesStatistics(timeseries, data_shape).get()
+            self.has_nan = self.has_nan or bool(statistics[TimeSeriesStatistics.NAN_COUNT].any())
+            array_min = statistics[TimeSeriesStatistics.MINIMUM][0, :, 0]
+            array_max = statistics[TimeSeriesStatistics.MAXIMUM][0, :, 0]
+
+            translations.extend(((array_max + array_min) / 2).astype(float).tolist())
+            amplitudes = numpy.abs(array_max - array_min)
+            amplitudes[amplitudes == 0] = 1
+            step.extend(amplitudes.tolist())
 
         return float(max(step)), translations, channels_per_set
 
@@ -312,7 +392,7 @@ class EegMonitor(ABCDisplayer):
         if is_preview is False:
             page_size = self.page_size
             for timeseries in list_of_timeseries:
-                overall_shape = timeseries.read_data_shape()
+                overall_shape = self._read_data_shape(timeseries)
                 total_pages = overall_shape[0] / self.page_size
                 if overall_shape[0] % self.page_size > 0:
                     total_pages += 1
@@ -330,7 +410,7 @@ class EegMonitor(ABCDisplayer):
             total_pages_set.append(1)
             page_size = self.preview_page_size
             params = "current_page=0;page_size=" + str(self.preview_page_size) + ";max_size=" + \
-                     str(min(self.preview_page_size, list_of_timeseries[0].read_data_shape()[0]))
+                     str(min(self.preview_page_size, self._read_data_shape(list_of_timeseries[0])[0]))
             time_set_urls.append([self.paths2url(list_of_timeseries[0], 'read_time_page', parameter=params)])
         return base_urls, page_size, total_pages_set, time_set_urls
 
@@ -33,26 +33,34 @@
 
 """
 
+import os
 import json
+import uuid
+import hashlib
 import numpy
 import pylab
+from numpy.lib.stride_tricks import as_strided
 from tvb.basic.filters.chain import FilterChain
 from tvb.basic.profile import TvbProfile
+from tvb.basic.logger.builder import get_logger
 from tvb.core.utils import parse_slice, slice_str
 from tvb.datatypes.arrays import MappedArray
 from tvb.core.adapters.abcdisplayer import ABCDisplayer
+from tvb.core.entities.file.files_helper import FilesHelper
+from tvb.core.entities.file.hdf5_storage_manager import HDF5StorageManager
 
 
-def compute_2d_view(matrix, slice_s):
+def compute_2d_slice(shape, slice_s):
     """
-    Create a 2d view of the matrix using the suggested slice
+    Find the slice producing a 2d view of a matrix with the given shape, without needing the matrix data.
     If the given slice is invalid or fails to produce a 2d array the default is used
     which selects the first 2 dimensions.
-    If the matrix is complex the real part is shown
     :param slice_s: a string representation of a slice
-    :return: (a 2d array,  the slice used to make it, is_default_returned)
+    :return: (the slice,  its string representation, is_default_returned)
     """
-    default = (slice(None), slice(None)) + tuple(0 for _ in range(matrix.ndim - 2))     # [:,:,0,0,0,0 etc]
+    default = (slice(None), slice(None)) + tuple(0 for _ in range(len(shape) - 2))     # [:,:,0,0,0,0 etc]
+    # A read-only view of the given shape over a single element, for validating the slice
+    placeholder = as_strided(numpy.zeros(1), shape=tuple(shape), strides=(0,) * len(shape))
 
     try:
         if slice_s is not None:
@@ -60,16 +68,28 @@ def compute_2d_view(matrix, slice_s):
         else:
             matrix_slice = slice(None)
 
-        m = matrix[matrix_slice]
+        m = placeholder[matrix_slice]
 
         if m.ndim > 2:  # the slice did not produce a 2d array, treat as error
-            raise ValueError(str(matrix.shape))
+            raise ValueError(str(shape))
 
     except (IndexError, ValueError):  # if the slice could not be parsed or it failed to produce a 2d array
         matrix_slice = default
 
-    slice_used = slice_str(matrix_slice)
-    return matrix[matrix_slice].astype(float), slice_used, matrix_slice == default
+    return matrix_slice, slice_str(matrix_slice), matrix_slice == default
+
+
+def compute_2d_view(matrix, slice_s):
+    """
+    Create a 2d view of the matrix using the suggested slice
+    If the given slice is invalid or fails to produce a 2d array the default is used
+    which selects the first 2 dimensions.
+    If the matrix is complex the real part is shown
+    :param slice_s: a string representation of a slice
+    :return: (a 2d array,  the slice used to make it, is_default_returned)
+    """
+    matrix_slice, slice_used, is_default = compute_2d_slice(matrix.shape, slice_s)
+    return matrix[matrix_slice].astype(float), slice_used, is_default
 
 
 def dump_prec(xs, prec=3):
@@ -78,6 +98,220 @@ def dump_prec(xs, prec=3):
     return "[" + ",".join(format_str % s for s in xs) + "]"
 
 
+def downsample_blocks(minimum, maximum, mean, factor):
+    """
+    Reduce 2d arrays by the given factor on both axes, each output cell covering a block of factor x factor cells.
+    Blocks on the last rows and columns may be incomplete. NaN cells are ignored.
+    :return: (min of the minimum blocks, max of the maximum blocks, mean of the mean blocks)
+    """
+    rows, cols = minimum.shape
+    out_rows, out_cols = -(-rows // factor), -(-cols // factor)
+
+    def _blocks(data, fill_value):
+        padded = numpy.empty((out_rows * factor, out_cols * factor), dtype=numpy.float64)
+        padded.fill(fill_value)
+        padded[:rows, :cols] = data
+        return padded.reshape(out_rows, factor, out_cols, factor)
+
+    valid = ~numpy.isnan(_blocks(mean, numpy.nan))
+    count = valid.sum(axis=3).sum(axis=1)
+    min_blocks = _blocks(minimum, numpy.inf)
+    min_blocks[numpy.isnan(min_blocks)] = numpy.inf
+    max_blocks = _blocks(maximum, -numpy.inf)
+    max_blocks[numpy.isnan(max_blocks)] = -numpy.inf
+    mean_blocks = _blocks(mean, 0)
+    mean_blocks[~valid] = 0
+
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        result = (min_blocks.min(axis=3).min(axis=1),
+                  max_blocks.max(axis=3).max(axis=1),
+                  mean_blocks.sum(axis=3).sum(axis=1) / count)
+    for reduced in result:
+        reduced[count == 0] = numpy.nan
+    return result
+
+
+
+class MatrixTiles(object):
+    """
+    Tiled, multi-resolution access to the 2d view of a (possibly huge) MappedArray, for the matrix viewers.
+
+    Level 0 holds the original values, read for each tile with a HDF5 hyperslab selection on the DataType file.
+    Each following level is LEVEL_FACTOR times smaller on both axes, with the min, max and mean of the cells
+    it covers, down to the first level fitting in a single tile. These levels are computed once, from strips of
+    the view, and they are kept in a cache file next to the DataType, one for each slice.
+    """
+    TILE_SIZE = 256
+    LEVEL_FACTOR = 2
+    STRIP_ROWS = 256
+    STATISTICS = ('min', 'max', 'mean')
+    DATASET_NAME = 'array_data'
+    KEY_LEVELS = 'levels'
+
+
+    def __init__(self, datatype, slice_s=None):
+        self.logger = get_logger(self.__class__.__module__)
+        self.datatype = datatype
+        shape = datatype.read_data_shape()
+        matrix_slice, self.slice_used, self.is_default_slice = compute_2d_slice(shape, slice_s)
+        self._selection = self._normalize_selection(matrix_slice, shape)
+        if self._selection is None:
+            matrix_slice, self.slice_used, self.is_default_slice = compute_2d_slice(shape, None)
+            self._selection = self._normalize_selection(matrix_slice, shape)
+        self._view_axes = [axis for axis, item in enumerate(self._selection) if isinstance(item, slice)]
+        self.shape = tuple(len(xrange(item.start, item.stop, item.step))
+                           for item in self._selection if isinstance(item, slice))
+
+        self.level_shapes = [self.shape]
+        while max(self.level_shapes[-1]) > self.TILE_SIZE:
+            self.level_shapes.append(tuple(-(-dim // self.LEVEL_FACTOR) for dim in self.level_shapes[-1]))
+        cache_name = "tiles-" + hashlib.sha1(self.slice_used).hexdigest()[:12]
+        self.cache_path = FilesHelper().get_datatype_cache_path(datatype, cache_name)
+
+
+    @staticmethod
+    def _normalize_selection(matrix_slice, shape):
+        """
+        Expand a slice producing a 2d view into a selection with one positive index or slice (with explicit
+        start, stop and a positive step) for each dimension, as needed for composing it with the tiles windows.
+        :returns: list, or None when the slice can not be expressed as a simple hyperslab selection
+        """
+        if not isinstance(matrix_slice, tuple):
+            matrix_slice = (matrix_slice,)
+        if len(matrix_slice) > len(shape):
+            return None
+        matrix_slice = matrix_slice + (slice(None),) * (len(shape) - len(matrix_slice))
+        selection = []
+        for item, dim in zip(matrix_slice, shape):
+            if isinstance(item, slice):
+                start, stop, step = item.indices(dim)
+                if step < 0:
+                    return None
+                selection.append(slice(start, max(start, stop), step))
+            elif isinstance(item, (int, long, numpy.integer)):
+                selection.append(int(item) % dim)
+            else:
+                return None
+        if len([item for item in selection if isinstance(item, slice)]) != 2:
+            return None
+        return selection
+
+
+    def read_view(self, row_start, row_stop, col_start, col_stop):
+        """
+        Read a window of the 2d view from the DataType file, with a single hyperslab selection.
+        """
+        selection = list(self._selection)
+        for axis, start, stop in zip(self._view_axes, (row_start, col_start), (row_stop, col_stop)):
+            item = selection[axis]
+            selection[axis] = slice(item.start + start * item.step,
+                                    min(item.start + stop * item.step, item.stop), item.step)
+        data = self.datatype.get_data(self.DATASET_NAME, tuple(selection))
+        return numpy.real(data).astype(numpy.float64)
+
+
+    def get_tile(self, level, tile_row, tile_col):
+        """
+        :returns: (min, max, mean) 2d arrays, of at most TILE_SIZE x TILE_SIZE, for one tile of a level
+        """
+        if not 0 <= level < len(self.level_shapes):
+            raise ValueError("Invalid level %s, expected one of 0..%d" % (level, len(self.level_shapes) - 1))
+        rows, cols = self.level_shapes[level]
+        row_start, col_start = tile_row * self.TILE_SIZE, tile_col * self.TILE_SIZE
+        if not (0 <= row_start < rows and 0 <= col_start < cols):
+            raise ValueError("Invalid tile (%s, %s) for level %s" % (tile_row, tile_col, level))
+        row_stop, col_stop = min(row_start + self.TILE_SIZE, rows), min(col_start + self.TILE_SIZE, cols)
+
+        if level == 0:
+            data = self.read_view(row_start, row_stop, col_start, col_stop)
+            return data, data, data
+        storage = self._get_pyramid_storage()
+        window = (slice(row_start, row_stop), slice(col_start, col_stop))
+        return tuple(storage.get_data(self._get_dataset_name(level, statistic), window)
+                     for statistic in self.STATISTICS)
+
+
+    def get_tile_bytes(self, level, tile_row, tile_col):
+        """
+        :returns: binary tile for the web client: the min, max and mean arrays one after the other,
+            each in row-major order, as little-endian float32 values
+        """
+        tile = self.get_tile(level, tile_row, tile_col)
+        return numpy.concatenate([statistic.ravel() for statistic in tile]).astype('<f4').tostring()
+
+
+    def get_overview(self):
+        """
+        :returns: (min, max, mean) for the whole view, at the first level which fits in a single tile
+        """
+        return self.get_tile(len(self.level_shapes) - 1, 0, 0)
+
+
+    def get_metadata(self):
+        """
+        :returns: dictionary describing the levels, for the web client
+        """
+        return {'shape': self.shape, 'tile_size': self.TILE_SIZE, 'level_factor': self.LEVEL_FACTOR,
+                'level_shapes': self.level_shapes, 'statistics': self.STATISTICS}
+
+
+    @staticmethod
+    def _get_dataset_name(level, statistic):
+        return "level_%d_%s" % (level, statistic)
+
+
+    def _get_pyramid_storage(self):
+        """
+        :returns: HDF5StorageManager for the cache file holding the levels, computed first if missing
+        """
+        folder, file_name = os.path.split(self.cache_path)
+        storage = HDF5StorageManager(folder, file_name)
+        if storage.is_valid_hdf5_file():
+            levels = storage.get_metadata().get(self.KEY_LEVELS)
+            if levels is not None and int(levels) == len(self.level_shapes):
+                return storage
+        self._build_pyramid()
+        return HDF5StorageManager(folder, file_name)
+
+
+    def _build_pyramid(self):
+        """
+        Compute the levels 1..n into a temporary file, then move it in place. Each level is computed by
+        reading the previous one in strips of STRIP_ROWS rows, thus memory use does not depend on the matrix size.
+        """
+        folder, file_name = os.path.split(self.cache_path)
+        temporary_name = file_name + "." + uuid.uuid4().hex
+        storage = HDF5StorageManager(folder, temporary_name)
+        self.logger.info("Computing %d downsampled levels of %s for %s" % (len(self.level_shapes) - 1,
+                                                                          str(self.shape), self.cache_path))
+        try:
+            for level in xrange(1, len(self.level_shapes)):
+                source_rows, source_cols = self.level_shapes[level - 1]
+                strip_rows = self.STRIP_ROWS - self.STRIP_ROWS % self.LEVEL_FACTOR
+                for row_start in xrange(0, source_rows, strip_rows):
+                    row_stop = min(row_start + strip_rows, source_rows)
+                    if level == 1:
+                        data = self.read_view(row_start, row_stop, 0, source_cols)
+                        strip = (data, data, data)
+                    else:
+                        strip = [storage.get_data(self._get_dataset_name(level - 1, statistic),
+                                                  (slice(row_start, row_stop),)) for statistic in self.STATISTICS]
+                    reduced = downsample_blocks(strip[0], strip[1], strip[2], self.LEVEL_FACTOR)
+                    for statistic, values in zip(self.STATISTICS, reduced):
+                        storage.append_data(self._get_dataset_name(level, statistic), values.astype(numpy.float32),
+                                            grow_dimension=0, close_file=False)
+                storage.close_file()
+            storage.set_metadata({self.KEY_LEVELS: len(self.level_shapes)})
+            if os.path.exists(self.cache_path):
+                os.remove(self.cache_path)
+            os.rename(os.path.join(folder, temporary_name), self.cache_path)
+        finally:
+            storage.close_file()
+            if os.path.exists(os.path.join(folder, temporary_name)):
+                os.remove(os.path.join(folder, temporary_name))
+
+
+
 class MappedArraySVGVisualizerMixin(object):
     """
     To be mixed in a ABCDisplayer
@@ -124,6 +358,31 @@ class MappedArraySVGVisualizerMixin(object):
         return view_pars
 
 
+    def compute_tiled_params(self, datatype, viewer_title, given_slice=None):
+        """
+        Prepare the 2d view of a MappedArray, without loading it whole: the page gets the first level
+        fitting in a single tile, thus its size is constant, while the client can read the finer tiles on demand.
+        :returns: template parameters, plus the embedded 2d array under the 'overview' key
+        """
+        tiles = MatrixTiles(datatype, given_slice)
+        _, _, overview = tiles.get_overview()
+
+        view_pars = self.compute_raw_matrix_params(overview)
+        view_pars.update(original_matrix_shape=str(datatype.read_data_shape()),
+                         show_slice_info=given_slice is not None,
+                         given_slice=given_slice,
+                         slice_used=tiles.slice_used,
+                         is_default_slice=tiles.is_default_slice,
+                         viewer_title=viewer_title,
+                         view_shape=str(tiles.shape),
+                         is_downsampled=overview.shape != tiles.shape,
+                         tiles_url="/flow/read_matrix_tile/" + datatype.gid,
+                         tiles_slice=json.dumps(given_slice),
+                         tiles_metadata=json.dumps(tiles.get_metadata()),
+                         overview=overview)
+        return view_pars
+
+
 class MappedArrayMplVisualizer(object):
     @staticmethod
     def compute_parameters(matrix, plot_title):
@@ -153,12 +412,13 @@ class MappedArrayVisualizer(MappedArraySVGVisualizerMixin, ABCDisplayer):
                  'type': 'str', 'required': False}]
 
 
-    def launch(self, datatype, slice=''):
-        matrix = datatype.get_data('array_data')
-        matrix2d, _, _ = compute_2d_view(matrix, slice)
-        title = datatype.display_name + " matrix plot"
+    def get_required_memory_size(self, datatype, slice=''):
+        # Only strips of the 2d view, and single tiles, are read at once
+        return MatrixTiles.STRIP_ROWS * max(datatype.read_data_shape()) * 8.0 * 4
 
-        pars = self.compute_params(matrix, title, slice)
-        pars.update(MappedArrayMplVisualizer.compute_parameters(matrix2d, title))
 
-        return self.build_display_result("matrix/combined_view", pars)
\ No newline at end of file
+    def launch(self, datatype, slice=''):
+        title = datatype.display_name + " matrix plot"
+        pars = self.compute_tiled_params(datatype, title, slice)
+        pars.update(MappedArrayMplVisualizer.compute_parameters(pars.pop('overview'), title))
+        return self.build_display_result("matrix/combined_view", pars)
@@ -38,6 +38,7 @@ from tvb.core.entities import model
 from tvb.core.entities.storage import dao
 from tvb.core.entities.transient.pse import ContextDiscretePSE
 from tvb.core.adapters.abcdisplayer import ABCDisplayer
+from tvb.core.utils import string2date
 from tvb.datatypes.mapped_values import DatatypeMeasure
 from tvb.basic.filters.chain import FilterChain
 
@@ -129,12 +130,7 @@ class DiscretePSEAdapter(ABCDisplayer):
 
         :raises Exception: when `datatype_group_id` is invalid (not in database)
         """
-        datatype_group = dao.get_datatype_group_by_gid(datatype_group_gid)
-        if datatype_group is None:
-            raise Exception("Selected DataTypeGroup is no longer present in the database. "
-                            "It might have been remove or the specified id is not the correct one.")
-
-        operation_group = dao.get_operationgroup_by_id(datatype_group.fk_operation_group)
+        datatype_group, operation_group = DiscretePSEAdapter._load_groups(datatype_group_gid)
 
         range1_name, range1_values, range1_labels = DiscretePSEAdapter.prepare_range_labels(operation_group,
                                                                                             operation_group.range1)
@@ -144,9 +140,11 @@ class DiscretePSEAdapter(ABCDisplayer):
         pse_context = ContextDiscretePSE(datatype_group_gid, color_metric, size_metric, back_page)
         pse_context.setRanges(range1_name, range1_values, range1_labels, range2_name, range2_values, range2_labels)
         final_dict = {}
-        operations = dao.get_operations_in_group(operation_group.id)
+        ## Load all the measures and all the results in the group at once, instead of one query per node.
+        measures = dao.get_measures_for_datatype_group(DatatypeMeasure, datatype_group.id)
+        operation_results = dao.get_results_for_operation_group(operation_group.id)
 
-        for operation_ in operations:
+        for operation_, datatype in operation_results:
             if not operation_.has_finished:
                 pse_context.has_started_ops = True
             range_values = eval(operation_.range_values)
@@ -155,17 +153,11 @@ class DiscretePSEAdapter(ABCDisplayer):
             if range2_name is not None:
                 key_2 = range_values[range2_name]
 
-            datatype = None
-            if operation_.status == model.STATUS_FINISHED:
-                datatypes = dao.get_results_for_operation(operation_.id)
-                if len(datatypes) > 0:
-                    datatype = datatypes[0]
-                    if datatype.type == "DatatypeMeasure":
-                        ## Load proper entity class from DB.
-                        measures = dao.get_generic_entity(DatatypeMeasure, datatype.id)
-                    else:
-                        measures = dao.get_generic_entity(DatatypeMeasure, datatype.gid, '_analyzed_datatype')
-                    pse_context.prepare_metrics_datatype(measures, datatype)
+            if operation_.status != model.STATUS_FINISHED:
+                datatype = None
+            if datatype is not None:
+                measure = measures.get(datatype.gid)
+                pse_context.prepare_metrics_datatype([measure] if measure is not None else [], datatype)
 
             if key_1 not in final_dict:
                 final_dict[key_1] = {}
@@ -178,3 +170,68 @@ class DiscretePSEAdapter(ABCDisplayer):
         pse_context.datatypes_dict = {}
         return pse_context
 
+
+    @staticmethod
+    def prepare_updates(datatype_group_gid, since, color_metric=None, size_metric=None, limits=None):
+        """
+        Used for live refresh of a PSE with operations still running.
+        Only the operations completed after `since`, and the measures of their results, are read from DB.
+
+        :param since: string date (internal format), moment of the previous refresh
+        :param limits: list [min color, max color, min size, max size] the PSE is currently drawn with;
+                       missing values are None
+        :returns: dictionary with the nodes completed after `since`, the current status and color / size limits,
+                  and the moment of this refresh, to be passed as `since` at the next call
+        """
+        datatype_group, operation_group = DiscretePSEAdapter._load_groups(datatype_group_gid)
+        contains_numbers, range1_name, range1_values = operation_group.load_range_numbers(operation_group.range1)
+        contains_numbers, range2_name, range2_values = operation_group.load_range_numbers(operation_group.range2)
+        if contains_numbers is None:
+            range2_name = None
+
+        pse_context = ContextDiscretePSE(datatype_group_gid, color_metric, size_metric, '')
+        ## Labels are only used for their number (to compute the shape sizes), thus no need to load them.
+        pse_context.setRanges(range1_name, range1_values, range1_values, range2_name, range2_values, range2_values)
+        if limits is not None:
+            defaults = [float('inf'), -float('inf'), float('inf'), -float('inf')]
+            limits = [default if value is None else value for value, default in zip(limits, defaults)]
+            pse_context.min_color, pse_context.max_color = limits[:2]
+            pse_context.min_shape_size, pse_context.max_shape_size = limits[2:]
+        pse_context.has_started_ops = dao.count_running_operations_in_group(operation_group.id) > 0
+
+        operation_results = dao.get_results_for_operation_group(operation_group.id, string2date(since))
+        measures = dao.get_measures_for_datatypes(DatatypeMeasure, [datatype.gid for operation_, datatype
+                                                                    in operation_results if datatype is not None])
+        positions_1 = dict((value, idx) for idx, value in enumerate(range1_values))
+        positions_2 = dict((value, idx) for idx, value in enumerate(range2_values))
+        nodes = []
+        for operation_, datatype in operation_results:
+            range_values = eval(operation_.range_values)
+            key_1 = range_values[range1_name]
+            key_2 = model.RANGE_MISSING_STRING
+            if range2_name is not None:
+                key_2 = range_values[range2_name]
+
+            if operation_.status != model.STATUS_FINISHED:
+                datatype = None
+            if datatype is not None:
+                measure = measures.get(datatype.gid)
+                pse_context.prepare_metrics_datatype([measure] if measure is not None else [], datatype)
+            nodes.append((positions_1[key_1], positions_2[key_2], pse_context.build_node_info(operation_, datatype)))
+
+        result = pse_context.fill_updates(nodes)
+        result['timestamp'] = pse_context.last_update
+        return result
+
+
+    @staticmethod
+    def _load_groups(datatype_group_gid):
+        """
+        :returns: the DataTypeGroup with the given GID, and its OperationGroup
+        :raises Exception: when `datatype_group_id` is invalid (not in database)
+        """
+        datatype_group = dao.get_datatype_group_by_gid(datatype_group_gid)
+        if datatype_group is None:
+            raise Exception("Selected DataTypeGroup is no longer present in the database. "
+                            "It might have been remove or the specified id is not the correct one.")
+        return datatype_group, dao.get_operationgroup_by_id(datatype_group.fk_operation_group)
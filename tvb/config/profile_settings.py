@@ -50,6 +50,41 @@ class WebSettingsProfile(BaseSettingsProfile):
     """
     LOGGER_CONFIG_FILE_NAME = "logger_config.conf"
 
+    # When True, launching an algorithm with inputs identical to a previous finished operation
+    # will re-use (link) the existing results instead of computing them again.
+    REUSE_OPERATION_RESULTS = False
+
+    # Period (in seconds) for repairing from the OPERATIONS table the per project operation counters.
+    OPERATION_COUNTERS_RECONCILE_PERIOD = 600
+
+    # Memory (in Bytes) shared by the operations running in the same time on a stand-alone installation,
+    # based on the adapters estimates. When 0, the total RAM of the machine is used.
+    OPERATIONS_MEMORY_BUDGET = 0
+
+    # Opt-in profiling of single operations: class names (or identifiers) of algorithms, and user names,
+    # whose operations are launched under cProfile, with the results stored in the operation folder.
+    PROFILE_OPERATIONS_ALGORITHMS = []
+    PROFILE_OPERATIONS_USERS = []
+
+    # When True, metrics of the web process (operations, H5 files, requests) are served at /metrics in text format,
+    # to logged administrators and to the clients connecting from the addresses listed below (e.g. a local scraper).
+    METRICS_ENABLED = False
+    METRICS_ALLOWED_ADDRESSES = ['127.0.0.1', '::1']
+
+    # When True, the results of introspecting the adapters are kept in a manifest file in TVB_STORAGE,
+    # and at the next start only the adapters files and XML declarations which changed are introspected again.
+    INTROSPECTION_CACHE_ENABLED = True
+
+    # When True, the resources used by finished operations are recorded, and the run time, memory and disk
+    # estimates of the next operations are predicted from them, for the adapters describing their inputs size.
+    RESOURCE_ESTIMATES_FROM_HISTORY = True
+
+    # When True, visualizers are launched without storing an Operation: launches are kept in an in-memory log,
+    # and stored as Operations only when a figure is saved from them, or (when PERSIST) in batches.
+    EPHEMERAL_DISPLAYS_ENABLED = True
+    EPHEMERAL_DISPLAYS_PERSIST = False
+    EPHEMERAL_DISPLAYS_PERSIST_BATCH = 50
+
 
     def initialize_profile(self, change_logger_in_dev=True):
         """
@@ -56,6 +56,7 @@ from tvb.core.entities.transient.structure_entities import DataTypeMetaData
 from tvb.core.adapters.exceptions import IntrospectionException, InvalidParameterException, LaunchException
 from tvb.core.adapters.exceptions import NoMemoryAvailableException
 from tvb.core.adapters.xml_reader import ELEM_OPTIONS, ELEM_OUTPUTS, INPUTS_KEY
+from tvb.core.adapters.resource_estimator import ResourceEstimator, PEAK_MEMORY, DISK_SIZE
 
 import tvb.basic.traits.traited_interface as interface
 import tvb.core.adapters.xml_reader as xml_reader
@@ -158,6 +159,9 @@ class ABCAdapter(object):
     # Group that will be set for each adapter created by in build_adapter method
     algorithm_group = None
 
+    # When False, results are never re-used between operations with identical inputs (e.g. stochastic algorithms)
+    cacheable_results = True
+
     _ui_display = 1
 
     __metaclass__ = ABCMeta
@@ -219,6 +223,15 @@ class ABCAdapter(object):
         return -1
 
 
+    def get_size_features(self, **kwargs):
+        """
+        Describe the size of the inputs (e.g. number of nodes, of time steps) as a dictionary {name: number}.
+        When not empty, the resources of the operations are recorded, and the estimates for the next operations
+        are predicted from them (see tvb.core.adapters.resource_estimator), instead of the methods above.
+        """
+        return {}
+
+
     @abstractmethod
     def launch(self):
         """
@@ -258,7 +271,7 @@ class ABCAdapter(object):
             total_free_memory = psutil.virtual_memory().free + psutil.swap_memory().free
             total_existent_memory = psutil.virtual_memory().total + psutil.swap_memory().total
             memory_reference = (total_free_memory + total_existent_memory) / 2
-            adapter_required_memory = self.get_required_memory_size(**kwargs)
+            adapter_required_memory = ResourceEstimator.estimate(self, PEAK_MEMORY, **kwargs)
 
             if adapter_required_memory > memory_reference:
                 msg = "Machine does not have enough RAM memory for the operation (expected %.2g GB, but found %.2g GB)."
@@ -266,7 +279,7 @@ class ABCAdapter(object):
 
             # Compare the expected size of the operation results with the HDD space currently available for the user
             # TVB defines a quota per user.
-            required_disk_space = self.get_required_disk_size(**kwargs)
+            required_disk_space = ResourceEstimator.estimate(self, DISK_SIZE, **kwargs)
             if available_disk_space < 0:
                 msg = "You have exceeded you HDD space quota by %.2f MB Stopping execution."
                 raise NoMemoryAvailableException(msg % (- available_disk_space / 2 ** 10))
@@ -56,6 +56,8 @@ class ABCDisplayer(ABCSynchronous):
     PARAM_FIGURE_SIZE = 'figure_size'
     VISUALIZERS_ROOT = ''
     VISUALIZERS_URL_PREFIX = ''
+    # Displayers do not produce results, so there is nothing to re-use
+    cacheable_results = False
      
      
     def get_output(self):
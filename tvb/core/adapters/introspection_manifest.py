@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under 
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General 
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Persisted results of the adapters introspection, used for skipping at start-up the adapters files
+and XML declarations which did not change since the previous introspection.
+"""
+
+import os
+import json
+import hashlib
+import pkgutil
+from tvb.basic.profile import TvbProfile
+from tvb.basic.logger.builder import get_logger
+
+
+MANIFEST_FILE_NAME = "introspection_manifest.json"
+KEY_CODE = "code_key"
+KEY_MODULES = "modules"
+KEY_HASHES = "hashes"
+KEY_DATA = "data"
+
+# The introspection results depend on these packages too, so any change in them drops the manifest.
+FRAMEWORK_PACKAGES = ["tvb.core.adapters", "tvb.core.portlets"]
+# Same for the tvb-library packages, which the adapters take their inputs and outputs (DataTypes) from,
+# or wrap (the analyzers), and which get upgraded independently of the framework version.
+LIBRARY_PACKAGES = ["tvb.datatypes", "tvb.simulator", "tvb.analyzers"]
+
+
+
+def hash_file(file_path):
+    """
+    :returns: SHA1 digest of the file content, or None when the file can not be read.
+    """
+    try:
+        with open(file_path, 'rb') as source_file:
+            return hashlib.sha1(source_file.read()).hexdigest()
+    except (IOError, OSError, TypeError):
+        return None
+
+
+
+def hash_module(module_name):
+    """
+    Compute the digest of a Python module source, without importing it (only its parent packages get imported).
+    For a package, all the files underneath are considered.
+
+    :returns: SHA1 digest, or None when the module source was not found.
+    """
+    try:
+        loader = pkgutil.get_loader(module_name)
+        file_path = loader.get_filename() if loader is not None else None
+    except (ImportError, AttributeError):
+        return None
+    if file_path is None:
+        return None
+    if not os.path.basename(file_path).startswith("__init__."):
+        return hash_file(file_path)
+
+    digest = hashlib.sha1()
+    for folder, _, files in sorted(os.walk(os.path.dirname(file_path))):
+        for file_name in sorted(files):
+            if file_name.endswith(".py"):
+                file_hash = hash_file(os.path.join(folder, file_name))
+                if file_hash is None:
+                    return None
+                digest.update(file_name + file_hash)
+    return digest.hexdigest()
+
+
+
+def get_code_key(matlab_executable):
+    """
+    :returns: a key for the code version currently running, which the stored introspection results need to match.
+    """
+    version = TvbProfile.current.version
+    package_hashes = [str(hash_module(package)) for package in FRAMEWORK_PACKAGES + LIBRARY_PACKAGES]
+    return "-".join([str(version.BASE_VERSION), str(version.SVN_VERSION), str(bool(matlab_executable))]
+                    + package_hashes)
+
+
+
+class IntrospectionManifest(object):
+    """
+    Introspection results, stored in a JSON file for each introspected module and unit (an adapters file,
+    an XML group declaration or a portlets XML), together with the hashes of the sources they were computed from.
+
+    A unit is read back only when all its hashes are still the same. The whole manifest is dropped when
+    the code version changes. Only the units put during the current introspection are saved,
+    thus removed adapters files do not linger in the manifest.
+    """
+
+
+    def __init__(self, file_path, code_key):
+        self.file_path = file_path
+        self.code_key = code_key
+        self.logger = get_logger(self.__class__.__module__)
+        self._stored = self._read()
+        self._current = {}
+
+
+    def _read(self):
+        """
+        Read the modules section from the manifest file, when it exists and matches the current code.
+        """
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path) as manifest_file:
+                content = json.load(manifest_file)
+        except (IOError, ValueError), excep:
+            self.logger.warning("Ignoring invalid introspection manifest %s: %s" % (self.file_path, str(excep)))
+            return {}
+        if not isinstance(content, dict) or content.get(KEY_CODE) != self.code_key:
+            self.logger.info("Introspection manifest was written by a different code version. Ignoring it.")
+            return {}
+        return content.get(KEY_MODULES, {})
+
+
+    def get(self, module_name, unit, hashes):
+        """
+        :returns: the data stored for the given unit, or None when it is missing or any of its hashes changed.
+        """
+        if None in hashes:
+            return None
+        entry = self._stored.get(module_name, {}).get(unit)
+        if entry is None or entry[KEY_HASHES] != list(hashes):
+            return None
+        self.put(module_name, unit, hashes, entry[KEY_DATA])
+        return entry[KEY_DATA]
+
+
+    def put(self, module_name, unit, hashes, data):
+        """
+        Remember the introspection result for a unit. Units with an unknown source hash are never stored.
+        """
+        if None not in hashes:
+            self._current.setdefault(module_name, {})[unit] = {KEY_HASHES: list(hashes), KEY_DATA: data}
+
+
+    def save(self, module_name):
+        """
+        Replace in the manifest file the section of the given module, with the units put since loading.
+        """
+        self._stored[module_name] = self._current.get(module_name, {})
+        temporary_path = self.file_path + ".tmp"
+        try:
+            with open(temporary_path, 'w') as manifest_file:
+                json.dump({KEY_CODE: self.code_key, KEY_MODULES: self._stored}, manifest_file)
+            if os.path.exists(self.file_path):
+                os.remove(self.file_path)
+            os.rename(temporary_path, self.file_path)
+        except (IOError, OSError), excep:
+            self.logger.warning("Could not write introspection manifest %s: %s" % (self.file_path, str(excep)))
+
+
+    def clear(self):
+        """
+        Remove the manifest file, forcing a complete introspection at the next start.
+        """
+        self._stored = {}
+        self._current = {}
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+
+
+def get_manifest(matlab_executable):
+    """
+    :returns: IntrospectionManifest stored in the TVB storage folder, or None when the cache is disabled.
+    """
+    if not TvbProfile.current.INTROSPECTION_CACHE_ENABLED:
+        return None
+    file_path = os.path.join(TvbProfile.current.TVB_STORAGE, MANIFEST_FILE_NAME)
+    return IntrospectionManifest(file_path, get_code_key(matlab_executable))
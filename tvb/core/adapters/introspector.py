@@ -35,6 +35,7 @@
 
 import os
 import inspect
+import hashlib
 import datetime
 import tvb.core.removers_factory as removers
 from types import ModuleType
@@ -46,6 +47,7 @@ from tvb.core.entities.storage import dao, SA_SESSIONMAKER
 from tvb.core.portlets.xml_reader import XMLPortletReader, ATT_OVERWRITE
 from tvb.core.adapters.abcremover import ABCRemover
 from tvb.core.adapters.abcadapter import ABCAdapter, ABCGroupAdapter
+from tvb.core.adapters.introspection_manifest import get_manifest, hash_file, hash_module
 from tvb.core.adapters.xml_reader import ATT_TYPE, ATT_NAME, INPUTS_KEY
 from tvb.core.adapters.xml_reader import ATT_REQUIRED, ELEM_CONDITIONS, XMLGroupReader
 from tvb.core.adapters.exceptions import XmlParserException
@@ -60,6 +62,7 @@ DISPLAYER = 'display'
 RAWINPUT = 'rawinput'
 ORDER = 'order_nr'
 STATE = 'defaultdatastate'
+ALGORITHM_FIELDS = ['name', 'required_datatype', 'parameter_name', 'outputlist', 'datatype_filter']
 
 
 
@@ -109,6 +112,9 @@ class Introspector:
         Introspect a given module to: 
             - create tables for custom DataType;
             - populate adapter algorithms references. 
+
+        Adapters files, XML groups and portlets XML files unchanged since the previous start are not imported
+        again: their description is read from the introspection manifest and only compared with the DB.
         """
         self.logger.debug("Introspection into module:" + self.module_name)
         module = __import__(self.module_name, globals(), locals(), ["__init__"])
@@ -136,6 +142,15 @@ class Introspector:
             session.commit()
             session.close()
 
+            self.manifest = get_manifest(self.matlab_executable)
+            self.source_hashes = []
+            self.package_hashes = {}
+            self.introspection_time = datetime.datetime.now()
+            groups_in_db, algorithms_in_db = dao.get_all_algo_groups_and_algorithms()
+            groups_in_db = dict((self.__get_group_key(group.module, group.classname, group.init_parameter), group)
+                                for group in groups_in_db)
+            algorithms_in_db = dict(((algo.fk_algo_group, algo.identifier), algo) for algo in algorithms_in_db)
+
             self.logger.debug("Found Adapters_Dict=" + str(path_adapters))
             for category_name in path_adapters:
                 category_details = path_adapters[category_name]
@@ -155,20 +170,61 @@ class Introspector:
                     category_instance = model.AlgorithmCategory(category_name, launchable, rawinput, display,
                                                                 category_state, order_nr, datetime.datetime.now())
                 category_instance = dao.store_entity(category_instance)
+                groups_descriptions = []
                 for actual_module in path_adapters[category_name]['modules']:
-                    self.__populate_algorithms(category_instance.id, actual_module)
-
+                    groups_descriptions.extend(self.__populate_algorithms(actual_module))
+                self.__store_algorithm_groups(category_instance.id, groups_descriptions,
+                                              groups_in_db, algorithms_in_db)
+
+            # Portlets are validated against the adapters, thus any change in them invalidates the portlets as well
+            adapters_hash = None
+            if None not in self.source_hashes:
+                adapters_hash = hashlib.sha1("".join(self.source_hashes)).hexdigest()
             for path in self.path_portlets:
-                self.__get_portlets(path)
+                self.__get_portlets(path, adapters_hash)
+
+            if self.manifest is not None:
+                self.manifest.save(self.module_name)
         ### Register Remover instances for current introspected module
         removers.update_dictionary(self.get_removers_dict())
 
 
-    def __get_portlets(self, path_portlets):
+    def __get_cached(self, unit, hashes):
+        """
+        :returns: the description stored in the introspection manifest for an unchanged unit, or None.
+        """
+        self.source_hashes.extend(hashes)
+        if self.manifest is None:
+            return None
+        return self.manifest.get(self.module_name, unit, hashes)
+
+
+    def __get_package_hash(self, module_name):
+        """
+        Adapters import freely from their sibling packages (e.g. a visualizer from an analyzer adapter),
+        thus an adapter is considered unchanged only while the entire adapters package around it is unchanged.
+        :returns: digest of the package enclosing module_name, computed once for each introspection.
+        """
+        package_name = module_name.rsplit('.', 1)[0]
+        if package_name not in self.package_hashes:
+            self.package_hashes[package_name] = hash_module(package_name)
+        return self.package_hashes[package_name]
+
+
+    def __set_cached(self, unit, hashes, description):
+        """
+        Keep the description of a freshly introspected unit in the introspection manifest.
+        """
+        if self.manifest is not None:
+            self.manifest.put(self.module_name, unit, hashes, description)
+
+
+    def __get_portlets(self, path_portlets, adapters_hash):
         """
         Given a path in the form of a python package e.g.: "tvb.portlets', import
         the package, get it's folder and look for all the XML files defined 
         there, then read all the portlets defined there and store them in DB.
+        Portlets XML files are validated again only when they, or the adapters (given by adapters_hash), changed.
         """
         portlet_package = __import__(path_portlets, locals(), globals(), ["__init__"])
         portlet_folder = os.path.dirname(portlet_package.__file__)
@@ -177,72 +233,90 @@ class Introspector:
             try:
                 if file_n.endswith('.xml'):
                     complete_file_path = os.path.join(portlet_folder, file_n)
-                    portlet_reader = XMLPortletReader.get_instance(complete_file_path)
-                    portlet_list = portlet_reader.get_algorithms_dictionary()
-                    self.logger.debug("Starting to verify currently declared portlets in %s." % (file_n,))
-                    for algo_identifier in portlet_list:
-                        adapters_chain = portlet_reader.get_adapters_chain(algo_identifier)
-                        is_valid = True
-                        for adapter in adapters_chain:
-                            class_name = adapter[ABCAdapter.KEY_TYPE].split('.')[-1]
-                            module_name = adapter[ABCAdapter.KEY_TYPE].replace('.' + class_name, '')
-                            try:
-                                #Check that module is properly declared
-                                module = __import__(module_name, class_name, globals(), locals())
-                                if type(module) != ModuleType:
-                                    is_valid = False
-                                    self.logger.error("Wrong module %s in portlet %s" % (module_name, algo_identifier))
-                                    continue
-                                #Check that class is properly declared
-                                if not hasattr(module, class_name):
-                                    is_valid = False
-                                    self.logger.error("Wrong class %s in portlet %s." % (class_name, algo_identifier))
-                                    continue
-                                #Check inputs that refers to this adapter
-                                portlet_inputs = portlet_list[algo_identifier][INPUTS_KEY]
-                                adapter_instance, _ = PortletConfigurer.build_adapter_from_declaration(adapter)
-                                if adapter_instance is None:
-                                    is_valid = False
-                                    self.logger.warning("No group having class=%s stored for "
-                                                        "portlet %s." % (class_name, algo_identifier))
-                                    continue
-                                adapter_input_names = [entry[ABCAdapter.KEY_NAME] for entry
-                                                       in adapter_instance.flaten_input_interface()]
-                                for input_entry in portlet_inputs:
-                                    if portlet_inputs[input_entry][ATT_OVERWRITE] == adapter[ABCAdapter.KEY_NAME]:
-                                        if portlet_inputs[input_entry][ABCAdapter.KEY_NAME] not in adapter_input_names:
-                                            self.logger.error("Invalid input %s for adapter %s" % (
-                                                portlet_inputs[input_entry][ABCAdapter.KEY_NAME], adapter_instance))
-                                            is_valid = False
-                            except ImportError, _:
-                                self.logger.error("Invalid adapter declaration %s in portlet %s" % (
-                                                  adapter[ABCAdapter.KEY_TYPE], algo_identifier))
-                                is_valid = False
-                        if is_valid:
-                            portlets_list.append(model.Portlet(algo_identifier, complete_file_path,
-                                                               portlet_list[algo_identifier]['name']))
+                    hashes = [hash_file(complete_file_path), adapters_hash]
+                    valid_portlets = self.__get_cached(complete_file_path, hashes)
+                    if valid_portlets is None:
+                        valid_portlets = self.__validate_portlets(complete_file_path)
+                        self.__set_cached(complete_file_path, hashes, valid_portlets)
+                    for algo_identifier, portlet_name in valid_portlets:
+                        portlets_list.append(model.Portlet(algo_identifier, complete_file_path, portlet_name))
             except XmlParserException, excep:
                 self.logger.exception(excep)
                 self.logger.error("Invalid Portlet description File " + file_n + " will continue without it!!")
 
         self.logger.debug("Refreshing portlets from xml declarations.")
-        stored_portlets = dao.get_available_portlets()
-        #First update old portlets from DB
-        for stored_portlet in stored_portlets:
-            for verified_portlet in portlets_list:
-                if stored_portlet.algorithm_identifier == verified_portlet.algorithm_identifier:
-                    stored_portlet.xml_path = verified_portlet.xml_path
-                    stored_portlet.last_introspection_check = datetime.datetime.now()
-                    stored_portlet.name = verified_portlet.name
-                    dao.store_entity(stored_portlet)
-                    break
-
-        #Now add portlets that were not in DB at previous run but are valid now
-        for portlet in portlets_list:
-            db_entity = dao.get_portlet_by_identifier(portlet.algorithm_identifier)
-            if db_entity is None:
-                self.logger.debug("Will now store portlet %s" % (str(portlet),))
-                dao.store_entity(portlet)
+        stored_portlets = dict((portlet.algorithm_identifier, portlet) for portlet in dao.get_available_portlets())
+        to_store = []
+        unchanged_ids = []
+        for verified_portlet in portlets_list:
+            stored_portlet = stored_portlets.get(verified_portlet.algorithm_identifier)
+            if stored_portlet is None:
+                self.logger.debug("Will now store portlet %s" % (str(verified_portlet),))
+                stored_portlets[verified_portlet.algorithm_identifier] = verified_portlet
+                to_store.append(verified_portlet)
+            elif stored_portlet in to_store or stored_portlet.id in unchanged_ids:
+                # Same identifier declared in multiple files: the first declaration wins
+                continue
+            elif self.__update_fields(stored_portlet, {'xml_path': verified_portlet.xml_path,
+                                                       'name': verified_portlet.name}):
+                stored_portlet.last_introspection_check = self.introspection_time
+                to_store.append(stored_portlet)
+            else:
+                unchanged_ids.append(stored_portlet.id)
+        dao.store_entities_bulk(to_store)
+        dao.set_introspection_check(model.Portlet, unchanged_ids, self.introspection_time)
+
+
+    def __validate_portlets(self, complete_file_path):
+        """
+        Read the portlets declared in an XML file and check their adapters chain.
+        :returns: list of (identifier, name) for the valid portlets
+        """
+        portlet_reader = XMLPortletReader.get_instance(complete_file_path)
+        portlet_list = portlet_reader.get_algorithms_dictionary()
+        self.logger.debug("Starting to verify currently declared portlets in %s." % (complete_file_path,))
+        valid_portlets = []
+        for algo_identifier in portlet_list:
+            adapters_chain = portlet_reader.get_adapters_chain(algo_identifier)
+            is_valid = True
+            for adapter in adapters_chain:
+                class_name = adapter[ABCAdapter.KEY_TYPE].split('.')[-1]
+                module_name = adapter[ABCAdapter.KEY_TYPE].replace('.' + class_name, '')
+                try:
+                    #Check that module is properly declared
+                    module = __import__(module_name, class_name, globals(), locals())
+                    if type(module) != ModuleType:
+                        is_valid = False
+                        self.logger.error("Wrong module %s in portlet %s" % (module_name, algo_identifier))
+                        continue
+                    #Check that class is properly declared
+                    if not hasattr(module, class_name):
+                        is_valid = False
+                        self.logger.error("Wrong class %s in portlet %s." % (class_name, algo_identifier))
+                        continue
+                    #Check inputs that refers to this adapter
+                    portlet_inputs = portlet_list[algo_identifier][INPUTS_KEY]
+                    adapter_instance, _ = PortletConfigurer.build_adapter_from_declaration(adapter)
+                    if adapter_instance is None:
+                        is_valid = False
+                        self.logger.warning("No group having class=%s stored for "
+                                            "portlet %s." % (class_name, algo_identifier))
+                        continue
+                    adapter_input_names = [entry[ABCAdapter.KEY_NAME] for entry
+                                           in adapter_instance.flaten_input_interface()]
+                    for input_entry in portlet_inputs:
+                        if portlet_inputs[input_entry][ATT_OVERWRITE] == adapter[ABCAdapter.KEY_NAME]:
+                            if portlet_inputs[input_entry][ABCAdapter.KEY_NAME] not in adapter_input_names:
+                                self.logger.error("Invalid input %s for adapter %s" % (
+                                    portlet_inputs[input_entry][ABCAdapter.KEY_NAME], adapter_instance))
+                                is_valid = False
+                except ImportError, _:
+                    self.logger.error("Invalid adapter declaration %s in portlet %s" % (
+                                      adapter[ABCAdapter.KEY_TYPE], algo_identifier))
+                    is_valid = False
+            if is_valid:
+                valid_portlets.append((algo_identifier, portlet_list[algo_identifier]['name']))
+        return valid_portlets
 
 
     def __get_datatypes(self, path_types):
@@ -264,23 +338,34 @@ class Introspector:
         self.logger.debug('DB Model update finished for ' + path_types)
 
 
-    def __populate_algorithms(self, category_key, module_name):
+    def __populate_algorithms(self, module_name):
         """
-        Add lines to ALGORITHMS table, 
-        one line for each custom class found extending from ABCAdapter.
+        Describe the algorithm groups declared in an adapters package,
+        one group for each custom class found extending from ABCAdapter, and one for each XML declaration.
+        :returns: list of dictionaries with the group fields, and its 'algorithms' descriptions
         """
         groups = []
+        package_hash = self.__get_package_hash(module_name)
         for adapter_file in Introspector.__get_variable(module_name):
+            adapter_module = module_name + "." + adapter_file
+            hashes = [hash_module(adapter_module), package_hash]
+            file_groups = self.__get_cached(adapter_module, hashes)
+            if file_groups is not None:
+                groups.extend(file_groups)
+                continue
             try:
                 adapter = __import__(module_name, globals(), locals(), [adapter_file])
                 adapter = eval("adapter." + adapter_file)
                 tree = [adapter.__dict__[j] for j in [i for i in dir(adapter)
                            if (inspect.isclass(adapter.__dict__[i]) and not inspect.isabstract(adapter.__dict__[i])
                                and issubclass(adapter.__dict__[i], ABCAdapter))]]
+                file_groups = []
                 for class_ref in tree:
-                    group = self.__create_instance(category_key, class_ref)
+                    group = self.__describe_group(class_ref)
                     if group is not None:
-                        groups.append(group)
+                        file_groups.append(group)
+                self.__set_cached(adapter_module, hashes, file_groups)
+                groups.extend(file_groups)
             except Exception, excep:
                 self.logger.error("Could not introspect Adapters file:" + adapter_file)
                 self.logger.exception(excep)
@@ -291,54 +376,130 @@ class Introspector:
             files = os.listdir(folder_path)
             for file_ in files:
                 if file_.endswith(".xml"):
+                    xml_path = os.path.join(folder_path, file_)
                     try:
-                        reader = XMLGroupReader.get_instance(os.path.join(folder_path, file_))
+                        reader = XMLGroupReader.get_instance(xml_path)
                         adapter_class = reader.get_type()
-                        class_ref = self.__get_class_ref(adapter_class)
-                        group = self.__create_instance(category_key, class_ref, os.path.join(folder, file_))
-                        if group is not None:
-                            group.displayname = reader.get_ui_name()
-                            group.subsection_name = reader.subsection_name
-                            group.description = reader.get_ui_description()
-                            groups.append(group)
+                        hashes = [hash_file(xml_path), hash_module(adapter_class[:adapter_class.rfind(".")]),
+                                  package_hash]
+                        xml_groups = self.__get_cached(xml_path, hashes)
+                        if xml_groups is None:
+                            class_ref = self.__get_class_ref(adapter_class)
+                            group = self.__describe_group(class_ref, os.path.join(folder, file_), reader)
+                            xml_groups = [group] if group is not None else []
+                            self.__set_cached(xml_path, hashes, xml_groups)
+                        groups.extend(xml_groups)
                     except XmlParserException, excep:
-                        self.logger.error("Could not parse XML file: " + os.path.join(folder_path, file_))
+                        self.logger.error("Could not parse XML file: " + xml_path)
                         self.logger.exception(excep)
+        return groups
 
-        # Set the last_introspection_check flag so they will pass the validation check done after introspection
-        self.__update_references_last_check_timestamp(groups, category_key)
-
-        for group in groups:
-            group_inst_from_db = dao.find_group(group.module, group.classname, group.init_parameter)
-            adapter = ABCAdapter.build_adapter(group)
-            has_sub_algorithms = False
-            ui_name = group.displayname
-            if isinstance(adapter, ABCGroupAdapter):
-                group.algorithm_param_name = adapter.get_algorithm_param()
-                has_sub_algorithms = True
-            if group_inst_from_db is None:
-                self.logger.info(str(group.module) + " will be stored new in DB")
-                group = model.AlgorithmGroup(group.module, group.classname, category_key,
-                                             group.algorithm_param_name, group.init_parameter,
-                                             datetime.datetime.now(), subsection_name=group.subsection_name,
-                                             description=group.description)
-            else:
-                self.logger.info(str(group.module) + " will be updated")
-                group = group_inst_from_db
-            if hasattr(adapter, "_ui_name"):
-                ui_name = getattr(adapter, "_ui_name")
-            elif ui_name is None or len(ui_name) == 0:
-                ui_name = group.classname
-            if hasattr(adapter, "_ui_description"):
-                group.description = getattr(adapter, "_ui_description")
-            if hasattr(adapter, "_ui_subsection"):
-                group.subsection_name = getattr(adapter, "_ui_subsection")
-            group.ui_display = adapter._ui_display
-            group.displayname = ui_name
-            group.removed = False
-            group.last_introspection_check = datetime.datetime.now()
-            group_inst_from_db = dao.store_entity(group)
-            self.__store_algorithms_for_group(group_inst_from_db, adapter, has_sub_algorithms)
+
+    def __describe_group(self, class_ref, init_parameter=None, xml_reader=None):
+        """
+        Build the adapter for a class reference and read from it the details of its algorithm group.
+        :returns: dictionary with the group fields, or None when the adapter is not usable in the current setup
+        """
+        if not self.matlab_executable and self.__is_matlab_parent(inspect.getclasstree([class_ref])):
+            self.logger.debug("Skip Adapter because MATLAB is not found:" + str(class_ref))
+            return None
+
+        group = model.AlgorithmGroup(class_ref.__module__, class_ref.__name__, None, init_parameter=init_parameter)
+        adapter = ABCAdapter.build_adapter(group)
+        ui_name = xml_reader.get_ui_name() if xml_reader is not None else None
+        description = xml_reader.get_ui_description() if xml_reader is not None else None
+        subsection_name = xml_reader.subsection_name if xml_reader is not None else None
+        algorithm_param_name = None
+        if isinstance(adapter, ABCGroupAdapter):
+            algorithm_param_name = adapter.get_algorithm_param()
+        if hasattr(adapter, "_ui_name"):
+            ui_name = getattr(adapter, "_ui_name")
+        elif ui_name is None or len(ui_name) == 0:
+            ui_name = group.classname
+        if hasattr(adapter, "_ui_description"):
+            description = getattr(adapter, "_ui_description")
+        if hasattr(adapter, "_ui_subsection"):
+            subsection_name = getattr(adapter, "_ui_subsection")
+
+        return {'module': group.module, 'classname': group.classname, 'init_parameter': init_parameter,
+                'algorithm_param_name': algorithm_param_name, 'displayname': ui_name,
+                'description': description, 'subsection_name': subsection_name,
+                'ui_display': adapter._ui_display, 'algorithms': self.__describe_algorithms(adapter)}
+
+
+    @staticmethod
+    def __get_group_key(module, classname, init_parameter):
+        """ Key for matching a group description with the DB entity. """
+        return module, classname, init_parameter or None
+
+
+    @staticmethod
+    def __update_fields(entity, fields):
+        """
+        Set on the entity the given fields.
+        :returns: True when any value has changed
+        """
+        changed = False
+        for field_name, value in fields.iteritems():
+            if getattr(entity, field_name) != value:
+                setattr(entity, field_name, value)
+                changed = True
+        return changed
+
+
+    def __store_algorithm_groups(self, category_key, groups, groups_in_db, algorithms_in_db):
+        """
+        Compare the described groups and algorithms with those from DB, and store in bulk only the new and
+        changed ones. The unchanged groups only get their 'last_introspection_check' timestamp updated,
+        so they pass the validation check done after introspection.
+        """
+        groups_to_store = []
+        unchanged_ids = []
+        for group_description in groups:
+            key = self.__get_group_key(group_description['module'], group_description['classname'],
+                                       group_description['init_parameter'])
+            group = groups_in_db.get(key)
+            if group is None:
+                self.logger.info(str(group_description['module']) + " will be stored new in DB")
+                group = model.AlgorithmGroup(group_description['module'], group_description['classname'],
+                                             category_key, group_description['algorithm_param_name'],
+                                             group_description['init_parameter'], self.introspection_time,
+                                             subsection_name=group_description['subsection_name'],
+                                             description=group_description['description'])
+                groups_in_db[key] = group
+            fields = {'displayname': group_description['displayname'],
+                      'algorithm_param_name': group_description['algorithm_param_name'],
+                      'ui_display': group_description['ui_display'], 'removed': False}
+            for optional_field in ['description', 'subsection_name']:
+                if group_description[optional_field] is not None:
+                    fields[optional_field] = group_description[optional_field]
+            if self.__update_fields(group, fields) or group.id is None:
+                group.last_introspection_check = self.introspection_time
+                if group not in groups_to_store:
+                    groups_to_store.append(group)
+            elif group.id not in unchanged_ids:
+                unchanged_ids.append(group.id)
+        dao.store_entities_bulk(groups_to_store)
+        dao.set_introspection_check(model.AlgorithmGroup, unchanged_ids, self.introspection_time)
+
+        algorithms_to_store = []
+        for group_description in groups:
+            key = self.__get_group_key(group_description['module'], group_description['classname'],
+                                       group_description['init_parameter'])
+            group_id = groups_in_db[key].id
+            for algo_description in group_description['algorithms']:
+                algo_key = (group_id, algo_description['identifier'])
+                algorithm = algorithms_in_db.get(algo_key)
+                if algorithm is None:
+                    algorithm = model.Algorithm(group_id, algo_description['identifier'])
+                    algorithms_in_db[algo_key] = algorithm
+                fields = dict((field, algo_description[field]) for field in ALGORITHM_FIELDS)
+                if algo_description['description'] is not None:
+                    fields['description'] = algo_description['description']
+                if (self.__update_fields(algorithm, fields) or algorithm.id is None) \
+                        and algorithm not in algorithms_to_store:
+                    algorithms_to_store.append(algorithm)
+        dao.store_entities_bulk(algorithms_to_store)
 
 
     def __get_class_ref(self, full_class_name):
@@ -359,15 +520,15 @@ class Introspector:
         raise Exception("The location of the adapter class is incorrect. It should be placed in a module.")
 
 
-    def __store_algorithms_for_group(self, group, adapter, has_sub_algorithms):
+    def __describe_algorithms(self, adapter):
         """
-        For the group passed as parameter do the following:
-        If it has sub-algorithms, get the list of them, add sub-algorithm 
-        references into the DB with all the required fields.
-        If it is not a GroupAdapter add a single algorithm into the DB with an
-        empty identifier.
+        For the adapter passed as parameter do the following:
+        If it is a GroupAdapter, describe each of its sub-algorithms with all the required fields.
+        Otherwise describe a single algorithm with an empty identifier.
+        :returns: list of dictionaries with the algorithms fields
         """
-        if has_sub_algorithms:
+        result = []
+        if isinstance(adapter, ABCGroupAdapter):
             algos = adapter.get_algorithms_dictionary()
             for algo_ident in algos:
                 in_params = adapter.get_input_for_algorithm(algo_ident)
@@ -379,40 +540,22 @@ class Introspector:
                     file_name = adapter.get_matlab_file(algo_ident)
                     if file_name:
                         algo_description = self.extract_matlab_doc_string(os.path.join(root_folder, file_name))
-                algorithm = dao.get_algorithm_by_group(group.id, algo_ident)
-                if algorithm is None:
-                    #Create new
-                    algorithm = model.Algorithm(group.id, algo_ident, algos[algo_ident][ATT_NAME],
-                                                req_type, param_name, str(outputs), flt, description=algo_description)
-                else:
-                    #Edit previous
-                    algorithm.name = algos[algo_ident][ATT_NAME]
-                    algorithm.required_datatype = req_type
-                    algorithm.parameter_name = param_name
-                    algorithm.outputlist = str(outputs)
-                    algorithm.datatype_filter = flt
-                    algorithm.description = algo_description
-                dao.store_entity(algorithm)
+                result.append({'identifier': algo_ident, 'name': algos[algo_ident][ATT_NAME],
+                               'required_datatype': req_type, 'parameter_name': param_name,
+                               'outputlist': str(outputs), 'datatype_filter': flt, 'description': algo_description})
         else:
             input_tree = adapter.get_input_tree()
             req_type, param_name, flt = self.__get_required_input(input_tree)
             outputs = str(adapter.get_output())
-            algorithm = dao.get_algorithm_by_group(group.id, None)
             if hasattr(adapter, '_ui_name'):
                 algo_name = getattr(adapter, '_ui_name')
             else:
                 algo_name = adapter.__class__.__name__
-            if algorithm is None:
-                #Create new
-                algorithm = model.Algorithm(group.id, None, algo_name, req_type, param_name, outputs, flt)
-            else:
-                #Edit previous
-                algorithm.name = algo_name
-                algorithm.required_datatype = req_type
-                algorithm.parameter_name = param_name
-                algorithm.outputlist = str(outputs)
-                algorithm.datatype_filter = flt
-            dao.store_entity(algorithm)
+            # The description of single algorithms is not changed by introspection
+            result.append({'identifier': None, 'name': algo_name, 'required_datatype': req_type,
+                           'parameter_name': param_name, 'outputlist': outputs, 'datatype_filter': flt,
+                           'description': None})
+        return result
 
 
     def __get_required_input(self, input_tree):
@@ -474,44 +617,6 @@ class Introspector:
             return None
 
 
-    @staticmethod
-    def __update_references_last_check_timestamp(current_groups, category_key):
-        """
-        For all the algorithms found in the db for category given by category_key, update their
-        'last_introspection_check' timestamp if they are part of current_groups.
-        
-        :param current_groups: a list of algorithm groups that recently passed our validations
-            from the introspection and are still valid
-        :param category_key: the algorithm group category for which we match the algorithms found
-            in the db with those we recently validated on introspection
-        """
-        db_groups = dao.get_groups_by_categories([category_key], filter_removed=False)
-        for group in db_groups:
-            for curr_group in current_groups:
-                if group.module == curr_group.module and group.classname == curr_group.classname:
-                    group.last_introspection_check = datetime.datetime.now()
-                    dao.store_entity(group)
-                    break
-
-
-    def __create_instance(self, category_key, class_ref, init_parameter=None):
-        """
-        Validate Class reference.
-        Return None of Algorithm instance, from class reference.
-        """
-        if self.matlab_executable:
-            return model.AlgorithmGroup(class_ref.__module__, class_ref.__name__, category_key,
-                                        init_parameter=init_parameter, last_introspection_check=datetime.datetime.now())
-        else:
-            if self.__is_matlab_parent(inspect.getclasstree([class_ref])):
-                self.logger.debug("Skip Adapter because MATLAB is not found:" + str(class_ref))
-                return None
-            else:
-                return model.AlgorithmGroup(class_ref.__module__, class_ref.__name__, category_key,
-                                            init_parameter=init_parameter,
-                                            last_introspection_check=datetime.datetime.now())
-
-
     def __is_matlab_parent(self, search_in):
         """ Check if current class has MATLAB as parent Class"""
         if inspect.isclass(search_in) and search_in.__name__.find(MATLAB_ADAPTER) >= 0:
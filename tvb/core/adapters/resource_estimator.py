@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under 
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General 
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Estimates of the resources (run time, peak memory, disk size) of an operation, predicted from the resources
+actually used by the previous operations of the same algorithm, with the adapter formulas as fall-back.
+"""
+
+import os
+import sys
+import json
+import math
+import threading
+import numpy
+import psutil
+from tvb.basic.profile import TvbProfile
+from tvb.basic.logger.builder import get_logger
+from tvb.core.entities import model
+from tvb.core.entities.storage import dao
+
+try:
+    import resource
+except ImportError:
+    ## Not available on Windows
+    resource = None
+
+
+RUNTIME = 'runtime'
+PEAK_MEMORY = 'peak_memory'
+DISK_SIZE = 'disk_size'
+
+
+
+class ResourceModel(object):
+    """
+    Regression of one resource on the size features of the inputs, in log space (i.e. a power law):
+    log(1 + resource) = c0 + sum(c_i * log(1 + feature_i)).
+    The spread of the residuals gives the confidence bounds of a prediction.
+    """
+    ## Number of standard deviations of the residuals around the prediction (~95% for normal residuals)
+    CONFIDENCE_Z = 2.0
+    ## Predictions are trusted only for features at most this many times larger than the ones seen
+    EXTRAPOLATION_FACTOR = 2.0
+
+
+    def __init__(self, coefficients, sigma, max_features):
+        self.coefficients = coefficients
+        self.sigma = sigma
+        self.max_features = max_features
+
+
+    @staticmethod
+    def fit(features, values, min_samples):
+        """
+        :param features: 2d array, with one row of size features per operation
+        :param values: 1d array, with the resource used by each operation
+        :returns: ResourceModel, or None when there are not enough samples
+        """
+        nr_samples, nr_features = features.shape
+        if nr_samples < max(min_samples, nr_features + 2):
+            return None
+        design = numpy.hstack([numpy.ones((nr_samples, 1)), numpy.log1p(features)])
+        targets = numpy.log1p(values)
+        coefficients = numpy.linalg.lstsq(design, targets)[0]
+        residuals = targets - design.dot(coefficients)
+        sigma = math.sqrt(numpy.sum(residuals ** 2) / (nr_samples - nr_features - 1))
+        return ResourceModel(coefficients, sigma, features.max(axis=0))
+
+
+    def predict(self, features):
+        """
+        :returns: (estimate, lower bound, upper bound), or None when the features are out of the fitted range
+        """
+        features = numpy.asarray(features, dtype=numpy.float64)
+        if numpy.any(features > self.max_features * self.EXTRAPOLATION_FACTOR):
+            return None
+        center = self.coefficients[0] + numpy.dot(self.coefficients[1:], numpy.log1p(features))
+        margin = self.CONFIDENCE_Z * self.sigma
+        return tuple(max(0.0, math.expm1(value)) for value in (center, center - margin, center + margin))
+
+
+
+class ResourceEstimator(object):
+    """
+    Records the resources used by finished operations (table OPERATION_RESOURCE_USAGE), and predicts the
+    resources of new ones, for the adapters which describe the size of their inputs (see
+    ABCAdapter.get_size_features). Models are fitted per algorithm group, on the most recent HISTORY_SIZE
+    operations, and fitted again only when new operations were recorded.
+    """
+    HISTORY_SIZE = 200
+    MIN_SAMPLES = 5
+
+    FALLBACK_METHODS = {RUNTIME: 'get_execution_time_approximation',
+                        PEAK_MEMORY: 'get_required_memory_size',
+                        DISK_SIZE: 'get_required_disk_size'}
+
+    ## {algo_group_id: (id of the last usage fitted, {(feature names, resource): ResourceModel})}
+    _models = {}
+    _lock = threading.Lock()
+    logger = get_logger(__name__)
+
+
+    @staticmethod
+    def get_current_memory():
+        """
+        :returns: resident memory of current process in Bytes, or None when not available
+        """
+        try:
+            return float(psutil.Process(os.getpid()).memory_info().rss)
+        except psutil.Error:
+            return None
+
+
+    @staticmethod
+    def get_peak_memory(baseline):
+        """
+        The interpreter, the imported modules and the previous operations in the same process are not counted,
+        as the estimate is compared with the free memory, for a process already started.
+
+        :param baseline: resident memory of current process (from get_current_memory) just before the launch
+        :returns: peak resident memory of current process above baseline in Bytes, or None when not available
+        """
+        if resource is None or baseline is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        ## kB on Linux, Bytes on Mac OS
+        peak = float(peak) if sys.platform == 'darwin' else peak * 1024.0
+        return max(peak - baseline, 0.0)
+
+
+    @staticmethod
+    def get_size_features(adapter_instance, **kwargs):
+        """
+        :returns: dictionary {name: number} from the adapter, empty when the adapter does not give any
+        """
+        get_features = getattr(adapter_instance, 'get_size_features', None)
+        if get_features is None:
+            return {}
+        try:
+            return dict((str(name), float(value)) for name, value in get_features(**kwargs).iteritems())
+        except Exception, excep:
+            ResourceEstimator.logger.warning("Could not compute size features: %s" % str(excep))
+            return {}
+
+
+    @classmethod
+    def record(cls, adapter_instance, operation, peak_memory=None, **kwargs):
+        """
+        Store the resources used by a finished operation, launched with the given (prepared) arguments.
+        """
+        if not TvbProfile.current.RESOURCE_ESTIMATES_FROM_HISTORY:
+            return
+        algo_group = getattr(adapter_instance, 'algorithm_group', None)
+        if algo_group is None or operation.start_date is None or operation.completion_date is None:
+            return
+        features = cls.get_size_features(adapter_instance, **kwargs)
+        if not features:
+            return
+        delta = operation.completion_date - operation.start_date
+        runtime = delta.days * 86400 + delta.seconds + delta.microseconds / 1e6
+        disk_size = dao.get_disk_size_for_operation(operation.id)
+        dao.store_entity(model.OperationResourceUsage(algo_group.id, operation.id, features,
+                                                      runtime, peak_memory, disk_size))
+
+
+    @classmethod
+    def predict(cls, adapter_instance, resource_name, **kwargs):
+        """
+        :param resource_name: one of RUNTIME, PEAK_MEMORY, DISK_SIZE
+        :returns: (estimate, lower bound, upper bound) from the history of the algorithm,
+            or None when there is no reliable model
+        """
+        algo_group = getattr(adapter_instance, 'algorithm_group', None)
+        if algo_group is None or not TvbProfile.current.RESOURCE_ESTIMATES_FROM_HISTORY:
+            return None
+        features = cls.get_size_features(adapter_instance, **kwargs)
+        if not features:
+            return None
+        names = tuple(sorted(features))
+        resource_model = cls._get_models(algo_group.id).get((names, resource_name))
+        if resource_model is None:
+            return None
+        return resource_model.predict([features[name] for name in names])
+
+
+    @classmethod
+    def estimate(cls, adapter_instance, resource_name, **kwargs):
+        """
+        :returns: upper confidence bound predicted from history, or the value given by the adapter formula
+            (get_execution_time_approximation in seconds, get_required_memory_size in Bytes,
+            get_required_disk_size in kB)
+        """
+        try:
+            prediction = cls.predict(adapter_instance, resource_name, **kwargs)
+        except Exception, excep:
+            cls.logger.warning("Could not predict %s from history: %s" % (resource_name, str(excep)))
+            prediction = None
+        if prediction is not None:
+            return prediction[2]
+        return getattr(adapter_instance, cls.FALLBACK_METHODS[resource_name])(**kwargs)
+
+
+    @classmethod
+    def _get_models(cls, algo_group_id):
+        last_usage_id = dao.get_last_resource_usage_id(algo_group_id)
+        with cls._lock:
+            cached = cls._models.get(algo_group_id)
+        if cached is not None and cached[0] == last_usage_id:
+            return cached[1]
+        models = cls._fit_models(dao.get_resource_usage(algo_group_id, cls.HISTORY_SIZE))
+        with cls._lock:
+            cls._models[algo_group_id] = (last_usage_id, models)
+        return models
+
+
+    @classmethod
+    def _fit_models(cls, usages):
+        """
+        :returns: {(feature names, resource): ResourceModel} for the operations with the same feature names
+        """
+        samples = {}
+        for usage in usages:
+            features = json.loads(usage.size_features)
+            names = tuple(sorted(features))
+            samples.setdefault(names, []).append(([features[name] for name in names], usage))
+
+        models = {}
+        for names, entries in samples.iteritems():
+            for resource_name in cls.FALLBACK_METHODS:
+                known = [(features, getattr(usage, resource_name)) for features, usage in entries
+                         if getattr(usage, resource_name) is not None]
+                if not known:
+                    continue
+                features = numpy.array([entry[0] for entry in known], dtype=numpy.float64)
+                values = numpy.array([entry[1] for entry in known], dtype=numpy.float64)
+                resource_model = ResourceModel.fit(features, values, cls.MIN_SAMPLES)
+                if resource_model is not None:
+                    models[(names, resource_name)] = resource_model
+        return models
@@ -33,11 +33,15 @@
 """
 
 import os
+import glob
 import shutil
 import json
+import zlib
+import struct
 import zipfile
 from contextlib import closing
-from zipfile import ZipFile, ZIP_DEFLATED, BadZipfile
+from multiprocessing.pool import ThreadPool
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, ZIP_STORED, BadZipfile
 from tvb.basic.profile import TvbProfile
 from tvb.basic.logger.builder import get_logger
 from tvb.core.decorators import synchronized
@@ -61,9 +65,13 @@ class FilesHelper():
 
     TVB_FILE_EXTENSION = XMLWriter.FILE_EXTENSION    
     TVB_STORAGE_FILE_EXTENSION = ".h5"
+    # Files with data derived from a DataType (e.g. downsampled views), kept next to its H5 file
+    DATATYPE_CACHE_EXTENSION = ".cache"
 
     TVB_PROJECT_FILE = "Project" + TVB_FILE_EXTENSION
     TVB_OPERARATION_FILE = "Operation" + TVB_FILE_EXTENSION
+
+    EXPORT_INDEX_FILE = "export_index.json"
     
     def __init__(self):
         self.logger = get_logger(self.__class__.__module__)
@@ -247,11 +255,33 @@ class FilesHelper():
     
     ####################### DATA-TYPES METHODS Start Here #####################
      
+    def get_datatype_cache_path(self, datatype, cache_name):
+        """
+        :returns: path of a file with data derived from a DataType, placed next to its H5 file.
+            Such files are not DataTypes: they are ignored at import and removed together with the DataType.
+        """
+        storage_file = datatype.get_storage_file_path()
+        return os.path.splitext(storage_file)[0] + "-" + cache_name + self.DATATYPE_CACHE_EXTENSION
+
+
+    def remove_datatype_caches(self, datatype):
+        """
+        Remove all the files created with get_datatype_cache_path for a DataType.
+        """
+        cache_pattern = os.path.splitext(datatype.get_storage_file_path())[0] + "-*" + self.DATATYPE_CACHE_EXTENSION
+        for cache_file in glob.glob(cache_pattern):
+            try:
+                os.remove(cache_file)
+            except OSError, excep:
+                self.logger.warning("Could not remove cache file %s: %s" % (cache_file, str(excep)))
+
+
     def remove_datatype(self, datatype):  
         """
         Remove H5 storage fully.
         """
         try:
+            self.remove_datatype_caches(datatype)
             if os.path.exists(datatype.get_storage_file_path()):
                 os.remove(datatype.get_storage_file_path())
             else:
@@ -267,6 +297,7 @@ class FilesHelper():
         Move H5 storage into a new location
         """
         try:
+            self.remove_datatype_caches(datatype)
             full_path = datatype.get_storage_file_path()
             folder = self.get_project_folder(new_project_name, str(new_op_id))
             full_new_file = os.path.join(folder, os.path.split(full_path)[1])
@@ -390,13 +421,16 @@ class FilesHelper():
         return result_name
      
      
-    def unpack_zip(self, uploaded_zip, folder_path):
-        """ Simple method to unpack ZIP archive in a given folder. """
+    def unpack_zip(self, uploaded_zip, folder_path, members=None):
+        """
+        Simple method to unpack ZIP archive in a given folder.
+        :param members: when given, only these archive entries are unpacked
+        """
         EXCLUDED_FOLDERS = ["__MACOSX" + os.path.sep, ".DS_Store" + os.path.sep]
         try:
             with zipfile.ZipFile(uploaded_zip) as zip_arch:
                 result = []
-                for filename in zip_arch.namelist():
+                for filename in zip_arch.namelist() if members is None else members:
                     to_be_excluded = False
                     for excluded in EXCLUDED_FOLDERS:
                         if filename.startswith(excluded) or filename.find(os.path.sep + excluded) >= 0:
@@ -420,7 +454,84 @@ class FilesHelper():
         except Exception, excep:
             self.logger.exception("Could not process zip file")
             raise FileStructureException("Could not unpack the given ZIP file..." + str(excep))
-            
+
+
+    @staticmethod
+    def read_export_index(zip_path):
+        """
+        :returns: the leading index of an archive written with `TvbZip.write_indexed_folders`,
+                  or None for a plain ZIP archive
+        """
+        try:
+            with TvbZip(zip_path) as zip_arch:
+                if FilesHelper.EXPORT_INDEX_FILE not in zip_arch.namelist():
+                    return None
+                return json.loads(zip_arch.read(FilesHelper.EXPORT_INDEX_FILE))
+        except BadZipfile:
+            return None
+
+
+    def unpack_indexed_zip(self, zip_path, folder_path, selected_folders=None, workers=4):
+        """
+        Unpack an archive written with `TvbZip.write_indexed_folders`.
+        Indexed folders are validated against the index before anything is written on disk,
+        and then they get unpacked in parallel.
+
+        :param selected_folders: names (as keys in the index) of the indexed folders to unpack; None for all
+        :returns: the list of unpacked indexed folders
+        """
+        index = self.read_export_index(zip_path)
+        if index is None:
+            raise FileStructureException("The given ZIP archive has no index: %s" % zip_path)
+        entries = index[KEY_INDEX_FOLDERS]
+        if selected_folders is not None:
+            entries = dict((name, entries[name]) for name in selected_folders if name in entries)
+
+        infos = {}
+        with TvbZip(zip_path) as zip_arch:
+            for name, entry in entries.iteritems():
+                try:
+                    info = zip_arch.getinfo(entry[KEY_INDEX_MEMBER])
+                except KeyError:
+                    raise FileStructureException("Indexed folder %s is missing from the archive." % name)
+                if info.CRC != entry[KEY_INDEX_CRC] or info.file_size != entry[KEY_INDEX_SIZE]:
+                    raise FileStructureException("Indexed folder %s is corrupted in the archive." % name)
+                infos[name] = info
+            indexed_members = set(entry[KEY_INDEX_MEMBER] for entry in index[KEY_INDEX_FOLDERS].itervalues())
+            indexed_members.add(self.EXPORT_INDEX_FILE)
+            plain_members = [member for member in zip_arch.namelist() if member not in indexed_members]
+
+        self.unpack_zip(zip_path, folder_path, plain_members)
+
+        def _unpack_folder(name):
+            info = infos[name]
+            if info.compress_type == ZIP_STORED:
+                # The inner archive is read in place, from its bytes in the outer archive
+                folder_zip = _FileRange(zip_path, _member_data_offset(zip_path, info), info.compress_size)
+                try:
+                    self.unpack_zip(folder_zip, os.path.join(folder_path, name))
+                finally:
+                    folder_zip.close()
+                return
+
+            temp_archive = os.path.join(folder_path, info.filename)
+            try:
+                with TvbZip(zip_path) as outer_zip:
+                    self.copy_file(outer_zip.open(info.filename), temp_archive)
+                self.unpack_zip(temp_archive, os.path.join(folder_path, name))
+            finally:
+                if os.path.exists(temp_archive):
+                    os.remove(temp_archive)
+
+        if entries:
+            pool = ThreadPool(min(workers, len(entries)))
+            try:
+                pool.map(_unpack_folder, entries.keys())
+            finally:
+                pool.close()
+                pool.join()
+        return entries.keys()
+
 
     @staticmethod
     def copy_file(source, dest, dest_postfix=None, buffer_size=1024 * 1024):
@@ -490,6 +601,133 @@ class FilesHelper():
         return 0
 
 
+KEY_INDEX_VERSION = "version"
+KEY_INDEX_FOLDERS = "folders"
+KEY_INDEX_MEMBER = "member"
+KEY_INDEX_FILES = "files"
+KEY_INDEX_NAME = "name"
+KEY_INDEX_SIZE = "size"
+KEY_INDEX_CRC = "crc32"
+EXPORT_INDEX_VERSION = 1
+# Fixed part of a ZIP local file header, ending with the file name and extra field lengths
+LOCAL_HEADER_SIZE = 30
+
+
+
+def _is_compressible(file_path, sample_size=256 * 1024, samples=5):
+    """
+    Guess from a few samples spread over a file if deflate would gain anything on it (e.g. no for H5 files with
+    compressed datasets, or images). The first sample alone would mostly be the H5 header.
+    """
+    file_size = os.path.getsize(file_path)
+    if file_size == 0:
+        return False
+    last_offset = max(file_size - sample_size, 0)
+    offsets = sorted(set(last_offset * idx // (samples - 1) for idx in xrange(samples)))
+
+    compressible = 0
+    with open(file_path, 'rb') as file_obj:
+        for offset in offsets:
+            file_obj.seek(offset)
+            sample = file_obj.read(sample_size)
+            if len(zlib.compress(sample, 1)) < 0.9 * len(sample):
+                compressible += 1
+    return 2 * compressible > len(offsets)
+
+
+
+def _member_data_offset(zip_path, info):
+    """ Position in the archive file where the data of a member starts, after its local header. """
+    with open(zip_path, 'rb') as file_obj:
+        file_obj.seek(info.header_offset)
+        header = file_obj.read(LOCAL_HEADER_SIZE)
+    name_length, extra_length = struct.unpack('<HH', header[LOCAL_HEADER_SIZE - 4:])
+    return info.header_offset + LOCAL_HEADER_SIZE + name_length + extra_length
+
+
+
+class _FileRange(object):
+    """
+    Read-only, seekable view over a range of bytes of a file, e.g. over an archive stored uncompressed
+    inside another archive, for ZipFile to read it in place.
+    """
+
+    def __init__(self, file_path, start, size):
+        self._file = open(file_path, 'rb')
+        self._start = start
+        self._size = size
+        self._position = 0
+
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self._position
+        elif whence == 2:
+            offset += self._size
+        self._position = min(max(offset, 0), self._size)
+
+
+    def tell(self):
+        return self._position
+
+
+    def seekable(self):
+        return True
+
+
+    def read(self, size=-1):
+        if size is None or size < 0 or self._position + size > self._size:
+            size = self._size - self._position
+        self._file.seek(self._start + self._position)
+        data = self._file.read(size)
+        self._position += len(data)
+        return data
+
+
+    def close(self):
+        self._file.close()
+
+
+
+def _file_crc32(file_path, buffer_size=1024 * 1024):
+    """ Compute the CRC32 of a file, the same way the ZIP format does. """
+    crc = 0
+    with open(file_path, 'rb') as file_obj:
+        while True:
+            data = file_obj.read(buffer_size)
+            if not data:
+                break
+            crc = zlib.crc32(data, crc)
+    return crc & 0xffffffff
+
+
+
+def _pack_indexed_folder(name, folder, work_folder):
+    """
+    Pack a folder into its own archive under work_folder.
+    Already compressed files are stored as they are.
+    :returns: the archive path and its entry in the export index
+    """
+    member = name.replace('/', '_') + ".zip"
+    archive_path = os.path.join(work_folder, member)
+    files = []
+    with TvbZip(archive_path, "w") as folder_zip:
+        for root, _, file_names in os.walk(folder):
+            for file_n in file_names:
+                abs_file_n = os.path.join(root, file_n)
+                zip_file_n = abs_file_n[len(folder) + len(os.sep):]
+                compress_type = ZIP_DEFLATED if _is_compressible(abs_file_n) else ZIP_STORED
+                folder_zip.write(abs_file_n, zip_file_n, compress_type)
+        for info in folder_zip.infolist():
+            files.append({KEY_INDEX_NAME: info.filename, KEY_INDEX_SIZE: info.file_size,
+                          KEY_INDEX_CRC: info.CRC})
+
+    entry = {KEY_INDEX_MEMBER: member, KEY_INDEX_SIZE: os.path.getsize(archive_path),
+             KEY_INDEX_CRC: _file_crc32(archive_path), KEY_INDEX_FILES: files}
+    return archive_path, entry
+
+
+
 class TvbZip(ZipFile):
     def __init__(self, dest_path, mode="r"):
         ZipFile.__init__(self, dest_path, mode, ZIP_DEFLATED, True)
@@ -521,4 +759,34 @@ class TvbZip(ZipFile):
                 zip_file_n = abs_file_n[len(folder) + len(os.sep):]
                 self.write(abs_file_n, archive_path_prefix + zip_file_n)
 
+
+    def write_indexed_folders(self, folders, work_folder, workers=4):
+        """
+        Pack each of the given folders into its own archive, concurrently, then write a JSON index
+        (folder -> archive member, size, checksum and listed files), followed by these archives,
+        stored without a second compression.
+        Call this before writing anything else, for the index to lead the archive.
+
+        :param folders: dictionary {folder name in archive: full path of the folder on disk}
+        :param work_folder: where the intermediate archives are built; they are removed afterwards
+        """
+        if not folders:
+            return
+
+        names = list(folders)
+        pool = ThreadPool(min(workers, len(names)))
+        try:
+            packed = pool.map(lambda name: _pack_indexed_folder(name, folders[name], work_folder), names)
+        finally:
+            pool.close()
+            pool.join()
+
+        index = {KEY_INDEX_VERSION: EXPORT_INDEX_VERSION,
+                 KEY_INDEX_FOLDERS: dict((name, entry) for name, (_, entry) in zip(names, packed))}
+        self.writestr(ZipInfo(FilesHelper.EXPORT_INDEX_FILE), json.dumps(index))
+
+        for archive_path, entry in packed:
+            self.write(archive_path, entry[KEY_INDEX_MEMBER], ZIP_STORED)
+            os.remove(archive_path)
+
     # TODO: move filehelper's zip methods here
\ No newline at end of file
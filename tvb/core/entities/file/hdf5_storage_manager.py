@@ -44,6 +44,7 @@ import tvb.core.utils as utils
 from datetime import datetime
 from tvb.basic.logger.builder import get_logger
 from tvb.basic.profile import TvbProfile
+from tvb.core.metrics import REGISTRY
 from tvb.core.entities.file.exceptions import FileStructureException, MissingDataSetException
 from tvb.core.entities.file.exceptions import IncompatibleFileManagerException, MissingDataFileException
 from tvb.core.entities.transient.structure_entities import GenericMetaData
@@ -58,6 +59,9 @@ LOCK_OPEN_FILE = threading.Lock()
 ## big files. Since performance will mostly be important for the simulator we'll just use the top range for now.
 CHUNK_BLOCK_SIZE = 300000
 
+H5_FILE_OPENS = REGISTRY.counter("tvb_hdf5_file_opens_total", "H5 files opened in this process, per mode.", ("mode",))
+H5_OPEN_FILES = REGISTRY.gauge("tvb_hdf5_open_files", "H5 files currently kept open in this process.")
+
 
 class HDF5StorageManager(object):
     """
@@ -580,6 +584,7 @@ class HDF5StorageManager(object):
                 LOG.exception(excep)
             if not hdf5_file.fid.valid:
                 self.__hfd5_file = None
+                H5_OPEN_FILES.dec()
 
 
     # -------------- Private methods  --------------
@@ -598,6 +603,10 @@ class HDF5StorageManager(object):
         try:
             # Check if file is still open from previous writes.
             if self.__hfd5_file is None or not self.__hfd5_file.fid.valid:
+                if self.__hfd5_file is not None:
+                    ## Closed without passing through close_file
+                    self.__hfd5_file = None
+                    H5_OPEN_FILES.dec()
                 file_exists = os.path.exists(self.__storage_full_name)
 
                 # bug in some versions of hdf5 on windows prevent creating file with mode='a'
@@ -606,6 +615,8 @@ class HDF5StorageManager(object):
 
                 LOG.debug("Opening file: %s in mode: %s" % (self.__storage_full_name, mode))
                 self.__hfd5_file = hdf5.File(self.__storage_full_name, mode, libver='latest', chunks=chunk_shape)
+                H5_FILE_OPENS.inc(mode=mode)
+                H5_OPEN_FILES.inc()
 
                 # If this is the first time we access file, write data version
                 if not file_exists:
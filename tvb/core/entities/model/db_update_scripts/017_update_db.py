@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Change of DB structure for TVB version 1.3.3:
+indexes for the foreign keys used when listing operations and datatypes.
+"""
+
+from tvb.core.entities import model
+from tvb.basic.logger.builder import get_logger
+
+meta = model.Base.metadata
+LOGGER = get_logger(__name__)
+
+NEW_INDEXES = {'OPERATIONS': ['idx_operations_project_group', 'idx_operations_user_status'],
+               'DATA_TYPES': ['ix_DATA_TYPES_fk_from_operation', 'ix_DATA_TYPES_fk_datatype_group',
+                              'ix_DATA_TYPES_fk_parent_burst'],
+               'LINKS': ['ix_LINKS_fk_to_project', 'ix_LINKS_fk_from_datatype']}
+
+
+
+def _new_indexes():
+    """Index entities, as declared in the current model, for all the names in NEW_INDEXES."""
+    for table_name, index_names in NEW_INDEXES.iteritems():
+        for index in meta.tables[table_name].indexes:
+            if index.name in index_names:
+                yield index
+
+
+
+def upgrade(migrate_engine):
+    """
+    Upgrade operations go here.
+    Don't create your own engine; bind migrate_engine to your metadata.
+    """
+    meta.bind = migrate_engine
+    for index in _new_indexes():
+        try:
+            index.create(migrate_engine)
+        except Exception:
+            LOGGER.warning("Could not create index %s. It might exist already." % index.name)
+
+
+
+def downgrade(migrate_engine):
+    """
+    Operations to reverse the above upgrade go here.
+    """
+    meta.bind = migrate_engine
+    for index in _new_indexes():
+        try:
+            index.drop(migrate_engine)
+        except Exception:
+            LOGGER.warning("Could not drop index %s." % index.name)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Change of DB structure for TVB version 1.3.3:
+new table with the number of operations per project and status, filled from the existing operations.
+"""
+
+from sqlalchemy.sql import text
+from tvb.core.entities import model
+from tvb.core.entities.storage import SA_SESSIONMAKER
+from tvb.basic.logger.builder import get_logger
+
+meta = model.Base.metadata
+LOGGER = get_logger(__name__)
+
+
+
+def upgrade(migrate_engine):
+    """
+    Upgrade operations go here.
+    Don't create your own engine; bind migrate_engine to your metadata.
+    """
+    meta.bind = migrate_engine
+    meta.tables['OPERATION_STATUS_COUNTERS'].create(checkfirst=True)
+
+    try:
+        session = SA_SESSIONMAKER()
+        ## One row for every status in every project (as for new projects), thus operations only update them
+        for status in model.ALL_STATUSES:
+            session.execute(text("""INSERT INTO "OPERATION_STATUS_COUNTERS" (fk_project, status, count)
+                                    SELECT p.id, :status, (SELECT count(o.id) FROM "OPERATIONS" o
+                                                           WHERE o.fk_launched_in = p.id AND o.status = :status)
+                                    FROM "PROJECTS" p"""), {'status': status})
+        session.commit()
+        session.close()
+    except Exception:
+        LOGGER.exception("Could not count existing operations")
+        raise
+
+
+
+def downgrade(migrate_engine):
+    """
+    Operations to reverse the above upgrade go here.
+    """
+    meta.bind = migrate_engine
+    meta.tables['OPERATION_STATUS_COUNTERS'].drop(checkfirst=True)
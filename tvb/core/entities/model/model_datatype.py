@@ -104,15 +104,15 @@ class DataType(Base):
     # ID of a burst in which current dataType was generated
     # Native burst-results are referenced from a workflowSet as well
     # But we also have results generated afterwards from TreeBurst tab.
-    fk_parent_burst = Column(Integer, ForeignKey('BURST_CONFIGURATIONS.id', ondelete="SET NULL"))
+    fk_parent_burst = Column(Integer, ForeignKey('BURST_CONFIGURATIONS.id', ondelete="SET NULL"), index=True)
     _parent_burst = relationship(BurstConfiguration)
 
     #it should be a reference to a DataTypeGroup, but we can not create that FK
     #because this two tables (DATA_TYPES, DATA_TYPES_GROUPS) will reference each
     #other mutually and SQL-Alchemy complains about that.
-    fk_datatype_group = Column(Integer, ForeignKey('DATA_TYPES.id'))
+    fk_datatype_group = Column(Integer, ForeignKey('DATA_TYPES.id'), index=True)
 
-    fk_from_operation = Column(Integer, ForeignKey('OPERATIONS.id', ondelete="CASCADE"))
+    fk_from_operation = Column(Integer, ForeignKey('OPERATIONS.id', ondelete="CASCADE"), index=True)
     parent_operation = relationship(Operation, backref=backref("DATA_TYPES", order_by=id, cascade="all,delete"))
 
 
@@ -221,8 +221,8 @@ class Links(Base):
     __tablename__ = 'LINKS'
 
     id = Column(Integer, primary_key=True)
-    fk_to_project = Column(Integer, ForeignKey('PROJECTS.id', ondelete="CASCADE"))
-    fk_from_datatype = Column(Integer, ForeignKey('DATA_TYPES.id', ondelete="CASCADE"))
+    fk_to_project = Column(Integer, ForeignKey('PROJECTS.id', ondelete="CASCADE"), index=True)
+    fk_from_datatype = Column(Integer, ForeignKey('DATA_TYPES.id', ondelete="CASCADE"), index=True)
 
     referenced_project = relationship(Project, backref=backref('LINKS', order_by=id, cascade="delete, all"))
     referenced_datatype = relationship(DataType, backref=backref('LINKS', order_by=id, cascade="delete, all"))
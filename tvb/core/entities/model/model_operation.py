@@ -39,7 +39,7 @@ Here we define entities for Operations and Algorithms.
 import json
 import datetime
 from sqlalchemy.orm import relationship, backref
-from sqlalchemy import Boolean, Integer, String, DateTime, Column, ForeignKey
+from sqlalchemy import Boolean, Integer, Float, String, DateTime, Column, ForeignKey, Index, UniqueConstraint
 from tvb.basic.logger.builder import get_logger
 from tvb.config import TVB_IMPORTER_CLASS, TVB_IMPORTER_MODULE
 from tvb.core.utils import string2date, generate_guid
@@ -292,6 +292,7 @@ STATUS_PENDING = "4-PENDING"
 STATUS_STARTED = "3-STARTED"
 STATUS_CANCELED = "2-CANCELED"
 STATUS_ERROR = "1-ERROR"
+ALL_STATUSES = [STATUS_FINISHED, STATUS_PENDING, STATUS_STARTED, STATUS_CANCELED, STATUS_ERROR]
 
 
 def has_finished(status):
@@ -304,6 +305,9 @@ class Operation(Base, Exportable):
     The class used to log any action executed in Projects.
     """
     __tablename__ = 'OPERATIONS'
+    # Composite indexes for the operations listing (grouped per project) and for the per user status counters.
+    __table_args__ = (Index('idx_operations_project_group', 'fk_launched_in', 'fk_operation_group', 'id'),
+                      Index('idx_operations_user_status', 'fk_launched_by', 'status'))
 
     id = Column(Integer, primary_key=True)
     fk_launched_by = Column(Integer, ForeignKey('USERS.id'))
@@ -517,6 +521,81 @@ class OperationProcessIdentifier(Base):
 
 
 
+class OperationResultCache(Base):
+    """
+    Class for storing, for finished operations, a hash of their canonical inputs (including algorithm version),
+    so that launching again the same algorithm with identical inputs can re-use the already computed results.
+    """
+    __tablename__ = "OPERATION_RESULT_CACHE"
+
+    id = Column(Integer, primary_key=True)
+    fk_from_operation = Column(Integer, ForeignKey('OPERATIONS.id', ondelete="CASCADE"))
+    input_hash = Column(String, index=True)
+
+    operation = relationship(Operation, backref=backref('OPERATION_RESULT_CACHE', order_by=id, cascade="delete"))
+
+
+    def __init__(self, operation_id, input_hash):
+        self.fk_from_operation = operation_id
+        self.input_hash = input_hash
+
+
+
+class OperationStatusCount(Base):
+    """
+    Number of operations in a project having a given status.
+    Rows are kept current by DB triggers on Operation (see tvb.core.traits.db_events),
+    and repaired periodically from the OPERATIONS table, in case of drift.
+    """
+    __tablename__ = "OPERATION_STATUS_COUNTERS"
+    __table_args__ = (UniqueConstraint('fk_project', 'status'),)
+
+    id = Column(Integer, primary_key=True)
+    fk_project = Column(Integer, ForeignKey('PROJECTS.id', ondelete="CASCADE"))
+    status = Column(String)
+    count = Column(Integer, default=0)
+
+    project = relationship(Project, backref=backref('OPERATION_STATUS_COUNTERS', order_by=id, cascade="delete"))
+
+
+    def __init__(self, project_id, status, count=0):
+        self.fk_project = project_id
+        self.status = status
+        self.count = count
+
+
+
+class OperationResourceUsage(Base):
+    """
+    Resources actually used by a finished operation, together with the size of its inputs, from which the
+    resources of the next operations with the same algorithm are predicted (see tvb.core.adapters.resource_estimator).
+    The operation is not a foreign key, such that the history is kept when operations are removed.
+    """
+    __tablename__ = "OPERATION_RESOURCE_USAGE"
+
+    id = Column(Integer, primary_key=True)
+    fk_algo_group = Column(Integer, ForeignKey('ALGORITHM_GROUPS.id', ondelete="CASCADE"), index=True)
+    operation_id = Column(Integer)
+    size_features = Column(String)
+    ## In seconds
+    runtime = Column(Float)
+    ## In Bytes. None when the operation did not run in a process of its own.
+    peak_memory = Column(Float)
+    ## In kB
+    disk_size = Column(Float)
+    create_date = Column(DateTime, default=datetime.datetime.now)
+
+
+    def __init__(self, algo_group_id, operation_id, size_features, runtime, peak_memory, disk_size):
+        self.fk_algo_group = algo_group_id
+        self.operation_id = operation_id
+        self.size_features = json.dumps(size_features, sort_keys=True)
+        self.runtime = runtime
+        self.peak_memory = peak_memory
+        self.disk_size = disk_size
+
+
+
 class ResultFigure(Base, Exportable):
     """
     Class for storing figures from results, visualize them eventually next to each other.
@@ -38,7 +38,7 @@ DAO operations related to generic DataTypes are defined here.
 from sqlalchemy import func, or_, not_, and_
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.sql import text
-from sqlalchemy.orm import aliased
+from sqlalchemy.orm import aliased, joinedload, joinedload_all
 from sqlalchemy.sql.expression import desc, cast
 from sqlalchemy.types import Text
 from sqlalchemy.orm.exc import NoResultFound
@@ -182,6 +182,65 @@ class DatatypeDAO(RootDAO):
             return None
 
 
+    def get_measures_for_datatype_group(self, measure_class, datatype_group_id):
+        """
+        Retrieve in a single query all the measures of a given class, computed for the DataTypes in a group
+        (or being themselves part of the group).
+
+        :param measure_class: mapped class of the measure (e.g. DatatypeMeasure)
+        :returns: dictionary {measured DataType GID: first measure entity computed for it}
+        """
+        try:
+            group_gids = self.session.query(model.DataType.gid).filter_by(fk_datatype_group=datatype_group_id)
+            measures = self.session.query(measure_class
+                                          ).filter(or_(measure_class.fk_datatype_group == datatype_group_id,
+                                                       measure_class._analyzed_datatype.in_(group_gids.subquery()))
+                                          ).order_by(measure_class.id).all()
+            # Traited entities are seen as dirty after load (see get_generic_entity)
+            self.session.expunge_all()
+        except SQLAlchemyError, excep:
+            self.logger.exception(excep)
+            return {}
+
+        result = {}
+        for measure in measures:
+            if measure.fk_datatype_group == datatype_group_id:
+                key = measure.gid
+            else:
+                key = measure._analyzed_datatype
+            if key not in result:
+                result[key] = measure
+        return result
+
+
+    def get_measures_for_datatypes(self, measure_class, datatype_gids):
+        """
+        Same as get_measures_for_datatype_group, but only for the given DataTypes in a group, with one query
+        for each chunk of IN_QUERY_CHUNK_SIZE GIDs.
+
+        :returns: dictionary {measured DataType GID: first measure entity computed for it}
+        """
+        result = {}
+        datatype_gids = list(set(datatype_gids))
+        try:
+            for idx in xrange(0, len(datatype_gids), self.IN_QUERY_CHUNK_SIZE):
+                chunk = datatype_gids[idx: idx + self.IN_QUERY_CHUNK_SIZE]
+                measures = self.session.query(measure_class
+                                              ).filter(or_(measure_class.gid.in_(chunk),
+                                                           measure_class._analyzed_datatype.in_(chunk))
+                                              ).order_by(measure_class.id).all()
+                for measure in measures:
+                    key = measure.gid if measure.gid in chunk else measure._analyzed_datatype
+                    if key not in result:
+                        result[key] = measure
+            # Traited entities are seen as dirty after load (see get_generic_entity)
+            self.session.expunge_all()
+        except SQLAlchemyError, excep:
+            self.logger.exception(excep)
+            return {}
+        return result
+
+
     def set_datatype_visibility(self, datatype_gid, is_visible):
         """
         Sets the dataType visibility. If the given dataType is a dataTypeGroup or it is part of a
@@ -273,59 +332,68 @@ class DatatypeDAO(RootDAO):
         return query.all()
 
 
-    def get_data_in_project(self, project_id, visibility_filter=None, filter_value=None):
+    def _query_data_in_project(self, project_id, visibility_filter, filter_value, *entities):
         """
-        Get all the DataTypes for a given project, including Linked Entities and DataType Groups.
+        Build the queries which, together, cover all the DataTypes for a given project (see get_data_in_project).
 
-        :param visibility_filter: when not None, will filter by DataTye fields
-        :param filter_value: when not None, will filter with ilike multiple DataType string attributes
+        :param entities: what to select; all the joins and filters start from model.DataType
+        :returns: a list of queries
         """
-        resulted_data = []
-        try:
-            ## First Query DT, DT_gr, Lk_DT and Lk_DT_gr
-            query = self.session.query(model.DataType
-                        ).join((model.Operation, model.Operation.id == model.DataType.fk_from_operation)
-                        ).join(model.Algorithm).join(model.AlgorithmGroup).join(model.AlgorithmCategory
-                        ).outerjoin((model.Links, and_(model.Links.fk_from_datatype == model.DataType.id,
-                                                       model.Links.fk_to_project == project_id))
-                        ).outerjoin(model.BurstConfiguration,
-                                    model.DataType.fk_parent_burst == model.BurstConfiguration.id
-                        ).filter(model.DataType.fk_datatype_group == None
-                        ).filter(or_(model.Operation.fk_launched_in == project_id,
-                                     model.Links.fk_to_project == project_id))
-
+        ## First Query DT, DT_gr, Lk_DT and Lk_DT_gr
+        query = self.session.query(*entities).select_from(model.DataType
+                    ).join((model.Operation, model.Operation.id == model.DataType.fk_from_operation)
+                    ).join(model.Algorithm).join(model.AlgorithmGroup).join(model.AlgorithmCategory
+                    ).outerjoin((model.Links, and_(model.Links.fk_from_datatype == model.DataType.id,
+                                                   model.Links.fk_to_project == project_id))
+                    ).outerjoin(model.BurstConfiguration,
+                                model.DataType.fk_parent_burst == model.BurstConfiguration.id
+                    ).outerjoin(model.OperationGroup, model.Operation.fk_operation_group == model.OperationGroup.id
+                    ).filter(model.DataType.fk_datatype_group == None
+                    ).filter(or_(model.Operation.fk_launched_in == project_id,
+                                 model.Links.fk_to_project == project_id))
+
+        ## Now query what it was not covered before:
+        ## Links of DT which are part of a group, but the entire group is not linked
+        links = aliased(model.Links)
+        query2 = self.session.query(*entities).select_from(model.DataType
+                    ).join((model.Operation, model.Operation.id == model.DataType.fk_from_operation)
+                    ).join(model.Algorithm).join(model.AlgorithmGroup).join(model.AlgorithmCategory
+                    ).join((model.Links, and_(model.Links.fk_from_datatype == model.DataType.id,
+                                              model.Links.fk_to_project == project_id))
+                    ).outerjoin(links, and_(links.fk_from_datatype == model.DataType.fk_datatype_group,
+                                            links.fk_to_project == project_id)
+                    ).outerjoin(model.BurstConfiguration,
+                                model.DataType.fk_parent_burst == model.BurstConfiguration.id
+                    ).outerjoin(model.OperationGroup, model.Operation.fk_operation_group == model.OperationGroup.id
+                    ).filter(model.DataType.fk_datatype_group != None
+                    ).filter(links.id == None)
+
+        queries = []
+        for one_query in [query, query2]:
             if visibility_filter:
                 filter_str = visibility_filter.get_sql_filter_equivalent()
                 if filter_str is not None:
-                    query = query.filter(eval(filter_str))
+                    one_query = one_query.filter(eval(filter_str))
             if filter_value is not None:
-                query = query.filter(self._compose_filter_datatype_ilike(filter_value))
-
-            resulted_data = query.all()
-
-            ## Now query what it was not covered before:
-            ## Links of DT which are part of a group, but the entire group is not linked
-            links = aliased(model.Links)
-            query2 = self.session.query(model.DataType
-                        ).join((model.Operation, model.Operation.id == model.DataType.fk_from_operation)
-                        ).join(model.Algorithm).join(model.AlgorithmGroup).join(model.AlgorithmCategory
-                        ).join((model.Links, and_(model.Links.fk_from_datatype == model.DataType.id,
-                                                  model.Links.fk_to_project == project_id))
-                        ).outerjoin(links, and_(links.fk_from_datatype == model.DataType.fk_datatype_group,
-                                                links.fk_to_project == project_id)
-                        ).outerjoin(model.BurstConfiguration,
-                                    model.DataType.fk_parent_burst == model.BurstConfiguration.id
-                        ).filter(model.DataType.fk_datatype_group != None
-                        ).filter(links.id == None)
+                one_query = one_query.filter(self._compose_filter_datatype_ilike(filter_value))
+            queries.append(one_query)
+        return queries
 
-            if visibility_filter:
-                filter_str = visibility_filter.get_sql_filter_equivalent()
-                if filter_str is not None:
-                    query2 = query2.filter(eval(filter_str))
-            if filter_value is not None:
-                query2 = query2.filter(self._compose_filter_datatype_ilike(filter_value))
 
-            resulted_data.extend(query2.all())
+    def get_data_in_project(self, project_id, visibility_filter=None, filter_value=None, column_filters=None):
+        """
+        Get all the DataTypes for a given project, including Linked Entities and DataType Groups.
+
+        :param visibility_filter: when not None, will filter by DataTye fields
+        :param filter_value: when not None, will filter with ilike multiple DataType string attributes
+        :param column_filters: optional list of extra SqlAlchemy clauses
+        """
+        resulted_data = []
+        try:
+            for query in self._query_data_in_project(project_id, visibility_filter, filter_value, model.DataType):
+                for clause in column_filters or []:
+                    query = query.filter(clause)
+                resulted_data.extend(query.all())
 
             # Load lazy fields for future usage
             for dt in resulted_data:
@@ -343,6 +411,68 @@ class DatatypeDAO(RootDAO):
         return resulted_data
 
 
+    def get_data_in_project_for_display(self, project_id, visibility_filter=None, filter_value=None,
+                                        column_filters=None):
+        """
+        Same DataTypes as get_data_in_project, but loaded in bulk, for displaying them: each DataType as its
+        own class (for display_name) with one query per class (and chunk of IN_QUERY_CHUNK_SIZE ids),
+        together with its operation, algorithm, operation group, user and burst.
+
+        :returns: DataTypes sorted by id
+        """
+        result = []
+        try:
+            ids_per_class = {}
+            for query in self._query_data_in_project(project_id, visibility_filter, filter_value, model.DataType.id,
+                                                     model.DataType.module, model.DataType.type):
+                for clause in column_filters or []:
+                    query = query.filter(clause)
+                for datatype_id, module, class_name in query.all():
+                    ids_per_class.setdefault((module, class_name), []).append(datatype_id)
+
+            for (module, class_name), ids in ids_per_class.iteritems():
+                data_class = getattr(__import__(module, globals(), locals(), [class_name]), class_name)
+                for idx in xrange(0, len(ids), self.IN_QUERY_CHUNK_SIZE):
+                    chunk = ids[idx: idx + self.IN_QUERY_CHUNK_SIZE]
+                    query = self.session.query(data_class).filter(data_class.id.in_(chunk)
+                                ).options(joinedload_all('parent_operation.algorithm.algo_group.group_category'),
+                                          joinedload_all('parent_operation.operation_group'),
+                                          joinedload_all('parent_operation.user'),
+                                          joinedload('_parent_burst'))
+                    result.extend(query.all())
+            result.sort(key=lambda datatype: datatype.id)
+            # Entities are seen dirty after the traited DB events, and they should not get committed
+            self.session.expunge_all()
+        except Exception, excep:
+            self.logger.exception(excep)
+        return result
+
+
+    def count_data_in_project_by_columns(self, project_id, first_column, second_column,
+                                         visibility_filter=None, filter_value=None):
+        """
+        Count the DataTypes of a project (the same ones get_data_in_project returns), grouped by 2 columns.
+
+        :returns: list of tuples (first column value, second column value, count)
+        """
+        result = []
+        try:
+            for query in self._query_data_in_project(project_id, visibility_filter, filter_value, first_column,
+                                                     second_column, func.count(model.DataType.id)):
+                result.extend(query.group_by(first_column, second_column).all())
+        except Exception, excep:
+            self.logger.exception(excep)
+        return result
+
+
+    def get_datatypes_marker(self):
+        """
+        :returns: the number of DataTypes and the largest DataType id, as a cheap marker that DataTypes
+                  got stored or removed (also by other processes)
+        """
+        return tuple(self.session.query(func.count(model.DataType.id), func.max(model.DataType.id)).one())
+
+
     def _compose_filter_datatype_ilike(self, filter_string):
         """
         :param filter_string: String to be search for with ilike.
@@ -379,6 +509,43 @@ class DatatypeDAO(RootDAO):
         return result_dt
 
 
+    def get_datatype_ids_by_gids(self, datatype_gids):
+        """
+        Find which of the given GIDs are already present in DB, with one query for each chunk
+        of IN_QUERY_CHUNK_SIZE GIDs.
+
+        :returns: dictionary {gid: id} for the DataTypes found
+        """
+        result = {}
+        datatype_gids = list(set(datatype_gids))
+        for idx in xrange(0, len(datatype_gids), self.IN_QUERY_CHUNK_SIZE):
+            chunk = datatype_gids[idx: idx + self.IN_QUERY_CHUNK_SIZE]
+            query = self.session.query(model.DataType.gid, model.DataType.id).filter(model.DataType.gid.in_(chunk))
+            result.update(dict(query.all()))
+        return result
+
+
+    def get_display_names_by_gids(self, datatype_class, datatype_gids):
+        """
+        Read the display names of the DataTypes with the given GIDs, with one query for each chunk
+        of IN_QUERY_CHUNK_SIZE GIDs. Entities are loaded as datatype_class, as display_name can be overwritten.
+
+        :returns: dictionary {gid: display_name} for the DataTypes found
+        """
+        result = {}
+        datatype_gids = list(set(datatype_gids))
+        try:
+            for idx in xrange(0, len(datatype_gids), self.IN_QUERY_CHUNK_SIZE):
+                chunk = datatype_gids[idx: idx + self.IN_QUERY_CHUNK_SIZE]
+                for datatype in self.session.query(datatype_class).filter(datatype_class.gid.in_(chunk)).all():
+                    result[datatype.gid] = datatype.display_name
+            # Entities are seen dirty after the traited DB events, and they should not get committed
+            self.session.expunge_all()
+        except SQLAlchemyError, excep:
+            self.logger.exception(excep)
+        return result
+
+
     def get_datatype_by_gid(self, gid, load_lazy=True):
         """
         Retrieve a DataType DB reference by a global identifier.
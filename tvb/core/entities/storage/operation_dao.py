@@ -35,6 +35,7 @@ DAO operations related to Algorithms and User Operations are defined here.
 .. moduleauthor:: Bogdan Neacsa <bogdan.neacsa@codemart.ro>
 """
 
+from datetime import datetime
 from sqlalchemy import or_, and_
 from sqlalchemy import func as func
 from sqlalchemy.exc import SQLAlchemyError
@@ -42,6 +43,7 @@ from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.sql.expression import case as case_, desc
 from tvb.core.entities import model
 from tvb.core.entities.storage.root_dao import RootDAO
+from tvb.core.traits.db_events import recount_status_counters, status_counters_available
 
 
 
@@ -78,6 +80,25 @@ class OperationDAO(RootDAO):
             return None
 
 
+    def get_operations_by_gids(self, operation_gids):
+        """
+        Retrieve OPERATION entities (without lazy fields) for a list of GIDs, with one query for each chunk
+        of IN_QUERY_CHUNK_SIZE GIDs.
+
+        :returns: dictionary {gid: Operation}
+        """
+        result = {}
+        operation_gids = list(set(operation_gids))
+        try:
+            for idx in xrange(0, len(operation_gids), self.IN_QUERY_CHUNK_SIZE):
+                chunk = operation_gids[idx: idx + self.IN_QUERY_CHUNK_SIZE]
+                for operation in self.session.query(model.Operation).filter(model.Operation.gid.in_(chunk)).all():
+                    result[operation.gid] = operation
+        except SQLAlchemyError, excep:
+            self.logger.exception(excep)
+        return result
+
+
     def get_operation_by_gid(self, operation_gid):
         """Retrieve OPERATION entity for a given gid."""
         try:
@@ -151,6 +172,48 @@ class OperationDAO(RootDAO):
         return result
 
 
+    def get_cached_operation(self, inputs_hash):
+        """
+        :returns: the most recent finished operation recorded in the results cache with the given inputs hash,
+                  or None when no such operation exists.
+        """
+        try:
+            return self.session.query(model.Operation
+                                      ).join((model.OperationResultCache,
+                                              model.OperationResultCache.fk_from_operation == model.Operation.id)
+                                      ).filter(model.OperationResultCache.input_hash == inputs_hash
+                                      ).filter(model.Operation.status == model.STATUS_FINISHED
+                                      ).order_by(desc(model.Operation.id)).first()
+        except SQLAlchemyError, excep:
+            self.logger.exception(excep)
+            return None
+
+
+    def get_resource_usage(self, algo_group_id, limit):
+        """
+        :returns: the most recent `limit` OperationResourceUsage entries for an algorithm group, newest first
+        """
+        try:
+            return self.session.query(model.OperationResourceUsage
+                                      ).filter(model.OperationResourceUsage.fk_algo_group == algo_group_id
+                                      ).order_by(desc(model.OperationResourceUsage.id)).limit(limit).all()
+        except SQLAlchemyError, excep:
+            self.logger.exception(excep)
+            return []
+
+
+    def get_last_resource_usage_id(self, algo_group_id):
+        """
+        :returns: id of the most recent OperationResourceUsage for an algorithm group, or None
+        """
+        try:
+            return self.session.query(func.max(model.OperationResourceUsage.id)
+                                      ).filter(model.OperationResourceUsage.fk_algo_group == algo_group_id).scalar()
+        except SQLAlchemyError, excep:
+            self.logger.exception(excep)
+            return None
+
+
     def get_operations_in_group(self, operation_group_id, is_count=False,
                                 only_first_operation=False, only_gids=False):
         """
@@ -173,6 +236,20 @@ class OperationDAO(RootDAO):
         return result
 
 
+    def count_running_operations_in_group(self, operation_group_id):
+        """
+        :returns: the number of operations in a group which did not finish yet (neither FINISHED, ERROR or CANCELED)
+        """
+        try:
+            return self.session.query(func.count(model.Operation.id)
+                                      ).filter(model.Operation.fk_operation_group == operation_group_id
+                                      ).filter(~model.Operation.status.in_([model.STATUS_FINISHED, model.STATUS_ERROR,
+                                                                            model.STATUS_CANCELED])).scalar()
+        except SQLAlchemyError, excep:
+            self.logger.exception(excep)
+            return 0
+
+
     def compute_disk_size_for_started_ops(self, user_id):
         """ Get all the disk space that should be reserved for the started operations of this user. """
         try:
@@ -185,11 +262,15 @@ class OperationDAO(RootDAO):
         return expected_hdd_size or 0
 
 
-    def get_filtered_operations(self, project_id, filter_chain, page_start=0, page_size=20, is_count=False):
+    def get_filtered_operations(self, project_id, filter_chain, page_start=0, page_size=20, is_count=False,
+                                before_id=None, after_id=None):
         """
         :param project_id: current project ID
         :param filter_chain: instance of FilterChain
         :param is_count: when True, return a number, otherwise the list of operation entities
+        :param before_id: when given, seek the page right after the row with this max(id),
+                          instead of skipping `page_start` rows
+        :param after_id: when given, seek the page right before the row with this max(id)
 
         :return a list of filtered operation in current project, page by page, or the total count for them.
         """
@@ -224,6 +305,16 @@ class OperationDAO(RootDAO):
             if is_count:
                 return query.count()
 
+            ## Keyset pagination: rows are sorted by max(id), thus a page can start from the boundary of its neighbour.
+            if before_id is not None:
+                query = query.having(func.max(model.Operation.id) < before_id)
+                return query.order_by(desc(func.max(model.Operation.id))).limit(page_size).all()
+            if after_id is not None:
+                query = query.having(func.max(model.Operation.id) > after_id)
+                result = query.order_by(func.max(model.Operation.id)).limit(page_size).all()
+                result.reverse()
+                return result
+
             return query.order_by(desc(func.max(model.Operation.id))).offset(page_start).limit(page_size).all()
 
         except SQLAlchemyError, excep:
@@ -253,6 +344,34 @@ class OperationDAO(RootDAO):
             return None
 
 
+    def get_results_for_operation_group(self, operation_group_id, completed_after=None):
+        """
+        Retrieve in a single query all the operations in a group, together with their first resulted DataType.
+
+        :param completed_after: when given, only the operations completed after this moment are returned
+        :returns: list of tuples (Operation, DataType or None), ordered by operation ID
+        """
+        try:
+            query = self.session.query(model.Operation, model.DataType
+                                       ).outerjoin((model.DataType,
+                                                    and_(model.DataType.fk_from_operation == model.Operation.id,
+                                                         model.DataType.type != self.EXCEPTION_DATATYPE_GROUP,
+                                                         model.DataType.type != self.EXCEPTION_DATATYPE_SIMULATION))
+                                       ).filter(model.Operation.fk_operation_group == operation_group_id)
+            if completed_after is not None:
+                query = query.filter(model.Operation.completion_date > completed_after)
+            rows = query.order_by(model.Operation.id, model.DataType.id).all()
+        except SQLAlchemyError, excep:
+            self.logger.exception(excep)
+            return []
+
+        result = []
+        for operation, datatype in rows:
+            if not result or result[-1][0].id != operation.id:
+                result.append((operation, datatype))
+        return result
+
+
     def get_operations_for_datatype(self, datatype_gid, only_relevant=True, only_in_groups=False):
         """
         Returns all the operations which uses as an input parameter
@@ -355,6 +474,28 @@ class OperationDAO(RootDAO):
             self.logger.exception(excep)
 
 
+    def claim_pending_operation(self, operation_id):
+        """
+        Mark a PENDING operation as dispatched, by filling its start_date with one conditional UPDATE,
+        for concurrent callers (e.g. workflow steps finishing at the same time) to launch it only once.
+        The start_date gets overwritten when the operation actually starts.
+
+        :returns: True when current call claimed the operation, False when it was already dispatched.
+        """
+        claimed = 0
+        try:
+            ## Core statement (and not query.update), as no operation counter needs to be recounted after it
+            table = model.Operation.__table__
+            claimed = self.session.execute(table.update().where(and_(table.c.id == operation_id,
+                                                                     table.c.status == model.STATUS_PENDING,
+                                                                     table.c.start_date == None)
+                                                                ).values(start_date=datetime.now())).rowcount
+            self.session.commit()
+        except SQLAlchemyError, excep:
+            self.logger.exception(excep)
+        return claimed == 1
+
+
     def get_figures_for_operation(self, operation_id):
         """Retrieve Figure entities, resulted after executing an operation."""
         try:
@@ -538,6 +679,20 @@ class OperationDAO(RootDAO):
         return algos_list
 
 
+    def get_all_algo_groups_and_algorithms(self):
+        """
+        Retrieve all algorithm groups (including the removed ones) and all algorithms, in two queries.
+        Used by the introspection, for comparing them with the currently declared adapters.
+        """
+        try:
+            groups = self.session.query(model.AlgorithmGroup).all()
+            algorithms = self.session.query(model.Algorithm).all()
+        except SQLAlchemyError, excep:
+            self.logger.exception(excep)
+            groups, algorithms = [], []
+        return groups, algorithms
+
+
     #
     # ALGORITHM RELATED METHODS
     #
@@ -669,10 +824,17 @@ class OperationDAO(RootDAO):
     def get_operation_numbers(self, proj_id):
         """
         Count total number of operations started for current project.
-        """
-        stats = self.session.query(model.Operation.status, func.count(model.Operation.id)
-                                    ).filter_by(fk_launched_in=proj_id
-                                    ).group_by(model.Operation.status).all()
+        Numbers are read from the counters kept per project, with a fall-back on counting the operations
+        (also used while the DB is not upgraded to have the counters table).
+        """
+        stats = []
+        if status_counters_available(self.session.connection()):
+            stats = self.session.query(model.OperationStatusCount.status, model.OperationStatusCount.count
+                                       ).filter_by(fk_project=proj_id).all()
+        if not stats:
+            stats = self.session.query(model.Operation.status, func.count(model.Operation.id)
+                                       ).filter_by(fk_launched_in=proj_id
+                                       ).group_by(model.Operation.status).all()
         stats = dict(stats)
         finished = stats.get(model.STATUS_FINISHED, 0)
         started = stats.get(model.STATUS_STARTED, 0)
@@ -680,4 +842,15 @@ class OperationDAO(RootDAO):
         canceled = stats.get(model.STATUS_CANCELED, 0)
         pending = stats.get(model.STATUS_PENDING, 0)
 
-        return finished, started, failed, canceled, pending
\ No newline at end of file
+        return finished, started, failed, canceled, pending
+
+
+    def reconcile_operation_numbers(self, proj_id=None):
+        """
+        Repair the per project operation counters, by counting again the operations (in one or all projects).
+
+        :returns: number of counters which had drifted
+        """
+        repaired = recount_status_counters(self.session.connection(), None if proj_id is None else [proj_id])
+        self.session.commit()
+        return repaired
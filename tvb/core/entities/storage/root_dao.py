@@ -55,6 +55,8 @@ class RootDAO(object):
 
     EXCEPTION_DATATYPE_GROUP = "DataTypeGroup"
     EXCEPTION_DATATYPE_SIMULATION = SIMULATION_DATATYPE_CLASS
+    # Keep the number of bound parameters in "IN" queries under the limits of all supported DB engines
+    IN_QUERY_CHUNK_SIZE = 500
 
 
     def store_entity(self, entity):
@@ -85,6 +87,19 @@ class RootDAO(object):
         return stored_entities
 
 
+    def store_entities_bulk(self, entities_list):
+        """
+        Store in DB a list of generic entities, in the given order, with a single flush and commit.
+        Unlike `store_entities`, entities are not re-loaded one by one after commit: they get detached
+        from the session right after flush, thus keeping the values (including the new IDs) they had then.
+        """
+        self.session.add_all(entities_list)
+        self.session.flush()
+        self.session.expunge_all()
+        self.session.commit()
+        return entities_list
+
+
     def get_generic_entity(self, entity_type, filter_value, select_field="id"):
         """
         Retrieve an entity of entity_type, filtered by select_field = filter_value.
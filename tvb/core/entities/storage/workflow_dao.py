@@ -66,6 +66,22 @@ class WorkflowDAO(RootDAO):
         return result
 
 
+    def set_introspection_check(self, entity_class, entity_ids, check_time):
+        """
+        Mark as found valid at check_time the categories, portlets or algorithm groups with the given IDs,
+        with one UPDATE statement for each chunk of IDs.
+        """
+        try:
+            for start in xrange(0, len(entity_ids), self.IN_QUERY_CHUNK_SIZE):
+                chunk = entity_ids[start:start + self.IN_QUERY_CHUNK_SIZE]
+                self.session.query(entity_class).filter(entity_class.id.in_(chunk)
+                                                        ).update({"last_introspection_check": check_time},
+                                                                 synchronize_session=False)
+            self.session.commit()
+        except SQLAlchemyError, excep:
+            self.logger.exception(excep)
+
+
     def get_bursts_for_project(self, project_id, page_start=0, page_size=None, count=False):
         """Get latest 50 BurstConfiguration entities for the current project"""
         try:
@@ -38,9 +38,11 @@ The purpose of this entities is to be used in Genshi UI, or for populating visua
 """
 
 import json
-import math
+import numpy
+from datetime import datetime
 from tvb.basic.config.utils import EnhancedDictionary
 from tvb.core.entities import model
+from tvb.core.utils import date2string
 
 
 class ContextDiscretePSE(EnhancedDictionary):
@@ -51,6 +53,7 @@ class ContextDiscretePSE(EnhancedDictionary):
     KEY_NODE_TYPE = "dataType"
     KEY_OPERATION_ID = "operationId"
     KEY_TOOLTIP = "tooltip"
+    KEY_COMPLETION_DATE = "completionDate"
     LINE_SEPARATOR = "<br/>"
     
     
@@ -72,6 +75,7 @@ class ContextDiscretePSE(EnhancedDictionary):
         self.color_metric = color_metric
         self.size_metric = size_metric
         self.pse_back_page = back_page
+        self.last_update = date2string(datetime.now())
 
 
     def setRanges(self, title_x, values_x, labels_x, title_y, values_y, labels_y):
@@ -90,6 +94,7 @@ class ContextDiscretePSE(EnhancedDictionary):
         """
         self.labels_x = json.dumps(self.labels_x)
         self.labels_y = json.dumps(self.labels_y)
+        self.series_array = json.dumps(self.series_array)
         self.data = json.dumps(self.data)
         self.has_started_ops = json.dumps(self.has_started_ops)
     
@@ -125,12 +130,15 @@ class ContextDiscretePSE(EnhancedDictionary):
         else:
             tooltip = "No result available. Operation is in status: %s" % operation.status.split('-')[1]
             node_info[self.KEY_TOOLTIP] = tooltip
+        if operation.completion_date is not None:
+            node_info[self.KEY_COMPLETION_DATE] = date2string(operation.completion_date)
         return node_info
     
     
     def prepare_metrics_datatype(self, measures, datatype):
         """
         Update attribute self.datatypes_dict with metric values for this DataType.
+        MIN/MAX limits are computed later, for all the nodes at once, in `fill_object` or `fill_updates`.
         """
         dt_info = {}
         if measures is not None and len(measures) > 0:
@@ -145,149 +153,143 @@ class ContextDiscretePSE(EnhancedDictionary):
                     self.size_metric = self.available_metrics[1]
 
             if self.color_metric is not None:
-                color_value = measure.metrics[self.color_metric]
-                if color_value < self.min_color:
-                    self.min_color = color_value
-                if color_value > self.max_color:
-                    self.max_color = color_value
-                dt_info[self.color_metric] = color_value
+                dt_info[self.color_metric] = measure.metrics[self.color_metric]
 
             if self.size_metric is not None:
-                size_value = measure.metrics[self.size_metric]
-                if size_value < self.min_shape_size:
-                    self.min_shape_size = size_value
-                if size_value > self.max_shape_size:
-                    self.max_shape_size = size_value
-                dt_info[self.size_metric] = size_value
+                dt_info[self.size_metric] = measure.metrics[self.size_metric]
         self.datatypes_dict[datatype.gid] = dt_info
         
     
     def fill_object(self, final_dict):
         """ Populate current entity with attributes required for visualizer"""
-        all_series = []
-        for i, key_1 in enumerate(self.values_x):
-            for j, key_2 in enumerate(self.values_y):
-                datatype_gid = None
-                current = final_dict[key_1][key_2]
-                if self.KEY_GID in current:
-                    #This means the operation was finished
-                    datatype_gid = current[self.KEY_GID]
-                series_data = [[i, j]]
-                color_weight, shape_type_1 = self.__get_color_weight(self.datatypes_dict, datatype_gid, 
-                                                                     self.color_metric)
-                if (shape_type_1 is not None) and (datatype_gid is not None):
-                    current[self.KEY_TOOLTIP] += self.LINE_SEPARATOR + " Color metric has NaN values"
-                shape_size, shape_type_2 = self.__get_node_size(self.datatypes_dict, datatype_gid, len(self.labels_x), 
-                                                                len(self.labels_y), self.size_metric)
-                if (shape_type_2 is not None) and (datatype_gid is not None):
-                    current[self.KEY_TOOLTIP] += self.LINE_SEPARATOR + " Size metric has NaN values"
-                #If either of the shape_types is not none use that
-                shape_type = shape_type_1 or shape_type_2
-                series = self.__get_node_json(series_data, shape_type, shape_size)
-                current['color_weight'] = color_weight
-                all_series.append(series)
-
         #each shape from the UI corresponds to a dataType. In this matrix we
         #keep information about those dataTypes.
-        matrix = []
-        for x_label in self.values_x:
-            r = []
-            for y_label in self.values_y:
-                r.append(final_dict[x_label][y_label])
-            matrix.append(r)
+        matrix = [[final_dict[key_1][key_2] for key_2 in self.values_y] for key_1 in self.values_x]
+        positions = [[(i, j) for j in xrange(len(self.values_y))] for i in xrange(len(self.values_x))]
+        series = self.__build_series(matrix, positions)
 
         self.data = matrix
-        self.series_array = self.__build_series_json(all_series)
+        self.series_array = [one_series for row in series for one_series in row]
         self.status = 'started' if self.has_started_ops else 'finished'
-        
-        
-    @staticmethod
-    def __build_series_json(list_of_series):
-        """ Given a list with all the data points, build the final FLOT JSON. """
-        final_json = "["
-        for i, value in enumerate(list_of_series):
-            if i:
-                final_json += ","
-            final_json += value
-        final_json += "]"
-        return final_json
-    
-    
-    @staticmethod
-    def __get_node_json(data, symbol, radius):
+
+
+    def fill_updates(self, nodes):
         """
-        For each data point entry, build the FLOT specific JSON.
+        Build only the given nodes, for a live refresh of the PSE. The color / size limits set on this entity
+        beforehand (the ones the PSE is currently drawn with) are extended with the metrics of these nodes.
+
+        :param nodes: list of tuples (range 1 position, range 2 position, node info from `build_node_info`),
+                      with their metrics already registered through `prepare_metrics_datatype`
+        :returns: dictionary with the nodes, and the color / size limits for the entire group
         """
-        series = '{"data": ' + json.dumps(data) + ', "points": {'
-        if symbol is not None:
-            series += '"symbol": "' + symbol + '", '
-        series += '"radius": ' + str(radius) + '} }'
-        return series
+        points = []
+        if nodes:
+            series = self.__build_series([[node for _, _, node in nodes]], [[(i, j) for i, j, _ in nodes]])[0]
+            for (i, j, node), one_series in zip(nodes, series):
+                points.append({'x': i, 'y': j, 'series': one_series, 'info': node})
+        self.status = 'started' if self.has_started_ops else 'finished'
 
+        limits = [self.min_color, self.max_color, self.min_shape_size, self.max_shape_size]
+        limits = [value if numpy.isfinite(value) else None for value in limits]
+        return {'points': points, 'status': self.status, 'has_started_ops': self.has_started_ops,
+                'min_color': limits[0], 'max_color': limits[1],
+                'min_shape_size': limits[2], 'max_shape_size': limits[3]}
 
-    @staticmethod
-    def __get_color_weight(datatype_indexes, datatype_gid, metric):
+
+    def __build_series(self, matrix, positions):
+        """
+        Extend the color / size limits with the metrics of the given nodes, then compute their color weights
+        and FLOT series (shape size, cross for missing results or NaN metrics).
+
+        :param matrix: nodes (as returned by `build_node_info`) in a 2D list
+        :param positions: (range 1 position, range 2 position) of each node, in the same layout as `matrix`
+        :returns: the FLOT series of each node, in the same layout as `matrix`
         """
-        Returns the color weight of the shape used for representing the dataType with id equal to 'datatype_id'.
+        shape = (len(matrix), len(matrix[0]) if matrix else 0)
+        gids = [[node.get(self.KEY_GID) for node in row] for row in matrix]
+        has_result = numpy.array([[gid is not None for gid in row] for row in gids], dtype=bool).reshape(shape)
+
+        color_values, color_present = self.__get_metric_grid(gids, shape, self.color_metric)
+        size_values, size_present = self.__get_metric_grid(gids, shape, self.size_metric)
+        color_valid = numpy.isfinite(color_values)
+        size_valid = numpy.isfinite(size_values)
+        self.min_color, self.max_color = self.__get_limits(color_values, color_present,
+                                                           self.min_color, self.max_color)
+        self.min_shape_size, self.max_shape_size = self.__get_limits(size_values, size_present,
+                                                                     self.min_shape_size, self.max_shape_size)
+
+        color_weights = numpy.where(color_valid, color_values, 0)
+        color_nan = color_present & ~color_valid
+        size_nan = size_present & ~size_valid
+        crosses = ~has_result | color_nan | size_nan
+
+        min_size, max_size = self.__get_boundaries(len(self.labels_x), len(self.labels_y))
+        shape_sizes = numpy.empty(shape)
+        shape_sizes.fill(max_size / 2.0)
+        values_range = self.max_shape_size - self.min_shape_size
+        if values_range != 0:
+            with numpy.errstate(invalid='ignore'):
+                scaled_sizes = min_size + (size_values - self.min_shape_size) / float(values_range) * (max_size -
+                                                                                                      min_size)
+            shape_sizes[size_valid] = scaled_sizes[size_valid]
+        else:
+            shape_sizes[size_valid] = min_size
+
+        for i, j in zip(*numpy.nonzero(color_nan)):
+            matrix[i][j][self.KEY_TOOLTIP] += self.LINE_SEPARATOR + " Color metric has NaN values"
+        for i, j in zip(*numpy.nonzero(size_nan)):
+            matrix[i][j][self.KEY_TOOLTIP] += self.LINE_SEPARATOR + " Size metric has NaN values"
+
+        all_series = []
+        crosses, color_weights, shape_sizes = crosses.tolist(), color_weights.tolist(), shape_sizes.tolist()
+        for i, row in enumerate(matrix):
+            row_series = []
+            for j, node in enumerate(row):
+                node['color_weight'] = color_weights[i][j]
+                points = {"radius": shape_sizes[i][j]}
+                if crosses[i][j]:
+                    points["symbol"] = "cross"
+                row_series.append({"data": [list(positions[i][j])], "points": points})
+            all_series.append(row_series)
+        return all_series
 
-        :param: datatype_indexes -  a dictionary which contains as keys a dataType GID and as values
-                            the index corresponding to the dataType into the list of
-                            dataTypes resulted from the same operation group
-        :param: datatype_gid - It should exists into the 'datatype_indexes' dictionary.
-        :param: metric - current metric key.
+
+    def __get_metric_grid(self, gids, shape, metric):
         """
-        if datatype_gid is None:
-            return 0, "cross"
-        node_info = datatype_indexes[datatype_gid]
-        valid_metric = True
-
-        if metric in node_info:
-            try:
-                if math.isnan(float(node_info[metric])) or math.isinf(float(node_info[metric])):
-                    valid_metric = False
-            except ValueError, _:
-                valid_metric = False
-            if valid_metric:
-                return node_info[metric], None
-            else:
-                return 0, "cross"
-        return 0, None
-
-
-    def __get_node_size(self, datatype_indexes, datatype_gid, range1_length, range2_length, metric):
+        Build the grid of values for a given metric, indexed by range positions.
+
+        :param gids: matrix with the resulted DataType GID on each range position, or None when no result exists
+        :returns: array of floats (NaN when missing or not numeric) and a boolean mask of positions having the metric
         """
-        Computes the size of the shape used for representing the dataType with GID given.
+        values = numpy.empty(shape)
+        values.fill(numpy.nan)
+        present = numpy.zeros(shape, dtype=bool)
+        if metric is None:
+            return values, present
 
-        :param: datatype_indexes -  a dictionary which contains as keys a daTatype GID and as values
-                            the index corresponding to the dataType into the list of
-                            dataTypes resulted from the same operation group
-        :param: datatype_gid - It should exists into the 'datatype_indexes' dict.
-        
+        for i, row in enumerate(gids):
+            for j, datatype_gid in enumerate(row):
+                if datatype_gid is None:
+                    continue
+                node_info = self.datatypes_dict[datatype_gid]
+                if metric in node_info:
+                    present[i, j] = True
+                    try:
+                        values[i, j] = float(node_info[metric])
+                    except (ValueError, TypeError):
+                        pass
+        return values, present
+
+
+    @staticmethod
+    def __get_limits(values, present, current_min, current_max):
+        """
+        MIN and MAX for the metric values available (NaN excluded), extending the current limits.
         """
-        min_size, max_size = self.__get_boundaries(range1_length, range2_length)
-        if datatype_gid is None:
-            return max_size / 2.0, "cross"
-        node_info = datatype_indexes[datatype_gid]
-
-        if metric in node_info:
-            valid_metric = True
-            try:
-                if math.isnan(float(node_info[metric])) or math.isinf(float(node_info[metric])):
-                    valid_metric = False
-            except ValueError, _:
-                valid_metric = False
-
-            if valid_metric:
-                shape_weight = node_info[metric]
-                values_range = self.max_shape_size - self.min_shape_size
-                shape_range = max_size - min_size
-                if values_range != 0:
-                    return min_size + (shape_weight - self.min_shape_size) / float(values_range) * shape_range, None
-                else:
-                    return min_size, None
-            else:
-                return max_size / 2.0, "cross"
-        return max_size / 2.0, None
+        values = values[present & ~numpy.isnan(values)]
+        if values.size == 0:
+            return current_min, current_max
+        return min(current_min, float(values.min())), max(current_max, float(values.max()))
 
 
     @staticmethod
@@ -34,6 +34,8 @@
 """
 
 import json
+import threading
+from collections import OrderedDict
 from tvb.basic.config.utils import EnhancedDictionary
 
 
@@ -144,22 +146,8 @@ class StructureNode:
             level_children = []
             for sublevel in sorted(sublevels.iterkeys()):
                 metas = sublevels[sublevel]
-                datas = []
-                for meta in metas:
-                    parent_name = meta[meta.KEY_NODE_TYPE] + " "
-
-                    if meta[meta.KEY_TAG_1]:
-                        parent_name = parent_name + " - " + meta[meta.KEY_TAG_1]
-                    if meta[meta.KEY_OPERATION_TAG]:
-                        parent_name = parent_name + " - " + meta[meta.KEY_OPERATION_TAG]
-                    
-                    parent = StructureNode(meta.gid, parent_name, meta=meta)
-                    if meta.invalid:
-                        parent._type = StructureNode.TYPE_INVALID
-                    else:
-                        parent._type = meta[meta.KEY_NODE_TYPE]
-                    datas.append(parent)
-                sublevel_id = level.replace(" ", "") + StructureNode.SEP + sublevel.replace(" ", "")
+                datas = [StructureNode._metadata2node(meta) for meta in metas]
+                sublevel_id = StructureNode._compute_sublevel_id(level, sublevel)
                 sublevel_name = StructureNode._prepare_node_name(sublevel, second_level)
                 sublevel_node = StructureNode(sublevel_id, sublevel_name, children=datas)
                 sublevel_node._type = StructureNode._capitalize_first_letter(second_level)
@@ -171,6 +159,83 @@ class StructureNode:
             forest.append(level_node)
             
         json_children = StructureNode.__convert2json(forest, project_id)
+        return StructureNode._project2json(json_children, project_name)
+
+
+    @staticmethod
+    def levels2json(level_counts, level_filter, project_id, project_name=None, parent_level=None):
+        """
+        Build the JSON for a single level of folders in the project tree.
+        Folders are returned closed and without children, for them to be loaded only when expanded.
+
+        :param level_counts: dictionary {level value: number of DataTypes under it}
+        :param level_filter: the DataTypeMetaData field by which this level groups
+        :param project_name: when given, the result is the project root node, holding the first level folders
+        :param parent_level: value of the first level folder, when building second level folders
+        """
+        json_nodes = []
+        for level in sorted(level_counts.iterkeys()):
+            if parent_level is None:
+                node_id = level
+                level_attrs = 'level:' + json.dumps(level)
+            else:
+                node_id = StructureNode._compute_sublevel_id(parent_level, level)
+                level_attrs = 'level:' + json.dumps(parent_level) + ', sublevel:' + json.dumps(level)
+            node_name = "%s (%d)" % (StructureNode._prepare_node_name(level, level_filter), level_counts[level])
+
+            json_node = '{data: {title:' + json.dumps(node_name)
+            json_node += ',icon: "/static/style/nodes/node' + StructureNode._capitalize_first_letter(level_filter)
+            json_node += '.png"}, state:"closed", attr:{id:' + json.dumps(StructureNode.PREFIX_ID_NODE + node_id)
+            json_node += ', separator: ">>", projectId:"' + str(project_id) + '", ' + level_attrs + '}}'
+            json_nodes.append(json_node)
+
+        if project_name is not None:
+            return StructureNode._project2json(','.join(json_nodes), project_name)
+        return '[' + ','.join(json_nodes) + ']'
+
+
+    @staticmethod
+    def metadata2json(metadatas, project_id):
+        """
+        Build the JSON for the DataType leaves of a second level folder in the project tree.
+        """
+        nodes = [StructureNode._metadata2node(meta) for meta in metadatas]
+        return '[' + StructureNode.__convert2json(nodes, project_id) + ']'
+
+
+    @staticmethod
+    def _metadata2node(meta):
+        """
+        Create the tree leaf for one DataTypeMetaData entity.
+        """
+        parent_name = meta[meta.KEY_NODE_TYPE] + " "
+
+        if meta[meta.KEY_TAG_1]:
+            parent_name = parent_name + " - " + meta[meta.KEY_TAG_1]
+        if meta[meta.KEY_OPERATION_TAG]:
+            parent_name = parent_name + " - " + meta[meta.KEY_OPERATION_TAG]
+
+        parent = StructureNode(meta.gid, parent_name, meta=meta)
+        if meta.invalid:
+            parent._type = StructureNode.TYPE_INVALID
+        else:
+            parent._type = meta[meta.KEY_NODE_TYPE]
+        return parent
+
+
+    @staticmethod
+    def _compute_sublevel_id(level, sublevel):
+        """
+        :returns: the identifier of a second level folder in the tree.
+        """
+        return level.replace(" ", "") + StructureNode.SEP + sublevel.replace(" ", "")
+
+
+    @staticmethod
+    def _project2json(json_children, project_name):
+        """
+        Wrap the JSON of the tree nodes under the project root node.
+        """
         if len(json_children) > 0:
             result = '{data: [{ data: {title: "' + project_name + '"'
             result += ',icon: "/static/style/nodes/nodeRoot.png"},'
@@ -180,7 +245,7 @@ class StructureNode:
             result = '{data: [{ data: {title: "' + project_name + '"'
             result += ',icon: "/static/style/nodes/nodeRoot.png"}'
             result += ',attr:{id:"' + StructureNode.PREFIX_ID_PROJECT + '"}}]}'
-            
+
         return result
 
 
@@ -250,6 +315,49 @@ class StructureNode:
 
 
 
+class StructureCache(object):
+    """
+    Thread-safe, bounded cache for the aggregated levels of project trees,
+    keyed by (project, visibility filter, grouping, filter value).
+    Entries are dropped all at once, when DataTypes or Links change (see tvb.core.traits.db_events).
+    """
+    MAX_ENTRIES = 200
+
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def get(self, key):
+        """
+        :returns: the cached value, or None
+        """
+        with self._lock:
+            return self._entries.get(key)
+
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            while len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+
+    def invalidate(self, *_ignored):
+        """
+        Drop all cached entries. Can be used directly as an SQLAlchemy event listener.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+
+STRUCTURE_CACHE = StructureCache()
+
+
+
 class GenericMetaData(EnhancedDictionary):
     """
     Wrap a dictionary of meta-data for generic entities 
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under 
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General 
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+In-process registry of metrics (counters, gauges and histograms), rendered in the Prometheus text format.
+
+Metrics are declared at module level, next to the code they measure, and they are collected only in
+the current process (e.g. the web server), without any external service. Label values are expected to
+come from a bounded set (algorithm class names, controllers, etc), never from user input or identifiers.
+"""
+
+import math
+import threading
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+
+class _Metric(object):
+    """
+    Base class for a metric with a fixed list of label names, holding one value for each labels combination.
+    """
+    TYPE = None
+
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError("Metric %s expects labels %s, got %s" % (self.name, self.label_names, sorted(labels)))
+        return tuple(unicode(labels[label_name]) for label_name in self.label_names)
+
+
+    def get(self, **labels):
+        """
+        :returns: current value for the given labels (0 when nothing was recorded for them yet).
+        """
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+    def collect(self):
+        """
+        :returns: list of tuples (sample name, dictionary of labels, value).
+        """
+        with self._lock:
+            values = sorted(self._values.items())
+        return [(self.name, dict(zip(self.label_names, key)), value) for key, value in values]
+
+
+
+class Counter(_Metric):
+    """
+    Value which can only increase (e.g. number of failed operations).
+    """
+    TYPE = "counter"
+
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counter %s can not be decreased" % self.name)
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+
+class Gauge(_Metric):
+    """
+    Value which can go up and down (e.g. number of open files). When a function is given, it is called
+    at collect time, for gauges without labels which mirror a state kept somewhere else.
+    """
+    TYPE = "gauge"
+
+
+    def __init__(self, name, documentation, label_names=()):
+        super(Gauge, self).__init__(name, documentation, label_names)
+        self._function = None
+
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+    def set_function(self, function):
+        if self.label_names:
+            raise ValueError("Gauge %s has labels, thus it can not be computed by a function" % self.name)
+        self._function = function
+
+
+    def get(self, **labels):
+        if self._function is not None:
+            return self._function()
+        return super(Gauge, self).get(**labels)
+
+
+    def collect(self):
+        if self._function is not None:
+            return [(self.name, {}, self._function())]
+        return super(Gauge, self).collect()
+
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values (e.g. durations in seconds), counted in cumulative buckets.
+    """
+    TYPE = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            ## One count for each bucket, plus one for the values above the last bucket
+            bucket_counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0))
+            idx = 0
+            while idx < len(self.buckets) and value > self.buckets[idx]:
+                idx += 1
+            bucket_counts[idx] += 1
+            self._values[key] = (bucket_counts, total + value)
+
+
+    def get(self, **labels):
+        """
+        :returns: tuple (number of observations, sum of observed values) for the given labels.
+        """
+        with self._lock:
+            bucket_counts, total = self._values.get(self._key(labels), ([0], 0))
+            return sum(bucket_counts), total
+
+
+    def collect(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.iteritems())
+        samples = []
+        for key, (bucket_counts, total) in values:
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for upper_bound, count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += count
+                samples.append((self.name + "_bucket", dict(labels, le=upper_bound), cumulative))
+            samples.append((self.name + "_count", labels, cumulative))
+            samples.append((self.name + "_sum", labels, total))
+        return samples
+
+
+
+class MetricsRegistry(object):
+    """
+    Keeps the metrics of current process, by name. Declaring again a metric returns the existing one,
+    thus modules can be re-imported safely.
+    """
+
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+
+    def counter(self, name, documentation, label_names=()):
+        return self._register(Counter, name, documentation, label_names)
+
+
+    def gauge(self, name, documentation, label_names=()):
+        return self._register(Gauge, name, documentation, label_names)
+
+
+    def histogram(self, name, documentation, label_names=(), buckets=Histogram.DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, label_names, buckets=buckets)
+
+
+    def _register(self, metric_class, name, documentation, label_names, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = metric_class(name, documentation, label_names, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, metric_class) or metric.label_names != tuple(label_names):
+                raise ValueError("Metric %s is already declared with a different type or labels" % name)
+            return metric
+
+
+    def get_metric(self, name):
+        return self._metrics.get(name)
+
+
+    def render(self):
+        """
+        :returns: unicode text, with all the metrics in the Prometheus exposition format (version 0.0.4).
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            documentation = metric.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+            lines.append(u"# HELP %s %s" % (metric.name, documentation))
+            lines.append(u"# TYPE %s %s" % (metric.name, metric.TYPE))
+            for sample_name, labels, value in metric.collect():
+                lines.append(u"%s%s %s" % (sample_name, _format_labels(labels), _format_value(value)))
+        return u"\n".join(lines) + u"\n"
+
+
+
+def _format_labels(labels):
+    if not labels:
+        return u""
+    pairs = []
+    for name in sorted(labels):
+        value = labels[name]
+        if not isinstance(value, basestring):
+            value = _format_value(value)
+        value = value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(u'%s="%s"' % (name, value))
+    return u"{" + u",".join(pairs) + u"}"
+
+
+
+def _format_value(value):
+    value = float(value)
+    if math.isinf(value):
+        return u"+Inf" if value > 0 else u"-Inf"
+    if math.isnan(value):
+        return u"NaN"
+    if value == int(value) and abs(value) < 1e15:
+        return unicode(int(value))
+    return unicode(repr(value))
+
+
+## Metrics of the current process.
+REGISTRY = MetricsRegistry()
@@ -50,6 +50,7 @@ if __name__ == '__main__':
 
 from tvb.basic.logger.builder import get_logger
 from tvb.core.adapters.abcadapter import ABCAdapter
+from tvb.core.entities import model
 from tvb.core.entities.storage import dao
 from tvb.core.utils import parse_json_parameters
 from tvb.core.services.operation_service import OperationService
@@ -73,19 +74,25 @@ def do_operation_launch(operation_id):
         PARAMS = parse_json_parameters(curent_operation.parameters)
         adapter_instance = ABCAdapter.build_adapter(algorithm_group)
 
-        ## Un-comment bellow for profiling an operation:
-        ## import cherrypy.lib.profiler as profiler
-        ## p = profiler.Profiler("/Users/lia.domide/TVB/profiler/")
-        ## p.run(OperationService().initiate_prelaunch, curent_operation, adapter_instance, {}, **PARAMS)
-
-        OperationService().initiate_prelaunch(curent_operation, adapter_instance, {}, **PARAMS)
+        ## For profiling an operation, see PROFILE_OPERATIONS_ALGORITHMS and PROFILE_OPERATIONS_USERS settings.
+        operation_service = OperationService()
+        operation_service.dispatch_workflow_steps = False
+        operation_service.record_peak_memory = True
+        operation_service.initiate_prelaunch(curent_operation, adapter_instance, {}, **PARAMS)
         LOGGER.debug("Successfully finished operation " + str(operation_id))
 
+        ## On a stand-alone installation, the next workflow steps are launched by the parent OperationExecutor,
+        ## within its limit of concurrent operations. On the cluster, they are submitted as separate jobs.
+        if TvbProfile.current.cluster.IS_DEPLOY:
+            operation_service.launch_next_workflow_steps(curent_operation.id, True)
+
     except Exception, excep:
         LOGGER.error("Could not execute operation " + str(sys.argv[1]))
         LOGGER.exception(excep)
         parent_burst = dao.get_burst_for_operation_id(operation_id)
-        if parent_burst is not None:
+        failed_operation = dao.try_get_operation_by_id(operation_id)
+        ## A failed step was already handled by the WorkflowService, which stops only the steps depending on it.
+        if parent_burst is not None and (failed_operation is None or failed_operation.status != model.STATUS_ERROR):
             WorkflowService().mark_burst_finished(parent_burst, error_message=str(excep))
 
 
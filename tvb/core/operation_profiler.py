@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under 
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General 
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Opt-in profiling of single operations.
+
+When enabled for the algorithm or for the user of an operation (see PROFILE_OPERATIONS_ALGORITHMS and
+PROFILE_OPERATIONS_USERS in the settings profile), the adapter launch is executed under cProfile, while a
+background thread samples the memory of the process. In the operation folder, next to its results, we store:
+
+    - profile.prof: the cProfile statistics (to be opened with pstats, snakeviz, etc);
+    - profile_summary.json: duration, peak RSS, bytes read/written and the top hotspots.
+
+When profiling is not enabled, the launch is not wrapped at all.
+"""
+
+import os
+import json
+import time
+import pstats
+import cProfile
+import threading
+import psutil
+from tvb.basic.profile import TvbProfile
+from tvb.basic.logger.builder import get_logger
+
+
+PROFILE_FILE = "profile.prof"
+SUMMARY_FILE = "profile_summary.json"
+
+
+
+class _MemorySampler(threading.Thread):
+    """
+    Keep the peak RSS of current process, sampled at a fixed interval.
+    """
+
+    def __init__(self, process, interval):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.process = process
+        self.interval = interval
+        self.peak_rss = process.memory_info().rss
+        self._done = threading.Event()
+
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self._sample()
+
+
+    def _sample(self):
+        try:
+            self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+        except psutil.Error:
+            pass
+
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self._sample()
+
+
+
+class OperationProfiler(object):
+    """
+    Execute a function under cProfile, and store the statistics and a summary in a folder.
+    """
+    ## Seconds between two memory samples.
+    SAMPLING_INTERVAL = 0.1
+    ## Number of functions (with the longest own time) kept in the summary.
+    HOTSPOTS_NUMBER = 10
+
+
+    def __init__(self, operation_folder):
+        self.operation_folder = operation_folder
+        self.logger = get_logger(self.__class__.__module__)
+
+
+    @staticmethod
+    def is_enabled(operation):
+        """
+        :param operation: Operation entity, with its algorithm and user loaded
+        :returns: True when the operation should be profiled, according to current settings.
+        """
+        algorithms = TvbProfile.current.PROFILE_OPERATIONS_ALGORITHMS
+        users = TvbProfile.current.PROFILE_OPERATIONS_USERS
+        if not algorithms and not users:
+            return False
+        algo_group = operation.algorithm.algo_group
+        return (algo_group.classname in algorithms or operation.algorithm.identifier in algorithms
+                or operation.user.username in users)
+
+
+    def run(self, function, args=(), kwargs=None):
+        """
+        Call function(*args, **kwargs) under cProfile, then write the profile files (also when it fails).
+
+        :returns: the result of the function call
+        """
+        process = psutil.Process(os.getpid())
+        sampler = _MemorySampler(process, self.SAMPLING_INTERVAL)
+        io_before = self._read_io_counters(process)
+        cpu_before = sum(process.cpu_times()[:2])
+        start_time = time.time()
+        profiler = cProfile.Profile()
+        failed = True
+
+        sampler.start()
+        try:
+            result = profiler.runcall(function, *args, **(kwargs or {}))
+            failed = False
+            return result
+        finally:
+            sampler.stop()
+            summary = {'failed': failed,
+                       'wall_time': time.time() - start_time,
+                       'cpu_time': sum(process.cpu_times()[:2]) - cpu_before,
+                       'peak_rss': sampler.peak_rss}
+            io_after = self._read_io_counters(process)
+            if io_before is not None and io_after is not None:
+                summary['read_bytes'] = io_after.read_bytes - io_before.read_bytes
+                summary['write_bytes'] = io_after.write_bytes - io_before.write_bytes
+            self._write_results(profiler, summary)
+
+
+    @staticmethod
+    def _read_io_counters(process):
+        """ I/O counters are not available on all platforms (e.g. Mac OS). """
+        try:
+            return process.io_counters()
+        except (AttributeError, NotImplementedError, psutil.Error):
+            return None
+
+
+    def _write_results(self, profiler, summary):
+        """
+        Store the cProfile statistics and the JSON summary. Failing to do so should not fail the operation.
+        """
+        try:
+            profiler.create_stats()
+            stats = pstats.Stats(profiler)
+            summary['h5_bytes'] = sum(os.path.getsize(os.path.join(self.operation_folder, file_name))
+                                      for file_name in os.listdir(self.operation_folder)
+                                      if file_name.endswith('.h5'))
+            summary['hotspots'] = self._get_hotspots(stats)
+            stats.dump_stats(os.path.join(self.operation_folder, PROFILE_FILE))
+            with open(os.path.join(self.operation_folder, SUMMARY_FILE), 'w') as summary_file:
+                json.dump(summary, summary_file, indent=2)
+        except Exception:
+            self.logger.exception("Could not store the profile of operation in %s" % self.operation_folder)
+
+
+    def _get_hotspots(self, stats):
+        """
+        :returns: list with the functions where most of the time was spent (excluding the called functions).
+        """
+        entries = sorted(stats.stats.iteritems(), key=lambda entry: entry[1][2], reverse=True)
+        hotspots = []
+        for (file_name, line, function_name), stat in entries[:self.HOTSPOTS_NUMBER]:
+            _, calls, own_time, cumulative_time, _ = stat
+            hotspots.append({'function': "%s:%s(%s)" % (file_name, line, function_name),
+                             'calls': calls,
+                             'own_time': own_time,
+                             'cumulative_time': cumulative_time})
+        return hotspots
+
+
+    @staticmethod
+    def read_summary(operation_folder):
+        """
+        :returns: the profile summary stored for an operation, or None when it was not profiled.
+        """
+        summary_path = os.path.join(operation_folder, SUMMARY_FILE)
+        if not os.path.exists(summary_path):
+            return None
+        with open(summary_path) as summary_file:
+            return json.load(summary_file)
@@ -37,24 +37,60 @@
 import os
 import sys
 import signal
-import Queue
+import psutil
 import threading
 from subprocess import Popen, PIPE
 from tvb.basic.profile import TvbProfile
 from tvb.basic.logger.builder import get_logger
 from tvb.core.utils import parse_json_parameters
+from tvb.core.metrics import REGISTRY
 from tvb.core.entities import model
 from tvb.core.entities.storage import dao
+from tvb.core.entities.transient.structure_entities import DataTypeMetaData
+from tvb.core.adapters.abcadapter import ABCAdapter
+from tvb.core.adapters.resource_estimator import ResourceEstimator, RUNTIME
 from tvb.core.services.workflow_service import WorkflowService
+from tvb.core.services.event_bus import STATUS_EVENT_BUS
+from tvb.core.services.operation_scheduler import OperationScheduler, ScheduledOperation
+from tvb.core.services.operation_scheduler import PRIORITY_INTERACTIVE, PRIORITY_BURST, PRIORITY_BULK
 
 
 LOGGER = get_logger(__name__)
 
 CURRENT_ACTIVE_THREADS = []
 
-LOCKS_QUEUE = Queue.Queue(0)
-for i in range(TvbProfile.current.MAX_THREADS_NUMBER):
-    LOCKS_QUEUE.put(1)
+## Decides which of the operations launched on current machine runs next.
+OPERATION_SCHEDULER = OperationScheduler(TvbProfile.current.MAX_THREADS_NUMBER,
+                                         TvbProfile.current.OPERATIONS_MEMORY_BUDGET or psutil.virtual_memory().total)
+
+## Metrics exposed by the web server (see tvb.core.metrics)
+RUNNING_OPERATIONS = REGISTRY.gauge("tvb_operations_running", "Operations currently running on this machine.")
+RUNNING_OPERATIONS.set_function(lambda: OPERATION_SCHEDULER.count_operations()[0])
+WAITING_OPERATIONS = REGISTRY.gauge("tvb_operations_waiting", "Operations waiting in the queue on this machine.")
+WAITING_OPERATIONS.set_function(lambda: OPERATION_SCHEDULER.count_operations()[1])
+OPERATION_DURATION = REGISTRY.histogram("tvb_operation_duration_seconds",
+                                        "Duration of the operations finished in this process.",
+                                        ("algorithm", "status"))
+OPERATION_FAILURES = REGISTRY.counter("tvb_operation_failures_total",
+                                      "Operations finished with error in this process, per adapter.", ("algorithm",))
+
+
+
+def record_finished_operation(operation_id):
+    """
+    Observe the duration and final status of an operation, once it is no longer running.
+    Metrics are only informative, thus failing to record them will never fail the operation.
+    """
+    try:
+        operation = dao.get_operation_by_id(operation_id)
+        algorithm = operation.algorithm.algo_group.classname
+        if operation.start_date is not None and operation.completion_date is not None:
+            duration = (operation.completion_date - operation.start_date).total_seconds()
+            OPERATION_DURATION.observe(duration, algorithm=algorithm, status=operation.status)
+        if operation.status == model.STATUS_ERROR:
+            OPERATION_FAILURES.inc(algorithm=algorithm)
+    except Exception:
+        LOGGER.exception("Could not record the metrics of operation %s" % operation_id)
 
 
 
@@ -72,10 +108,27 @@ class OperationExecutor(threading.Thread):
 
     def run(self):
         """
-        Get the required data from the operation queue and launch the operation.
+        Wait for the scheduler to admit current operation, then launch it in a separate process.
+        Current thread leaves CURRENT_ACTIVE_THREADS (and gives back its spot) whatever happens.
+        """
+        try:
+            #Try to get a spot to launch own operation.
+            if OPERATION_SCHEDULER.wait_for_turn(self._prepare_scheduled_operation()):
+                self._launch_operation()
+            ## Otherwise, it was canceled while waiting in the queue
+        except Exception:
+            LOGGER.exception("Could not launch operation %s" % self.operation_id)
+        finally:
+            #Give back empty spot now that you finished your operation
+            if self in CURRENT_ACTIVE_THREADS:
+                CURRENT_ACTIVE_THREADS.remove(self)
+            OPERATION_SCHEDULER.release(int(self.operation_id))
+
+
+    def _launch_operation(self):
+        """
+        Run current operation in a separate process, and wait for it to end.
         """
-        #Try to get a spot to launch own operation.
-        LOCKS_QUEUE.get(True)
         operation_id = self.operation_id
         run_params = [TvbProfile.current.PYTHON_PATH, '-m', 'tvb.core.operation_async_launcher',
                       str(operation_id), TvbProfile.CURRENT_PROFILE_NAME]
@@ -111,19 +164,57 @@ class OperationExecutor(threading.Thread):
                 LOGGER.error("Operation suffered fatal failure! Exit code: %s Exit message: %s" % (returned,
                                                                                                    subprocess_result))
 
-                workflow_service.persist_operation_state(operation, model.STATUS_ERROR,
-                                                         "Operation failed unexpectedly! Please check the log files.")
+                operation = workflow_service.persist_operation_state(operation, model.STATUS_ERROR,
+                                                                     "Operation failed unexpectedly! "
+                                                                     "Please check the log files.")
+                ## Stop the workflow steps depending on current one, and finish the burst when nothing else runs.
+                workflow_service.update_executed_workflow_state(operation)
 
-                burst_entity = dao.get_burst_for_operation_id(self.operation_id)
-                if burst_entity:
-                    message = "Error in operation process! Possibly segmentation fault."
-                    workflow_service.mark_burst_finished(burst_entity, error_message=message)
+            elif not self.stopped():
+                self._launch_next_workflow_steps(operation_id)
 
+            ## Status changes done in the launched process were not published in current one.
+            STATUS_EVENT_BUS.publish_stored_state(operation_id)
+            record_finished_operation(operation_id)
             del launched_process
 
-        #Give back empty spot now that you finished your operation
-        CURRENT_ACTIVE_THREADS.remove(self)
-        LOCKS_QUEUE.put(1)
+
+    def _prepare_scheduled_operation(self):
+        """
+        :returns: ScheduledOperation for current operation, with its priority class, user and the estimates
+                  of the adapter (memory and execution time) for its parameters.
+        """
+        operation = dao.get_operation_by_id(self.operation_id)
+        if operation.fk_operation_group is not None:
+            priority = PRIORITY_BULK
+        elif DataTypeMetaData.KEY_BURST in parse_json_parameters(operation.meta_data or '{}'):
+            priority = PRIORITY_BURST
+        else:
+            priority = PRIORITY_INTERACTIVE
+
+        adapter_instance, kwargs = None, {}
+        try:
+            adapter_instance = ABCAdapter.build_adapter(operation.algorithm.algo_group)
+            kwargs = adapter_instance.prepare_ui_inputs(parse_json_parameters(operation.parameters))
+        except Exception:
+            LOGGER.warning("Could not prepare estimates for operation %s" % self.operation_id)
+        return ScheduledOperation.from_adapter(operation.id, operation.fk_launched_by, priority,
+                                               adapter_instance, **kwargs)
+
+
+    @staticmethod
+    def _launch_next_workflow_steps(operation_id):
+        """
+        Queue the workflow steps which became ready after the operation with the given id has finished.
+        They are queued from here, and not from the operation process, to share the limit of concurrent threads.
+        """
+        try:
+            for next_op_id in WorkflowService().prepare_next_steps(operation_id):
+                LOGGER.debug("Launching workflow step operation %s, after %s" % (next_op_id, operation_id))
+                StandAloneClient.execute(str(next_op_id), None, None)
+        except Exception, excep:
+            LOGGER.error("Could not launch the workflow steps following operation %s" % operation_id)
+            LOGGER.exception(excep)
 
 
     def stop(self):
@@ -188,6 +279,9 @@ class StandAloneClient(object):
 
         LOGGER.debug("Stopping operation: %s" % str(operation_id))
 
+        ## Remove it from the queue, when still waiting
+        OPERATION_SCHEDULER.cancel(operation_id)
+
         ## Set the thread stop flag to true
         for thread in CURRENT_ACTIVE_THREADS:
             if int(thread.operation_id) == operation_id:
@@ -230,7 +324,7 @@ class ClusterSchedulerClient(object):
         operation = dao.get_operation_by_id(operation_identifier)
         kwargs = parse_json_parameters(operation.parameters)
         kwargs = adapter_instance.prepare_ui_inputs(kwargs)
-        time_estimate = int(adapter_instance.get_execution_time_approximation(**kwargs))
+        time_estimate = int(ResourceEstimator.estimate(adapter_instance, RUNTIME, **kwargs))
         hours = int(time_estimate / 3600)
         minutes = (int(time_estimate) % 3600) / 60
         seconds = int(time_estimate) % 60
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under 
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General 
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Visualizers launched without an Operation row: the launch is only kept in an in-memory audit log, and is
+stored in DB as a finished Operation when a figure is saved from it, or in batches when so configured.
+"""
+
+import uuid
+import threading
+from collections import deque
+from datetime import datetime
+from tvb.basic.profile import TvbProfile
+from tvb.basic.logger.builder import get_logger
+from tvb.core.entities import model
+from tvb.core.entities.storage import dao
+
+
+KEY_PREFIX = "display-"
+
+
+
+def is_ephemeral_key(operation_id):
+    """
+    :returns: True when an operation identifier (as received from the UI) references an ephemeral display
+    """
+    return isinstance(operation_id, basestring) and operation_id.startswith(KEY_PREFIX)
+
+
+
+class EphemeralDisplay(object):
+    """
+    One launch of a visualizer, with what is needed for storing it later as an Operation.
+    """
+
+    def __init__(self, user_id, project_id, algorithm_id, parameters, meta, method_name):
+        self.key = KEY_PREFIX + uuid.uuid4().hex
+        self.user_id = user_id
+        self.project_id = project_id
+        self.algorithm_id = algorithm_id
+        self.parameters = parameters
+        self.meta = meta
+        self.method_name = method_name
+        self.start_date = datetime.now()
+        self.completion_date = None
+        self.status = model.STATUS_STARTED
+        ## Set once stored in DB
+        self.operation_id = None
+
+
+    def mark_complete(self, status):
+        self.completion_date = datetime.now()
+        self.status = status
+
+
+    def to_operation(self):
+        operation = model.Operation(self.user_id, self.project_id, self.algorithm_id, self.parameters, self.meta,
+                                    self.method_name, status=self.status, start_date=self.start_date,
+                                    completion_date=self.completion_date)
+        operation.visible = False
+        return operation
+
+
+
+class EphemeralDisplaysLog(object):
+    """
+    Bounded audit log of the ephemeral displays, most recent last.
+    When EPHEMERAL_DISPLAYS_PERSIST is set, the finished displays are also stored in DB, every
+    EPHEMERAL_DISPLAYS_PERSIST_BATCH launches (see flush).
+    """
+    ## Older displays are dropped from the log; a figure can no longer be linked to them.
+    MAX_DISPLAYS = 1000
+    ## Period (in seconds) for storing the pending displays, when fewer than a batch were launched meanwhile.
+    FLUSH_PERIOD = 60
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size or self.MAX_DISPLAYS
+        self._displays = deque(maxlen=self.max_size)
+        self._by_key = {}
+        self._pending = []
+        self._lock = threading.RLock()
+        self.logger = get_logger(self.__class__.__module__)
+
+
+    def add(self, display):
+        """
+        Record a finished display, and store the pending ones when a full batch is ready.
+        """
+        with self._lock:
+            if len(self._displays) == self.max_size:
+                del self._by_key[self._displays[0].key]
+            self._displays.append(display)
+            self._by_key[display.key] = display
+            if TvbProfile.current.EPHEMERAL_DISPLAYS_PERSIST:
+                self._pending.append(display)
+                batch_ready = len(self._pending) >= TvbProfile.current.EPHEMERAL_DISPLAYS_PERSIST_BATCH
+            else:
+                batch_ready = False
+        if batch_ready:
+            self.flush()
+
+
+    def get(self, key):
+        with self._lock:
+            return self._by_key.get(key)
+
+
+    def get_recent(self, count=None):
+        """
+        :returns: list with the most recent displays, newest first
+        """
+        with self._lock:
+            displays = list(reversed(self._displays))
+        return displays if count is None else displays[:count]
+
+
+    def persist(self, key):
+        """
+        Store a display as an Operation, if not already stored.
+        :returns: the Operation id, or None when the display is no longer in the log
+        """
+        with self._lock:
+            display = self._by_key.get(key)
+            if display is None:
+                return None
+            if display.operation_id is None:
+                operation = dao.store_entity(display.to_operation())
+                display.operation_id = operation.id
+                if display in self._pending:
+                    self._pending.remove(display)
+            return display.operation_id
+
+
+    def flush(self):
+        """
+        Store in DB, with a single commit, the displays waiting to be persisted.
+        """
+        with self._lock:
+            pending = [display for display in self._pending if display.operation_id is None]
+            self._pending = []
+            if not pending:
+                return
+            try:
+                operations = dao.store_entities_bulk([display.to_operation() for display in pending])
+            except Exception, excep:
+                self.logger.warning("Could not store %d ephemeral displays" % len(pending))
+                self.logger.exception(excep)
+                return
+            for display, operation in zip(pending, operations):
+                display.operation_id = operation.id
+
+
+
+EPHEMERAL_DISPLAYS = EphemeralDisplaysLog()
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under 
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General 
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+In-process notifications about Operation and Burst state transitions.
+
+Every transition gets a revision number (increasing for the whole application), and each project remembers
+its last revision, so that browsers can wait (long-poll) for a project to change, and then fetch only
+the deltas, instead of periodically re-querying everything.
+
+Transitions are published after the DB transaction storing them commits (see tvb.core.traits.db_events).
+Transitions done by other processes (operations launched in a separate process, or on a cluster) are detected
+from the per project operation counters, and published as a full refresh for the project.
+"""
+
+import time
+import threading
+from tvb.basic.logger.builder import get_logger
+from tvb.core.entities.storage import dao
+
+
+KIND_OPERATION = "operation"
+KIND_BURST = "burst"
+KIND_PROJECT = "project"
+
+
+
+class StatusEventBus(object):
+    """
+    Keep the latest status events for each project, and wake up the requests waiting for them.
+    """
+    ## Older events are dropped; clients falling behind them will receive a full refresh.
+    MAX_EVENTS_PER_PROJECT = 200
+    ## Minimum interval (seconds) between two reads of the operation counters of a project.
+    COUNTERS_CHECK_INTERVAL = 5
+    ## Above these numbers of requests waiting (for one project, or in total), answer immediately with a
+    ## `retry_after` hint (seconds), to keep server threads available and share them between projects.
+    MAX_WAITING_PER_PROJECT = 2
+    MAX_WAITING_REQUESTS = 5
+    RETRY_AFTER = 10
+
+
+    def __init__(self):
+        self.logger = get_logger(self.__class__.__module__)
+        self._condition = threading.Condition()
+        self._revision = 0
+        self._project_revisions = {}
+        self._project_events = {}
+        self._dropped_revisions = {}
+        self._operation_numbers = {}
+        self._waiting_requests = {}
+
+
+    def publish(self, project_id, kind, entity_id, status):
+        """
+        Record a state transition in project `project_id`, and wake up the requests waiting for it.
+        """
+        with self._condition:
+            self._revision += 1
+            self._project_revisions[project_id] = self._revision
+            events = self._project_events.setdefault(project_id, [])
+            events.append((self._revision, {'kind': kind, 'id': entity_id, 'status': status}))
+            if len(events) > self.MAX_EVENTS_PER_PROJECT:
+                self._dropped_revisions[project_id] = events.pop(0)[0]
+            if kind != KIND_PROJECT:
+                ## Operation counters changed as well; take them as reference again, without a refresh event.
+                self._operation_numbers.pop(project_id, None)
+            self._condition.notify_all()
+
+
+    def publish_stored_state(self, operation_id):
+        """
+        Publish the current (stored in DB) status of an operation and of its burst.
+        To be used for transitions done by another process, once that process ended.
+        """
+        operation = dao.try_get_operation_by_id(operation_id)
+        if operation is None:
+            return
+        self.publish(operation.fk_launched_in, KIND_OPERATION, operation.id, operation.status)
+        burst = dao.get_burst_for_operation_id(operation_id)
+        if burst is not None:
+            self.publish(burst.fk_project, KIND_BURST, burst.id, burst.status)
+
+
+    def get_revision(self, project_id):
+        """
+        :returns: last revision for the given project (0 when nothing changed since the application started)
+        """
+        with self._condition:
+            return self._project_revisions.get(project_id, 0)
+
+
+    def get_changes(self, project_id, since):
+        """
+        :returns: dictionary with the current revision of the project, the events after revision `since`, and
+                  a flag `full_refresh` when these events are not enough to describe the changes.
+        """
+        with self._condition:
+            revision = self._project_revisions.get(project_id, 0)
+            changes = [event for event_revision, event in self._project_events.get(project_id, [])
+                       if event_revision > since]
+            full_refresh = (since > self._revision or since < self._dropped_revisions.get(project_id, 0)
+                            or any(event['kind'] == KIND_PROJECT for event in changes))
+            return {'revision': revision, 'changes': changes, 'full_refresh': full_refresh}
+
+
+    def wait_for_changes(self, project_id, since, timeout):
+        """
+        Block the current request until the project has a revision different from `since`, or `timeout` elapses.
+        When too many requests wait already, return at once, with the number of seconds to wait before
+        the next call, under key `retry_after`.
+        """
+        deadline = time.time() + timeout
+        with self._condition:
+            can_wait = (self._waiting_requests.get(project_id, 0) < self.MAX_WAITING_PER_PROJECT
+                        and sum(self._waiting_requests.values()) < self.MAX_WAITING_REQUESTS)
+            if can_wait:
+                self._waiting_requests[project_id] = self._waiting_requests.get(project_id, 0) + 1
+        if not can_wait:
+            self._check_operation_numbers(project_id)
+            changes = self.get_changes(project_id, since)
+            changes['retry_after'] = self.RETRY_AFTER
+            return changes
+        try:
+            while True:
+                self._check_operation_numbers(project_id)
+                with self._condition:
+                    remaining = deadline - time.time()
+                    if self._project_revisions.get(project_id, 0) != since or remaining <= 0:
+                        break
+                    self._condition.wait(min(remaining, self.COUNTERS_CHECK_INTERVAL))
+        finally:
+            with self._condition:
+                self._waiting_requests[project_id] -= 1
+                if not self._waiting_requests[project_id]:
+                    del self._waiting_requests[project_id]
+        return self.get_changes(project_id, since)
+
+
+    def _check_operation_numbers(self, project_id):
+        """
+        Publish a full refresh event, when the operation counters of the project changed without
+        a transition published in current process.
+        """
+        with self._condition:
+            last_check, previous_numbers = self._operation_numbers.get(project_id, (0, None))
+            if time.time() - last_check < self.COUNTERS_CHECK_INTERVAL:
+                return
+            self._operation_numbers[project_id] = (time.time(), previous_numbers)
+        try:
+            numbers = dao.get_operation_numbers(project_id)
+        except Exception:
+            self.logger.exception("Could not read operation counters for project %s" % project_id)
+            return
+        with self._condition:
+            if project_id not in self._operation_numbers:
+                ## A transition was published meanwhile, thus numbers are not a reliable reference.
+                return
+            self._operation_numbers[project_id] = (time.time(), numbers)
+        if previous_numbers is not None and previous_numbers != numbers:
+            self.publish(project_id, KIND_PROJECT, project_id, None)
+
+
+
+STATUS_EVENT_BUS = StatusEventBus()
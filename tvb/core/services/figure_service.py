@@ -49,6 +49,7 @@ from tvb.core import utils
 from tvb.core.entities import model
 from tvb.core.entities.storage import dao
 from tvb.core.entities.file.files_helper import FilesHelper
+from tvb.core.services.ephemeral_displays import is_ephemeral_key, EPHEMERAL_DISPLAYS
 
 
 
@@ -143,6 +144,9 @@ class FigureService:
         elif img_type == FigureService._TYPE_SVG:          # SVG file from svg viewer
             self._write_svg(store_path, export_data)
 
+        if is_ephemeral_key(operation_id):
+            ## The figure comes from a visualizer launched without an Operation: store one now
+            operation_id = EPHEMERAL_DISPLAYS.persist(operation_id)
         if operation_id:
             operation = dao.get_operation_by_id(operation_id)
         else:
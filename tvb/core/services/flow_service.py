@@ -151,6 +151,19 @@ class FlowService:
     def get_operation_numbers(proj_id):
         """ Count total number of operations started for current project. """
         return dao.get_operation_numbers(proj_id)
+
+
+    def reconcile_operation_numbers(self):
+        """
+        Periodic job: repair the operation counters of all projects, in case they drifted
+        (e.g. operations changed from a process without DB triggers attached, or by raw SQL).
+        """
+        try:
+            repaired = dao.reconcile_operation_numbers()
+            if repaired:
+                self.logger.info("Repaired %d operation counters" % repaired)
+        except Exception:
+            self.logger.exception("Could not reconcile operation counters")
     
     
     def build_adapter_instance(self, group):
@@ -218,20 +231,34 @@ class FlowService:
         
     
     @staticmethod
-    def populate_values(data_list, type_, category_key, complex_dt_attributes=None):
+    def get_display_names(data_name, datatype_gids):
+        """
+        Read in bulk the display names for DataTypes of a given class (or full class name).
+        :returns: dictionary {gid: display_name}
+        """
+        data_class = FilterChain._get_class_instance(data_name)
+        if data_class is None or not issubclass(data_class, model.DataType) or not datatype_gids:
+            return {}
+        return dao.get_display_names_by_gids(data_class, datatype_gids)
+
+
+    @staticmethod
+    def populate_values(data_list, type_, category_key, complex_dt_attributes=None, display_names=None,
+                        category=None):
         """
         Populate meta-data fields for data_list (list of DataTypes).
+        When not given, display_names ({gid: display_name}) and the category entity for category_key
+        are read from DB, with one query each.
         """
+        if display_names is None:
+            display_names = FlowService.get_display_names(type_, [value[2] for value in data_list])
         values = []
         all_field_values = ''
         for value in data_list:
             # Here we only populate with DB data, actual
             # XML check will be done after select and submit.
             entity_gid = value[2]
-            actual_entity = dao.get_generic_entity(type_, entity_gid, "gid")
-            display_name = ''
-            if actual_entity is not None and len(actual_entity) > 0 and isinstance(actual_entity[0], model.DataType):
-                display_name = actual_entity[0].display_name
+            display_name = display_names.get(entity_gid) or ''
             display_name = display_name + ' - ' + (value[3] or "None ")
             if value[5]:
                 display_name = display_name + ' - From: ' + str(value[5])
@@ -246,18 +273,23 @@ class FlowService:
                 ### TODO apply filter on sub-attributes
                 values[-1][ABCAdapter.KEY_ATTRIBUTES] = complex_dt_attributes
         if category_key is not None:
-            category = dao.get_category_by_id(category_key)
+            if category is None:
+                category = dao.get_category_by_id(category_key)
             if (not category.display) and (not category.rawinput) and len(data_list) > 1:
                 values.insert(0, {ABCAdapter.KEY_NAME: "All", ABCAdapter.KEY_VALUE: all_field_values[:-1]})
         return values
      
      
-    def prepare_parameters(self, attributes_list, project_id, category_key):
+    def prepare_parameters(self, attributes_list, project_id, category_key, resolution=None):
         """
         Private method, to be called recursively.
         It will receive a list of Attributes, and it will populate 'options'
         entry with data references from DB.
+
+        :param resolution: DataTypesResolution shared by the recursive calls, for the whole input tree
         """
+        if resolution is None:
+            resolution = DataTypesResolution(self, project_id, category_key)
         result = []
         for param in attributes_list:
             if param.get(ABCAdapter.KEY_UI_HIDE):
@@ -272,18 +304,20 @@ class FlowService:
                     filter_condition = FilterChain('')
                 filter_condition.add_condition(FilterChain.datatype + ".visible", "==", True)
 
-                data_list, total_count = self.get_available_datatypes(project_id, param[ABCAdapter.KEY_TYPE],
-                                                                      filter_condition)
+                data_list, total_count = resolution.get_available_datatypes(param[ABCAdapter.KEY_TYPE],
+                                                                            filter_condition)
 
                 if total_count > self.MAXIMUM_DATA_TYPES_DISPLAYED:
                     transformed_param[self.KEY_WARNING] = self.WARNING_OVERFLOW
 
                 complex_dt_attributes = None
                 if param.get(ABCAdapter.KEY_ATTRIBUTES):
-                    complex_dt_attributes = self.prepare_parameters(param[ABCAdapter.KEY_ATTRIBUTES], 
-                                                                    project_id, category_key)
-                values = self.populate_values(data_list, param[ABCAdapter.KEY_TYPE], 
-                                              category_key, complex_dt_attributes)
+                    complex_dt_attributes = self.prepare_parameters(param[ABCAdapter.KEY_ATTRIBUTES],
+                                                                    project_id, category_key, resolution)
+                values = self.populate_values(data_list, param[ABCAdapter.KEY_TYPE], category_key,
+                                              complex_dt_attributes,
+                                              resolution.get_display_names(param[ABCAdapter.KEY_TYPE], data_list),
+                                              resolution.category)
                 
                 if (transformed_param.get(ABCAdapter.KEY_REQUIRED) and len(values) > 0 and
                         transformed_param.get(ABCAdapter.KEY_DEFAULT) in [None, 'None']):
@@ -311,7 +345,8 @@ class FlowService:
             else:
                 if param.get(ABCAdapter.KEY_OPTIONS) is not None:
                     transformed_param[ABCAdapter.KEY_OPTIONS] = self.prepare_parameters(param[ABCAdapter.KEY_OPTIONS],
-                                                                                        project_id, category_key)
+                                                                                        project_id, category_key,
+                                                                                        resolution)
                     if (transformed_param.get(ABCAdapter.KEY_REQUIRED) and
                             len(param[ABCAdapter.KEY_OPTIONS]) > 0 and
                             (transformed_param.get(ABCAdapter.KEY_DEFAULT) in [None, 'None'])):
@@ -320,7 +355,7 @@ class FlowService:
                     
                 if param.get(ABCAdapter.KEY_ATTRIBUTES) is not None:
                     transformed_param[ABCAdapter.KEY_ATTRIBUTES] = self.prepare_parameters(
-                        param[ABCAdapter.KEY_ATTRIBUTES], project_id, category_key)
+                        param[ABCAdapter.KEY_ATTRIBUTES], project_id, category_key, resolution)
             result.append(transformed_param)   
         return result
     
@@ -405,4 +440,74 @@ class FlowService:
 
     @staticmethod
     def get_generic_entity(entity_type, filter_value, select_field):
-        return dao.get_generic_entity(entity_type, filter_value, select_field)
\ No newline at end of file
+        return dao.get_generic_entity(entity_type, filter_value, select_field)
+
+
+
+
+class DataTypesResolution(object):
+    """
+    DataTypes lists and display names read from DB while preparing one adapter input tree.
+    The same DataType class and filter appear in many branches of a tree (e.g. the simulator models or
+    monitors), thus each one is queried only once, and display names are read in bulk.
+    """
+
+
+    def __init__(self, flow_service, project_id, category_key):
+        self.flow_service = flow_service
+        self.project_id = project_id
+        self.category_key = category_key
+        self._datatypes = {}
+        self._display_names = {}
+        self._category = None
+
+
+    def get_available_datatypes(self, data_name, filters):
+        """
+        :returns: (DataTypes list, total count) from FlowService.get_available_datatypes, queried once per tree.
+        """
+        key = (self._get_type_key(data_name), self._get_filter_key(filters))
+        if key not in self._datatypes:
+            self._datatypes[key] = self.flow_service.get_available_datatypes(self.project_id, data_name, filters)
+        return self._datatypes[key]
+
+
+    def get_display_names(self, data_name, data_list):
+        """
+        :returns: dictionary {gid: display_name}, which includes all the DataTypes in data_list
+        """
+        missing_gids = [value[2] for value in data_list if value[2] not in self._display_names]
+        if missing_gids:
+            found = FlowService.get_display_names(data_name, missing_gids)
+            for gid in missing_gids:
+                self._display_names[gid] = found.get(gid, '')
+        return self._display_names
+
+
+    @property
+    def category(self):
+        """ AlgorithmCategory entity for category_key, read once per tree. """
+        if self._category is None and self.category_key is not None:
+            self._category = dao.get_category_by_id(self.category_key)
+        return self._category
+
+
+    @staticmethod
+    def _get_type_key(data_name):
+        """ Full class name, for a DataType given as class or as string. """
+        if isinstance(data_name, (str, unicode)):
+            return data_name
+        return data_name.__module__ + '.' + data_name.__name__
+
+
+    @staticmethod
+    def _get_filter_key(filters):
+        """
+        Canonical form of a FilterChain: the order of the conditions does not matter, and repeated
+        conditions (e.g. the visibility one, added again for each branch) are counted once.
+        """
+        if filters is None:
+            return None
+        conditions = zip(filters.fields, filters.operations, [repr(value) for value in filters.values])
+        return tuple(sorted(set(conditions)))
+
@@ -39,6 +39,7 @@ import json
 import shutil
 from cgi import FieldStorage
 from datetime import datetime
+from multiprocessing.pool import ThreadPool
 from cherrypy._cpreqbody import Part
 from sqlalchemy.orm.attributes import manager_of_class
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
@@ -49,7 +50,6 @@ from tvb.core.entities import model
 from tvb.core.entities.storage import dao, transactional
 from tvb.core.entities.model.model_burst import BURST_INFO_FILE, BURSTS_DICT_KEY, DT_BURST_MAP
 from tvb.core.services.exceptions import ProjectImportException
-from tvb.core.services.flow_service import FlowService
 from tvb.core.project_versions.project_update_manager import ProjectUpdateManager
 from tvb.core.entities.file.xml_metadata_handlers import XMLReader
 from tvb.core.entities.file.files_helper import FilesHelper
@@ -62,12 +62,31 @@ from tvb.core.entities.transient.structure_entities import DataTypeMetaData
 
 
 
+def _read_h5_metadata(h5_file):
+    """
+    Upgrade an H5 file to the current data version, and read its root meta-data.
+    Kept at module level (and not as a method), to be usable from a pool.
+
+    :returns: tuple (h5_file, meta-data dictionary), meta-data being None for incompatible files
+    """
+    try:
+        FilesUpdateManager().upgrade_file(h5_file)
+        folder, file_name = os.path.split(h5_file)
+        return h5_file, HDF5StorageManager(folder, file_name).get_metadata()
+    except IncompatibleFileManagerException:
+        return h5_file, None
+
+
+
 class ImportService():
     """
     Service for importing TVB entities into system.
     It supports TVB exported H5 files as input, but it should also handle H5 files 
     generated outside of TVB, as long as they respect the same structure.
     """
+    PARALLEL_IMPORT_WORKERS = 4
+    # Under this number of H5 files, starting a pool costs more than scanning them sequentially
+    PARALLEL_SCAN_MIN_FILES = 16
 
 
     def __init__(self):
@@ -77,7 +96,7 @@ class ImportService():
         self.created_projects = []
 
 
-    def _download_and_unpack_project_zip(self, uploaded, uq_file_name, temp_folder):
+    def _download_and_unpack_project_zip(self, uploaded, uq_file_name, temp_folder, operation_folders=None):
 
         if isinstance(uploaded, FieldStorage) or isinstance(uploaded, Part):
             if not uploaded.file:
@@ -88,7 +107,11 @@ class ImportService():
             shutil.copy2(uploaded, uq_file_name)
 
         try:
-            self.files_helper.unpack_zip(uq_file_name, temp_folder)
+            if self.files_helper.read_export_index(uq_file_name) is not None:
+                self.files_helper.unpack_indexed_zip(uq_file_name, temp_folder, operation_folders,
+                                                     self.PARALLEL_IMPORT_WORKERS)
+            else:
+                self.files_helper.unpack_zip(uq_file_name, temp_folder)
         except FileStructureException, excep:
             self.logger.exception(excep)
             raise ProjectImportException("Bad ZIP archive provided. A TVB exported project is expected!")
@@ -107,7 +130,7 @@ class ImportService():
 
 
     @transactional
-    def import_project_structure(self, uploaded, user_id):
+    def import_project_structure(self, uploaded, user_id, operation_folders=None):
         """
         Execute import operations:
          
@@ -118,6 +141,10 @@ class ImportService():
             - create all operations
             - import all images
             - create all dataTypes
+
+        :param operation_folders: only for archives exported in parallel mode (with an index, see
+                                  `FilesHelper.read_export_index`): names of the operation folders to import.
+                                  Callers are responsible to include the operations these depend on.
         """
 
         self.user_id = user_id
@@ -128,7 +155,7 @@ class ImportService():
         uq_file_name = temp_folder + ".zip"
 
         try:
-            self._download_and_unpack_project_zip(uploaded, uq_file_name, temp_folder)
+            self._download_and_unpack_project_zip(uploaded, uq_file_name, temp_folder, operation_folders)
             self._import_projects_from_folder(temp_folder)
 
         except Exception, excep:
@@ -328,24 +355,52 @@ class ImportService():
         return operations
 
 
-    def _load_datatypes_from_operation_folder(self, op_path, operation_entity, datatype_group):
+    def _scan_h5_files(self, h5_files):
+        """
+        Upgrade H5 files and read their meta-data, in a pool of threads when there are enough files.
+        Threads (and not forked processes) are used, as the web process is multi-threaded: a forked child
+        would inherit locks held by other threads, the DB connections and the open H5 handles.
+
+        :returns: list of tuples (h5_file, meta-data dictionary or None), in the same order as received
+        """
+        if len(h5_files) < self.PARALLEL_SCAN_MIN_FILES or self.PARALLEL_IMPORT_WORKERS < 2:
+            return [_read_h5_metadata(h5_file) for h5_file in h5_files]
+
+        pool = ThreadPool(min(self.PARALLEL_IMPORT_WORKERS, len(h5_files)))
+        try:
+            chunk_size = max(1, len(h5_files) // (4 * self.PARALLEL_IMPORT_WORKERS))
+            return pool.map(_read_h5_metadata, h5_files, chunk_size)
+        finally:
+            pool.close()
+            pool.join()
+
+
+    def _load_datatypes_from_operation_folders(self, project, operation_folders):
         """
-        Loads datatypes from operation folder
+        Loads datatypes from operation folders. H5 files are upgraded and scanned in parallel.
+
+        :param operation_folders: list of tuples (folder path, stored operation entity, datatype group or None)
         :returns: Datatypes ordered by creation date (to solve any dependencies)
         """
+        h5_files = []
+        h5_owners = []
+        for op_path, operation_entity, datatype_group in operation_folders:
+            for file_name in os.listdir(op_path):
+                if file_name.endswith(FilesHelper.TVB_STORAGE_FILE_EXTENSION):
+                    h5_files.append(os.path.join(op_path, file_name))
+                    h5_owners.append((operation_entity.id, datatype_group))
+
         all_datatypes = []
-        for file_name in os.listdir(op_path):
-            if file_name.endswith(FilesHelper.TVB_STORAGE_FILE_EXTENSION):
-                h5_file = os.path.join(op_path, file_name)
-                try:
-                    file_update_manager = FilesUpdateManager()
-                    file_update_manager.upgrade_file(h5_file)
-                    datatype = self.load_datatype_from_file(op_path, file_name, operation_entity.id, datatype_group)
-                    all_datatypes.append(datatype)
-
-                except IncompatibleFileManagerException:
-                    os.remove(h5_file)
-                    self.logger.warning("Incompatible H5 file will be ignored: %s" % h5_file)
+        for (h5_file, meta_dictionary), (operation_id, datatype_group) in zip(self._scan_h5_files(h5_files),
+                                                                              h5_owners):
+            if meta_dictionary is None:
+                os.remove(h5_file)
+                self.logger.warning("Incompatible H5 file will be ignored: %s" % h5_file)
+                continue
+            op_path, file_name = os.path.split(h5_file)
+            datatype = self._build_datatype_from_metadata(meta_dictionary, op_path, file_name, operation_id,
+                                                          datatype_group, project=project)
+            all_datatypes.append(datatype)
 
         all_datatypes.sort(key=lambda dt_date: dt_date.create_date)
         for dt in all_datatypes:
@@ -354,6 +409,9 @@ class ImportService():
 
 
     def _store_imported_datatypes_in_db(self, project, all_datatypes, dt_burst_mappings, burst_ids_mapping):
+        """
+        Store with bulk inserts the datatypes not yet in TVB, and link into current project the ones already present.
+        """
         def by_time(dt):
             return dt.create_date or datetime.now()
 
@@ -363,35 +421,79 @@ class ImportService():
             dt_burst_mappings = {}
 
         all_datatypes.sort(key=by_time)
+        ids_already_in_tvb = dao.get_datatype_ids_by_gids([datatype.gid for datatype in all_datatypes])
 
+        new_datatypes = []
+        links = []
         for datatype in all_datatypes:
             old_burst_id = dt_burst_mappings.get(datatype.gid)
 
             if old_burst_id is not None:
                 datatype.fk_parent_burst = burst_ids_mapping[old_burst_id]
 
-            datatype_allready_in_tvb = dao.get_datatype_by_gid(datatype.gid)
-
-            if not datatype_allready_in_tvb:
+            if datatype.gid not in ids_already_in_tvb:
                 # Compute disk size. Similar to ABCAdapter._capture_operation_results.
                 # No need to close the h5 as we have not written to it.
                 associated_file = os.path.join(datatype.storage_path, datatype.get_storage_file_name())
                 datatype.disk_size = FilesHelper.compute_size_on_disk(associated_file)
+                new_datatypes.append(datatype)
+                # Same GID found twice in the imported folders should be stored only once
+                ids_already_in_tvb[datatype.gid] = None
+            elif ids_already_in_tvb[datatype.gid] is not None:
+                links.append(model.Links(ids_already_in_tvb[datatype.gid], project.id))
 
+        self.logger.debug("Store %d imported datatypes and %d links" % (len(new_datatypes), len(links)))
+        try:
+            dao.store_entities_bulk(new_datatypes)
+        except MissingDataSetException:
+            # Fall back to storing one by one, for skipping only the incomplete datatypes
+            for datatype in new_datatypes:
                 self.store_datatype(datatype)
-            else:
-                FlowService.create_link([datatype_allready_in_tvb.id], project.id)
+        except IntegrityError, excep:
+            self.logger.exception(excep)
+            # None of them got stored, thus delete their files, as store_datatype does for a single DataType
+            for datatype in new_datatypes:
+                if os.path.exists(datatype.get_storage_file_path()):
+                    os.remove(datatype.get_storage_file_path())
+            raise ProjectImportException("Could not import data. There is already data with the same gid in TVB.")
+        if links:
+            dao.store_entities_bulk(links)
+
 
     def _store_imported_images(self, project):
         """
         Import all images from project
         """
         images_root = self.files_helper.get_images_folder(project.name)
-        # for file_name in os.listdir(images_root):
+        figure_dicts = []
         for root, _, files in os.walk(images_root):
             for file_name in files:
                 if file_name.endswith(FilesHelper.TVB_FILE_EXTENSION):
-                    self._populate_image(os.path.join(root, file_name), project.id)
+                    figure_dict = XMLReader(os.path.join(root, file_name)).read_metadata()
+                    new_path = os.path.join(root, os.path.split(figure_dict['file_path'])[1])
+                    if not os.path.exists(new_path):
+                        self.logger.warn("Expected to find image path %s .Skipping" % new_path)
+                    figure_dicts.append(figure_dict)
+        if not figure_dicts:
+            return
+
+        operations = dao.get_operations_by_gids([figure_dict['fk_from_operation'] for figure_dict in figure_dicts])
+        figures = []
+        for figure_dict in figure_dicts:
+            operation = operations.get(figure_dict['fk_from_operation'])
+            figure_dict['fk_op_id'] = operation.id if operation is not None else None
+            figure_dict['fk_user_id'] = self.user_id
+            figure_dict['fk_project_id'] = project.id
+            figure_entity = manager_of_class(model.ResultFigure).new_instance()
+            figures.append(figure_entity.from_dict(figure_dict))
+        dao.store_entities_bulk(figures)
+        self.logger.debug("Stored %d imported figures" % len(figures))
+
+        # Update images meta-data with the new details after import
+        for figure, figure_dict in zip(figures, figure_dicts):
+            figure.operation = operations.get(figure_dict['fk_from_operation'])
+            figure.project = project
+            self.files_helper.write_image_metadata(figure)
 
 
     def import_project_operations(self, project, import_path, dt_burst_mappings=None, burst_ids_mapping=None):
@@ -400,54 +502,25 @@ class ImportService():
         """
         op_paths = self._append_tmp_to_folders_containing_operations(import_path)
         operations = self._load_operations_from_paths(project, op_paths)
+        imported_operations, datatype_groups = self.__import_operations(operations)
 
-        imported_operations = []
-        datatypes = []
-
-        # Here we process each operation found
-        for operation in operations:
-            old_operation_folder, _ = os.path.split(operation.import_file)
-            operation_entity, datatype_group = self.__import_operation(operation)
-
-            # Rename operation folder with the ID of the stored operation
+        # Rename operation folders with the ID of the stored operations
+        operation_folders = []
+        for operation_entity in imported_operations:
+            old_operation_folder, _ = os.path.split(operation_entity.import_file)
             new_operation_path = FilesHelper().get_operation_folder(project.name, operation_entity.id)
             if old_operation_folder != new_operation_path:
                 # Delete folder of the new operation, otherwise move will fail
                 shutil.rmtree(new_operation_path)
                 shutil.move(old_operation_folder, new_operation_path)
+            datatype_group = datatype_groups.get(operation_entity.fk_operation_group)
+            operation_folders.append((new_operation_path, operation_entity, datatype_group))
 
-            operation_datatypes = self._load_datatypes_from_operation_folder(new_operation_path, operation_entity,
-                                                                             datatype_group)
-            imported_operations.append(operation_entity)
-            datatypes.extend(operation_datatypes)
-
+        datatypes = self._load_datatypes_from_operation_folders(project, operation_folders)
         self._store_imported_datatypes_in_db(project, datatypes, dt_burst_mappings, burst_ids_mapping)
         return imported_operations
 
 
-    def _populate_image(self, file_name, project_id):
-        """
-        Create and store a image entity.
-        """
-        figure_dict = XMLReader(file_name).read_metadata()
-        new_path = os.path.join(os.path.split(file_name)[0], os.path.split(figure_dict['file_path'])[1])
-        if not os.path.exists(new_path):
-            self.logger.warn("Expected to find image path %s .Skipping" % new_path)
-
-        op = dao.get_operation_by_gid(figure_dict['fk_from_operation'])
-        figure_dict['fk_op_id'] = op.id if op is not None else None
-        figure_dict['fk_user_id'] = self.user_id
-        figure_dict['fk_project_id'] = project_id
-        figure_entity = manager_of_class(model.ResultFigure).new_instance()
-        figure_entity = figure_entity.from_dict(figure_dict)
-        stored_entity = dao.store_entity(figure_entity)
-
-        # Update image meta-data with the new details after import
-        figure = dao.load_figure(stored_entity.id)
-        self.logger.debug("Store imported figure")
-        self.files_helper.write_image_metadata(figure)
-
-
     def load_datatype_from_file(self, storage_folder, file_name, op_id, datatype_group=None, move=True):
         """
         Creates an instance of datatype from storage / H5 file 
@@ -456,6 +529,18 @@ class ImportService():
         self.logger.debug("Loading datatType from file: %s" % file_name)
         storage_manager = HDF5StorageManager(storage_folder, file_name)
         meta_dictionary = storage_manager.get_metadata()
+        return self._build_datatype_from_metadata(meta_dictionary, storage_folder, file_name, op_id,
+                                                  datatype_group, move)
+
+
+    @staticmethod
+    def _build_datatype_from_metadata(meta_dictionary, storage_folder, file_name, op_id,
+                                      datatype_group=None, move=True, project=None):
+        """
+        Creates an instance of datatype from the meta-data already read from its H5 file.
+        :param project: Project of operation `op_id`, when already known (saves one DB query per datatype)
+        :returns: datatype
+        """
         meta_structure = DataTypeMetaData(meta_dictionary)
 
         # Now try to determine class and instantiate it
@@ -475,7 +560,7 @@ class ImportService():
         #Add all the required attributes
         if datatype_group is not None:
             type_instance.fk_datatype_group = datatype_group.id
-        type_instance.set_operation_id(op_id)
+        type_instance.set_operation_id(op_id, project)
 
         # Now move storage file into correct folder if necessary
         current_file = os.path.join(storage_folder, file_name)
@@ -533,15 +618,20 @@ class ImportService():
 
 
     @staticmethod
-    def __import_operation(operation_entity):
+    def __import_operations(operations):
         """
-        Store a Operation entity.
+        Store Operation entities with a single bulk insert (received order is kept, for dependencies),
+        then find or create the DataTypeGroup of each operation group.
+
+        :returns: stored operations, dictionary {operation group id: DataTypeGroup}
         """
-        operation_entity = dao.store_entity(operation_entity)
-        operation_group_id = operation_entity.fk_operation_group
-        datatype_group = None
+        operations = dao.store_entities_bulk(operations)
+        datatype_groups = {}
 
-        if operation_group_id is not None:
+        for operation_entity in operations:
+            operation_group_id = operation_entity.fk_operation_group
+            if operation_group_id is None or operation_group_id in datatype_groups:
+                continue
             try:
                 datatype_group = dao.get_datatypegroup_by_op_group_id(operation_group_id)
             except SQLAlchemyError:
@@ -550,5 +640,6 @@ class ImportService():
                 datatype_group = model.DataTypeGroup(operation_group, operation_id=operation_entity.id)
                 datatype_group.state = ADAPTERS['Upload']['defaultdatastate']
                 datatype_group = dao.store_entity(datatype_group)
+            datatype_groups[operation_group_id] = datatype_group
 
-        return operation_entity, datatype_group
+        return operations, datatype_groups
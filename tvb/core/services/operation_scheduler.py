@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under 
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General 
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Admission of operations for execution on a stand-alone installation.
+
+Submitted operations wait in a queue, and are started while the number of running operations is below
+MAX_THREADS_NUMBER, and the sum of their estimated memory fits in the memory budget.
+The order in the queue is given by:
+
+    - the priority class: interactive, then burst steps, then PSE (bulk) operations;
+    - fair share: users with fewer running operations come first;
+    - the estimated execution time: shorter operations first;
+    - the submit order.
+
+A waiting operation climbs one priority class for every PRIORITY_AGING_INTERVAL seconds spent in the queue,
+thus bulk work is delayed but never starved.
+When the first operation in the queue does not fit in the remaining memory,
+only interactive operations are allowed to bypass it.
+"""
+
+import time
+import threading
+from tvb.basic.logger.builder import get_logger
+from tvb.core.adapters.resource_estimator import ResourceEstimator, PEAK_MEMORY, RUNTIME
+
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BURST = 1
+PRIORITY_BULK = 2
+
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive",
+                  PRIORITY_BURST: "burst",
+                  PRIORITY_BULK: "bulk"}
+
+
+
+class ScheduledOperation(object):
+    """
+    An operation waiting for (or holding) a place to run, together with the estimates used when admitting it.
+    """
+
+    def __init__(self, operation_id, user_id, priority, required_memory=0, estimated_time=-1):
+        self.operation_id = operation_id
+        self.user_id = user_id
+        self.priority = priority
+        ## In Bytes. Operations without an estimate are considered to need no memory.
+        self.required_memory = max(0, int(required_memory or 0))
+        ## In seconds. Negative when unknown.
+        self.estimated_time = estimated_time
+        self.sequence = None
+        self.submit_time = None
+        self.start_time = None
+        self.cancelled = False
+
+
+    @staticmethod
+    def from_adapter(operation_id, user_id, priority, adapter_instance, **kwargs):
+        """
+        Build a ScheduledOperation with the estimates returned by the adapter for the given (prepared) arguments.
+        Failing estimates are ignored, the adapter will complain about its inputs when actually launched.
+        """
+        required_memory, estimated_time = 0, -1
+        if adapter_instance is not None:
+            try:
+                required_memory = ResourceEstimator.estimate(adapter_instance, PEAK_MEMORY, **kwargs)
+            except Exception:
+                get_logger(__name__).warning("Could not estimate memory for operation %s" % operation_id)
+            try:
+                estimated_time = ResourceEstimator.estimate(adapter_instance, RUNTIME, **kwargs)
+            except Exception:
+                get_logger(__name__).warning("Could not estimate time for operation %s" % operation_id)
+        return ScheduledOperation(operation_id, user_id, priority, required_memory, estimated_time)
+
+
+    def to_dict(self, now):
+        """
+        :returns: dictionary describing current entry, for displaying the queue.
+        """
+        reference_time = self.start_time if self.start_time is not None else self.submit_time
+        return {'operation_id': self.operation_id,
+                'user_id': self.user_id,
+                'priority': PRIORITY_NAMES.get(self.priority, str(self.priority)),
+                'required_memory': self.required_memory,
+                'estimated_time': self.estimated_time,
+                'elapsed': now - reference_time if reference_time is not None else 0}
+
+
+
+class OperationScheduler(object):
+    """
+    Priority queue with memory-budget admission, shared by the threads launching operations.
+    All the decisions are taken when an operation is submitted, released or canceled, thus the scheduler
+    can be driven without threads and with a fake clock (see wait_for_turn for the blocking variant).
+    """
+    ## Seconds of waiting after which an operation is considered one priority class higher.
+    PRIORITY_AGING_INTERVAL = 600
+
+
+    def __init__(self, max_running, memory_budget=0, clock=time.time):
+        """
+        :param max_running: maximum number of operations running in the same time
+        :param memory_budget: Bytes to share between the running operations; 0 for no limit
+        :param clock: function returning current time in seconds
+        """
+        self.max_running = max_running
+        self.memory_budget = memory_budget
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._running = {}
+        self._sequence = 0
+        self.logger = get_logger(self.__class__.__module__)
+
+
+    def submit(self, scheduled_op):
+        """
+        Add an operation to the queue, and start it immediately when it fits.
+        """
+        with self._condition:
+            self._sequence += 1
+            scheduled_op.sequence = self._sequence
+            scheduled_op.submit_time = self._clock()
+            self._waiting.append(scheduled_op)
+            self._admit()
+
+
+    def wait_for_turn(self, scheduled_op):
+        """
+        Submit an operation, and block current thread until it is started.
+
+        :returns: True when the operation can run, False when it was canceled while waiting.
+        """
+        self.submit(scheduled_op)
+        with self._condition:
+            while scheduled_op.start_time is None and not scheduled_op.cancelled:
+                self._condition.wait()
+            return not scheduled_op.cancelled
+
+
+    def release(self, operation_id):
+        """
+        Mark a running operation as done, and start the next operations which fit now.
+        """
+        with self._condition:
+            self._running.pop(operation_id, None)
+            self._admit()
+
+
+    def cancel(self, operation_id):
+        """
+        Remove an operation from the queue of waiting ones.
+
+        :returns: True when the operation was waiting.
+        """
+        with self._condition:
+            for scheduled_op in self._waiting:
+                if scheduled_op.operation_id == operation_id:
+                    self._waiting.remove(scheduled_op)
+                    scheduled_op.cancelled = True
+                    self._condition.notify_all()
+                    return True
+            return False
+
+
+    def count_operations(self):
+        """
+        :returns: tuple (number of running operations, number of waiting operations)
+        """
+        with self._condition:
+            return len(self._running), len(self._waiting)
+
+
+    def get_queue_state(self):
+        """
+        :returns: dictionary with the running operations and the waiting ones (in the order they will start).
+        """
+        with self._condition:
+            now = self._clock()
+            return {'max_running': self.max_running,
+                    'memory_budget': self.memory_budget,
+                    'used_memory': self._used_memory(),
+                    'running': [op.to_dict(now) for op in sorted(self._running.values(), key=lambda op: op.sequence)],
+                    'waiting': [op.to_dict(now) for op in self._queue_order(now)]}
+
+
+    def _used_memory(self):
+        return sum(op.required_memory for op in self._running.itervalues())
+
+
+    def _effective_priority(self, scheduled_op, now):
+        aged_classes = int((now - scheduled_op.submit_time) / self.PRIORITY_AGING_INTERVAL)
+        return max(PRIORITY_INTERACTIVE, scheduled_op.priority - aged_classes)
+
+
+    def _queue_order(self, now):
+        """
+        :returns: the waiting operations, sorted in the order they should start.
+        """
+        running_per_user = {}
+        for running_op in self._running.itervalues():
+            running_per_user[running_op.user_id] = running_per_user.get(running_op.user_id, 0) + 1
+
+        def _sort_key(scheduled_op):
+            estimated_time = scheduled_op.estimated_time if scheduled_op.estimated_time >= 0 else float('inf')
+            return (self._effective_priority(scheduled_op, now), running_per_user.get(scheduled_op.user_id, 0),
+                    estimated_time, scheduled_op.sequence)
+
+        return sorted(self._waiting, key=_sort_key)
+
+
+    def _fits(self, scheduled_op):
+        if len(self._running) >= self.max_running:
+            return False
+        if self.memory_budget <= 0 or not self._running:
+            ## An operation larger than the whole budget still gets to run, alone.
+            return True
+        return self._used_memory() + scheduled_op.required_memory <= self.memory_budget
+
+
+    def _admit(self):
+        """
+        Start waiting operations, one at a time (fair share changes with each start), while any fits.
+        Should be called with the condition acquired.
+        """
+        started_any = False
+        while self._waiting and len(self._running) < self.max_running:
+            now = self._clock()
+            queue = self._queue_order(now)
+            candidate = None
+            if self._fits(queue[0]):
+                candidate = queue[0]
+            else:
+                ## The head waits for memory. Only interactive work may bypass it.
+                for scheduled_op in queue[1:]:
+                    if self._effective_priority(scheduled_op, now) == PRIORITY_INTERACTIVE and self._fits(scheduled_op):
+                        candidate = scheduled_op
+                        break
+            if candidate is None:
+                break
+            self._waiting.remove(candidate)
+            candidate.start_time = now
+            self._running[candidate.operation_id] = candidate
+            started_any = True
+            self.logger.debug("Starting operation %s (%s priority, %s Bytes estimated)"
+                              % (candidate.operation_id, PRIORITY_NAMES.get(candidate.priority),
+                                 candidate.required_memory))
+        if started_any:
+            self._condition.notify_all()
@@ -39,6 +39,8 @@ Module in charge with Launching an operation (creating the Operation entity as w
 
 import os
 import json
+import numpy
+import hashlib
 import zipfile
 import tvb.core.utils as utils
 import tvb.core.adapters.xml_reader as xml_reader
@@ -55,7 +57,10 @@ from tvb.core.services.workflow_service import WorkflowService
 from tvb.core.entities.transient.structure_entities import DataTypeMetaData
 from tvb.core.entities.file.files_helper import FilesHelper
 from tvb.core.adapters.abcadapter import ABCAdapter, ABCSynchronous
-from tvb.core.services.backend_client import BACKEND_CLIENT
+from tvb.core.adapters.resource_estimator import ResourceEstimator
+from tvb.core.services.backend_client import BACKEND_CLIENT, record_finished_operation
+from tvb.core.services.ephemeral_displays import EphemeralDisplay, EPHEMERAL_DISPLAYS
+from tvb.core.operation_profiler import OperationProfiler
 from tvb.core.adapters.exceptions import LaunchException
 from tvb.basic.profile import TvbProfile
 from tvb.basic.logger.builder import get_logger
@@ -76,6 +81,28 @@ UIKEY_USERGROUP = "RESERVEDusergroup"
 
 
 
+def _canonical_inputs(value):
+    """
+    Transform the converted inputs of an adapter into a structure with a deterministic JSON representation:
+    DataTypes are replaced by their GID, and arrays by a digest of their content.
+    """
+    if isinstance(value, model.DataType):
+        return {'gid': value.gid}
+    if isinstance(value, numpy.ndarray):
+        digest = hashlib.sha1(numpy.ascontiguousarray(value).tostring()).hexdigest()
+        return {'array': digest, 'dtype': str(value.dtype), 'shape': list(value.shape)}
+    if isinstance(value, numpy.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return dict((str(key), _canonical_inputs(val)) for key, val in value.iteritems())
+    if isinstance(value, (list, tuple)):
+        return [_canonical_inputs(val) for val in value]
+    if value is None or isinstance(value, (bool, int, long, float, basestring)):
+        return value
+    return repr(value)
+
+
+
 class OperationService:
     """
     Class responsible for preparing an operation launch. 
@@ -89,6 +116,10 @@ class OperationService:
         self.logger = get_logger(self.__class__.__module__)
         self.workflow_service = WorkflowService()
         self.file_helper = FilesHelper()
+        ## When False, the next workflow steps are not launched from initiate_prelaunch, but by the caller.
+        self.dispatch_workflow_steps = True
+        ## True when operations are launched in a process of their own, thus its peak memory is the operation's.
+        self.record_peak_memory = False
 
 
     ##########################################################################################
@@ -144,6 +175,10 @@ class OperationService:
         else:
             algo = dao.get_algorithm_by_group(algo_group.id)
 
+        if self._is_ephemeral_display(adapter_instance, algo_category, method_name, temp_files, kwargs):
+            return self._launch_ephemeral_display(current_user, project_id, adapter_instance, algo,
+                                                  algo_category, method_name, **kwargs)
+
         operations = self.prepare_operations(current_user.id, project_id, algo, algo_category,
                                              {}, method_name, visible, **kwargs)[0]
 
@@ -153,11 +188,53 @@ class OperationService:
             if len(operations) < 1:
                 self.logger.warning("No operation was defined")
                 raise LaunchException("Invalid empty Operation!!!")
-            return self.initiate_prelaunch(operations[0], adapter_instance, temp_files, **kwargs)
+            try:
+                return self.initiate_prelaunch(operations[0], adapter_instance, temp_files, **kwargs)
+            finally:
+                record_finished_operation(operations[0].id)
         else:
             return self._send_to_cluster(operations, adapter_instance, current_user.username)
 
 
+    def _is_ephemeral_display(self, adapter_instance, algo_category, method_name, temp_files, kwargs):
+        """
+        Visualizers only build parameters for the UI, thus storing an Operation for them can be skipped.
+        Uploads and ranges still go through the usual Operation.
+        """
+        return (TvbProfile.current.EPHEMERAL_DISPLAYS_ENABLED and algo_category.display is True
+                and method_name == ABCAdapter.LAUNCH_METHOD and isinstance(adapter_instance, ABCSynchronous)
+                and not temp_files and self._range_name(1) not in kwargs)
+
+
+    def _launch_ephemeral_display(self, current_user, project_id, adapter_instance, algorithm,
+                                  algo_category, method_name, **kwargs):
+        """
+        Launch a visualizer in current thread, without storing an Operation, nor checking disk and memory.
+        The launch is recorded in EPHEMERAL_DISPLAYS, and its key replaces the operation id in the adapter.
+        """
+        filtered_kwargs = adapter_instance.prepare_ui_inputs(kwargs)
+        metadata, _ = self._prepare_metadata({}, algo_category, None, kwargs)
+        display = EphemeralDisplay(current_user.id, project_id, algorithm.id,
+                                   json.dumps(kwargs, cls=MapAsJson.MapAsJsonEncoder), json.dumps(metadata),
+                                   method_name)
+        adapter_instance.operation_id = display.key
+        adapter_instance.user_id = current_user.id
+        adapter_instance.current_project_id = project_id
+        self.logger.debug("Launching display " + display.key + " with " + str(filtered_kwargs))
+        try:
+            result = adapter_instance.launch(**dict((str(key), value) for key, value in filtered_kwargs.iteritems()))
+            display.mark_complete(model.STATUS_FINISHED)
+            return result
+        except TVBException, excep:
+            display.mark_complete(model.STATUS_ERROR)
+            self._handle_exception(excep, {}, excep.message)
+        except Exception, excep:
+            display.mark_complete(model.STATUS_ERROR)
+            self._handle_exception(excep, {}, "Could not launch Operation with the given input data!")
+        finally:
+            EPHEMERAL_DISPLAYS.add(display)
+
+
     @staticmethod
     def _prepare_metadata(initial_metadata, algo_category, operation_group, submit_data):
         """
@@ -325,6 +402,13 @@ class OperationService:
                               operation.method_name + " with " + str(filtered_kwargs))
             operation = dao.get_operation_by_id(operation.id)   # Load Lazy fields
 
+            inputs_hash = self._compute_inputs_hash(operation, adapter_instance, filtered_kwargs)
+            if inputs_hash is not None:
+                result_msg = self._reuse_cached_results(operation, inputs_hash)
+                if result_msg is not None:
+                    self._remove_files(temp_files)
+                    return result_msg
+
             params = dict()
             for k, value_ in filtered_kwargs.items():
                 params[str(k)] = value_
@@ -334,7 +418,14 @@ class OperationService:
             user_disk_space = dao.compute_user_generated_disk_size(operation.fk_launched_by)    # From kB to Bytes
             available_space = disk_space_per_user - pending_op_disk_space - user_disk_space
 
-            result_msg, nr_datatypes = adapter_instance._prelaunch(operation, unique_id, available_space, **params)
+            memory_baseline = ResourceEstimator.get_current_memory() if self.record_peak_memory else None
+            if OperationProfiler.is_enabled(operation):
+                profiler = OperationProfiler(self.file_helper.get_operation_folder(operation.project.name,
+                                                                                   operation.id))
+                result_msg, nr_datatypes = profiler.run(adapter_instance._prelaunch,
+                                                        (operation, unique_id, available_space), params)
+            else:
+                result_msg, nr_datatypes = adapter_instance._prelaunch(operation, unique_id, available_space, **params)
             operation = dao.get_operation_by_id(operation.id)
             ## Update DB stored kwargs for search purposes, to contain only valuable params (no unselected options)
             operation.parameters = json.dumps(kwargs)
@@ -343,6 +434,10 @@ class OperationService:
                 #### Write operation meta-XML only if some result are returned
                 self.file_helper.write_operation_metadata(operation)
             dao.store_entity(operation)
+            if inputs_hash is not None and nr_datatypes > 0:
+                self._store_cached_results(operation, inputs_hash)
+            if operation.method_name == ABCAdapter.LAUNCH_METHOD:
+                self._record_resource_usage(operation, adapter_instance, params, memory_baseline)
             self._remove_files(temp_files)
 
         except zipfile.BadZipfile, excep:
@@ -358,12 +453,104 @@ class OperationService:
             msg = "Could not launch Operation with the given input data!"
             self._handle_exception(excep1, temp_files, msg, operation)
 
-        ### Try to find next workflow Step. It might throw WorkflowException
-        next_op_id = self.workflow_service.prepare_next_step(operation.id)
-        self.launch_operation(next_op_id)
+        ### Try to find next workflow Steps. It might throw WorkflowException
+        if self.dispatch_workflow_steps:
+            self.launch_next_workflow_steps(operation.id)
         return result_msg
 
 
+    def _record_resource_usage(self, operation, adapter_instance, params, memory_baseline):
+        """
+        Keep the resources used by a finished operation, for estimating the next ones. Never fails the operation.
+        :param memory_baseline: resident memory before the launch, None when the peak memory is not recorded
+        """
+        try:
+            peak_memory = ResourceEstimator.get_peak_memory(memory_baseline)
+            ResourceEstimator.record(adapter_instance, operation, peak_memory, **params)
+        except Exception, excep:
+            self.logger.warning("Could not record resources used by operation %s" % operation.id)
+            self.logger.exception(excep)
+
+
+    def launch_next_workflow_steps(self, operation_id, send_to_cluster=False):
+        """
+        Launch all the steps in the same workflow whose inputs became ready after the operation
+        with the given id has finished. When send_to_cluster, they are sent through the backend client,
+        to be executed concurrently, otherwise they are executed one after the other, in current process.
+        A failed step does not stop the launch of its siblings.
+        """
+        for next_op_id in self.workflow_service.prepare_next_steps(operation_id):
+            try:
+                self.launch_operation(next_op_id, send_to_cluster)
+            except Exception:
+                self.logger.exception("Could not execute workflow step operation %s" % next_op_id)
+
+
+    @staticmethod
+    def _compute_inputs_hash(operation, adapter_instance, launch_kwargs):
+        """
+        Hash the canonical form of the converted adapter inputs, together with the algorithm version.
+
+        :returns: hex digest, or None when the results of current operation are not to be shared
+                  (cache disabled, stochastic adapter, operation part of a group or of a burst workflow).
+        """
+        if (not TvbProfile.current.REUSE_OPERATION_RESULTS or not adapter_instance.cacheable_results
+                or operation.method_name != ABCAdapter.LAUNCH_METHOD or operation.fk_operation_group is not None
+                or DataTypeMetaData.KEY_BURST in json.loads(operation.meta_data)):
+            return None
+
+        algorithm = operation.algorithm
+        version = [algorithm.algo_group.module, algorithm.algo_group.classname, algorithm.identifier,
+                   TvbProfile.current.version.BASE_VERSION, TvbProfile.current.version.SVN_VERSION]
+        canonical = json.dumps([version, _canonical_inputs(launch_kwargs)], sort_keys=True)
+        return hashlib.sha1(canonical).hexdigest()
+
+
+    def _reuse_cached_results(self, operation, inputs_hash):
+        """
+        When a previous operation with the same inputs hash still has all its results valid, link those results
+        into the project of current operation and mark it as finished, instead of computing them again.
+
+        No DataType gets attached to current operation: a DataType has exactly one parent operation (the one which
+        computed it, and whose removal removes it too), thus the re-used results stay under the cached operation.
+        They are reachable from the project of current operation (directly, or through Links), and the cached
+        operation is named in the `additional_info` of current operation.
+
+        :returns: result message, or None when nothing could be re-used
+        """
+        cached_operation = dao.get_cached_operation(inputs_hash)
+        if cached_operation is None:
+            return None
+        results = dao.get_results_for_operation(cached_operation.id)
+        if not results or any(datatype.invalid for datatype in results):
+            return None
+
+        project_id = operation.fk_launched_in
+        if cached_operation.fk_launched_in != project_id:
+            for datatype in results:
+                links = dao.get_links_for_datatype(datatype.id) or []
+                if not any(link.fk_to_project == project_id for link in links):
+                    dao.store_entity(model.Links(datatype.id, project_id))
+
+        self.logger.debug("Operation %s re-uses the results of operation %s" % (operation.id, cached_operation.id))
+        operation.start_now()
+        operation.mark_complete(model.STATUS_FINISHED, "Results re-used from operation %s." % cached_operation.id)
+        dao.store_entity(operation)
+        return "Operation %s has finished, re-using the results of operation %s." % (operation.id,
+                                                                                  cached_operation.id)
+
+
+    def _store_cached_results(self, operation, inputs_hash):
+        """
+        Record a successfully finished operation in the results cache. Failing to do so is not fatal.
+        """
+        try:
+            dao.store_entity(model.OperationResultCache(operation.id, inputs_hash))
+        except Exception, excep:
+            self.logger.warning("Could not record operation %s in the results cache!" % operation.id)
+            self.logger.exception(excep)
+
+
     def _send_to_cluster(self, operations, adapter_instance, current_username="unknown"):
         """ Initiate operation on cluster"""
         for operation in operations:
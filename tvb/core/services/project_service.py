@@ -40,6 +40,8 @@ import copy
 import json
 import formencode
 from inspect import stack, getmro
+from datetime import datetime, timedelta
+from sqlalchemy import or_, and_, case, func
 
 from tvb.core import utils
 from tvb.basic.traits.types_mapped import MappedType
@@ -52,7 +54,7 @@ from tvb.core.entities import model
 from tvb.core.entities.storage import dao, transactional
 from tvb.core.entities.transient.context_overlay import CommonDetails, DataTypeOverlayDetails, OperationOverlayDetails
 from tvb.core.entities.transient.filtering import StaticFiltersFactory
-from tvb.core.entities.transient.structure_entities import StructureNode, DataTypeMetaData
+from tvb.core.entities.transient.structure_entities import StructureNode, DataTypeMetaData, STRUCTURE_CACHE
 from tvb.core.entities.file.files_helper import FilesHelper
 from tvb.core.entities.file.exceptions import FileStructureException
 from tvb.core.services.event_handlers import handle_event
@@ -60,6 +62,7 @@ from tvb.core.services.exceptions import StructureException, ProjectServiceExcep
 from tvb.core.services.exceptions import RemoveDataTypeException
 from tvb.core.services.user_service import UserService
 from tvb.core.adapters.abcadapter import ABCAdapter
+from tvb.core.operation_profiler import OperationProfiler
 
 
 def initialize_storage():
@@ -89,6 +92,26 @@ class ProjectService:
     """
     Services layer for Project entities.
     """
+    ## Tree levels which can be aggregated directly in DB: DataTypeMetaData key -> (column, value displayed for NULL)
+    STRUCTURE_LEVEL_COLUMNS = {DataTypeMetaData.KEY_NODE_TYPE: (model.DataType.type, None),
+                               DataTypeMetaData.KEY_SUBJECT: (model.DataType.subject, None),
+                               DataTypeMetaData.KEY_STATE: (model.DataType.state, None),
+                               DataTypeMetaData.KEY_OPERATION_ALGORITHM: (model.Algorithm.name, None),
+                               DataTypeMetaData.KEY_BURST: (model.BurstConfiguration.name, '-None-'),
+                               DataTypeMetaData.KEY_TAG_1: (model.DataType.user_tag_1, ''),
+                               DataTypeMetaData.KEY_TAG_2: (model.DataType.user_tag_2, ''),
+                               DataTypeMetaData.KEY_TAG_3: (model.DataType.user_tag_3, ''),
+                               DataTypeMetaData.KEY_TAG_4: (model.DataType.user_tag_4, ''),
+                               DataTypeMetaData.KEY_TAG_5: (model.DataType.user_tag_5, ''),
+                               DataTypeMetaData.KEY_GID: (model.DataType.gid, None),
+                               DataTypeMetaData.KEY_DATATYPE_ID: (model.DataType.id, None),
+                               DataTypeMetaData.KEY_OPERATION_TAG: (
+                                   case([(and_(model.DataType.type == DataTypeGroup.__name__,
+                                               model.OperationGroup.id != None), model.OperationGroup.name)],
+                                        else_=model.Operation.user_group), None)}
+    ## Tree levels grouping by the completion date of the parent operation: DataTypeMetaData key -> date format
+    STRUCTURE_LEVEL_DATES = {DataTypeMetaData.KEY_CREATE_DATA_DAY: DAY_MONTH_YEAR_FORMAT,
+                             DataTypeMetaData.KEY_CREATE_DATA_MONTH: MONTH_YEAR_FORMAT}
 
 
     def __init__(self):
@@ -184,12 +207,14 @@ class ProjectService:
         return dao.get_filtered_operations(project_id, filters, is_count=True)
 
 
-    def retrieve_project_full(self, project_id, applied_filters=None, current_page=1):
+    def retrieve_project_full(self, project_id, applied_filters=None, current_page=1, before_id=None, after_id=None):
         """
         Return a Tuple with Project entity and Operations for current Project.
         :param project_id: Current Project Identifier
         :param applied_filters: Filters to apply on Operations
         :param current_page: Number for current page in operations
+        :param before_id: optional `max_id` of the last row on the previous page (seek instead of offset)
+        :param after_id: optional `max_id` of the first row on the next page (seek instead of offset)
         """
         selected_project = self.find_project(project_id)
         total_filtered = self.count_filtered_operations(project_id, applied_filters)
@@ -197,7 +222,8 @@ class ProjectService:
         total_ops_nr = self.count_filtered_operations(project_id)
 
         start_idx = OPERATIONS_PAGE_SIZE * (current_page - 1)
-        current_ops = dao.get_filtered_operations(project_id, applied_filters, start_idx, OPERATIONS_PAGE_SIZE)
+        current_ops = dao.get_filtered_operations(project_id, applied_filters, start_idx, OPERATIONS_PAGE_SIZE,
+                                                  before_id=before_id, after_id=after_id)
         if current_ops is None:
             return selected_project, 0, [], 0
 
@@ -210,6 +236,7 @@ class ProjectService:
                     result["id"] = str(one_op[0]) + "-" + str(one_op[1])
                 else:
                     result["id"] = str(one_op[0])
+                result["max_id"] = one_op[1]
                 burst = dao.get_burst_for_operation_id(one_op[0])
                 result["burst_name"] = burst.name if burst else '-'
                 result["count"] = one_op[2]
@@ -479,6 +506,33 @@ class ProjectService:
         return op_details
 
 
+    def get_operation_profile_fields(self, operation):
+        """
+        :returns: list of dictionaries {name, value} describing the profile stored for an operation,
+                  or an empty list when the operation was not profiled (see tvb.core.operation_profiler).
+        """
+        operation_folder = self.structure_helper.get_operation_folder(operation.project.name, operation.id)
+        summary = OperationProfiler.read_summary(operation_folder)
+        if summary is None:
+            return []
+
+        fields = [{"name": "Wall time", "value": "%.2f s" % summary['wall_time']},
+                  {"name": "CPU time", "value": "%.2f s" % summary['cpu_time']},
+                  {"name": "Peak memory (RSS)", "value": format_bytes_human(summary['peak_rss'] / 1024)},
+                  {"name": "Results on disk (H5)", "value": format_bytes_human(summary.get('h5_bytes', 0) / 1024)}]
+        if 'read_bytes' in summary:
+            fields.append({"name": "Bytes read", "value": format_bytes_human(summary['read_bytes'] / 1024)})
+            fields.append({"name": "Bytes written", "value": format_bytes_human(summary['write_bytes'] / 1024)})
+        if summary['failed']:
+            fields.append({"name": "Launch", "value": "Failed"})
+        for idx, hotspot in enumerate(summary.get('hotspots', [])):
+            fields.append({"name": "Hotspot %d" % (idx + 1),
+                           "value": "%.3f s (%.3f s total, %d calls) %s" % (hotspot['own_time'],
+                                                                            hotspot['cumulative_time'],
+                                                                            hotspot['calls'], hotspot['function'])})
+        return fields
+
+
     @staticmethod
     def get_filterable_meta():
         """
@@ -494,60 +548,170 @@ class ProjectService:
         In case of a problem, will return an empty list.
         """
         metadata_list = []
-        dt_list = dao.get_data_in_project(project.id, visibility_filter, filter_value)
+        dt_list = dao.get_data_in_project_for_display(project.id, visibility_filter, filter_value)
 
         for dt in dt_list:
-            # Prepare the DT results from DB, for usage in controller, by converting into DataTypeMetaData objects
-            data = {}
-            is_group = False
-            group_op = None
-            dt_entity = dao.get_datatype_by_gid(dt.gid)
-            ## Filter by dt.type, otherwise Links to individual DT inside a group will be mistaken
-            if dt.type == "DataTypeGroup" and dt.parent_operation.operation_group is not None:
-                is_group = True
-                group_op = dt.parent_operation.operation_group
-
-            # All these fields are necessary here for dynamic Tree levels.
-            data[DataTypeMetaData.KEY_DATATYPE_ID] = dt.id
-            data[DataTypeMetaData.KEY_GID] = dt.gid
-            data[DataTypeMetaData.KEY_NODE_TYPE] = dt.type
-            data[DataTypeMetaData.KEY_STATE] = dt.state
-            data[DataTypeMetaData.KEY_SUBJECT] = str(dt.subject)
-            data[DataTypeMetaData.KEY_TITLE] = dt_entity.display_name
-            data[DataTypeMetaData.KEY_RELEVANCY] = dt.visible
-            data[DataTypeMetaData.KEY_LINK] = dt.parent_operation.fk_launched_in != project.id
-
-            data[DataTypeMetaData.KEY_TAG_1] = dt.user_tag_1 if dt.user_tag_1 else ''
-            data[DataTypeMetaData.KEY_TAG_2] = dt.user_tag_2 if dt.user_tag_2 else ''
-            data[DataTypeMetaData.KEY_TAG_3] = dt.user_tag_3 if dt.user_tag_3 else ''
-            data[DataTypeMetaData.KEY_TAG_4] = dt.user_tag_4 if dt.user_tag_4 else ''
-            data[DataTypeMetaData.KEY_TAG_5] = dt.user_tag_5 if dt.user_tag_5 else ''
-
-            # Operation related fields:
-            operation_name = CommonDetails.compute_operation_name(
-                dt.parent_operation.algorithm.algo_group.group_category.displayname,
-                dt.parent_operation.algorithm.algo_group.displayname,
-                dt.parent_operation.algorithm.name)
-            data[DataTypeMetaData.KEY_OPERATION_TYPE] = operation_name
-            data[DataTypeMetaData.KEY_OPERATION_ALGORITHM] = dt.parent_operation.algorithm.name
-            data[DataTypeMetaData.KEY_AUTHOR] = dt.parent_operation.user.username
-            data[DataTypeMetaData.KEY_OPERATION_TAG] = group_op.name if is_group else dt.parent_operation.user_group
-            data[DataTypeMetaData.KEY_OP_GROUP_ID] = group_op.id if is_group else None
-
-            completion_date = dt.parent_operation.completion_date
-            string_year = completion_date.strftime(MONTH_YEAR_FORMAT) if completion_date is not None else ""
-            string_month = completion_date.strftime(DAY_MONTH_YEAR_FORMAT) if completion_date is not None else ""
-            data[DataTypeMetaData.KEY_DATE] = date2string(completion_date) if (completion_date is not None) else ''
-            data[DataTypeMetaData.KEY_CREATE_DATA_MONTH] = string_year
-            data[DataTypeMetaData.KEY_CREATE_DATA_DAY] = string_month
-
-            data[DataTypeMetaData.KEY_BURST] = dt._parent_burst.name if dt._parent_burst is not None else '-None-'
-
-            metadata_list.append(DataTypeMetaData(data, dt.invalid))
+            metadata_list.append(self._build_datatype_metadata(dt, project, dt.display_name))
 
         return StructureNode.metadata2tree(metadata_list, first_level, second_level, project.id, project.name)
 
 
+    def get_project_structure_level(self, project, visibility_filter, first_level, second_level, filter_value,
+                                    level=None, sublevel=None):
+        """
+        Lazy alternative to get_project_structure: build the JSON for a single level of the project tree.
+        With no level, the project root and first level folders are returned; with a level, the second level
+        folders under it; with both a level and a sublevel, the DataTypes in that folder.
+        Folders show the number of DataTypes under them.
+        """
+        if level is None or sublevel is None:
+            levels = self._get_structure_levels(project, visibility_filter, first_level, second_level, filter_value)
+            if level is None:
+                counts = dict((one_level, sum(sublevels.itervalues())) for one_level, sublevels in levels.iteritems())
+                return StructureNode.levels2json(counts, first_level, project.id, project_name=project.name)
+            return StructureNode.levels2json(levels.get(level, {}), second_level, project.id, parent_level=level)
+
+        column_filters = [self._structure_level_clause(first_level, level),
+                          self._structure_level_clause(second_level, sublevel)]
+        dt_list = dao.get_data_in_project_for_display(project.id, visibility_filter, filter_value, column_filters)
+        metadata_list = [self._build_datatype_metadata(dt, project, dt.display_name) for dt in dt_list]
+        return StructureNode.metadata2json(metadata_list, project.id)
+
+
+    def _get_structure_levels(self, project, visibility_filter, first_level, second_level, filter_value):
+        """
+        Count the DataTypes in a project by the two levels of the tree, with GROUP BY queries.
+        Results are cached until DataTypes and Links change in this process, or the number of DataTypes
+        or the largest DataType id change in DB (DataTypes stored or removed by other processes).
+
+        :returns: dictionary {level: {sublevel: count}}
+        """
+        filter_key = visibility_filter.get_sql_filter_equivalent() if visibility_filter else None
+        cache_key = (project.id, filter_key, first_level, second_level, filter_value)
+        datatypes_marker = dao.get_datatypes_marker()
+        cached = STRUCTURE_CACHE.get(cache_key)
+        if cached is not None and cached[0] == datatypes_marker:
+            return cached[1]
+
+        first_column, first_label = self._structure_level_column(first_level)
+        second_column, second_label = self._structure_level_column(second_level)
+        levels = {}
+        for first_value, second_value, count in dao.count_data_in_project_by_columns(project.id, first_column,
+                                                                                     second_column, visibility_filter,
+                                                                                     filter_value):
+            sublevels = levels.setdefault(first_label(first_value), {})
+            sublevel = second_label(second_value)
+            # Several DB values (e.g. days of the same month) can show under the same folder
+            sublevels[sublevel] = sublevels.get(sublevel, 0) + count
+
+        STRUCTURE_CACHE.put(cache_key, (datatypes_marker, levels))
+        return levels
+
+
+    def _structure_level_column(self, level_key):
+        """
+        :returns: the SqlAlchemy expression to group DataTypes by, for a tree level, and the function
+                  converting its values into the folder names (as displayed by get_project_structure)
+        """
+        if level_key in self.STRUCTURE_LEVEL_DATES:
+            date_format = self.STRUCTURE_LEVEL_DATES[level_key]
+            return func.date(model.Operation.completion_date), lambda value: self._format_day(value, date_format)
+        if level_key in self.STRUCTURE_LEVEL_COLUMNS:
+            column, null_value = self.STRUCTURE_LEVEL_COLUMNS[level_key]
+            return column, lambda value: str(null_value if value is None else value)
+        raise ProjectServiceException("Invalid level for the project tree: %s" % level_key)
+
+
+    @staticmethod
+    def _format_day(value, date_format):
+        """
+        Format a day, as read with SQL date(): a date for Postgres, a 'YYYY-MM-DD' string for SQLite.
+        """
+        if value is None:
+            return ''
+        if isinstance(value, basestring):
+            value = datetime.strptime(value[:10], "%Y-%m-%d")
+        return value.strftime(date_format)
+
+
+    def _structure_level_clause(self, level_key, value):
+        """
+        :returns: SqlAlchemy clause selecting the DataTypes displayed under `value`, for a tree level.
+        """
+        if level_key in self.STRUCTURE_LEVEL_DATES:
+            column = model.Operation.completion_date
+            if value == '':
+                return column == None
+            start = datetime.strptime(value, self.STRUCTURE_LEVEL_DATES[level_key])
+            if self.STRUCTURE_LEVEL_DATES[level_key] == MONTH_YEAR_FORMAT:
+                end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+            else:
+                end = start + timedelta(days=1)
+            return and_(column >= start, column < end)
+
+        if level_key not in self.STRUCTURE_LEVEL_COLUMNS:
+            raise ProjectServiceException("Invalid level for the project tree: %s" % level_key)
+        column, null_value = self.STRUCTURE_LEVEL_COLUMNS[level_key]
+        if value == str(null_value):
+            return or_(column == None, column == value)
+        return column == value
+
+
+    @staticmethod
+    def _build_datatype_metadata(dt, project, display_name=None):
+        """
+        Prepare a DT result from DB, for usage in controller, by converting it into a DataTypeMetaData object.
+        :param display_name: when None, the DataType is loaded again as its own class, to read it
+        """
+        data = {}
+        is_group = False
+        group_op = None
+        if display_name is None:
+            display_name = dao.get_datatype_by_gid(dt.gid).display_name
+        ## Filter by dt.type, otherwise Links to individual DT inside a group will be mistaken
+        if dt.type == "DataTypeGroup" and dt.parent_operation.operation_group is not None:
+            is_group = True
+            group_op = dt.parent_operation.operation_group
+
+        # All these fields are necessary here for dynamic Tree levels.
+        data[DataTypeMetaData.KEY_DATATYPE_ID] = dt.id
+        data[DataTypeMetaData.KEY_GID] = dt.gid
+        data[DataTypeMetaData.KEY_NODE_TYPE] = dt.type
+        data[DataTypeMetaData.KEY_STATE] = dt.state
+        data[DataTypeMetaData.KEY_SUBJECT] = str(dt.subject)
+        data[DataTypeMetaData.KEY_TITLE] = display_name
+        data[DataTypeMetaData.KEY_RELEVANCY] = dt.visible
+        data[DataTypeMetaData.KEY_LINK] = dt.parent_operation.fk_launched_in != project.id
+
+        data[DataTypeMetaData.KEY_TAG_1] = dt.user_tag_1 if dt.user_tag_1 else ''
+        data[DataTypeMetaData.KEY_TAG_2] = dt.user_tag_2 if dt.user_tag_2 else ''
+        data[DataTypeMetaData.KEY_TAG_3] = dt.user_tag_3 if dt.user_tag_3 else ''
+        data[DataTypeMetaData.KEY_TAG_4] = dt.user_tag_4 if dt.user_tag_4 else ''
+        data[DataTypeMetaData.KEY_TAG_5] = dt.user_tag_5 if dt.user_tag_5 else ''
+
+        # Operation related fields:
+        operation_name = CommonDetails.compute_operation_name(
+            dt.parent_operation.algorithm.algo_group.group_category.displayname,
+            dt.parent_operation.algorithm.algo_group.displayname,
+            dt.parent_operation.algorithm.name)
+        data[DataTypeMetaData.KEY_OPERATION_TYPE] = operation_name
+        data[DataTypeMetaData.KEY_OPERATION_ALGORITHM] = dt.parent_operation.algorithm.name
+        data[DataTypeMetaData.KEY_AUTHOR] = dt.parent_operation.user.username
+        data[DataTypeMetaData.KEY_OPERATION_TAG] = group_op.name if is_group else dt.parent_operation.user_group
+        data[DataTypeMetaData.KEY_OP_GROUP_ID] = group_op.id if is_group else None
+
+        completion_date = dt.parent_operation.completion_date
+        string_year = completion_date.strftime(MONTH_YEAR_FORMAT) if completion_date is not None else ""
+        string_month = completion_date.strftime(DAY_MONTH_YEAR_FORMAT) if completion_date is not None else ""
+        data[DataTypeMetaData.KEY_DATE] = date2string(completion_date) if (completion_date is not None) else ''
+        data[DataTypeMetaData.KEY_CREATE_DATA_MONTH] = string_year
+        data[DataTypeMetaData.KEY_CREATE_DATA_DAY] = string_month
+
+        data[DataTypeMetaData.KEY_BURST] = dt._parent_burst.name if dt._parent_burst is not None else '-None-'
+
+        return DataTypeMetaData(data, dt.invalid)
+
+
     @staticmethod
     def get_datatype_details(datatype_gid):
         """
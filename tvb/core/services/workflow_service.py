@@ -116,93 +116,173 @@ class WorkflowService:
         workflow_step.dynamic_param = dynamic_params
 
 
-    def prepare_next_step(self, last_executed_op_id):
+    @staticmethod
+    def get_step_dependencies(workflow_step):
+        """
+        :returns: set with the indexes of the steps (in the same workflow) whose results or inputs
+                  are referred through the dynamic parameters of the given workflow_step.
+        """
+        return set(entry[WorkflowStepConfiguration.STEP_INDEX_KEY] for entry in workflow_step.dynamic_param.values())
+
+
+    @staticmethod
+    def build_workflow_dag(workflow_steps):
+        """
+        Build the graph of dependencies between the steps of one workflow, from their dynamic parameters.
+        The first step (the simulation) is the root; steps without dynamic references hang directly from it.
+        A step can only depend on steps with a smaller index, thus the graph has no cycles.
+
+        :param workflow_steps: all WorkflowStep entities of a workflow
+        :returns: dictionary {step_index: set with the indexes of the steps it depends on}
+        """
+        step_indexes = set(step.step_index for step in workflow_steps)
+        if not step_indexes:
+            return {}
+        root_index = min(step_indexes)
+        dag = {}
+        for step in workflow_steps:
+            parents = set(idx for idx in WorkflowService.get_step_dependencies(step)
+                          if idx in step_indexes and idx < step.step_index)
+            if not parents and step.step_index != root_index:
+                parents.add(root_index)
+            dag[step.step_index] = parents
+        return dag
+
+
+    @staticmethod
+    def get_downstream_steps(dag, step_index):
         """
-        If the operation with id 'last_executed_op_id' resulted after
-        the execution of a workflow step then this method will launch
-        the operation corresponding to the next step from the workflow.
+        :returns: set with the indexes of all the steps which depend (directly or not) on the step with step_index.
+        """
+        downstream = set()
+        ## Parents always have smaller indexes, thus they are visited before their children.
+        for index in sorted(dag):
+            if step_index in dag[index] or dag[index] & downstream:
+                downstream.add(index)
+        return downstream
+
+
+    def prepare_next_steps(self, last_executed_op_id):
+        """
+        If the operation with id 'last_executed_op_id' resulted after the execution of a workflow step,
+        find all the steps in the same workflow whose inputs are now ready (all the steps they depend on
+        have finished), fill their dynamic parameters, and return their operations, to be launched concurrently.
+        When no step of the workflow is left to run, mark the workflow (and eventually the burst) as finished.
+
+        :returns: list with the ids of the operations to be launched next (possibly empty)
         """
         try:
-            current_step, next_workflow_step = self._get_data(last_executed_op_id)
-            if next_workflow_step is not None:
-                operation = dao.get_operation_by_id(next_workflow_step.fk_operation)
-                dynamic_param_names = next_workflow_step.dynamic_workflow_param_names
-                if len(dynamic_param_names) > 0:
-                    op_params = json.loads(operation.parameters)
-                    for param_name in dynamic_param_names:
-                        dynamic_param = op_params[param_name]
-                        former_step = dao.get_workflow_step_by_step_index(next_workflow_step.fk_workflow,
-                                                                          dynamic_param[
-                                                                              WorkflowStepConfiguration.STEP_INDEX_KEY])
-                        if type(dynamic_param[WorkflowStepConfiguration.DATATYPE_INDEX_KEY]) is IntType:
-                            datatypes = dao.get_results_for_operation(former_step.fk_operation)
-                            op_params[param_name] = datatypes[
-                                dynamic_param[WorkflowStepConfiguration.DATATYPE_INDEX_KEY]].gid
-                        else:
-                            previous_operation = dao.get_operation_by_id(former_step.fk_operation)
-                            op_params[param_name] = json.loads(previous_operation.parameters)[
-                                dynamic_param[WorkflowStepConfiguration.DATATYPE_INDEX_KEY]]
-                    operation.parameters = json.dumps(op_params)
-                    operation = dao.store_entity(operation)
-                return operation.id
-            elif current_step is not None:
-                current_workflow = dao.get_workflow_by_id(current_step.fk_workflow)
-                current_workflow.status = current_workflow.STATUS_FINISHED
-                dao.store_entity(current_workflow)
-                burst_entity = dao.get_burst_by_id(current_workflow.fk_burst)
-                parallel_workflows = dao.get_workflows_for_burst(burst_entity.id)
-                all_finished = True
-                for workflow in parallel_workflows:
-                    if workflow.status == workflow.STATUS_STARTED:
-                        all_finished = False
-                if all_finished:
-                    self.mark_burst_finished(burst_entity)
-            return None
+            executed_step = dao.get_workflow_step_for_operation(last_executed_op_id)
+            if executed_step is None:
+                return []
+            workflow_steps = dao.get_workflow_steps(executed_step.fk_workflow)
+            dag = self.build_workflow_dag(workflow_steps)
+            operations = dict((step.step_index, dao.get_operation_by_id(step.fk_operation))
+                              for step in workflow_steps if step.fk_operation is not None)
+            finished_steps = set(idx for idx, operation in operations.iteritems()
+                                 if operation.status == model.STATUS_FINISHED)
+
+            next_operation_ids = []
+            for step in workflow_steps:
+                operation = operations.get(step.step_index)
+                if (operation is None or operation.status != model.STATUS_PENDING
+                        or not dag[step.step_index] or not dag[step.step_index] <= finished_steps):
+                    continue
+                ## Another step finishing in the same time might have seen this one ready as well.
+                if dao.claim_pending_operation(operation.id):
+                    self._fill_dynamic_parameters(step, operation)
+                    next_operation_ids.append(operation.id)
+
+            if not next_operation_ids:
+                self._finish_workflow_when_done(executed_step.fk_workflow, workflow_steps)
+            return next_operation_ids
         except Exception, excep:
             self.logger.error(excep)
             self.logger.exception(excep)
             raise WorkflowInterStepsException(excep)
 
 
+    @staticmethod
+    def _fill_dynamic_parameters(workflow_step, operation):
+        """
+        Replace in the operation parameters the references towards previous steps,
+        with the actual GIDs resulted from those steps (or with their input values).
+        """
+        dynamic_param_names = workflow_step.dynamic_workflow_param_names
+        if len(dynamic_param_names) > 0:
+            op_params = json.loads(operation.parameters)
+            for param_name in dynamic_param_names:
+                dynamic_param = op_params[param_name]
+                former_step = dao.get_workflow_step_by_step_index(
+                    workflow_step.fk_workflow, dynamic_param[WorkflowStepConfiguration.STEP_INDEX_KEY])
+                if type(dynamic_param[WorkflowStepConfiguration.DATATYPE_INDEX_KEY]) is IntType:
+                    datatypes = dao.get_results_for_operation(former_step.fk_operation)
+                    op_params[param_name] = datatypes[dynamic_param[WorkflowStepConfiguration.DATATYPE_INDEX_KEY]].gid
+                else:
+                    previous_operation = dao.get_operation_by_id(former_step.fk_operation)
+                    op_params[param_name] = json.loads(previous_operation.parameters)[
+                        dynamic_param[WorkflowStepConfiguration.DATATYPE_INDEX_KEY]]
+            operation.parameters = json.dumps(op_params)
+            dao.store_entity(operation)
+
+
+    def _finish_workflow_when_done(self, workflow_id, workflow_steps):
+        """
+        When all the steps of a workflow are done, mark the workflow as finished.
+        When all the parallel workflows in the burst are finished, mark the burst too
+        (as error, when a failure was recorded on it while other steps were still running).
+        """
+        for step in workflow_steps:
+            if step.fk_operation is not None and not dao.get_operation_by_id(step.fk_operation).has_finished:
+                return
+        current_workflow = dao.get_workflow_by_id(workflow_id)
+        current_workflow.status = current_workflow.STATUS_FINISHED
+        dao.store_entity(current_workflow)
+
+        burst_entity = dao.get_burst_by_id(current_workflow.fk_burst)
+        if burst_entity.status != burst_entity.BURST_RUNNING:
+            return
+        parallel_workflows = dao.get_workflows_for_burst(burst_entity.id)
+        if all(workflow.status != workflow.STATUS_STARTED for workflow in parallel_workflows):
+            self.mark_burst_finished(burst_entity, error_message=burst_entity.error_message)
+
+
     def update_executed_workflow_state(self, operation):
         """
         Used for updating the state of an executed workflow.
         Only if the operation with the specified id has resulted after the execution
         of an ExecutedWorkflowStep than the state of the ExecutedWorkflow
         to which belongs the step will be updated.
+        For a failed step, only the steps depending on it are marked with error,
+        while the independent branches of the workflow continue their execution.
         """
-        executed_step, _ = self._get_data(operation.id)
-        if executed_step is not None:
-            if operation.status == model.STATUS_ERROR:
-                all_executed_steps = dao.get_workflow_steps(executed_step.fk_workflow)
-                for step in all_executed_steps:
-                    if step.step_index > executed_step.step_index:
-                        self.logger.debug("Marking unreached operation %s with error." % step.fk_operation)
-                        unreached_operation = dao.get_operation_by_id(step.fk_operation)
-                        self.persist_operation_state(unreached_operation, model.STATUS_ERROR,
-                                                     "Blocked by failure in step %s with message: \n\n%s." % (
-                                                         executed_step.step_index, operation.additional_info))
+        executed_step = dao.get_workflow_step_for_operation(operation.id)
+        if executed_step is None:
+            return
+        workflow_steps = dao.get_workflow_steps(executed_step.fk_workflow)
+        if operation.status == model.STATUS_ERROR:
+            downstream = self.get_downstream_steps(self.build_workflow_dag(workflow_steps), executed_step.step_index)
+            for step in workflow_steps:
+                if step.step_index not in downstream or step.fk_operation is None:
+                    continue
+                unreached_operation = dao.get_operation_by_id(step.fk_operation)
+                if unreached_operation.has_finished:
+                    continue
+                self.logger.debug("Marking unreached operation %s with error." % step.fk_operation)
+                self.persist_operation_state(unreached_operation, model.STATUS_ERROR,
+                                             "Blocked by failure in step %s with message: \n\n%s." % (
+                                                 executed_step.step_index, operation.additional_info))
 
+            ## The burst is marked as error only when its last step is done.
             workflow = dao.get_workflow_by_id(executed_step.fk_workflow)
             burst = dao.get_burst_by_id(workflow.fk_burst)
-            self.mark_burst_finished(burst, error_message=operation.additional_info)
-            dao.store_entity(burst)
+            if burst.error_message is None:
+                burst.error_message = operation.additional_info or "Step %s failed." % executed_step.step_index
+                dao.store_entity(burst)
+
+        self._finish_workflow_when_done(executed_step.fk_workflow, workflow_steps)
 
 
-    @staticmethod
-    def _get_data(operation_id):
-        """
-        For a given operation id, return the corresponding WorkflowStep and the NextWorkflowStep to be executed.
-        """
-        executed_step = dao.get_workflow_step_for_operation(operation_id)
-        if executed_step is not None:
-            next_workflow_step = dao.get_workflow_step_by_step_index(executed_step.fk_workflow,
-                                                                     executed_step.step_index + 1)
-            return executed_step, next_workflow_step
-        else:
-            return None, None
-        
-        
     def mark_burst_finished(self, burst_entity, burst_status=None, error_message=None):
         """
         Mark Burst status field.
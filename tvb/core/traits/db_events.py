@@ -33,8 +33,10 @@ Python Triggers on DB operations.
 .. moduleauthor:: Lia Domide <lia.domide@codemart.ro>
 """
 
-from sqlalchemy import event
+from sqlalchemy import event, and_, func, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import mapper
+from sqlalchemy.orm.attributes import get_history
 from tvb.basic.logger.builder import get_logger
 from tvb.basic.traits.types_basic import MapAsJson
 from tvb.basic.traits.types_mapped import MappedType
@@ -45,6 +47,17 @@ LOG = get_logger(__name__)
 # Refer SQLalchemy specific events
 EVENT_LOAD = 'load'
 EVENT_BEFORE_INSERT = 'before_insert'
+EVENT_AFTER_INSERT = 'after_insert'
+EVENT_AFTER_UPDATE = 'after_update'
+EVENT_AFTER_DELETE = 'after_delete'
+EVENT_AFTER_BULK_UPDATE = 'after_bulk_update'
+EVENT_AFTER_BULK_DELETE = 'after_bulk_delete'
+EVENT_COMMIT = 'commit'
+EVENT_ROLLBACK = 'rollback'
+# Whether the table of the per project operation counters was found in DB (see status_counters_available)
+_STATUS_COUNTERS_FOUND = False
+# Key, in the DB connection info, for the status transitions waiting for the transaction to end
+KEY_STATUS_EVENTS = 'tvb_status_events'
 
 
 def initialize_on_load(target, _):
@@ -120,6 +133,186 @@ def fill_before_insert(_, _ignored, target):
                                 
 
 
+
+def status_counters_available(connection):
+    """
+    The OPERATION_STATUS_COUNTERS table is created by DB script 018, thus it is missing on a DB not upgraded
+    that far (DB_STRUCTURE_VERSION below 18). Until then, counters are neither kept nor read.
+    Once found, the table is not checked again.
+    """
+    global _STATUS_COUNTERS_FOUND
+    if not _STATUS_COUNTERS_FOUND:
+        from tvb.core.entities.model import OperationStatusCount
+        _STATUS_COUNTERS_FOUND = OperationStatusCount.__table__.exists(bind=connection)
+    return _STATUS_COUNTERS_FOUND
+
+
+
+def _change_status_counter(connection, project_id, status, delta, create_missing=True):
+    """
+    Add `delta` to the number of operations with `status` in project `project_id`,
+    on the same connection (thus transaction) which is storing the operation.
+    A missing counter row is inserted in a SAVEPOINT: when a concurrent transaction inserted it first,
+    the unique constraint rejects ours, and the UPDATE is retried on the row now existing.
+    SQLite allows a single writer at a time, thus the race can not happen there.
+    """
+    if project_id is None or status is None or not status_counters_available(connection):
+        return
+    from tvb.core.entities.model import OperationStatusCount
+    table = OperationStatusCount.__table__
+    update = table.update().where(and_(table.c.fk_project == project_id, table.c.status == status)
+                                  ).values(count=table.c.count + delta)
+    result = connection.execute(update)
+    if result.rowcount > 0 or not create_missing:
+        return
+    insert = table.insert().values(fk_project=project_id, status=status, count=max(delta, 0))
+    if connection.dialect.name == 'sqlite':
+        connection.execute(insert)
+        return
+    savepoint = connection.begin_nested()
+    try:
+        connection.execute(insert)
+        savepoint.commit()
+    except IntegrityError:
+        savepoint.rollback()
+        connection.execute(update)
+
+
+
+def recount_status_counters(connection, project_ids=None):
+    """
+    Count again the operations per project and status, and repair the counters which drifted.
+    Counter rows are locked before counting, thus concurrent triggers wait for the repair to commit,
+    and then add their change over it, instead of getting overwritten.
+
+    :param project_ids: projects to repair, or None for all of them
+    :returns: number of counters which had drifted
+    """
+    if not status_counters_available(connection):
+        return 0
+    from tvb.core.entities.model import Operation, OperationStatusCount
+    counters = OperationStatusCount.__table__
+    operations = Operation.__table__
+    counters_query = select([counters.c.id, counters.c.fk_project, counters.c.status, counters.c.count],
+                            for_update=True)
+    stats_query = select([operations.c.fk_launched_in, operations.c.status, func.count(operations.c.id)],
+                         operations.c.fk_launched_in != None)
+    if project_ids is not None:
+        counters_query = counters_query.where(counters.c.fk_project.in_(project_ids))
+        stats_query = stats_query.where(operations.c.fk_launched_in.in_(project_ids))
+
+    current = connection.execute(counters_query).fetchall()
+    expected = {}
+    for project_id, status, count in connection.execute(stats_query.group_by(operations.c.fk_launched_in,
+                                                                             operations.c.status)):
+        expected[(project_id, status)] = count
+
+    repaired = 0
+    for counter_id, project_id, status, count in current:
+        expected_count = expected.pop((project_id, status), 0)
+        if count != expected_count:
+            connection.execute(counters.update().where(counters.c.id == counter_id).values(count=expected_count))
+            repaired += 1
+    for (project_id, status), count in expected.iteritems():
+        _change_status_counter(connection, project_id, status, count)
+        repaired += 1
+    return repaired
+
+
+
+def count_project_insert(_, connection, target):
+    """
+    Trigger after a Project is stored: prepare its operation counters, so that
+    concurrent operations only need to update them.
+    """
+    from tvb.core.entities.model import ALL_STATUSES
+    for status in ALL_STATUSES:
+        _change_status_counter(connection, target.id, status, 0)
+
+
+
+def count_operation_insert(_, connection, target):
+    """Trigger after an Operation is stored for the first time: count it under its project and status."""
+    _change_status_counter(connection, target.fk_launched_in, target.status, 1)
+
+
+
+def count_operation_update(_, connection, target):
+    """
+    Trigger after an Operation is updated: move it between status counters, when its status (or project) changed.
+    """
+    status_history = get_history(target, 'status')
+    project_history = get_history(target, 'fk_launched_in')
+    if not status_history.has_changes() and not project_history.has_changes():
+        return
+    old_status = status_history.deleted[0] if status_history.has_changes() else target.status
+    old_project = project_history.deleted[0] if project_history.has_changes() else target.fk_launched_in
+    if ((status_history.has_changes() and not status_history.deleted)
+            or (project_history.has_changes() and not project_history.deleted)):
+        ## Previous value was not loaded; the periodic reconciliation will repair the counters.
+        LOG.debug("Unknown previous status for operation %s, counters not updated" % target.id)
+        return
+    _change_status_counter(connection, old_project, old_status, -1, create_missing=False)
+    _change_status_counter(connection, target.fk_launched_in, target.status, 1)
+
+
+
+def count_operation_delete(_, connection, target):
+    """
+    Trigger after an Operation is removed. The counter row is not re-created when missing,
+    as the whole project might be under removal, in the same transaction.
+    """
+    _change_status_counter(connection, target.fk_launched_in, target.status, -1, create_missing=False)
+
+
+
+
+def recount_after_bulk_change(session, query, _, result):
+    """
+    Trigger after a bulk query.update() or query.delete(), which skips the mapper events above:
+    when it changed Operations, count again those of the projects still matched by the query
+    (or of all projects, when none is matched any more), in the same transaction.
+    """
+    from tvb.core.entities.model import Operation
+    if not result.rowcount or not any(column['type'] is Operation for column in query.column_descriptions):
+        return
+    project_ids = [row[0] for row in query.with_entities(Operation.fk_launched_in).distinct().all()]
+    recount_status_counters(session.connection(), project_ids or None)
+
+
+
+def queue_status_event(_, connection, target):
+    """
+    Trigger after an Operation or a BurstConfiguration is stored: when its status changed,
+    remember the transition, to be published when the transaction commits.
+    """
+    if not get_history(target, 'status').has_changes():
+        return
+    from tvb.core.entities import model
+    from tvb.core.services.event_bus import KIND_OPERATION, KIND_BURST
+    if isinstance(target, model.Operation):
+        event_details = (target.fk_launched_in, KIND_OPERATION, target.id, target.status)
+    else:
+        event_details = (target.fk_project, KIND_BURST, target.id, target.status)
+    connection.info.setdefault(KEY_STATUS_EVENTS, []).append(event_details)
+
+
+
+def publish_status_events(connection):
+    """Trigger on transaction commit: publish the status transitions stored by it."""
+    status_events = connection.info.pop(KEY_STATUS_EVENTS, None)
+    if status_events:
+        from tvb.core.services.event_bus import STATUS_EVENT_BUS
+        for project_id, kind, entity_id, status in status_events:
+            STATUS_EVENT_BUS.publish(project_id, kind, entity_id, status)
+
+
+
+def discard_status_events(connection):
+    """Trigger on transaction rollback: forget the transitions which were not stored."""
+    connection.info.pop(KEY_STATUS_EVENTS, None)
+
+
  
 def attach_db_events():   
     """
@@ -128,6 +321,30 @@ def attach_db_events():
     event.listen(mapper, EVENT_LOAD, initialize_on_load)
     event.listen(mapper, EVENT_BEFORE_INSERT, fill_before_insert)
 
+    ## Cached project trees become stale when DataTypes or Links change
+    from tvb.core.entities import model
+    from tvb.core.entities.transient.structure_entities import STRUCTURE_CACHE
+    for entity in [model.DataType, model.Links]:
+        for event_name in [EVENT_AFTER_INSERT, EVENT_AFTER_UPDATE, EVENT_AFTER_DELETE]:
+            event.listen(entity, event_name, STRUCTURE_CACHE.invalidate, propagate=True)
+
+    ## Keep per project operation status counters current
+    event.listen(model.Project, EVENT_AFTER_INSERT, count_project_insert)
+    event.listen(model.Operation, EVENT_AFTER_INSERT, count_operation_insert)
+    event.listen(model.Operation, EVENT_AFTER_UPDATE, count_operation_update)
+    event.listen(model.Operation, EVENT_AFTER_DELETE, count_operation_delete)
+    from tvb.core.entities.storage.session_maker import SA_SESSIONMAKER
+    event.listen(SA_SESSIONMAKER, EVENT_AFTER_BULK_UPDATE, recount_after_bulk_change)
+    event.listen(SA_SESSIONMAKER, EVENT_AFTER_BULK_DELETE, recount_after_bulk_change)
+
+    ## Notify about Operation and Burst status transitions, once they are committed
+    from tvb.core.entities.storage.session_maker import DB_ENGINE
+    for entity in [model.Operation, model.BurstConfiguration]:
+        for event_name in [EVENT_AFTER_INSERT, EVENT_AFTER_UPDATE]:
+            event.listen(entity, event_name, queue_status_event)
+    event.listen(DB_ENGINE, EVENT_COMMIT, publish_status_events)
+    event.listen(DB_ENGINE, EVENT_ROLLBACK, discard_status_events)
+
 
 
 
@@ -171,12 +171,15 @@ class MappedType(model.DataType, mapped.MappedTypeLight):
                                               (self.__class__.__name__, key))
 
 
-    def set_operation_id(self, operation_id):
+    def set_operation_id(self, operation_id, parent_project=None):
         """
         Setter for FK_operation_id.
+
+        :param parent_project: Project of the operation, when already known by the caller (avoids a DB query).
         """
         self.fk_from_operation = operation_id
-        parent_project = dao.get_project_for_operation(operation_id)
+        if parent_project is None:
+            parent_project = dao.get_project_for_operation(operation_id)
         self.storage_path = FilesHelper().get_project_folder(parent_project, str(operation_id))
         self._storage_manager = None
 
@@ -33,6 +33,7 @@
 """
 
 import os
+import re
 import csv
 import sys
 import json
@@ -40,6 +41,7 @@ import datetime
 import uuid
 import urllib
 import numpy
+from cStringIO import StringIO
 from tvb.basic.profile import TvbProfile
 from tvb.basic.logger.builder import get_logger
 from tvb.core.decorators import user_environment_execution
@@ -130,7 +132,124 @@ def store_list_data(data_list, file_name, storage_folder, overwrite=False):
     return file_name
 
 
-################## FILE related methods end here ###############  
+TEXT_MATRIX_BLOCK_SIZE = 8 * 1024 * 1024
+# Single line arguments looking like a path (see _is_text_matrix_path)
+_TEXT_MATRIX_PATH = re.compile(r'[/\\]|\.[A-Za-z]\w*$')
+
+
+
+def _is_text_matrix_path(source):
+    """
+    A single line argument containing a folder separator or ending in a file extension is a path,
+    unless it parses as numbers (e.g. "3 1.e5" ends like an extension).
+    """
+    if not _TEXT_MATRIX_PATH.search(source):
+        return False
+    try:
+        [float(token) for token in source.split('#', 1)[0].split()]
+        return False
+    except ValueError:
+        return True
+
+
+
+def count_text_rows(content):
+    """
+    Upper bound for the number of rows in a text matrix (blank lines are counted too).
+    """
+    if not content:
+        return 0
+    return content.count('\n') + (0 if content.endswith('\n') else 1)
+
+
+
+def _count_line_values(block):
+    """
+    Number of white-space separated values on each non-blank line of a text block, computed without splitting it.
+    """
+    chars = numpy.frombuffer(block, dtype=numpy.uint8)
+    new_lines = chars == 10
+    blanks = new_lines | (chars == 32) | (chars == 9) | (chars == 13)
+    value_starts = ~blanks
+    value_starts[1:] &= blanks[:-1]
+    counts = numpy.bincount(numpy.cumsum(new_lines)[value_starts])
+    return counts[counts > 0]
+
+
+
+def read_text_matrix(source, dtype=numpy.float64, columns=None, out=None, block_size=TEXT_MATRIX_BLOCK_SIZE):
+    """
+    Fast replacement for numpy.loadtxt, for large, white-space separated, numeric 2D text matrices.
+    Content is parsed in blocks of whole lines with numpy.fromstring, directly into a preallocated result.
+    Blocks which can not be parsed this way (comments, ragged lines) fall back to numpy.loadtxt.
+
+    :param source: a file path, a file-like object or the already read text content
+    :param dtype: numeric type of the result
+    :param columns: expected number of columns; when None it is detected from the first non-empty line
+    :param out: optional 2D array to write into; it should have at least `count_text_rows(content)` rows
+    :returns: 2D array with the rows read (a view over `out`, when `out` is given)
+    :raises IOError: when `source` is the path of a missing file
+    :raises ValueError: when the rows do not all have the same number of columns
+    """
+    if isinstance(source, basestring) and '\n' not in source and os.path.isfile(source):
+        with open(source, 'rb') as file_:
+            content = file_.read()
+    elif isinstance(source, basestring) and '\n' not in source and _is_text_matrix_path(source):
+        raise IOError("File %s does not exist." % source)
+    elif hasattr(source, 'read'):
+        content = source.read()
+    else:
+        content = source
+
+    if columns is None:
+        columns = 0
+        for line in StringIO(content):
+            tokens = line.split('#', 1)[0].split()
+            if tokens:
+                columns = len(tokens)
+                break
+    if out is None:
+        out = numpy.empty((count_text_rows(content), columns), dtype=dtype)
+    if columns == 0:
+        return out[:0]
+
+    rows = 0
+    start = 0
+    length = len(content)
+    while start < length:
+        end = content.rfind('\n', start, start + block_size) + 1 if start + block_size < length else length
+        if end <= start:
+            # A single line is longer than the block size
+            end = content.find('\n', start + block_size) + 1 or length
+        block = content[start:end]
+        start = end
+        if not block.strip():
+            continue
+
+        values = None
+        if '#' not in block:
+            line_values = _count_line_values(block)
+            block_rows = len(line_values)
+            if numpy.all(line_values == columns):
+                try:
+                    values = numpy.fromstring(block, dtype=dtype, sep=' ')
+                except ValueError:
+                    # Newer numpy versions raise instead of returning the partially parsed content
+                    values = None
+        if values is not None and values.size == block_rows * columns:
+            out[rows:rows + block_rows] = values.reshape((block_rows, columns))
+        else:
+            values = numpy.loadtxt(StringIO(block), dtype=dtype, ndmin=2)
+            if values.shape[1] != columns:
+                raise ValueError("Expected %d columns, but found %d." % (columns, values.shape[1]))
+            block_rows = values.shape[0]
+            out[rows:rows + block_rows] = values
+        rows += block_rows
+
+    return out[:rows]
+
+
+################## FILE related methods end here ###############
 
 
 ################## CONVERT related methods start here ###############
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Command line of the benchmark suite (see the package documentation).
+"""
+
+import sys
+import argparse
+
+
+GROUPS = ["storage", "analyzers", "projects", "web", "simulations"]
+
+
+
+def _parse_tolerances(values):
+    tolerances = {}
+    for value in values or []:
+        name, tolerance = value.split("=")
+        tolerances[name] = float(tolerance)
+    return tolerances
+
+
+
+def run(arguments):
+    from tvb.basic.profile import TvbProfile
+    TvbProfile.set_profile(TvbProfile.COMMAND_PROFILE)
+    from tvb.interfaces.command.benchmark.suite import BenchmarkContext, BenchmarkRunner, write_results
+
+    benchmarks = []
+    for group in arguments.groups.split(","):
+        module = __import__("tvb.interfaces.command.benchmark." + group, globals(), locals(), ["BENCHMARKS"])
+        benchmarks.extend(module.BENCHMARKS)
+
+    context = BenchmarkContext(web_url=arguments.web_url, web_user=arguments.web_user,
+                               web_password=arguments.web_password)
+    try:
+        results = BenchmarkRunner(context, arguments.repeat, arguments.warmup).run(benchmarks)
+    finally:
+        context.cleanup()
+    write_results(results, arguments.output)
+
+    for name, result in sorted(results['results'].iteritems()):
+        if 'error' in result:
+            print "%-60s FAILED: %s" % (name, result['error'])
+        else:
+            print "%-60s median %10.4f s   p95 %10.4f s" % (name, result['median'], result['p95'])
+    print "Results written in " + arguments.output
+    return 0
+
+
+
+def compare(arguments):
+    from tvb.interfaces.command.benchmark.suite import read_results
+    from tvb.interfaces.command.benchmark.compare import compare_results, format_comparison, has_regressions
+
+    rows = compare_results(read_results(arguments.baseline), read_results(arguments.current),
+                           arguments.tolerance, _parse_tolerances(arguments.group_tolerance),
+                           arguments.statistic, arguments.min_delta)
+    print format_comparison(rows)
+    return 1 if has_regressions(rows) else 0
+
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="python -m tvb.interfaces.command.benchmark")
+    commands = parser.add_subparsers()
+
+    run_parser = commands.add_parser("run", help="run benchmarks, and write their results as JSON")
+    run_parser.add_argument("--groups", default=",".join(GROUPS),
+                            help="comma separated benchmark groups, from: " + ", ".join(GROUPS))
+    run_parser.add_argument("--repeat", type=int, help="overwrite the number of measured repetitions")
+    run_parser.add_argument("--warmup", type=int, help="overwrite the number of warm-up repetitions")
+    run_parser.add_argument("--output", default="benchmark_results.json")
+    run_parser.add_argument("--web-url", help="URL of a running TVB web server, for the web group")
+    run_parser.add_argument("--web-user")
+    run_parser.add_argument("--web-password")
+    run_parser.set_defaults(command=run)
+
+    compare_parser = commands.add_parser("compare", help="compare results against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=0.1,
+                                help="accepted relative slow-down (default 0.1, for 10%%)")
+    compare_parser.add_argument("--group-tolerance", action="append", metavar="NAME=TOLERANCE",
+                                help="tolerance for a group or a single benchmark; can be repeated")
+    compare_parser.add_argument("--statistic", default="median", choices=["median", "mean", "p90", "p95", "min"])
+    compare_parser.add_argument("--min-delta", type=float, default=0.001,
+                                help="differences under this number of seconds are ignored")
+    compare_parser.set_defaults(command=compare)
+
+    arguments = parser.parse_args(argv)
+    return arguments.command(arguments)
+
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
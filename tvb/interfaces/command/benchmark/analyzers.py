@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Analyzers launched on the region TimeSeries resulted from a simulation.
+"""
+
+from tvb.core.entities import model
+from tvb.core.entities.storage import dao
+from tvb.interfaces.command import lab
+from tvb.interfaces.command.benchmark.suite import Benchmark
+
+
+
+class AnalyzerBenchmark(Benchmark):
+    """
+    Launch each analyzer as an operation; the measured time is the duration of the operation.
+    """
+    group = "analyzers"
+    repeat = 3
+    warmup = 0
+    ANALYZERS = [("tvb.adapters.analyzers.fourier_adapter", "FourierAdapter"),
+                 ("tvb.adapters.analyzers.node_covariance_adapter", "NodeCovarianceAdapter"),
+                 ("tvb.adapters.analyzers.node_coherence_adapter", "NodeCoherenceAdapter"),
+                 ("tvb.adapters.analyzers.cross_correlation_adapter", "CrossCorrelateAdapter"),
+                 ("tvb.adapters.analyzers.pca_adapter", "PCAAdapter")]
+    SIMULATION_LENGTH = 4000
+
+
+    def setup(self, context):
+        connectivity = context.get_connectivities()[0]
+        operation = lab.fire_simulation(context.get_project().id, connectivity=connectivity.gid,
+                                        simulation_length=str(self.SIMULATION_LENGTH))
+        operation = self._wait(operation)
+        self.time_series = [datatype for datatype in dao.get_results_for_operation(operation.id)
+                            if datatype.type.startswith("TimeSeries")][0]
+
+
+    def get_cases(self, context):
+        return [(class_name, {'module': module, 'class': class_name, 'time_series': self.time_series.gid})
+                for module, class_name in self.ANALYZERS]
+
+
+    def measure(self, context, params):
+        operation = lab.fire_operation(context.get_project().id, params['module'], params['class'],
+                                       time_series=params['time_series'])
+        operation = self._wait(operation)
+        return (operation.completion_date - operation.start_date).total_seconds()
+
+
+    @staticmethod
+    def _wait(operation):
+        operation = lab.wait_for_operation(operation)
+        if operation.status != model.STATUS_FINISHED:
+            raise Exception('operation failed: ' + operation.additional_info)
+        return operation
+
+
+
+BENCHMARKS = [AnalyzerBenchmark()]
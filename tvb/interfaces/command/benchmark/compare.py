@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Compare benchmark results against a stored baseline, and flag the regressions.
+"""
+
+
+STATUS_OK = "ok"
+STATUS_REGRESSION = "REGRESSION"
+STATUS_IMPROVED = "improved"
+STATUS_FAILED = "FAILED"
+STATUS_NEW = "new"
+STATUS_MISSING = "missing"
+
+## Statuses for which the compare command fails.
+FAILING_STATUSES = (STATUS_REGRESSION, STATUS_FAILED)
+
+
+
+def get_tolerance(name, group, tolerance, tolerances):
+    """
+    :returns: the tolerance for a benchmark: given for its name, else for its group, else the default one.
+    """
+    tolerances = tolerances or {}
+    if name in tolerances:
+        return tolerances[name]
+    return tolerances.get(group, tolerance)
+
+
+
+def compare_results(baseline, current, tolerance=0.1, tolerances=None, statistic='median', min_delta=0.0):
+    """
+    Compare two results dictionaries (as written by the benchmark runner).
+
+    :param tolerance: relative slow-down accepted, e.g. 0.1 for 10%
+    :param tolerances: dictionary {benchmark name or group: tolerance}, overwriting the default one
+    :param statistic: the value compared (median, mean, p90, p95, min or max)
+    :param min_delta: absolute difference (in seconds) under which changes are ignored, for very short cases
+    :returns: list of dictionaries {name, status, baseline, current, ratio}, sorted by name
+    """
+    baseline_results = baseline['results']
+    current_results = current['results']
+    rows = []
+    for name in sorted(set(baseline_results) | set(current_results)):
+        old = baseline_results.get(name)
+        new = current_results.get(name)
+        row = {'name': name, 'baseline': None, 'current': None, 'ratio': None}
+        if old is not None and statistic in old:
+            row['baseline'] = old[statistic]
+        if new is not None and statistic in new:
+            row['current'] = new[statistic]
+
+        if new is None:
+            row['status'] = STATUS_MISSING
+        elif row['current'] is None:
+            row['status'] = STATUS_FAILED
+        elif row['baseline'] is None:
+            row['status'] = STATUS_NEW
+        else:
+            allowed = get_tolerance(name, new.get('group'), tolerance, tolerances)
+            difference = row['current'] - row['baseline']
+            threshold = max(row['baseline'] * allowed, min_delta)
+            if row['baseline'] > 0:
+                row['ratio'] = row['current'] / row['baseline']
+            if difference > threshold:
+                row['status'] = STATUS_REGRESSION
+            elif -difference > threshold:
+                row['status'] = STATUS_IMPROVED
+            else:
+                row['status'] = STATUS_OK
+        rows.append(row)
+    return rows
+
+
+
+def has_regressions(rows):
+    return any(row['status'] in FAILING_STATUSES for row in rows)
+
+
+
+def format_comparison(rows):
+    """
+    :returns: text table with one line for each compared benchmark.
+    """
+    name_width = max([len("Benchmark")] + [len(row['name']) for row in rows])
+    line_format = "%-" + str(name_width) + "s %12s %12s %8s  %s"
+    lines = [line_format % ("Benchmark", "Baseline (s)", "Current (s)", "Ratio", "Status")]
+    for row in rows:
+        lines.append(line_format % (row['name'], _format_number(row['baseline'], "%.4f"),
+                                    _format_number(row['current'], "%.4f"),
+                                    _format_number(row['ratio'], "%.2f"), row['status']))
+    return "\n".join(lines)
+
+
+
+def _format_number(value, number_format):
+    if value is None:
+        return "-"
+    return number_format % value
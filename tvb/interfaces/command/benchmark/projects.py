@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Export and import of a project holding the connectivities of tvb_data.
+"""
+
+import os
+import time
+import shutil
+from datetime import datetime
+from tvb.adapters.exporters.export_manager import ExportManager
+from tvb.core.services.import_service import ImportService
+from tvb.core.services.project_service import ProjectService
+from tvb.interfaces.command import lab
+from tvb.interfaces.command.benchmark.suite import Benchmark, BenchmarkContext
+
+
+
+class ProjectBenchmark(Benchmark):
+    """
+    Export (sequential and parallel) a dedicated project, and import it back.
+    Each import creates a new project, removed after the measurement.
+    """
+    group = "projects"
+    repeat = 3
+
+
+    def setup(self, context):
+        self.project = lab.new_project("benchmark_export_%s" % datetime.now())
+        for zip_path in BenchmarkContext.get_connectivity_zips():
+            lab.import_conn_zip(self.project.id, zip_path)
+        self.exported_zip = ExportManager().export_project(self.project)
+        ProjectService().remove_project(self.project.id)
+
+
+    def get_cases(self, context):
+        return [("import", {'operation': 'import'}),
+                ("export", {'operation': 'export', 'parallel': False}),
+                ("export_parallel", {'operation': 'export', 'parallel': True})]
+
+
+    def measure(self, context, params):
+        import_service = ImportService()
+        start = time.time()
+        import_service.import_project_structure(self.exported_zip, self.project.fk_admin)
+        duration = time.time() - start
+        project = import_service.created_projects[0]
+
+        if params['operation'] == 'export':
+            start = time.time()
+            exported_zip = ExportManager().export_project(project, parallel=params['parallel'])
+            duration = time.time() - start
+            shutil.rmtree(os.path.dirname(exported_zip))
+
+        ProjectService().remove_project(project.id)
+        return duration
+
+
+    def teardown(self, context):
+        shutil.rmtree(os.path.dirname(self.exported_zip), ignore_errors=True)
+
+
+
+BENCHMARKS = [ProjectBenchmark()]
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Standardized simulations, on the connectivities with 68, 96 and 190 regions.
+"""
+
+from tvb.core.entities import model
+from tvb.interfaces.command import lab
+from tvb.interfaces.command.benchmark.suite import Benchmark
+
+
+
+class SimulationBenchmark(Benchmark):
+    """
+    Simulations for all the combinations of the given models, connectivities, simulation lengths,
+    integration steps and conduction speeds. The measured time is the duration of the operation.
+    """
+    group = "simulations"
+    repeat = 1
+    warmup = 0
+
+
+    def __init__(self, model_kws, conductions, int_dts, sim_lengths):
+        self.model_kws = model_kws
+        self.conductions = conductions
+        self.int_dts = int_dts
+        self.sim_lengths = sim_lengths
+
+
+    def get_cases(self, context):
+        cases = []
+        for model_kw in self.model_kws:
+            for conn in context.get_connectivities():
+                for length in self.sim_lengths:
+                    for int_dt in self.int_dts:
+                        for conduction in self.conductions:
+                            params = dict(model_kw, connectivity=conn.gid, nodes=conn.number_of_regions,
+                                          simulation_length=length, dt=int_dt, conduction_speed=conduction)
+                            name = "%s_%dnodes_%gms_dt%g_speed%g" % (model_kw['model'], conn.number_of_regions,
+                                                                     length, int_dt, conduction)
+                            cases.append((name, params))
+        return cases
+
+
+    def measure(self, context, params):
+        launch_args = dict((key, params[key]) for key in ("model", "coupling") if key in params)
+        launch_args.update({"connectivity": params["connectivity"],
+                            "simulation_length": str(params["simulation_length"]),
+                            "integrator": "HeunDeterministic",
+                            "integrator_parameters_option_HeunDeterministic_dt": str(params["dt"]),
+                            "conduction_speed": str(params["conduction_speed"])})
+        operation = lab.wait_for_operation(lab.fire_simulation(context.get_project().id, **launch_args))
+        if operation.status != model.STATUS_FINISHED:
+            raise Exception('simulation failed: ' + operation.additional_info)
+        return (operation.completion_date - operation.start_date).total_seconds()
+
+
+
+BENCHMARKS = [
+    SimulationBenchmark(model_kws=[{"model": "Generic2dOscillator"}, {"model": "Epileptor"}],
+                        conductions=[30.0, 3.0], int_dts=[0.1, 0.05], sim_lengths=[1000]),
+    SimulationBenchmark(model_kws=[{"model": "LarterBreakspear", "coupling": "HyperbolicTangent"}],
+                        conductions=[10.0], int_dts=[0.2, 0.1], sim_lengths=[10000])
+]
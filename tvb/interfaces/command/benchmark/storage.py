@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Micro-benchmarks for the HDF5 storage: the append pattern of the simulator monitors, the read patterns
+of the viewers, and the metadata writes done for each stored DataType.
+"""
+
+import os
+import time
+import numpy
+from tvb.core.entities.file.hdf5_storage_manager import HDF5StorageManager
+from tvb.interfaces.command.benchmark.suite import Benchmark
+
+
+## Shape of a region level TimeSeries: (time, state variables, nodes, modes), as written by the simulator.
+TIME_STEPS = 5000
+SAMPLE_SHAPE = (1, 4, 190, 1)
+DATASET = "data"
+
+
+
+def _new_storage(context, file_name):
+    file_path = os.path.join(context.temp_folder, file_name)
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    return HDF5StorageManager(context.temp_folder, file_name)
+
+
+
+class AppendBenchmark(Benchmark):
+    """
+    Grow a dataset along the time dimension, in blocks of a few time steps (as monitors do).
+    """
+    group = "storage"
+
+
+    def get_cases(self, context):
+        return [("append_%d_steps_per_block" % block, {'block': block}) for block in (1, 10, 100)]
+
+
+    def measure(self, context, params):
+        block = numpy.random.random((params['block'],) + SAMPLE_SHAPE[1:])
+        storage = _new_storage(context, "append.h5")
+        start = time.time()
+        for _ in xrange(TIME_STEPS / params['block']):
+            storage.append_data(DATASET, block, grow_dimension=0, close_file=False)
+        storage.close_file()
+        return time.time() - start
+
+
+
+class ReadBenchmark(Benchmark):
+    """
+    Read a stored TimeSeries: entirely, in consecutive time windows (one request each, as the animated viewers
+    do), and a single node for all time steps (as the time-line viewers do).
+    """
+    group = "storage"
+    FILE_NAME = "read.h5"
+    WINDOW = 100
+
+
+    def setup(self, context):
+        storage = _new_storage(context, self.FILE_NAME)
+        storage.store_data(DATASET, numpy.random.random((TIME_STEPS,) + SAMPLE_SHAPE[1:]))
+
+
+    def get_cases(self, context):
+        return [("read_full", {'pattern': 'full'}),
+                ("read_time_windows_of_%d" % self.WINDOW, {'pattern': 'windows'}),
+                ("read_single_node", {'pattern': 'node'})]
+
+
+    def measure(self, context, params):
+        storage = HDF5StorageManager(context.temp_folder, self.FILE_NAME)
+        start = time.time()
+        if params['pattern'] == 'full':
+            storage.get_data(DATASET)
+        elif params['pattern'] == 'windows':
+            for window_start in xrange(0, TIME_STEPS, self.WINDOW):
+                storage.get_data(DATASET, (slice(window_start, window_start + self.WINDOW),))
+        else:
+            storage.get_data(DATASET, (slice(None), slice(0, 1), slice(5, 6), slice(None)))
+        return time.time() - start
+
+
+
+class MetadataBenchmark(Benchmark):
+    """
+    Write and read metadata on the root node and on a dataset, one key at a time (as done while storing traits).
+    """
+    group = "storage"
+    KEYS = 100
+
+
+    def get_cases(self, context):
+        return [("metadata_write_%d_keys" % self.KEYS, {'operation': 'write'}),
+                ("metadata_read_%d_keys" % self.KEYS, {'operation': 'read'})]
+
+
+    def measure(self, context, params):
+        if params['operation'] == 'write':
+            storage = _new_storage(context, "metadata.h5")
+            storage.store_data(DATASET, numpy.zeros((10, 10)))
+            start = time.time()
+            for idx in xrange(self.KEYS):
+                storage.set_metadata({"key_%d" % idx: "value %d" % idx})
+                storage.set_metadata({"key_%d" % idx: float(idx)}, DATASET)
+            return time.time() - start
+
+        storage = HDF5StorageManager(context.temp_folder, "metadata.h5")
+        start = time.time()
+        for _ in xrange(self.KEYS):
+            storage.get_metadata()
+            storage.get_metadata(DATASET)
+        return time.time() - start
+
+
+
+BENCHMARKS = [AppendBenchmark(), ReadBenchmark(), MetadataBenchmark()]
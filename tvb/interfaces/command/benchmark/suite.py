@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Infrastructure of the benchmark suite: the Benchmark base class, the context shared by benchmarks
+(project and data), the runner, and the JSON results.
+"""
+
+import os
+import sys
+import json
+import math
+import shutil
+import platform
+import tempfile
+import subprocess
+import multiprocessing
+from datetime import datetime
+import numpy
+import psutil
+from tvb.basic.profile import TvbProfile
+from tvb.basic.logger.builder import get_logger
+
+
+SCHEMA_VERSION = 1
+
+LOGGER = get_logger(__name__)
+
+
+
+class Benchmark(object):
+    """
+    A group of measured cases. Subclasses implement `measure`, and optionally `get_cases`, `setup` and `teardown`.
+    """
+    ## Results are stored under "<group>.<case name>"
+    group = None
+    ## Default number of measured repetitions, and of not measured ones, done before them.
+    repeat = 5
+    warmup = 1
+
+
+    def get_cases(self, context):
+        """
+        :returns: list of tuples (case name, dictionary of parameters), each to be measured separately.
+        """
+        return [(self.__class__.__name__, {})]
+
+
+    def setup(self, context):
+        pass
+
+
+    def measure(self, context, params):
+        """
+        Run a case once.
+
+        :returns: the measured duration, in seconds
+        """
+        raise NotImplementedError()
+
+
+    def teardown(self, context):
+        pass
+
+
+
+class BenchmarkContext(object):
+    """
+    Data shared by the benchmarks: a project (with connectivities imported on first use), a temporary folder,
+    and the options given in the command line.
+    """
+    CONNECTIVITY_ZIPS = ['connectivity_68.zip', 'connectivity_96.zip', 'connectivity_190.zip']
+
+
+    def __init__(self, **options):
+        self.options = options
+        self.temp_folder = tempfile.mkdtemp(prefix="tvb_benchmark_")
+        self._project = None
+        self._connectivities = None
+
+
+    def get_project(self):
+        if self._project is None:
+            from tvb.interfaces.command import lab
+            self._project = lab.new_project("benchmark_project_%s" % datetime.now())
+        return self._project
+
+
+    @classmethod
+    def get_connectivity_zips(cls):
+        """
+        :returns: paths of the connectivity archives (68, 96 and 190 regions) in tvb_data.
+        """
+        import tvb_data
+        data_dir = os.path.join(os.path.abspath(os.path.dirname(tvb_data.__file__)), 'connectivity')
+        return [os.path.join(data_dir, zip_name) for zip_name in cls.CONNECTIVITY_ZIPS]
+
+
+    def get_connectivities(self):
+        """
+        :returns: the connectivities from tvb_data, imported in the benchmark project, sorted by number of regions.
+        """
+        if self._connectivities is None:
+            from tvb.core.adapters.abcadapter import ABCAdapter
+            from tvb.core.entities.storage import dao
+            from tvb.interfaces.command import lab
+
+            project_id = self.get_project().id
+            for zip_path in self.get_connectivity_zips():
+                lab.import_conn_zip(project_id, zip_path)
+            connectivities = [ABCAdapter.load_entity_by_gid(datatype.gid)
+                              for datatype in dao.get_datatypes_in_project(project_id)
+                              if datatype.type == "Connectivity"]
+            self._connectivities = sorted(connectivities, key=lambda conn: conn.number_of_regions)
+        return self._connectivities
+
+
+    def cleanup(self):
+        shutil.rmtree(self.temp_folder, ignore_errors=True)
+
+
+
+def percentile(values, fraction):
+    """
+    :returns: the percentile of the given values, with linear interpolation (fraction 0.5 gives the median).
+    """
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(math.floor(position))
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+
+def summarize(samples):
+    """
+    :returns: dictionary with the statistics stored for a list of durations.
+    """
+    return {'count': len(samples),
+            'min': min(samples),
+            'max': max(samples),
+            'mean': float(numpy.mean(samples)),
+            'stdev': float(numpy.std(samples)),
+            'median': percentile(samples, 0.5),
+            'p90': percentile(samples, 0.9),
+            'p95': percentile(samples, 0.95)}
+
+
+
+def get_git_revision():
+    """
+    :returns: the revision of the git checkout holding the tvb package, or None (e.g. for a distribution).
+    """
+    import tvb
+    try:
+        process = subprocess.Popen(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(tvb.__file__)),
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        output, _ = process.communicate()
+        if process.returncode == 0:
+            return output.strip()
+    except OSError:
+        pass
+    return None
+
+
+
+def get_environment():
+    """
+    :returns: dictionary describing the machine and the software versions the results were measured with.
+    """
+    import h5py
+    return {'tvb_version': TvbProfile.current.version.CURRENT_VERSION,
+            'python': sys.version.split()[0],
+            'numpy': numpy.__version__,
+            'h5py': h5py.version.version,
+            'hdf5': h5py.version.hdf5_version,
+            'database': TvbProfile.current.db.SELECTED_DB,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': multiprocessing.cpu_count(),
+            'memory': psutil.virtual_memory().total,
+            'hostname': platform.node()}
+
+
+
+class BenchmarkRunner(object):
+    """
+    Run benchmarks and collect their results, in the JSON schema described by SCHEMA_VERSION.
+    """
+
+
+    def __init__(self, context, repeat=None, warmup=None):
+        """
+        :param repeat: when given, overwrites the number of repetitions declared by each benchmark
+        :param warmup: when given, overwrites the number of warm-up repetitions declared by each benchmark
+        """
+        self.context = context
+        self.repeat = repeat
+        self.warmup = warmup
+
+
+    def run(self, benchmarks):
+        """
+        :returns: dictionary with the environment and the results of the given benchmarks.
+                  A failing case is stored with its error, and does not stop the others.
+        """
+        results = {}
+        for benchmark in benchmarks:
+            try:
+                benchmark.setup(self.context)
+                cases = benchmark.get_cases(self.context)
+            except Exception, excep:
+                LOGGER.exception("Could not prepare benchmark %s" % benchmark.__class__.__name__)
+                results[benchmark.group + "." + benchmark.__class__.__name__] = {'group': benchmark.group,
+                                                                                 'error': str(excep)}
+                continue
+            try:
+                for case_name, params in cases:
+                    name = benchmark.group + "." + case_name
+                    LOGGER.info("Running benchmark %s" % name)
+                    results[name] = self._run_case(benchmark, params)
+            finally:
+                benchmark.teardown(self.context)
+
+        return {'schema_version': SCHEMA_VERSION,
+                'created': datetime.now().isoformat(),
+                'git_revision': get_git_revision(),
+                'environment': get_environment(),
+                'results': results}
+
+
+    def _run_case(self, benchmark, params):
+        result = {'group': benchmark.group, 'params': params, 'unit': 'seconds'}
+        repeat = self.repeat if self.repeat is not None else benchmark.repeat
+        warmup = self.warmup if self.warmup is not None else benchmark.warmup
+        try:
+            for _ in xrange(warmup):
+                benchmark.measure(self.context, params)
+            samples = [benchmark.measure(self.context, params) for _ in xrange(repeat)]
+        except Exception, excep:
+            LOGGER.exception("Benchmark failed")
+            result['error'] = str(excep)
+            return result
+        result['samples'] = samples
+        result.update(summarize(samples))
+        return result
+
+
+
+def write_results(results, file_path):
+    with open(file_path, 'w') as results_file:
+        json.dump(results, results_file, indent=2, sort_keys=True)
+
+
+
+def read_results(file_path):
+    with open(file_path) as results_file:
+        results = json.load(results_file)
+    if results.get('schema_version') != SCHEMA_VERSION:
+        raise ValueError("%s has an unsupported schema version: %s" % (file_path, results.get('schema_version')))
+    return results
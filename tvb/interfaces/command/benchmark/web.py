@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Response time of key pages, requested from an already running TVB web server.
+Skipped unless the server URL and the credentials of a user are given in the command line.
+"""
+
+import time
+import urllib
+import urllib2
+import cookielib
+from tvb.basic.logger.builder import get_logger
+from tvb.interfaces.command.benchmark.suite import Benchmark
+
+
+LOGGER = get_logger(__name__)
+
+
+
+class WebPagesBenchmark(Benchmark):
+    """
+    Log in once, then request each page; the measured time includes reading the whole response.
+    """
+    group = "web"
+    repeat = 10
+    PAGES = ["user/profile",
+             "project/viewall",
+             "project/viewoperations",
+             "project/get_operations_queue"]
+
+
+    def setup(self, context):
+        self.base_url = context.options.get('web_url')
+        if not self.base_url:
+            return
+        self.base_url = self.base_url.rstrip('/') + '/'
+        self.opener = urllib2.build_opener(urllib2.HTTPCookieProcessor(cookielib.CookieJar()))
+        login_data = urllib.urlencode({'username': context.options.get('web_user'),
+                                       'password': context.options.get('web_password')})
+        response = self.opener.open(self.base_url + "user/", login_data)
+        if not response.geturl().endswith("user/profile"):
+            raise Exception("Could not log in %s with the given user" % self.base_url)
+
+
+    def get_cases(self, context):
+        if not self.base_url:
+            LOGGER.info("No web server URL given; web pages are not measured.")
+            return []
+        return [(page.replace('/', '.'), {'url': page}) for page in self.PAGES]
+
+
+    def measure(self, context, params):
+        start = time.time()
+        self.opener.open(self.base_url + params['url']).read()
+        return time.time() - start
+
+
+
+BENCHMARKS = [WebPagesBenchmark()]
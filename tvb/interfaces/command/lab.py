@@ -34,6 +34,7 @@ A convenience module for the command interface
 """
 
 
+import time
 from tvb.config import SIMULATOR_MODULE, SIMULATOR_CLASS
 from tvb.core.adapters.abcadapter import ABCAdapter
 from tvb.core.entities.storage import dao
@@ -41,6 +42,11 @@ from tvb.core.entities.storage import dao
 from tvb.core.services.flow_service import FlowService
 from tvb.core.services.project_service import ProjectService
 from tvb.core.services.user_service import UserService
+from tvb.core.services.event_bus import STATUS_EVENT_BUS
+
+
+## Seconds between two checks of an operation, when no status change is published in the current process.
+OPERATION_WAIT_INTERVAL = 60
 
 
 def list_projects():
@@ -81,14 +87,18 @@ def import_conn_zip(project_id, zip_path):
     FlowService().fire_operation(importer, project.administrator, project_id, uploaded=zip_path)
 
 
-def fire_simulation(project_id=1, **kwargs):
+def fire_operation(project_id, adapter_module, adapter_class, **kwargs):
+    """
+    Launch an adapter with its default parameters, overwritten by kwargs.
+    :returns: the launched operation (for asynchronous adapters)
+    """
     project = dao.get_project_by_id(project_id)
     flow_service = FlowService()
 
     # below the holy procedure to launch with the correct parameters taken from the defaults
-    _, algo_group = flow_service.get_algorithm_by_module_and_class(SIMULATOR_MODULE, SIMULATOR_CLASS)
-    simulator_adapter = flow_service.build_adapter_instance(algo_group)
-    flatten_interface = simulator_adapter.flaten_input_interface()
+    _, algo_group = flow_service.get_algorithm_by_module_and_class(adapter_module, adapter_class)
+    adapter_instance = flow_service.build_adapter_instance(algo_group)
+    flatten_interface = adapter_instance.flaten_input_interface()
     prepared_flatten_interface = flow_service.prepare_parameters(flatten_interface, project.id,
                                                                       algo_group.fk_category)
     launch_args = {}
@@ -102,6 +112,34 @@ def fire_simulation(project_id=1, **kwargs):
     launch_args.update(**kwargs)
     # end of magic
 
-    launched_operation = flow_service.fire_operation(simulator_adapter, project.administrator,
+    launched_operation = flow_service.fire_operation(adapter_instance, project.administrator,
                                                      project.id, **launch_args)[0]
     return launched_operation
+
+
+def fire_simulation(project_id=1, **kwargs):
+    return fire_operation(project_id, SIMULATOR_MODULE, SIMULATOR_CLASS, **kwargs)
+
+
+def wait_for_operation(operation, timeout=None):
+    """
+    Block until an operation has finished, being woken up by the status changes in its project
+    (instead of polling the DB at fixed intervals).
+    :returns: the finished operation, reloaded from DB
+    """
+    project_id = operation.fk_launched_in
+    deadline = None if timeout is None else time.time() + timeout
+    revision = STATUS_EVENT_BUS.get_revision(project_id)
+    operation = dao.get_operation_by_id(operation.id)
+    while not operation.has_finished:
+        remaining = OPERATION_WAIT_INTERVAL
+        if deadline is not None:
+            remaining = min(deadline - time.time(), remaining)
+        if remaining <= 0:
+            raise RuntimeError("Operation %s did not finish in %s seconds" % (operation.id, timeout))
+        changes = STATUS_EVENT_BUS.wait_for_changes(project_id, revision, remaining)
+        revision = changes['revision']
+        if 'retry_after' in changes:
+            time.sleep(min(changes['retry_after'], remaining))
+        operation = dao.get_operation_by_id(operation.id)
+    return operation
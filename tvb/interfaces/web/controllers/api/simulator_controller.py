@@ -37,6 +37,7 @@ Defines a controller providing an HTTP/JSON API for the simulator
 """
 
 import os
+import time
 import hashlib
 import json
 import datetime
@@ -51,9 +52,20 @@ import cherrypy
 from tvb.datatypes import connectivity, equations, surfaces, patterns
 from tvb.simulator import noise, integrators, models, coupling, monitors, simulator
 # framework
+from tvb.basic.logger.builder import get_logger
 from tvb.interfaces.web.controllers.base_controller import BaseController
 
 
+LOGGER = get_logger(__name__)
+
+
+REGISTRY_FILE_NAME = "tvb_simulator_jobs.json"
+STATUS_RUNNING = 'running'
+STATUS_FINISHED = 'finished'
+STATUS_ERROR = 'error'
+STATUS_INTERRUPTED = 'interrupted'
+
+
 def threadsafe(f):
     """
     Decorate f with a re-entrant lock to ensure that only
@@ -92,9 +104,141 @@ def build_sim_part(mod, opt):
     return obj
 
 
+def get_result_path(spec):
+    """
+    Path of the HDF5 file with the results of a simulation.
+    """
+    path = os.path.abspath(spec['opt'].get('wd', './'))
+    return os.path.join(path, "tvb_%s.h5" % (spec['md5sum'], ))
+
+
+def get_progress_path(h5fname):
+    """
+    Path of the JSON file, next to the results file, with the progress of a simulation.
+    """
+    return os.path.splitext(h5fname)[0] + "_progress.json"
+
+
+def read_progress(h5fname):
+    """
+    :returns: dictionary with the simulated time 't', the final time 'tf', the 'status' and the number of
+              'samples' per monitor written in the results file, or None when the progress file can not be read.
+    """
+    try:
+        with open(get_progress_path(h5fname)) as progress_file:
+            return json.load(progress_file)
+    except (IOError, ValueError):
+        return None
+
+
+
+class MonitorOutputWriter(object):
+    """
+    Streams the output of the monitors into extendable datasets 'ts' and 'ys' of one group per monitor.
+
+    Samples are buffered and appended every FLUSH_PERIOD seconds. The file is closed in between.
+    After each append, the progress (with the number of samples per monitor which are complete in the file)
+    is written in a small JSON file next to it (see read_progress), replaced atomically, so that the web
+    process never needs the results file for the progress, and reads from it only the complete samples.
+    """
+    FLUSH_PERIOD = 5.0
+
+    def __init__(self, h5fname, monitors, tf):
+        self.h5fname = h5fname
+        self.groups = ["mon_%d_%s" % (i, mon.__class__.__name__) for i, mon in enumerate(monitors)]
+        self.buffers = [([], []) for _ in monitors]
+        self.written = dict((name, 0) for name in self.groups)
+        self.tf = tf
+        self.t = 0.0
+        self.status = STATUS_RUNNING
+        self.last_flush = time.time()
+
+        h5 = h5py.File(h5fname, 'w')
+        h5.attrs['tf'] = tf
+        h5.attrs['t'] = self.t
+        h5.attrs['status'] = self.status
+        for name in self.groups:
+            h5.create_group(name).create_dataset('ts', shape=(0,), maxshape=(None,), dtype=numpy.float64)
+        h5.close()
+        self._write_progress()
+
+
+    def append(self, all_monitor_data):
+        for (ts, ys), mondata in zip(self.buffers, all_monitor_data):
+            if not mondata is None:
+                t, y = mondata
+                ts.append(t)
+                ys.append(y)
+                self.t = max(self.t, t)
+        if time.time() - self.last_flush >= self.FLUSH_PERIOD:
+            self.flush()
+
+
+    def flush(self, status=None):
+        """
+        Append the buffered samples to the file, and update the progress.
+        When the file can not be written, the samples stay buffered for the next flush.
+
+        :returns: True when the buffered samples were written
+        """
+        self.last_flush = time.time()
+        try:
+            self._write_samples(status)
+        except (IOError, ValueError, KeyError) as excep:
+            LOGGER.warning("Could not write simulation results into %s: %s" % (self.h5fname, str(excep)))
+            if status == STATUS_ERROR:
+                self.status = status
+                self._write_progress()
+            return False
+        for name, (ts, ys) in zip(self.groups, self.buffers):
+            self.written[name] += len(ts)
+            del ts[:]
+            del ys[:]
+        if status is not None:
+            self.status = status
+        self._write_progress()
+        return True
+
+
+    def _write_samples(self, status):
+        h5 = h5py.File(self.h5fname, 'a')
+        try:
+            for name, (ts, ys) in zip(self.groups, self.buffers):
+                if not ts:
+                    continue
+                group = h5[name]
+                ys = numpy.array(ys)
+                if 'ys' not in group:
+                    group.create_dataset('ys', shape=(0,) + ys.shape[1:], maxshape=(None,) + ys.shape[1:],
+                                         dtype=ys.dtype)
+                for key, values in (('ys', ys), ('ts', numpy.array(ts))):
+                    dataset = group[key]
+                    dataset.resize(self.written[name] + len(values), axis=0)
+                    dataset[self.written[name]:] = values
+            h5.attrs['t'] = self.t
+            if status is not None:
+                h5.attrs['status'] = status
+        finally:
+            h5.close()
+
+
+    def _write_progress(self):
+        progress_path = get_progress_path(self.h5fname)
+        temporary_path = progress_path + '.tmp'
+        try:
+            with open(temporary_path, 'w') as progress_file:
+                json.dump(dict(t=self.t, tf=self.tf, status=self.status, samples=self.written), progress_file)
+            if os.name == 'nt' and os.path.exists(progress_path):
+                os.remove(progress_path)
+            os.rename(temporary_path, progress_path)
+        except (IOError, OSError) as excep:
+            LOGGER.warning("Could not write simulation progress into %s: %s" % (progress_path, str(excep)))
+
+
+
 def build_and_run_(spec):
     """
-    Builds a simulator from spec, run & collect output.
+    Builds a simulator from spec, run & stream output.
 
     Returns an HDF5 file with the results.
     """
@@ -131,30 +275,17 @@ def build_and_run_(spec):
     sim = simulator.Simulator(**simargs)
     sim.configure()
 
-    # TODO open HDF5 first, figure out correct sizes, etc
-
-    # loop, writing data to h5
-    ts = [[] for _ in opt['monitors']]
-    ys = [[] for _ in opt['monitors']]
-    for i, all_monitor_data in enumerate(sim(tf)):
-        for j, mondata in enumerate(all_monitor_data):
-            if not mondata is None:
-                t, y = mondata
-                ts[j].append(t)
-                ys[j].append(y)
-
-    # write data to hdf5 file
-    path = os.path.abspath(opt.get('wd', './'))
-    h5fname = os.path.join(path, "tvb_%s.h5" % (spec['md5sum'], ))
-    h5 = h5py.File(h5fname, 'w')
-
-    for i, (mon, (t, y)) in enumerate(zip(simargs['monitors'], zip(ts, ys))):
-        mname = "mon_%d_%s" % (i, mon.__class__.__name__)
-        g = h5.create_group(mname)
-        g.create_dataset('ts', data=t)
-        g.create_dataset('ys', data=y)
-
-    h5.close()
+    # loop, streaming data to h5
+    h5fname = get_result_path(spec)
+    writer = MonitorOutputWriter(h5fname, simargs['monitors'], tf)
+    try:
+        for all_monitor_data in sim(tf):
+            writer.append(all_monitor_data)
+        if not writer.flush(status=STATUS_FINISHED):
+            raise IOError("Could not write simulation results into %s" % h5fname)
+    except Exception:
+        writer.flush(status=STATUS_ERROR)
+        raise
 
     # return filename
     print "pool finished", opt
@@ -182,9 +313,104 @@ class SimulatorController(BaseController):
     exposed = True
 
 
-    def __init__(self, nproc=2):
+    def __init__(self, nproc=2, work_dir='./'):
         super(SimulatorController, self).__init__()
-        self.reset(nproc=nproc)
+        # jobs are kept in a registry file, so that their results can be found after a restart
+        self.registry_path = os.path.join(os.path.abspath(work_dir), REGISTRY_FILE_NAME)
+        self.async_results = {}
+        self._start_pool(nproc)
+        self.sims = self._load_registry()
+        self.nsim = max(self.sims.keys() or [0])
+
+
+    def _start_pool(self, nproc):
+        if hasattr(self, 'pool'):
+            # docs say GC'ing the pool will terminate() it, but let's be sure
+            self.pool.terminate()
+        self.pool = multiprocessing.Pool(processes=nproc)
+        self.async_results = {}
+
+
+    def _load_registry(self):
+        """
+        Read the jobs of previous runs. Those not finished when the process stopped are marked as interrupted.
+        """
+        if not os.path.exists(self.registry_path):
+            return {}
+        try:
+            with open(self.registry_path) as registry_file:
+                sims = dict((int(ix), spec) for ix, spec in json.load(registry_file).iteritems())
+        except (IOError, ValueError) as e:
+            self.logger.warning("Ignoring invalid simulations registry %s: %s" % (self.registry_path, str(e)))
+            return {}
+        for spec in sims.itervalues():
+            if spec.get('status') is None:
+                file_status = self._read_results(spec, lambda h5: h5.attrs['status'], default=None)
+                progress = read_progress(spec['h5'])
+                if progress is not None:
+                    file_status = progress['status']
+                spec['status'] = True if file_status == STATUS_FINISHED else STATUS_INTERRUPTED
+                if spec['status'] is True:
+                    spec['result'] = spec['h5']
+        return sims
+
+
+    def _save_registry(self):
+        temporary_path = self.registry_path + '.tmp'
+        with open(temporary_path, 'w') as registry_file:
+            json.dump(self.sims, registry_file)
+        if os.path.exists(self.registry_path):
+            os.remove(self.registry_path)
+        os.rename(temporary_path, self.registry_path)
+
+
+    def _update_status(self, ix):
+        """
+        Collect the result of a job which was launched by this process, once ready.
+        """
+        spec = self.sims[ix]
+        if spec.get('status') is not None or ix not in self.async_results:
+            return
+        async_result = self.async_results[ix]
+        if not async_result.ready():
+            return
+        result = async_result.get()
+        if isinstance(result, Exception):
+            spec['status'] = repr(result)
+        else:
+            spec['status'] = True
+            spec['result'] = result
+        del self.async_results[ix]
+        self._save_registry()
+
+
+    @staticmethod
+    def _read_results(spec, read_function, default=None):
+        """
+        Apply read_function on the results file of a job, opened for reading.
+        :returns: default when the file does not exist yet, or it could not be read (e.g. while being written)
+        """
+        if not os.path.exists(spec['h5']):
+            return default
+        try:
+            h5 = h5py.File(spec['h5'], 'r')
+        except IOError:
+            return default
+        try:
+            return read_function(h5)
+        except (IOError, KeyError, ValueError) as excep:
+            LOGGER.warning("Could not read simulation results %s: %s" % (spec['h5'], str(excep)))
+            return default
+        finally:
+            h5.close()
+
+
+    def _get_sim(self, ix):
+        ix = int(ix)
+        if ix not in self.sims:
+            raise cherrypy.HTTPError(404, "No simulation %d" % ix)
+        self._update_status(ix)
+        return self.sims[ix]
 
 
     @cherrypy.expose
@@ -197,35 +423,82 @@ class SimulatorController(BaseController):
     """
 
     @cherrypy.expose
+    @threadsafe
     def read(self, ix=None):
         """
         Get information on simulation(s)
         """
 
         if ix is not None:
-            sims = {ix: self.sims[int(ix)]} 
+            sims = [self._get_sim(ix)]
         else:
-            sims = self.sims
+            sims = [self._get_sim(ix) for ix in sorted(self.sims)]
 
         dump = []
-        for ix, sim in sims.iteritems():
-            kv = {}
-            for k, v in sim.iteritems():
-                if k == 'async_result':
-                    if v.ready():
-                        try:
-                            kv['result'] = v.get()
-                            kv['status'] = True
-                        except Exception as e:
-                            kv['status'] = repr(e)
-                    else:
-                        kv['status'] = 'waiting'
-                else:
-                    kv[k] = v
+        for sim in sims:
+            kv = dict(sim)
+            if kv.get('status') is None:
+                kv['status'] = 'waiting'
             dump.append(kv)
 
         return json.dumps(dump)
 
+
+    @cherrypy.expose
+    @threadsafe
+    def progress(self, ix):
+        """
+        Get the simulated time written so far in the results file of a simulation, and the samples per monitor.
+        """
+        sim = self._get_sim(ix)
+
+        def _read_progress(h5):
+            samples = dict((name, group['ts'].shape[0]) for name, group in h5.iteritems())
+            return dict(t=float(h5.attrs['t']), tf=float(h5.attrs['tf']), status=str(h5.attrs['status']),
+                        samples=samples)
+
+        ## Results files written before the progress files existed are read directly
+        progress = read_progress(sim['h5']) or self._read_results(sim, _read_progress, default={})
+        if 'status' in progress:
+            progress['file_status'] = progress.pop('status')
+        progress['ix'] = sim['ix']
+        progress['status'] = 'waiting' if sim.get('status') is None else sim['status']
+        if progress.get('tf'):
+            progress['progress'] = min(1.0, progress['t'] / progress['tf'])
+        return json.dumps(progress)
+
+
+    @cherrypy.expose
+    @threadsafe
+    def partial(self, ix, monitor=0, start=0, stop=None):
+        """
+        Get the samples of one monitor written so far, with indices in [start, stop), also for running simulations.
+        """
+        sim = self._get_sim(ix)
+        monitor, start = int(monitor), int(start)
+        ## Only the samples announced in the progress file are complete, while the simulation still writes
+        progress = read_progress(sim['h5'])
+
+        def _read_samples(h5):
+            names = sorted(h5.keys(), key=lambda name: int(name.split('_')[1]))
+            if not 0 <= monitor < len(names):
+                raise cherrypy.HTTPError(404, "No monitor %d" % monitor)
+            group = h5[names[monitor]]
+            written = group['ys'].shape[0] if 'ys' in group else 0
+            if progress is not None:
+                written = min(written, progress['samples'].get(names[monitor], 0))
+            end = written if stop is None else min(int(stop), written)
+            result = dict(monitor=names[monitor], n=written, start=start, ts=[], ys=[])
+            if start < end:
+                result['ts'] = group['ts'][start:end].tolist()
+                result['ys'] = group['ys'][start:end].tolist()
+            return result
+
+        result = self._read_results(sim, _read_samples)
+        if result is None:
+            raise cherrypy.HTTPError(503, "The results of simulation %s are not available yet, retry later" % ix)
+        return json.dumps(result)
+
     """
     - reformat data as received by MATLAB to what BurstController.launch_burst() expects
     - urlget on the URL directly? or inherit a burst controller...
@@ -245,8 +518,10 @@ class SimulatorController(BaseController):
         spec['ix'] = ix
         spec['datetime'] = datetime.datetime.now().strftime("%y-%m-%d_%H-%M-%S")
         spec['md5sum'] = hashlib.md5(json.dumps(spec)).hexdigest()
-        spec['async_result'] = self.pool.apply_async(build_and_run, (spec.copy(), ))
+        spec['h5'] = get_result_path(spec)
+        self.async_results[ix] = self.pool.apply_async(build_and_run, (spec.copy(), ))
         self.sims[ix] = spec
+        self._save_registry()
         return str(ix)
 
     """
@@ -286,16 +561,14 @@ class SimulatorController(BaseController):
     def reset(self, nproc=2):
         """
         Reset the simulation list & restarts the process pool with 
-        certain number of processes.
+        certain number of processes. Results files already written are kept.
         """
 
         nproc = int(nproc)
-        if hasattr(self, 'pool'):
-            # docs say GC'ing the pool will terminate() it, but let's be sure
-            self.pool.terminate()
-        self.pool = multiprocessing.Pool(processes=nproc)
+        self._start_pool(nproc)
         self.sims = {}
         self.nsim = 0
+        self._save_registry()
         return str(nproc)
 
 
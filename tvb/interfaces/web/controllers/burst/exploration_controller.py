@@ -35,13 +35,15 @@
 
 import urllib
 import cherrypy
+import numpy
 from tvb.config import DISCRETE_PSE_ADAPTER_MODULE, DISCRETE_PSE_ADAPTER_CLASS
 from tvb.config import ISOCLINE_PSE_ADAPTER_CLASS, ISOCLINE_PSE_ADAPTER_MODULE
 from tvb.core.services.project_service import ProjectService
 from tvb.core.adapters.abcadapter import ABCAdapter
 from tvb.core.adapters.exceptions import LaunchException
 from tvb.core.entities.transient.filtering import FilterChain
-from tvb.interfaces.web.controllers.decorators import handle_error, expose_fragment, check_user, using_template
+from tvb.interfaces.web.controllers.decorators import handle_error, expose_fragment, expose_json, check_user
+from tvb.interfaces.web.controllers.decorators import using_template
 from tvb.interfaces.web.controllers.base_controller import BaseController
 
 
@@ -128,6 +130,37 @@ class ParameterExplorationController(BaseController):
         raise cherrypy.HTTPRedirect(REDIRECT_MSG % (name, error_msg))
 
 
+    @expose_json
+    def get_discrete_exploration_updates(self, datatype_group_gid, since, color_metric=None, size_metric=None,
+                                         min_color=None, max_color=None, min_size=None, max_size=None):
+        """
+        For live refresh of the discrete PSE: return only the nodes completed after :param since:
+        The color and size limits are the ones the PSE is currently drawn with.
+        """
+        if color_metric == 'None':
+            color_metric = None
+        if size_metric == 'None':
+            size_metric = None
+        limits = [self._parse_limit(value) for value in [min_color, max_color, min_size, max_size]]
+
+        _, group = self.flow_service.get_algorithm_by_module_and_class(DISCRETE_PSE_ADAPTER_MODULE,
+                                                                       DISCRETE_PSE_ADAPTER_CLASS)
+        adapter = self.flow_service.build_adapter_instance(group)
+        return adapter.prepare_updates(datatype_group_gid, since, color_metric, size_metric, limits)
+
+
+    @staticmethod
+    def _parse_limit(value):
+        """
+        :returns: the float value of a PSE limit sent from UI, or None when missing (empty, NaN or infinite)
+        """
+        try:
+            value = float(value)
+        except (ValueError, TypeError):
+            return None
+        return value if numpy.isfinite(value) else None
+
+
     @cherrypy.expose
     @handle_error(redirect=True)
     @using_template('visualizers/pse_isocline/burst_preview')
@@ -43,6 +43,8 @@ import numpy
 
 from tvb.basic.filters.chain import FilterChain
 from tvb.datatypes.arrays import MappedArray
+from tvb.adapters.visualizers.brain import RegionAggregation
+from tvb.adapters.visualizers.matrix_viewer import MatrixTiles
 from tvb.core.utils import url2path, parse_json_parameters, string2date, string2bool
 from tvb.core.entities.file.files_helper import FilesHelper
 from tvb.core.adapters.abcdisplayer import ABCDisplayer
@@ -555,6 +557,52 @@ class FlowController(BaseController):
             return result
 
 
+    @expose_json
+    def read_region_aggregate(self, entity_gid, method, region_mapping_gid, dataset_name, flatten=False, **kwargs):
+        """
+        Same as read_datatype_attribute, but for the region level version of a surface TimeSeries, as played
+        in the brain viewer (see RegionAggregation). It is computed at the first call.
+
+        :param method: one of RegionAggregation.METHODS
+        :param dataset_name: one of RegionAggregation.EXPOSED_METHODS
+        """
+        if dataset_name not in RegionAggregation.EXPOSED_METHODS:
+            raise cherrypy.HTTPError(404, "Invalid attribute " + str(dataset_name))
+        time_series = ABCAdapter.load_entity_by_gid(entity_gid)
+        region_map = ABCAdapter.load_entity_by_gid(region_mapping_gid)
+        try:
+            aggregation = RegionAggregation(time_series, region_map, method)
+        except ValueError, excep:
+            raise cherrypy.HTTPError(404, str(excep))
+        result = getattr(aggregation, dataset_name)(**kwargs)
+        if isinstance(result, numpy.ndarray):
+            if flatten is True or flatten == "True":
+                result = result.flatten()
+            return result.tolist()
+        return result
+
+
+    @cherrypy.expose
+    @handle_error(redirect=False)
+    @check_user
+    def read_matrix_tile(self, entity_gid, level, tile_row, tile_col, slice=None):
+        """
+        Serve one tile of the 2d view of a MappedArray, for the tiled matrix viewer.
+
+        :param level: 0 for the original values, then each level is MatrixTiles.LEVEL_FACTOR times smaller
+        :param slice: JSON string with the slice producing the 2d view, as given to the viewer
+        :returns: binary data, with the min, max and mean arrays of the tile (see MatrixTiles.get_tile_bytes)
+        """
+        entity = ABCAdapter.load_entity_by_gid(entity_gid)
+        tiles = MatrixTiles(entity, json.loads(slice) if slice else None)
+        try:
+            data = tiles.get_tile_bytes(int(level), int(tile_row), int(tile_col))
+        except ValueError, excep:
+            raise cherrypy.HTTPError(404, str(excep))
+        cherrypy.response.headers['Content-Type'] = 'application/octet-stream'
+        return data
+
+
     @expose_page
     def invokeadaptermethod(self, adapter_id, method_name, **data):
         """
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under 
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General 
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Serve the metrics of the web process (see tvb.core.metrics) in the Prometheus text format.
+"""
+
+import cherrypy
+from tvb.basic.profile import TvbProfile
+from tvb.core.metrics import REGISTRY, CONTENT_TYPE
+from tvb.interfaces.web.controllers import common
+
+
+
+class MetricsController(object):
+    """
+    Mounted at /metrics. Disabled unless METRICS_ENABLED is set in the settings profile, then available to
+    the clients connecting from METRICS_ALLOWED_ADDRESSES, and to logged administrators.
+    """
+
+
+    @cherrypy.expose
+    def index(self):
+        if not TvbProfile.current.METRICS_ENABLED:
+            raise cherrypy.HTTPError(404)
+        if not self._is_allowed():
+            raise cherrypy.HTTPError(403, "Metrics are not available for this client.")
+        cherrypy.response.headers['Content-Type'] = CONTENT_TYPE
+        return REGISTRY.render().encode('utf-8')
+
+
+    @staticmethod
+    def _is_allowed():
+        if cherrypy.request.remote.ip in TvbProfile.current.METRICS_ALLOWED_ADDRESSES:
+            return True
+        if hasattr(cherrypy, common.KEY_SESSION):
+            user = common.get_logged_user()
+            return user is not None and user.is_administrator()
+        return False
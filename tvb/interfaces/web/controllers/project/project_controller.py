@@ -50,6 +50,8 @@ from tvb.core.entities.transient.filtering import StaticFiltersFactory
 from tvb.core.adapters.abcadapter import ABCAdapter
 from tvb.core.services.project_service import ProjectService
 from tvb.core.services.import_service import ImportService
+from tvb.core.services.event_bus import STATUS_EVENT_BUS
+from tvb.core.services.backend_client import OPERATION_SCHEDULER
 from tvb.core.services.exceptions import ServicesBaseException, ProjectServiceException
 from tvb.core.services.exceptions import RemoveDataTypeException
 from tvb.core.utils import string2bool
@@ -69,6 +71,8 @@ class ProjectController(BaseController):
     PRROJECTS_FOR_LINK_KEY = "projectsforlink"
     PRROJECTS_LINKED_KEY = "projectslinked"
     KEY_OPERATION_FILTERS = "operationfilters"
+    ## Seconds a request for status changes waits on server, when nothing changed
+    STATUS_CHANGES_TIMEOUT = 20
 
     def __init__(self):
         super(ProjectController, self).__init__()
@@ -246,9 +250,11 @@ class ProjectController(BaseController):
 
     @expose_page
     @settings
-    def viewoperations(self, project_id=None, page=1, filtername=None, reset_filters=None):
+    def viewoperations(self, project_id=None, page=1, filtername=None, reset_filters=None,
+                       shown_page=None, first_op_id=None, last_op_id=None):
         """
-        Display table of operations for a given project selected
+        Display table of operations for a given project selected.
+        When moving to a neighbour of the `shown_page`, the boundary IDs of the shown rows are used to seek the new page.
         """
         if (project_id is None) or (not int(project_id)):
             raise cherrypy.HTTPRedirect('/project')
@@ -273,18 +279,80 @@ class ProjectController(BaseController):
                 my_filter.passes_count = ''
 
         page = int(page)
+        before_id, after_id = None, None
+        if filtername is None and not reset_filters and shown_page:
+            if page == int(shown_page) + 1 and last_op_id:
+                before_id = int(last_op_id)
+            elif page == int(shown_page) - 1 and first_op_id:
+                after_id = int(first_op_id)
         project, total_op_count, filtered_ops, pages_no = self.project_service.retrieve_project_full(
-            project_id, selected_filters, page)
+            project_id, selected_filters, page, before_id, after_id)
         ## Select current project
         self._mark_selected(project)
 
         template_specification = dict(mainContent="project/viewoperations", project=project,
+                                      status_revision=STATUS_EVENT_BUS.get_revision(project.id),
                                       title='Past operations for " ' + project.name + '"', operationsList=filtered_ops,
                                       total_op_count=total_op_count, total_pages=pages_no, page_number=page,
                                       filters=filters, no_filter_selected=(selected_filters is None), model=model)
         return self.fill_default_attributes(template_specification, 'operations')
     
     
+    @expose_json
+    def get_status_changes(self, project_id, since=-1):
+        """
+        Long-poll for Operation and Burst status transitions in a project, after revision `since`.
+        A negative `since` returns immediately the current revision, to be used by next calls.
+        When the server can not keep this request waiting, it answers at once, with a `retry_after` hint.
+        """
+        project_id, since = int(project_id), int(since)
+        if since < 0:
+            return dict(revision=STATUS_EVENT_BUS.get_revision(project_id), changes=[], full_refresh=False)
+        ## Do not keep the user session locked while waiting, other requests of the same user need it.
+        if getattr(cherrypy.serving, 'session', None) is not None and cherrypy.session.locked:
+            cherrypy.session.release_lock()
+        result = STATUS_EVENT_BUS.wait_for_changes(project_id, since, self.STATUS_CHANGES_TIMEOUT)
+        if 'retry_after' in result:
+            cherrypy.response.headers['Retry-After'] = str(result['retry_after'])
+        return result
+
+
+    @expose_json
+    @check_user
+    def get_operations_queue(self):
+        """
+        Operations running on current machine, and those waiting (in the order they will start).
+        Other users' entries are anonymized, unless current user is an administrator.
+        """
+        return self._get_visible_queue_state()
+
+
+    @expose_fragment("overlay")
+    @check_user
+    def get_operations_queue_overlay(self):
+        """
+        Returns the html which displays the operations running on current machine, and those waiting.
+        """
+        template_specification = dict(queue_state=self._get_visible_queue_state())
+        return self.fill_overlay_attributes(template_specification, "Queue", "Operations running and waiting",
+                                            "project/operations_queue_overlay", "dialog-queue")
+
+
+    @staticmethod
+    def _get_visible_queue_state():
+        """
+        :returns: the state of the operations queue, with other users' entries anonymized, for non-administrators.
+        """
+        queue_state = OPERATION_SCHEDULER.get_queue_state()
+        user = common.get_logged_user()
+        if user is None or not user.is_administrator():
+            for entry in queue_state['running'] + queue_state['waiting']:
+                if user is None or entry['user_id'] != user.id:
+                    entry['operation_id'] = None
+                    entry['user_id'] = None
+        return queue_state
+
+
     @expose_fragment("call_out_project")
     def generate_call_out_control(self):
         """
@@ -521,7 +589,8 @@ class ProjectController(BaseController):
                                   "operationId": operation_id,
                                   "displayReloadBtn": display_reload_btn,
                                   "project": selected_project,
-                                  "isRelevant": operation.visible}
+                                  "isRelevant": operation.visible,
+                                  "profilingFields": self.project_service.get_operation_profile_fields(operation)}
         return template_specification
 
 
@@ -652,6 +721,30 @@ class ProjectController(BaseController):
         return encoder.iterencode(json_structure)
 
 
+    @cherrypy.expose
+    @handle_error(redirect=False)
+    @check_user
+    def readjsonstructurelevel(self, project_id, visibility_filter=StaticFiltersFactory.FULL_VIEW,
+                               first_level=None, second_level=None, filter_value=None, level=None, sublevel=None):
+        """
+        AJAX exposed method.
+        Will return the JSON for a single level of the Project's structure: the project root with the first
+        level folders, the second level folders under `level`, or the DataTypes under `level` and `sublevel`.
+        """
+        if first_level is None or second_level is None:
+            first_level, second_level = self.get_project_structure_grouping()
+        elif level is None:
+            self.set_project_structure_grouping(first_level, second_level)
+
+        selected_filter = StaticFiltersFactory.build_datatype_filters(single_filter=visibility_filter)
+
+        project = self.project_service.find_project(project_id)
+        json_structure = self.project_service.get_project_structure_level(project, selected_filter, first_level,
+                                                                          second_level, filter_value, level, sublevel)
+        encoder = JSONEncoder()
+        return encoder.iterencode(json_structure)
+
+
     @cherrypy.expose
     @handle_error(redirect=False)
     @check_user
@@ -744,13 +837,14 @@ class ProjectController(BaseController):
     @cherrypy.expose
     @handle_error(redirect=False)
     @check_user
-    def downloadproject(self, project_id):
+    def downloadproject(self, project_id, parallel=False):
         """
         Export the data from a whole project.
+        :param parallel: when True, operation folders are compressed concurrently, in an indexed archive
         """
         current_project = self.project_service.find_project(project_id)
         export_mng = ExportManager()
-        export_file = export_mng.export_project(current_project)
+        export_file = export_mng.export_project(current_project, parallel=string2bool(str(parallel)))
 
         # Register export file for delete when download complete
         # We force parent folder deletion because export process generated it.
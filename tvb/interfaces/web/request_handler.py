@@ -32,10 +32,12 @@
 .. moduleauthor:: calin.pavel <calin.pavel@codemart.ro>
 """
 import os
+import time
 import shutil
 import cherrypy
 import tvb.interfaces.web.controllers.base_controller as bc
 from tvb.basic.logger.builder import get_logger
+from tvb.core.metrics import REGISTRY
 
 # Constants for upload
 from tvb.interfaces.web.controllers.common import get_from_session
@@ -45,6 +47,10 @@ CONTENT_LENGTH_KEY = 'content-length'
 # Module logger
 LOG = get_logger(__name__)
 
+REQUEST_DURATION = REGISTRY.histogram("tvb_http_request_duration_seconds",
+                                      "Time spent serving HTTP requests, per controller and exposed method.",
+                                      ("controller", "method"))
+
 
 
 class RequestHandler(object):
@@ -96,4 +102,27 @@ class RequestHandler(object):
                 else:
                     # File not found on disk, so we remove it from list
                     del files_list[i]
-    
\ No newline at end of file
+    
+
+
+    @staticmethod
+    def start_request_timer():
+        """
+        Executed when the request starts to be processed, to measure its duration.
+        """
+        cherrypy.request.tvb_start_time = time.time()
+
+
+    @staticmethod
+    def observe_request_duration():
+        """
+        Executed at the end of a request, to record its duration under the controller (mount point)
+        and the name of the exposed method which served it.
+        """
+        start_time = getattr(cherrypy.request, 'tvb_start_time', None)
+        if start_time is None:
+            return
+        handler = getattr(cherrypy.request.handler, 'callable', None)
+        REQUEST_DURATION.observe(time.time() - start_time,
+                                 controller=cherrypy.request.script_name or "/",
+                                 method=getattr(handler, '__name__', "other"))
@@ -42,6 +42,7 @@ import sys
 import cherrypy
 import webbrowser
 from cherrypy import Tool
+from cherrypy.process.plugins import Monitor
 from tvb.basic.profile import TvbProfile
 if __name__ == '__main__':
     TvbProfile.set_profile(sys.argv[1])
@@ -51,6 +52,8 @@ from tvb.core.adapters.abcdisplayer import ABCDisplayer
 from tvb.core.decorators import user_environment_execution
 from tvb.core.services.initializer import initialize, reset
 from tvb.core.services.exceptions import InvalidSettingsException
+from tvb.core.services.flow_service import FlowService
+from tvb.core.services.ephemeral_displays import EPHEMERAL_DISPLAYS
 from tvb.interfaces.web.request_handler import RequestHandler
 from tvb.interfaces.web.controllers.base_controller import BaseController
 from tvb.interfaces.web.controllers.users_controller import UserController
@@ -59,6 +62,7 @@ from tvb.interfaces.web.controllers.project.project_controller import ProjectCon
 from tvb.interfaces.web.controllers.project.figure_controller import FigureController
 from tvb.interfaces.web.controllers.flow_controller import FlowController
 from tvb.interfaces.web.controllers.settings_controller import SettingsController
+from tvb.interfaces.web.controllers.metrics_controller import MetricsController
 from tvb.interfaces.web.controllers.burst.burst_controller import BurstController
 from tvb.interfaces.web.controllers.burst.region_model_parameters_controller import RegionsModelParametersController
 from tvb.interfaces.web.controllers.burst.exploration_controller import ParameterExplorationController
@@ -108,6 +112,7 @@ def init_cherrypy(arguments=None):
     cherrypy.tree.mount(LocalConnectivityController(), "/spatial/localconnectivity/", config=CONFIGUER)
     cherrypy.tree.mount(NoiseConfigurationController(), "/burst/noise/", config=CONFIGUER)
     cherrypy.tree.mount(SimulatorController(), "/api/simulator/", config=CONFIGUER)
+    cherrypy.tree.mount(MetricsController(), "/metrics", config=CONFIGUER)
 
     cherrypy.config.update(CONFIGUER)
 
@@ -116,8 +121,23 @@ def init_cherrypy(arguments=None):
     cherrypy.tools.upload = Tool('on_start_resource', RequestHandler.check_upload_size)
     # This tools clean up files on disk (mainly after export)
     cherrypy.tools.cleanup = Tool('on_end_request', RequestHandler.clean_files_on_disk)
+    # These tools measure the duration of each request, for the /metrics page
+    cherrypy.tools.request_timer = Tool('on_start_resource', RequestHandler.start_request_timer)
+    cherrypy.tools.request_duration = Tool('on_end_request', RequestHandler.observe_request_duration)
+    cherrypy.config.update({'tools.request_timer.on': True, 'tools.request_duration.on': True})
     #----------------- End register additional request handlers ----------------
 
+    #### Periodically repair the operation counters displayed in the project call-out
+    Monitor(cherrypy.engine, FlowService().reconcile_operation_numbers,
+            frequency=TvbProfile.current.OPERATION_COUNTERS_RECONCILE_PERIOD,
+            name="OperationCountersReconciliation").subscribe()
+
+    #### Periodically (and at shut-down) store the visualizers launched without an Operation
+    if TvbProfile.current.EPHEMERAL_DISPLAYS_PERSIST:
+        Monitor(cherrypy.engine, EPHEMERAL_DISPLAYS.flush, frequency=EPHEMERAL_DISPLAYS.FLUSH_PERIOD,
+                name="EphemeralDisplaysFlush").subscribe()
+        cherrypy.engine.subscribe('stop', EPHEMERAL_DISPLAYS.flush)
+
     #### HTTP Server is fired now ######  
     cherrypy.engine.start()
 
@@ -53,6 +53,12 @@ var ACTIVE_BURST_CLASS = 'burst-active';
 var GROUP_BURST_CLASS = 'burst-group-expanded';
 // When user edits a title, we won't overwrite that (e.g. by adding 'Copy of' prefix)
 var user_edited_title = false;
+// Project of the displayed bursts, and a flag for not waiting twice on server for their status changes
+var burstProjectId = null;
+var burstStatusWatched = false;
+// Pending refresh of the elapsed time displayed for running bursts, and its period (ms)
+var burstElapsedTimeRefresh = null;
+var BURST_ELAPSED_TIME_PERIOD = 10000;
 
 
 
@@ -161,6 +167,10 @@ function updateBurstHistoryStatus() {
                     }
                 }
                 _updateBurstHistoryElapsedTime(result);
+                if (finalStatusReceived) {
+                    // Operation counters in the project call-out changed together with the burst status
+                    updateCallOutProject();
+                }
                 scheduleNewUpdate(finalStatusReceived, changedStatusOnCurrentBurst);
             },
             error: function() {
@@ -184,8 +194,8 @@ function _updateBurstHistoryElapsedTime(result){
 }
 
 /**
- * Schedule burst-history section update, in the next 5 seconds.
- * If "withFullUpdate" is true, then a full history section replacement happens before the periodical update.
+ * Schedule burst-history section update, for when the server announces status changes in current project.
+ * If "withFullUpdate" is true, then a full history section replacement happens before.
  */
 function scheduleNewUpdate(withFullUpdate, refreshCurrent) {
     if ($('#burst-history').length !== 0) {
@@ -195,11 +205,39 @@ function scheduleNewUpdate(withFullUpdate, refreshCurrent) {
                 loadBurst(sessionStoredBurst.id);
             }
         } else {
-            setTimeout(updateBurstHistoryStatus, 5000);
+            _watchBurstStatus();
+            _scheduleElapsedTimeRefresh();
         }
     }
 }
 
+/**
+ * Refresh periodically the history of running bursts, for their elapsed time (which changes with no status event).
+ * The refresh stops by itself when no running burst is left in the history.
+ */
+function _scheduleElapsedTimeRefresh() {
+    if (burstElapsedTimeRefresh !== null) {
+        return;
+    }
+    burstElapsedTimeRefresh = setTimeout(function () {
+        burstElapsedTimeRefresh = null;
+        updateBurstHistoryStatus();
+    }, BURST_ELAPSED_TIME_PERIOD);
+}
+
+/**
+ * Start waiting (once per page) on server for Operation and Burst status changes, and update the history on them.
+ */
+function _watchBurstStatus() {
+    if (burstStatusWatched || burstProjectId === null) {
+        return;
+    }
+    burstStatusWatched = true;
+    watchProjectStatus(burstProjectId, null, function () {
+        updateBurstHistoryStatus();
+    });
+}
+
 /*
  * Cancel or Remove the burst entity given by burst_id. Also update the history column accordingly.
  */
@@ -932,7 +970,8 @@ function displayBurstTree(selectedHref, selectedProjectID, baseURL) {
   /*
    * If a burst is stored in session then load from there. Called on coming to burst page from a valid session.
    */
-function initBurstConfiguration(sessionPortlets, selectedTab) {
+function initBurstConfiguration(sessionPortlets, selectedTab, projectId) {
+    burstProjectId = projectId;
     //Get the selected burst from session and store it to be used further ....
     doAjaxCall({
         type: "POST",
@@ -366,8 +366,9 @@ function selectProject(projectId, formId) {
     document.getElementById(formId).submit();
 }
 
-function exportProject(projectId) {
-    window.location = "/project/downloadproject/?project_id=" + projectId
+function exportProject(projectId, parallel) {
+    window.location = "/project/downloadproject/?project_id=" + projectId +
+                      "&parallel=" + (parallel ? "True" : "False");
 }
 
 function removeProject(projectId, formId){
@@ -666,6 +667,44 @@ function refreshOperations() {
     }
 }
 
+// Longest delay (ms) between two status calls, while the project does not change
+var STATUS_WATCH_MAX_DELAY = 15000;
+
+/**
+ * Wait on server for Operation and Burst status changes in a project, and call `onChange` with the changes,
+ * each time the project revision moves. Without a `revision`, start from the current one on the server.
+ * While the revision stays the same, next calls are delayed more and more (up to STATUS_WATCH_MAX_DELAY),
+ * or as long as the server asks, when it has too many requests waiting already.
+ */
+function watchProjectStatus(projectId, revision, onChange, previousDelay) {
+    var since = (revision === undefined || revision === null) ? -1 : revision;
+    doAjaxCall({
+        type: 'GET',
+        cache: false,
+        url: '/project/get_status_changes/' + projectId + '/' + since,
+        success: function (r) {
+            var result = $.parseJSON(r);
+            var delay = 0;
+            if (since >= 0 && result.revision !== since) {
+                onChange(result);
+            } else if (since >= 0) {
+                delay = Math.min(2 * (previousDelay || 500), STATUS_WATCH_MAX_DELAY);
+            }
+            if (result.retry_after) {
+                delay = Math.max(delay, result.retry_after * 1000);
+            }
+            setTimeout(function () {
+                watchProjectStatus(projectId, result.revision, onChange, delay);
+            }, delay);
+        },
+        error: function () {
+            setTimeout(function () {
+                watchProjectStatus(projectId, revision, onChange);
+            }, 30000);
+        }
+    });
+}
+
 // ----------------END OPERATIONS----------------------------
 
 // ---------------------------------------------------------
@@ -902,6 +941,13 @@ function showProjectUploadOverlay() {
     showOverlay("/project/get_project_uploader_overlay", true);
 }
 
+/**
+ * Displays the operations running on the server, and those waiting for their turn.
+ */
+function showOperationsQueueOverlay() {
+    showOverlay("/project/get_operations_queue_overlay", true);
+}
+
 
 // -------------END OVERLAY--------------------------------
 
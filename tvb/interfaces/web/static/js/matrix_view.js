@@ -26,12 +26,35 @@
  * .. moduleauthor:: Mihai Andrei <mihai.andrei@codemart.ro>
  **/
 
-function matrix_view_init_svg(matrix_data, matrix_shape, matrix_strides, title, notes){
+function matrix_view_init_svg(matrix_data, matrix_shape, matrix_strides, title, notes, tiles){
+    var matrix = tv.ndar.ndfrom({
+        data: $.parseJSON(matrix_data),
+        shape: $.parseJSON(matrix_shape),
+        strides: $.parseJSON(matrix_strides)}
+    );
+    var div = d3.select("#svg-viewer");
+    var cells = matrix_view_plot(div, matrix);
+    tv.util.usage(div, title, notes);
+
+    if (tiles && tiles.metadata.level_shapes.length > 1) {
+        // the overview is downsampled: a click on one of its blocks reads the full resolution tile under it
+        cells.on("click", function (d, i) {
+            matrix_view_show_tile(tiles, Math.floor(i / matrix.shape[1]), i % matrix.shape[1]);
+        });
+    }
+}
+
+
+/**
+ * Draw a 2d tv.ndar with the d3 matrix plotter, into an empty div.
+ * :returns: the d3 selection of the matrix cells
+ */
+function matrix_view_plot(div, matrix){
     // setup dimensions, div, svg elements and plotter
     var width = 900;
     var height = 600;
 
-    var div = d3.select("#svg-viewer").attr("style", "width:" + width + "px;");
+    div.attr("style", "width:" + width + "px;");
     var svg = div.append("svg").attr("width", width).attr("height", height);
     var group = svg.append("g").attr("transform", "translate(200, 0)");
     var text = svg.append("g").attr("transform", "translate(20, 100)")
@@ -43,13 +66,65 @@ function matrix_view_init_svg(matrix_data, matrix_shape, matrix_strides, title,
     }
 
     var plot = tv.plot.mat().w(width - 200).h(height).mat_over(mat_over);
+    plot.mat(matrix);
+    plot(group);
+    // the first group holds the matrix, and its first child group the cells (the axes come after)
+    return group.select("g").select("g").selectAll("rect");
+}
 
-    plot.mat(tv.ndar.ndfrom({
-        data: $.parseJSON(matrix_data),
-        shape: $.parseJSON(matrix_shape),
-        strides: $.parseJSON(matrix_strides)}
-    ));
 
-    plot(group);
-    tv.util.usage(div, title, notes);
+/**
+ * Display at full resolution the cells under one block of the downsampled overview,
+ * from the level 0 tile holding the first of these cells.
+ */
+function matrix_view_show_tile(tiles, overview_row, overview_col){
+    var meta = tiles.metadata;
+    var scale = Math.pow(meta.level_factor, meta.level_shapes.length - 1);
+    var tile_row = Math.floor(overview_row * scale / meta.tile_size);
+    var tile_col = Math.floor(overview_col * scale / meta.tile_size);
+    var row_start = tile_row * meta.tile_size;
+    var col_start = tile_col * meta.tile_size;
+    var rows = Math.min(meta.tile_size, meta.shape[0] - row_start);
+    var cols = Math.min(meta.tile_size, meta.shape[1] - col_start);
+
+    matrix_view_read_tile(tiles.url, tiles.slice, 0, tile_row, tile_col, function (tile) {
+        var div = d3.select("#svg-viewer-tile");
+        div.selectAll("*").remove();
+        matrix_view_plot(div, tv.ndar.ndfrom({
+            data: Array.prototype.slice.call(tile.mean),
+            shape: [rows, cols],
+            strides: [cols, 1]}
+        ));
+        tv.util.usage(div, "Rows " + row_start + ".." + (row_start + rows - 1) + ", columns " + col_start +
+                           ".." + (col_start + cols - 1) + " at full resolution",
+                      ["Place mouse over matrix elements to inspect their values",
+                       "Click on another block of the matrix above to show its details"]);
+    });
+}
+
+
+/**
+ * Read one tile of a large matrix, from the server side pyramid of min / max / mean levels.
+ * The callback receives {min: Float32Array, max: Float32Array, mean: Float32Array}, each in row-major order.
+ */
+function matrix_view_read_tile(tiles_url, tiles_slice, level, tile_row, tile_col, callback){
+    var url = tiles_url + "/" + level + "/" + tile_row + "/" + tile_col;
+    if (tiles_slice && tiles_slice !== "null") {
+        url += "?slice=" + encodeURIComponent(tiles_slice);
+    }
+    var request = new XMLHttpRequest();
+    request.open("GET", url, true);
+    request.responseType = "arraybuffer";
+    request.onload = function () {
+        if (request.status !== 200) {
+            displayMessage("Could not read matrix tile " + level + "/" + tile_row + "/" + tile_col, "errorMessage");
+            return;
+        }
+        var values = new Float32Array(request.response);
+        var size = values.length / 3;
+        callback({min: values.subarray(0, size),
+                  max: values.subarray(size, 2 * size),
+                  mean: values.subarray(2 * size)});
+    };
+    request.send();
 }
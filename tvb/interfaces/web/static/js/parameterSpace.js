@@ -25,6 +25,9 @@ var _PSE_plotOptions;
 var _PSE_minColor;
 var _PSE_maxColor;
 var _PSE_plot;
+// Keep the FLOT series and the MIN/MAX color and size values received from server, for live (incremental) refresh.
+var _PSE_seriesArray;
+var _PSE_limits;
 
 /*
  * @param canvasId: the id of the HTML DIV on which the drawing is done. This should have sizes defined or else FLOT can't do the drawing.
@@ -82,7 +85,8 @@ function _updatePlotPSE(canvasId, xLabels, yLabels, seriesArray, data_info, min_
 
     };
     
-    _PSE_plot = $.plot($("#" + canvasId), $.parseJSON(seriesArray), $.extend(true, {}, _PSE_plotOptions));
+    _PSE_seriesArray = $.parseJSON(seriesArray);
+    _PSE_plot = $.plot($("#" + canvasId), _PSE_seriesArray, $.extend(true, {}, _PSE_plotOptions));
     changeColors();
     $(".tickLabel").each(function() { $(this).css("color", "#000000"); });
 
@@ -148,7 +152,7 @@ function applyHoverEvent(canvasId) {
 
 
 function PSEDiscreteInitialize(labelsXJson, labelsYJson, series_array, dataJson, backPage, hasStartedOperations,
-                               min_color, max_color, min_size, max_size) {
+                               min_color, max_color, min_size, max_size, lastUpdate) {
 
     var labels_x = $.parseJSON(labelsXJson);
     var labels_y = $.parseJSON(labelsYJson);
@@ -158,6 +162,7 @@ function PSEDiscreteInitialize(labelsXJson, labelsYJson, series_array, dataJson,
     max_color = parseFloat(max_color);
     min_size = parseFloat(min_size);
     max_size = parseFloat(max_size);
+    _PSE_limits = [min_color, max_color, min_size, max_size];
 
     ColSch_initColorSchemeGUI(min_color, max_color, function(){
         _updatePlotPSE('main_div_pse', labels_x, labels_y, series_array, data, min_color, max_color, backPage);
@@ -201,11 +206,63 @@ function PSEDiscreteInitialize(labelsXJson, labelsYJson, series_array, dataJson,
     };
 
     if (hasStartedOperations) {
-        setTimeout("PSE_mainDraw('main_div_pse','" + backPage + "')", 3000);
+        setTimeout(function() { _PSE_refreshUpdates('main_div_pse', backPage, lastUpdate); }, 3000);
     }
 }
 
 
+function _PSE_sameLimit(oldValue, newValue) {
+    if (newValue == null) {
+        return Number.isNaN(oldValue);
+    }
+    return Math.abs(oldValue - newValue) <= 1e-9 * Math.max(Math.abs(oldValue), Math.abs(newValue));
+}
+
+/*
+ * Ask the server only for the PSE nodes completed since the last refresh, and patch them into the current plot.
+ * The server extends the limits we currently draw with by the metrics of these nodes. When the color or size
+ * limits changed, all the nodes need to be re-scaled, thus we fall-back to a full redraw.
+ */
+function _PSE_refreshUpdates(canvasId, backPage, since) {
+
+    var groupGID = document.getElementById("datatype-group-gid").value;
+    doAjaxCall({
+        type: "POST",
+        url: '/burst/explore/get_discrete_exploration_updates/' + groupGID,
+        data: {since: since, color_metric: $('#color_metric_select').val(), size_metric: $('#size_metric_select').val(),
+               min_color: _PSE_limits[0], max_color: _PSE_limits[1],
+               min_size: _PSE_limits[2], max_size: _PSE_limits[3]},
+        success: function(r) {
+            var updates = $.parseJSON(r);
+            var newLimits = [updates.min_color, updates.max_color, updates.min_shape_size, updates.max_shape_size];
+            for (var i = 0; i < newLimits.length; i++) {
+                if (!_PSE_sameLimit(_PSE_limits[i], newLimits[i])) {
+                    PSE_mainDraw(canvasId, backPage);
+                    return;
+                }
+            }
+            if (updates.points.length > 0) {
+                var sizeY = PSE_nodesInfo[0].length;
+                for (var j = 0; j < updates.points.length; j++) {
+                    var point = updates.points[j];
+                    _PSE_seriesArray[point.x * sizeY + point.y] = point.series;
+                    PSE_nodesInfo[point.x][point.y] = point.info;
+                }
+                _PSE_plot = $.plot($("#" + canvasId), _PSE_seriesArray, $.extend(true, {}, _PSE_plotOptions));
+                changeColors();
+                $(".tickLabel").each(function() { $(this).css("color", "#000000"); });
+            }
+            if (updates.has_started_ops) {
+                setTimeout(function() { _PSE_refreshUpdates(canvasId, backPage, updates.timestamp); }, 3000);
+            }
+        },
+        error: function() {
+            displayMessage("Could not refresh the exploration results.", "errorMessage");
+        }
+    });
+}
+
+
 /*
  * Take currently selected metrics and refresh the plot. 
  */
@@ -98,7 +98,7 @@ function updateTree(treeSelector, projectId, baseUrl, visibilityFilter) {
     var secondLevel = $("#levelTree_2").val();
     var filterValue = $("#filterInput").val();
 
-    var url = "/project/readjsonstructure/" + projectId + "/" + visibilityFilter;
+    var url = "/project/readjsonstructurelevel/" + projectId + "/" + visibilityFilter;
 
     // the dropdowns will not exists if the overlay is launched from burst or operations etc
     if (firstLevel != null && secondLevel != null){
@@ -123,6 +123,17 @@ function updateTree(treeSelector, projectId, baseUrl, visibilityFilter) {
         },
         "json_data": {
             "ajax": { url: url,
+                data: function (node) {
+                    // Folders are loaded one level at a time, when expanded.
+                    if (node == -1) {
+                        return {};
+                    }
+                    var params = {level: node.attr("level")};
+                    if (node.attr("sublevel") != undefined) {
+                        params.sublevel = node.attr("sublevel");
+                    }
+                    return params;
+                },
                 success: function (d) {
                     return eval(d);
                 }
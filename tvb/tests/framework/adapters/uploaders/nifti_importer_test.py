@@ -34,7 +34,10 @@
 import os
 import numpy
 import unittest
+import nibabel
 import tvb_data.nifti as demo_data
+from tvb.basic.profile import TvbProfile
+from tvb.adapters.uploaders.nifti.parser import NIFTIParser
 from tvb.tests.framework.core.base_testcase import TransactionalTestCase
 from tvb.tests.framework.datatypes.datatypes_factory import DatatypesFactory
 from tvb.core.entities.file.files_helper import FilesHelper
@@ -179,6 +182,29 @@ class NIFTIImporterTest(TransactionalTestCase):
         self.assertEquals(self.UNKNOWN_STR, volume.voxel_unit)
 
 
+    def test_import_nii_in_blocks(self):
+        """
+        This method tests import of a NIFTI file with a time dimension, read and written in blocks of volumes.
+        """
+        data = numpy.random.random((4, 5, 6, 7)).astype(numpy.float32)
+        if not os.path.exists(TvbProfile.current.TVB_TEMP_FOLDER):
+            os.makedirs(TvbProfile.current.TVB_TEMP_FOLDER)
+        nii_path = os.path.join(TvbProfile.current.TVB_TEMP_FOLDER, "blocks.nii")
+        nibabel.Nifti1Image(data, numpy.eye(4)).to_filename(nii_path)
+
+        original_block_bytes = NIFTIParser.VOLUMES_BLOCK_BYTES
+        ## 3 volumes per block, the last one incomplete
+        NIFTIParser.VOLUMES_BLOCK_BYTES = 3 * 4 * 5 * 6 * 8
+        try:
+            time_series = self._import(nii_path)
+        finally:
+            NIFTIParser.VOLUMES_BLOCK_BYTES = original_block_bytes
+            os.remove(nii_path)
+
+        self.assertEqual((7, 4, 5, 6), time_series.read_data_shape())
+        numpy.testing.assert_allclose(numpy.rollaxis(data, 3), time_series.get_data('data'))
+
+
     def test_import_wrong_nii_file(self):
         """ 
         This method tests import of a file in a wrong format
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under 
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General 
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Tests for the block-wise import of BrainVision and EEGLAB signals.
+"""
+
+import os
+import numpy
+import shutil
+import unittest
+from scipy.io import savemat
+from tvb.basic.profile import TvbProfile
+from tvb.adapters.uploaders import signals_importer
+from tvb.adapters.uploaders.signals_importer import VHDR, EEGLAB, iter_signal_blocks, write_signal_blocks
+from tvb.datatypes.time_series import TimeSeriesEEG
+
+
+VHDR_CONTENT = """Brain Vision Data Exchange Header File Version 1.0
+
+[Common Infos]
+DataFile=synthetic.eeg
+DataFormat=BINARY
+DataOrientation=%s
+NumberOfChannels=3
+SamplingInterval=4000
+
+[Binary Infos]
+BinaryFormat=INT_16
+
+[Channel Infos]
+Ch1=Fp1,,0.5,uV
+Ch2=Fp2,,1,uV
+Ch3=Cz,,,uV
+"""
+
+
+
+class SignalsImporterTest(unittest.TestCase):
+    """
+    Unit-tests for reading BrainVision and EEGLAB files in blocks of samples, on generated files.
+    """
+    LABELS = ['Fp1', 'Fp2', 'Cz']
+    RESOLUTIONS = numpy.array([0.5, 1, 1], dtype=numpy.float32)
+    NR_SAMPLES = 1001
+    SAMPLE_PERIOD = 0.004
+
+
+    def setUp(self):
+        self.folder = os.path.join(TvbProfile.current.TVB_TEMP_FOLDER, "signals")
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        ## Read and write a few samples at a time, for testing the blocks
+        self.original_block_bytes = signals_importer.BLOCK_BYTES
+        signals_importer.BLOCK_BYTES = 100 * 4 * len(self.LABELS)
+
+
+    def tearDown(self):
+        signals_importer.BLOCK_BYTES = self.original_block_bytes
+        shutil.rmtree(self.folder)
+
+
+    def _write_and_check(self, importer, expected_data, scales=None):
+        """
+        Write the data mapped by an importer into a TimeSeriesEEG, then compare with the expected data.
+        """
+        self.assertEqual(self.LABELS, list(importer.labels))
+        time_series = TimeSeriesEEG(storage_path=self.folder)
+        write_signal_blocks(time_series, iter_signal_blocks(importer.data, scales), importer.fs)
+
+        self.assertEqual((self.NR_SAMPLES, 1, len(self.LABELS), 1), time_series.read_data_shape())
+        numpy.testing.assert_allclose(expected_data, time_series.get_data('data')[:, 0, :, 0], rtol=1e-6)
+        numpy.testing.assert_allclose(numpy.arange(self.NR_SAMPLES) * self.SAMPLE_PERIOD,
+                                      time_series.get_data('time'))
+        self.assertAlmostEqual(self.SAMPLE_PERIOD, time_series.sample_period)
+
+
+    def _read_vhdr(self, orientation, raw_data):
+        vhdr_path = os.path.join(self.folder, "synthetic.vhdr")
+        dat_path = os.path.join(self.folder, "synthetic.eeg")
+        with open(vhdr_path, 'w') as vhdr_file:
+            vhdr_file.write(VHDR_CONTENT % orientation)
+        raw_data.astype('<i2').tofile(dat_path)
+
+        importer = VHDR()
+        importer.read_header(vhdr_path, dat_path)
+        importer.read_data()
+        self.assertTrue(isinstance(importer.data, numpy.memmap) or isinstance(importer.data.base, numpy.memmap))
+        return importer
+
+
+    def test_blocks(self):
+        """
+        Blocks cover all the samples, in order, and are scaled by channel.
+        """
+        data = numpy.arange(30).reshape((10, 3))
+        blocks = list(iter_signal_blocks(data, self.RESOLUTIONS, block_samples=4))
+        self.assertEqual([4, 4, 2], [block.shape[0] for block in blocks])
+        numpy.testing.assert_allclose(data * self.RESOLUTIONS, numpy.concatenate(blocks))
+
+
+    def test_vhdr_multiplexed(self):
+        """
+        Samples stored one after the other, with all their channels, get scaled with the channels resolution.
+        """
+        raw_data = numpy.random.randint(-1000, 1000, (self.NR_SAMPLES, len(self.LABELS)))
+        importer = self._read_vhdr("MULTIPLEXED", raw_data)
+        self._write_and_check(importer, raw_data * self.RESOLUTIONS, importer.resolutions)
+
+
+    def test_vhdr_vectorized(self):
+        """
+        Channels stored one after the other.
+        """
+        raw_data = numpy.random.randint(-1000, 1000, (len(self.LABELS), self.NR_SAMPLES))
+        importer = self._read_vhdr("VECTORIZED", raw_data)
+        self._write_and_check(importer, raw_data.T * self.RESOLUTIONS, importer.resolutions)
+
+
+    def test_eeglab(self):
+        """
+        A SET file with the header, and a FDT file with the float32 samples.
+        """
+        data = numpy.random.random((self.NR_SAMPLES, len(self.LABELS))).astype(numpy.float32)
+        set_path = os.path.join(self.folder, "synthetic.set")
+        fdt_path = os.path.join(self.folder, "synthetic.fdt")
+        chanlocs = numpy.zeros((1, len(self.LABELS)), dtype=[('labels', object)])
+        for idx, label in enumerate(self.LABELS):
+            chanlocs[0, idx]['labels'] = label
+        savemat(set_path, {'EEG': {'srate': 1.0 / self.SAMPLE_PERIOD, 'pnts': self.NR_SAMPLES,
+                                   'nbchan': len(self.LABELS), 'chanlocs': chanlocs}}, appendmat=False)
+        data.tofile(fdt_path)
+
+        importer = EEGLAB()
+        importer.read_files(set_path, fdt_path)
+        self._write_and_check(importer, data)
+
+
+
+def suite():
+    """
+    Gather all the tests in a test suite.
+    """
+    test_suite = unittest.TestSuite()
+    test_suite.addTest(unittest.makeSuite(SignalsImporterTest))
+    return test_suite
+
+
+if __name__ == "__main__":
+    #So you can run tests from this package individually.
+    TEST_RUNNER = unittest.TextTestRunner()
+    TEST_SUITE = suite()
+    TEST_RUNNER.run(TEST_SUITE)
@@ -46,6 +46,7 @@ from tvb.tests.framework.adapters.uploaders import obj_file_test, obj_importer_t
 from tvb.tests.framework.adapters.uploaders import projection_matrix_importer_test
 from tvb.tests.framework.adapters.uploaders import region_mapping_importer_test
 from tvb.tests.framework.adapters.uploaders import sensors_importer_test
+from tvb.tests.framework.adapters.uploaders import signals_importer_test
 from tvb.tests.framework.adapters.uploaders import tvb_importer_test
 from tvb.tests.framework.adapters.uploaders import zip_surface_importer_test
 
@@ -70,6 +71,7 @@ def suite():
     test_suite.addTest(projection_matrix_importer_test.suite())
     test_suite.addTest(region_mapping_importer_test.suite())
     test_suite.addTest(sensors_importer_test.suite())
+    test_suite.addTest(signals_importer_test.suite())
     test_suite.addTest(tvb_importer_test.suite())
     test_suite.addTest(zip_surface_importer_test.suite())
     return test_suite
@@ -33,11 +33,13 @@
 """
 
 import unittest
+import numpy
 from tvb.core.entities.file.files_helper import FilesHelper
 from tvb.datatypes.surfaces import FaceSurface, EEGCap
 from tvb.datatypes.connectivity import Connectivity
 from tvb.datatypes.sensors import SensorsEEG
-from tvb.adapters.visualizers.brain import BrainViewer, DualBrainViewer
+from tvb.datatypes.region_mapping import RegionMapping
+from tvb.adapters.visualizers.brain import BrainViewer, DualBrainViewer, RegionAggregation
 from tvb.tests.framework.core.test_factory import TestFactory
 from tvb.tests.framework.datatypes.datatypes_factory import DatatypesFactory
 from tvb.tests.framework.core.base_testcase import TransactionalTestCase
@@ -94,6 +96,53 @@ class BrainViewerTest(TransactionalTestCase):
         self.assertFalse(result['extended_view'])
 
     
+    def test_launch_surface_regions(self):
+        """
+        Check that a surface TimeSeries can be played at region level, with the mean of the region vertices.
+        """
+        region_map = TestFactory.get_entity(self.test_project, RegionMapping())
+        self.assertTrue(region_map is not None)
+        time_series = self.datatypeFactory.create_surface_timeseries(region_map.surface)
+        viewer = BrainViewer()
+        viewer.current_project_id = self.test_project.id
+        result = viewer.launch(time_series=time_series, resolution=RegionAggregation.METHOD_MEAN)
+
+        number_of_regions = region_map.connectivity.number_of_regions
+        self.assertFalse(result['isOneToOneMapping'])
+        self.assertEqual(number_of_regions, result['noOfMeasurePoints'])
+        self.assertTrue(result['base_activity_url'].startswith(BrainViewer.REGION_AGGREGATE_URL_PREFIX))
+
+        ## The launch only started computing the regions data; reading it waits for the computation to end
+        aggregation = RegionAggregation(time_series, region_map, RegionAggregation.METHOD_MEAN)
+        page = aggregation.read_data_page(0, 5, specific_slices=[None, 0, None, 0])
+        self.assertTrue(aggregation.prepare())
+        self.assertEqual((5, number_of_regions), page.shape)
+        data = time_series.get_data('data')
+        mapping = region_map.array_data
+        for region in numpy.unique(mapping):
+            expected = data[:5, 0, mapping == region, 0].mean(axis=1)
+            numpy.testing.assert_allclose(expected, page[:, region])
+        min_val, max_val = aggregation.get_min_max_values()
+        self.assertTrue(data.min() <= min_val <= max_val <= data.max())
+
+
+    def test_surface_regions_pca(self):
+        """
+        Check the principal component of the region vertices, on a TimeSeries with all vertices in phase.
+        """
+        region_map = TestFactory.get_entity(self.test_project, RegionMapping())
+        time_series = self.datatypeFactory.create_surface_timeseries(region_map.surface)
+        aggregation = RegionAggregation(time_series, region_map, RegionAggregation.METHOD_PCA)
+        ## One pass over the TimeSeries for each region
+        aggregation.PCA_MEMORY_BUDGET = 1
+        signal = numpy.random.random((10, 1, 1, 1))
+        aggregation._read_chunks = lambda: iter([numpy.tile(signal, (1, 1, len(region_map.array_data), 1))])
+
+        page = aggregation.read_data_page(0, 10, specific_slices=[None, 0, None, 0])
+        for region in numpy.unique(region_map.array_data):
+            numpy.testing.assert_allclose(signal[:, 0, 0, 0], page[:, region])
+
+
     def test_get_required_memory(self):
         """
         Brainviewer should know required memory so expect positive number and not -1.
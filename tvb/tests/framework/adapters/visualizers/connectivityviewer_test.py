@@ -30,9 +30,14 @@
 """
 .. moduleauthor:: Bogdan Neacsa <bogdan.neacsa@codemart.ro>
 """
+import os
+import json
+import math
 import unittest
+import numpy
 from tvb.core.entities.file.files_helper import FilesHelper
-from tvb.adapters.visualizers.connectivity import ConnectivityViewer
+from tvb.core.services.project_service import ProjectService
+from tvb.adapters.visualizers.connectivity import ConnectivityViewer, Connectivity2DViewer, DERIVED_PARAMETERS_CACHE
 from tvb.datatypes.surfaces import CorticalSurface
 from tvb.datatypes.connectivity import Connectivity
 from tvb.tests.framework.core.test_factory import TestFactory
@@ -79,8 +84,61 @@ class ConnectivityViewerTest(TransactionalTestCase):
                          'leftHemisphereJson', 'connectivity_entity', 'bothHemisphereJson']
         for key in expected_keys:
             self.assertTrue(key in result)
-    
-    
+
+
+    def test_parameters_equivalence(self):
+        """
+        Check the vectorised parameters against a plain element by element computation.
+        """
+        weights = self.connectivity.ordered_weights
+        expected_extrema = (min(weights.flat), max(weights.flat), min(w for w in weights.flat if w != 0))
+        result = ConnectivityViewer().compute_connectivity_global_params(self.connectivity)[0]
+        self.assertEqual(expected_extrema, (result['weightsMin'], result['weightsMax'], result['weightsNonZeroMin']))
+
+        viewer = Connectivity2DViewer()
+        normalized = viewer._normalize_weights(weights)
+        w_min, w_max = numpy.min(weights), numpy.max(weights)
+        for (i, j), value in numpy.ndenumerate(weights):
+            expected = viewer.MIN_WEIGHT_VALUE + ((value - w_min) / (w_max - w_min)) * (viewer.MAX_WEIGHT_VALUE -
+                                                                                       viewer.MIN_WEIGHT_VALUE)
+            self.assertAlmostEqual(expected, normalized[i][j])
+
+        rays = [5.0] * self.connectivity.number_of_regions
+        colors = [viewer.DEFAULT_COLOR] * self.connectivity.number_of_regions
+        labels, positions = self.connectivity.ordered_labels, self.connectivity.ordered_centres
+        result = json.loads(viewer._get_json(labels, positions, normalized, math.pi, 0, 1, rays, colors, 280, 300))
+        self.assertEqual(len(labels), len(result))
+
+        x_values, y_values = positions[:, 0], positions[:, 1]
+        for i, node in enumerate(result):
+            x_coord = (x_values[i] - (max(x_values) + min(x_values)) / 2) * 2 * 280 / (max(x_values) - min(x_values))
+            y_coord = (y_values[i] - (max(y_values) + min(y_values)) / 2) * 2 * 300 / (max(y_values) - min(y_values))
+            self.assertEqual(labels[i], node['id'])
+            self.assertAlmostEqual(math.pi + math.atan2(y_coord, x_coord), node['data']['angle'])
+            self.assertAlmostEqual(math.sqrt(x_coord ** 2 + y_coord ** 2), node['data']['radius'])
+            self.assertEqual(5.0, node['data']['customShapeDimension'])
+            expected_edges = [(label, weight) for label, weight in zip(labels, normalized[i]) if weight]
+            expected_edges = sorted(expected_edges, key=lambda edge: -edge[1])[:viewer.MAX_EDGES_PER_NODE]
+            self.assertEqual(sorted(expected_edges),
+                             sorted((edge['nodeTo'], edge['data']['weight']) for edge in node['adjacencies']))
+
+
+    def test_parameters_cache(self):
+        """
+        Check that the derived parameters are cached next to the Connectivity, and removed together with it.
+        """
+        cache_path = FilesHelper().get_datatype_cache_path(self.connectivity, DERIVED_PARAMETERS_CACHE)
+        self.assertFalse(os.path.exists(cache_path))
+        first = ConnectivityViewer().launch(self.connectivity)
+        self.assertTrue(os.path.exists(cache_path))
+        second = ConnectivityViewer().launch(self.connectivity)
+        for key in ['bothHemisphereJson', 'leftHemisphereJson', 'rightHemisphereJson', 'weightsMin', 'tractsMax']:
+            self.assertEqual(first[key], second[key])
+
+        ProjectService().remove_datatype(self.test_project.id, self.connectivity.gid, skip_validation=True)
+        self.assertFalse(os.path.exists(cache_path))
+
+
 def suite():
     """
     Gather all the tests in a test suite.
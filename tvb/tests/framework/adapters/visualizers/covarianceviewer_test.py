@@ -32,7 +32,10 @@
 """
 import unittest
 from tvb.core.entities.file.files_helper import FilesHelper
+import os
+import numpy
 from tvb.adapters.visualizers.covariance import CovarianceVisualizer
+from tvb.adapters.visualizers.matrix_viewer import MatrixTiles, compute_2d_view, downsample_blocks
 from tvb.datatypes.connectivity import Connectivity
 from tvb.tests.framework.core.test_factory import TestFactory
 from tvb.tests.framework.datatypes.datatypes_factory import DatatypesFactory
@@ -81,6 +84,32 @@ class CovarianceViewerTest(TransactionalTestCase):
             self.assertTrue(key in result)
 
 
+    def test_tiles(self):
+        """
+        Check that tiles of the covariance matrix are read at full resolution and from the cached levels.
+        """
+        time_series = self.datatypeFactory.create_timeseries(self.connectivity)
+        covariance = self.datatypeFactory.create_covariance(time_series)
+        tiles = MatrixTiles(covariance)
+        tiles.TILE_SIZE = 2
+        tiles.level_shapes = [tiles.shape]
+        while max(tiles.level_shapes[-1]) > tiles.TILE_SIZE:
+            tiles.level_shapes.append(tuple(-(-dim // tiles.LEVEL_FACTOR) for dim in tiles.level_shapes[-1]))
+
+        full = compute_2d_view(covariance.get_data('array_data'), None)[0]
+        minimum, _, mean = tiles.get_tile(0, 0, 0)
+        self.assertTrue(numpy.allclose(full[:2, :2], mean))
+        self.assertTrue(numpy.allclose(full[:2, :2], minimum))
+
+        self.assertFalse(os.path.exists(tiles.cache_path))
+        expected = downsample_blocks(full, full, full, tiles.LEVEL_FACTOR)
+        for level_values, expected_values in zip(tiles.get_tile(1, 0, 0), expected):
+            self.assertTrue(numpy.allclose(expected_values[:2, :2], level_values))
+        self.assertTrue(os.path.exists(tiles.cache_path))
+        self.assertEqual(3 * 4 * 4, len(tiles.get_tile_bytes(1, 0, 0)))
+        self.assertRaises(ValueError, tiles.get_tile, len(tiles.level_shapes), 0, 0)
+
+
 
 def suite():
     """
@@ -33,9 +33,10 @@
 import json
 import os
 import unittest
+import numpy
 import tvb_data.sensors as sensors_dataset
 from tvb.core.entities.file.files_helper import FilesHelper
-from tvb.adapters.visualizers.eeg_monitor import EegMonitor
+from tvb.adapters.visualizers.eeg_monitor import EegMonitor, TimeSeriesStatistics
 from tvb.datatypes.connectivity import Connectivity
 from tvb.datatypes.sensors import SensorsEEG
 from tvb.tests.framework.core.test_factory import TestFactory
@@ -43,6 +44,21 @@ from tvb.tests.framework.datatypes.datatypes_factory import DatatypesFactory
 from tvb.tests.framework.core.base_testcase import TransactionalTestCase
 
 
+class _InMemoryTimeSeries(object):
+    """
+    Stand-in for a stored TimeSeries, reading from a given array.
+    """
+    def __init__(self, data):
+        self.data = data
+
+    def read_data_shape(self):
+        return self.data.shape
+
+    def get_data(self, data_name, data_slice=None):
+        return self.data if data_slice is None else self.data[data_slice]
+
+
+
 class EEGMonitorTest(TransactionalTestCase):
     """
     Unit-tests for EEG Viewer.
@@ -99,6 +115,48 @@ class EEGMonitorTest(TransactionalTestCase):
             self.assertTrue(key in ag_settings, "ag_settings should have the key %s" % key)
 
 
+    def test_statistics(self):
+        """
+        Check that the statistics of a TimeSeries are computed over all time points, stored, then read back.
+        """
+        time_series = self.datatypeFactory.create_timeseries(self.connectivity)
+        data = time_series.get_data('data')
+        statistics = TimeSeriesStatistics(time_series)
+        statistics.CHUNK_ELEMENTS = 1
+        computed = statistics.get()
+        numpy.testing.assert_allclose(data.min(axis=0), computed[TimeSeriesStatistics.MINIMUM])
+        numpy.testing.assert_allclose(data.max(axis=0), computed[TimeSeriesStatistics.MAXIMUM])
+        self.assertFalse(computed[TimeSeriesStatistics.NAN_COUNT].any())
+
+        stored = TimeSeriesStatistics(time_series)._read()
+        self.assertTrue(stored is not None, "Statistics should have been stored in the TimeSeries file")
+        for name, values in computed.iteritems():
+            numpy.testing.assert_allclose(values, stored[name])
+
+        viewer = EegMonitor()
+        viewer.selected_dimensions = [0, 2]
+        step, translations, channels_per_set = viewer.compute_required_info([time_series])
+        self.assertEqual([data.shape[2]], channels_per_set)
+        numpy.testing.assert_allclose((data[:, 0, :, 0].max(axis=0) + data[:, 0, :, 0].min(axis=0)) / 2,
+                                      translations)
+        self.assertAlmostEqual((data[:, 0, :, 0].max(axis=0) - data[:, 0, :, 0].min(axis=0)).max(), step)
+
+
+    def test_statistics_nan(self):
+        """
+        Check that NaN values are counted and left out of the extrema.
+        """
+        data = numpy.random.random((10, 2, 5, 1))
+        data[2, 0, 3, 0] = numpy.nan
+        data[:, 0, 4, 0] = numpy.nan
+        computed = TimeSeriesStatistics(_InMemoryTimeSeries(data)).compute()
+
+        self.assertEqual(1, computed[TimeSeriesStatistics.NAN_COUNT][0, 3, 0])
+        self.assertEqual(data.shape[0], computed[TimeSeriesStatistics.NAN_COUNT][0, 4, 0])
+        self.assertEqual(numpy.nanmin(data[:, 0, 3, 0]), computed[TimeSeriesStatistics.MINIMUM][0, 3, 0])
+        self.assertEqual(0, computed[TimeSeriesStatistics.MAXIMUM][0, 4, 0])
+
+
 def suite():
     """
     Gather all the tests in a test suite.
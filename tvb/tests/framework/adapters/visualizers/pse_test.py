@@ -33,10 +33,13 @@
 .. moduleauthor:: Bogdan Neacsa <bogdan.neacsa@codemart.ro>
 """
 
+import datetime
 import unittest
 from tvb.basic.profile import TvbProfile
 from tvb.adapters.visualizers.pse_discrete import DiscretePSEAdapter
 from tvb.adapters.visualizers.pse_isocline import IsoclinePSEAdapter
+from tvb.core.entities.storage import dao
+from tvb.core.utils import date2string
 from tvb.tests.framework.datatypes.datatypes_factory import DatatypesFactory
 from tvb.tests.framework.core.base_testcase import TransactionalTestCase
 
@@ -74,6 +77,34 @@ class PSETest(TransactionalTestCase):
 
 
 
+    def test_prepare_updates_discrete(self):
+        """
+        Check that only the nodes completed after a given moment are returned for a live refresh.
+        """
+        operation_group = dao.get_operationgroup_by_id(self.group.fk_operation_group)
+        operations = dao.get_operations_in_group(operation_group.id)
+        for operation in operations:
+            operation.completion_date = datetime.datetime.now()
+            dao.store_entity(operation)
+
+        since = date2string(datetime.datetime.now() - datetime.timedelta(days=1))
+        result = DiscretePSEAdapter.prepare_updates(self.group.gid, since)
+        self.assertEqual(len(operations), len(result['points']))
+        for point in result['points']:
+            self.assertTrue('series' in point)
+            self.assertTrue('radius' in point['series']['points'])
+        self.assertFalse(result['has_started_ops'])
+
+        result = DiscretePSEAdapter.prepare_updates(self.group.gid, result['timestamp'])
+        self.assertEqual([], result['points'])
+
+        limits = [-10.0, 10.0, None, None]
+        result = DiscretePSEAdapter.prepare_updates(self.group.gid, since, limits=limits)
+        self.assertEqual(len(operations), len(result['points']))
+        self.assertTrue(result['min_color'] <= limits[0] and result['max_color'] >= limits[1],
+                        "Limits the PSE is drawn with should only be extended")
+
+
     def test_launch_isocline(self):
         """
         Check that all required keys are present in output from PSE Discrete Adapter launch.
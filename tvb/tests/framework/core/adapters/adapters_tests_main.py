@@ -39,6 +39,7 @@ from tvb.tests.framework.core.adapters import xml_reader_test
 from tvb.tests.framework.core.adapters import introspector_test
 from tvb.tests.framework.core.adapters import adapters_memory_usage_tests
 from tvb.tests.framework.core.adapters import abcadapter_test
+from tvb.tests.framework.core.adapters import resource_estimator_test
 
 def suite():
     """
@@ -49,6 +50,7 @@ def suite():
     test_suite.addTest(xml_reader_test.suite())
     test_suite.addTest(adapters_memory_usage_tests.suite())
     test_suite.addTest(abcadapter_test.suite())
+    test_suite.addTest(resource_estimator_test.suite())
     return test_suite
 
 
@@ -38,6 +38,7 @@ from tvb.tests.framework.core.base_testcase import BaseTestCase
 from tvb.basic.profile import TvbProfile
 from tvb.core.entities import model
 from tvb.core.entities.storage import dao
+from tvb.core.adapters.abcadapter import ABCAdapter
 from tvb.core.adapters.introspector import Introspector
 import tvb.tests.framework.adapters as adapters_init
 
@@ -120,6 +121,35 @@ class IntrospectorTest(BaseTestCase):
         self.assertEqual(group.classname, "TestGroupAdapter", "The class-name of the group is not valid")
         self.assertEqual(group.module, "tvb.tests.framework.adapters.testgroupadapter", "Group Module invalid")
 
+
+
+    def test_introspect_unchanged(self):
+        """
+        Check that a second introspection reads the unchanged adapters from the manifest, without building them,
+        and still restores in DB the groups removed in the meantime.
+        """
+        init_parameter = os.path.join("core", "adapters", "test_group.xml")
+        group = dao.find_group("tvb.tests.framework.adapters.testgroupadapter", "TestGroupAdapter", init_parameter)
+        dao.remove_entity(model.AlgorithmGroup, group.id)
+
+        built_adapters = []
+        original_build = ABCAdapter.__dict__['build_adapter']
+
+        def _build_adapter(algo_group):
+            built_adapters.append(algo_group.classname)
+            return original_build.__func__(algo_group)
+
+        ABCAdapter.build_adapter = staticmethod(_build_adapter)
+        try:
+            Introspector("tvb.tests.framework").introspect(True)
+        finally:
+            ABCAdapter.build_adapter = original_build
+
+        self.assertEqual([], built_adapters, "Unchanged adapters should not be built again")
+        group = dao.find_group("tvb.tests.framework.adapters.testgroupadapter", "TestGroupAdapter", init_parameter)
+        self.assertTrue(group is not None, "The removed group was not restored")
+        self.assertEqual(group.displayname, "Simple Python Analyzers", "The display-name of the group is not valid")
+        self.assertTrue(dao.get_algorithm_by_group(group.id, "CC") is not None, "The algorithm was not restored")
         
 def suite():
     """
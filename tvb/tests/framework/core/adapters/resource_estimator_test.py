@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under 
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General 
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Tests for the resources estimates, from the history of an algorithm.
+"""
+
+import unittest
+import datetime
+from tvb.core.entities import model
+from tvb.core.entities.storage import dao
+from tvb.core.adapters.resource_estimator import ResourceEstimator, RUNTIME, PEAK_MEMORY
+from tvb.tests.framework.core.base_testcase import TransactionalTestCase
+from tvb.tests.framework.core.test_factory import TestFactory
+
+
+
+class ResourceEstimatorTest(TransactionalTestCase):
+    """
+    Test the estimates predicted from the resources used by previous operations.
+    """
+
+    def setUp(self):
+        ResourceEstimator._models = {}
+        self.adapter = TestFactory.create_adapter()
+        self.adapter.get_size_features = lambda **kwargs: {'nodes': kwargs['nodes']}
+        self.adapter.get_execution_time_approximation = lambda **kwargs: -1
+
+
+    def _store_usage(self, nodes, runtime):
+        usage = model.OperationResourceUsage(self.adapter.algorithm_group.id, None, {'nodes': nodes},
+                                             runtime, None, 0)
+        dao.store_entity(usage)
+
+
+    def test_fallback_without_history(self):
+        self.assertEqual(None, ResourceEstimator.predict(self.adapter, RUNTIME, nodes=10))
+        self.assertEqual(-1, ResourceEstimator.estimate(self.adapter, RUNTIME, nodes=10))
+
+        for nodes in xrange(1, ResourceEstimator.MIN_SAMPLES):
+            self._store_usage(nodes * 10, nodes * 5.0)
+        self.assertEqual(-1, ResourceEstimator.estimate(self.adapter, RUNTIME, nodes=10))
+        ## Peak memory was not recorded
+        self.assertEqual(None, ResourceEstimator.predict(self.adapter, PEAK_MEMORY, nodes=10))
+
+
+    def test_predict_from_history(self):
+        for nodes in [10, 20, 40, 80, 160, 320]:
+            self._store_usage(nodes, nodes * 0.5)
+        estimate, lower, upper = ResourceEstimator.predict(self.adapter, RUNTIME, nodes=100)
+        self.assertTrue(lower <= estimate <= upper)
+        self.assertTrue(abs(estimate - 50) < 5, "Unexpected estimate %s" % estimate)
+        self.assertEqual(upper, ResourceEstimator.estimate(self.adapter, RUNTIME, nodes=100))
+
+        ## Too far from the sizes seen so far
+        self.assertEqual(-1, ResourceEstimator.estimate(self.adapter, RUNTIME, nodes=10000))
+
+        ## Models are fitted again when new operations are recorded
+        for _ in xrange(6):
+            self._store_usage(100, 500.0)
+        estimate, _, upper = ResourceEstimator.predict(self.adapter, RUNTIME, nodes=100)
+        self.assertTrue(estimate > 55, "History was not re-read %s" % estimate)
+
+
+    def test_record(self):
+        operation = TestFactory.create_operation()
+        operation.start_date = datetime.datetime.now() - datetime.timedelta(seconds=30)
+        operation.completion_date = datetime.datetime.now()
+        ResourceEstimator.record(self.adapter, operation, 2 ** 20, nodes=76)
+
+        usages = dao.get_resource_usage(self.adapter.algorithm_group.id, 10)
+        self.assertEqual(1, len(usages))
+        self.assertEqual(operation.id, usages[0].operation_id)
+        self.assertTrue(29 < usages[0].runtime < 31)
+        self.assertEqual(2 ** 20, usages[0].peak_memory)
+        self.assertEqual('{"nodes": 76.0}', usages[0].size_features)
+
+
+
+    def test_peak_memory_above_baseline(self):
+        self.assertEqual(None, ResourceEstimator.get_peak_memory(None))
+        baseline = ResourceEstimator.get_current_memory()
+        self.assertTrue(baseline > 0)
+        peak_memory = ResourceEstimator.get_peak_memory(baseline)
+        if peak_memory is not None:
+            ## The interpreter and the modules already imported are not counted
+            self.assertTrue(0 <= peak_memory < ResourceEstimator.get_peak_memory(0.0))
+
+
+
+def suite():
+    """
+    Gather all the tests in a test suite.
+    """
+    test_suite = unittest.TestSuite()
+    test_suite.addTest(unittest.makeSuite(ResourceEstimatorTest))
+    return test_suite
+
+
+
+if __name__ == "__main__":
+    #So you can run tests from this package individually.
+    TEST_RUNNER = unittest.TextTestRunner()
+    TEST_SUITE = suite()
+    TEST_RUNNER.run(TEST_SUITE)
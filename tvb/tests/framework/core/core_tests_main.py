@@ -35,6 +35,7 @@ Created on Jul 19, 2011
 
 import unittest
 from tvb.tests.framework.core import utils_test
+from tvb.tests.framework.core import metrics_test
 from tvb.tests.framework.core.traits import traits_tests_main
 from tvb.tests.framework.core.services import services_tests_main
 from tvb.tests.framework.core.entities import storage_tests_main
@@ -49,6 +50,7 @@ def suite():
     """
     test_suite = unittest.TestSuite()
     test_suite.addTest(utils_test.suite())
+    test_suite.addTest(metrics_test.suite())
     test_suite.addTest(traits_tests_main.suite())
     test_suite.addTest(services_tests_main.suite())
     test_suite.addTest(storage_tests_main.suite())
@@ -40,7 +40,7 @@ from tvb.core.entities.file.xml_metadata_handlers import XMLReader
 from tvb.core.entities import model
 from tvb.core.entities.storage import dao
 from tvb.core.entities.file.exceptions import FileStructureException
-from tvb.core.entities.file.files_helper import FilesHelper
+from tvb.core.entities.file.files_helper import FilesHelper, TvbZip
 from tvb.tests.framework.core.base_testcase import TransactionalTestCase
 from tvb.tests.framework.core.test_factory import TestFactory
 
@@ -251,6 +251,33 @@ class FilesHelperTest(TransactionalTestCase):
         self.assertRaises(FileStructureException, self.files_helper.remove_folder, folder_name, False)
 
 
+    def test_unpack_indexed_zip(self):
+        """
+        Folders packed in an indexed archive are unpacked in place, without intermediate archives left on disk.
+        """
+        work_folder = os.path.join(TvbProfile.current.TVB_TEMP_FOLDER, "indexed_zip")
+        folders = {}
+        for name in ("1", "2"):
+            folders[name] = os.path.join(work_folder, "source", name)
+            os.makedirs(os.path.join(folders[name], "sub"))
+            with open(os.path.join(folders[name], "sub", "data.txt"), 'w') as data_file:
+                data_file.write("operation " + name + "\n" * 1000)
+        zip_path = os.path.join(work_folder, "export.zip")
+        with TvbZip(zip_path, "w") as zip_file:
+            zip_file.write_indexed_folders(folders, work_folder)
+
+        target = os.path.join(work_folder, "target")
+        os.makedirs(target)
+        try:
+            unpacked = self.files_helper.unpack_indexed_zip(zip_path, target, selected_folders=["2"])
+            self.assertEqual(["2"], unpacked)
+            self.assertEqual(["2"], os.listdir(target))
+            with open(os.path.join(target, "2", "sub", "data.txt")) as data_file:
+                self.assertEqual("operation 2" + "\n" * 1000, data_file.read())
+        finally:
+            self.files_helper.remove_folder(work_folder, True)
+
+
 def suite():
     """
     Gather all the tests in a test suite.
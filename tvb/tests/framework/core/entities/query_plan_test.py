@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under 
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General 
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Check on a large SQLite DB that the listing queries are served from indexes, and not through full-table scans.
+"""
+
+import unittest
+from sqlalchemy import event
+from tvb.basic.profile import TvbProfile
+from tvb.core.entities import model
+from tvb.core.entities.storage import dao
+from tvb.core.entities.storage.session_maker import DB_ENGINE
+from tvb.tests.framework.core.base_testcase import BaseTestCase
+from tvb.tests.framework.core.test_factory import TestFactory
+
+
+
+class QueryPlanTest(BaseTestCase):
+    """
+    Seed OPERATIONS and DATA_TYPES with many rows (spread in multiple projects),
+    then run EXPLAIN QUERY PLAN for the statements the DAO methods emit.
+    """
+    NUMBER_OF_PROJECTS = 50
+    ROWS_PER_PROJECT = 400
+    WATCHED_TABLES = ['OPERATIONS', 'DATA_TYPES']
+
+    captured_statements = None
+    is_listening = False
+
+
+    @classmethod
+    def _capture_statement(cls, conn, cursor, statement, parameters, context, executemany):
+        """Listener for the DB engine: remember the SQL statements, while a capture is in progress."""
+        if cls.captured_statements is not None and statement.lstrip().upper().startswith("SELECT"):
+            cls.captured_statements.append((statement, parameters))
+
+
+    def setUp(self):
+        if TvbProfile.current.db.SELECTED_DB != 'sqlite':
+            self.skipTest("Query plans are checked with SQLite only")
+        self.clean_database()
+        self.test_user = TestFactory.create_user()
+        self.test_project = TestFactory.create_project(self.test_user)
+        self.operation = TestFactory.create_operation(test_user=self.test_user, test_project=self.test_project)
+        self._seed_rows()
+        if not QueryPlanTest.is_listening:
+            event.listen(DB_ENGINE, 'before_cursor_execute', QueryPlanTest._capture_statement)
+            QueryPlanTest.is_listening = True
+
+
+    def tearDown(self):
+        QueryPlanTest.captured_statements = None
+        self.clean_database()
+
+
+    def _seed_rows(self):
+        """Bulk insert operations in several projects, each operation with a resulted datatype."""
+        operations = []
+        project_ids = [self.test_project.id] + [self.test_project.id + 1000 + i
+                                                for i in xrange(self.NUMBER_OF_PROJECTS - 1)]
+        for project_id in project_ids:
+            for i in xrange(self.ROWS_PER_PROJECT):
+                operations.append(dict(fk_launched_by=self.test_user.id, fk_launched_in=project_id,
+                                       fk_from_algo=self.operation.fk_from_algo, gid="op-%d-%d" % (project_id, i),
+                                       method_name=self.operation.method_name, status=model.STATUS_FINISHED,
+                                       visible=True, fk_operation_group=None))
+        DB_ENGINE.execute(model.Operation.__table__.insert(), operations)
+
+        first_id = self.operation.id + 1
+        datatypes = [dict(gid="dt-%d" % (first_id + i), type="Datatype1", module="tvb.tests.framework.datatypes",
+                          fk_from_operation=first_id + i, fk_datatype_group=None, fk_parent_burst=None)
+                     for i in xrange(len(operations))]
+        DB_ENGINE.execute(model.DataType.__table__.insert(), datatypes)
+
+
+    def _full_scans(self, dao_call, *args, **kwargs):
+        """
+        Run a DAO call, capture its SELECT statements and return the query plan lines
+        which are full scans on one of the WATCHED_TABLES.
+        """
+        QueryPlanTest.captured_statements = []
+        try:
+            dao_call(*args, **kwargs)
+            statements = QueryPlanTest.captured_statements
+        finally:
+            QueryPlanTest.captured_statements = None
+        self.assertTrue(len(statements) > 0, "No statement captured for %s" % dao_call.__name__)
+
+        full_scans = []
+        for statement, parameters in statements:
+            for plan_row in DB_ENGINE.execute("EXPLAIN QUERY PLAN " + statement, parameters).fetchall():
+                detail = plan_row[-1]
+                words = detail.replace("TABLE ", "").split()
+                if words[0] == "SCAN" and words[1] in self.WATCHED_TABLES:
+                    full_scans.append(detail)
+        return full_scans
+
+
+    def test_filtered_operations(self):
+        """
+        The operations listing (count, offset page and keyset page) should search by project.
+        """
+        self.assertEqual([], self._full_scans(dao.get_filtered_operations, self.test_project.id, None,
+                                              is_count=True))
+        self.assertEqual([], self._full_scans(dao.get_filtered_operations, self.test_project.id, None, 40, 20))
+        self.assertEqual([], self._full_scans(dao.get_filtered_operations, self.test_project.id, None,
+                                              before_id=self.operation.id + 100))
+
+
+    def test_keyset_matches_offset(self):
+        """
+        Pages sought from the boundary of their neighbour are the same as pages computed with offset.
+        """
+        first_page = dao.get_filtered_operations(self.test_project.id, None, 0, 20)
+        second_page = dao.get_filtered_operations(self.test_project.id, None, 20, 20)
+        self.assertEqual(second_page, dao.get_filtered_operations(self.test_project.id, None,
+                                                                  before_id=first_page[-1][1]))
+        self.assertEqual(first_page, dao.get_filtered_operations(self.test_project.id, None,
+                                                                 after_id=second_page[0][1]))
+
+
+    def test_operations_per_user(self):
+        """
+        Started operations for a user are searched by (user, status).
+        """
+        self.assertEqual([], self._full_scans(dao.compute_disk_size_for_started_ops, self.test_user.id))
+
+
+    def test_datatype_foreign_keys(self):
+        """
+        Datatypes are searched by their parent operation, group and burst.
+        """
+        self.assertEqual([], self._full_scans(dao.get_results_for_operation, self.operation.id + 1))
+        self.assertEqual([], self._full_scans(dao.count_datatypes_in_group, self.operation.id + 1))
+        self.assertEqual([], self._full_scans(dao.count_datatypes_in_burst, 1))
+
+
+
+def suite():
+    """
+    Gather all the tests in a test suite.
+    """
+    test_suite = unittest.TestSuite()
+    test_suite.addTest(unittest.makeSuite(QueryPlanTest))
+    return test_suite
+
+
+if __name__ == "__main__":
+    #So you can run tests from this package individually.
+    unittest.main()
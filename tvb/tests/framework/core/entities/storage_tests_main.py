@@ -35,6 +35,7 @@ import unittest
 from tvb.tests.framework.core.entities import model_manager_test
 from tvb.tests.framework.core.entities import filtering_test
 from tvb.tests.framework.core.entities import transactional_test
+from tvb.tests.framework.core.entities import query_plan_test
 from tvb.tests.framework.core.entities.file import file_tests_main
 
 
@@ -47,6 +48,7 @@ def suite():
     test_suite.addTest(model_manager_test.suite())
     test_suite.addTest(filtering_test.suite())
     test_suite.addTest(transactional_test.suite())
+    test_suite.addTest(query_plan_test.suite())
     return test_suite
 
 
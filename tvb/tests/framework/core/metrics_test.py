@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under 
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General 
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Tests for the in-process metrics registry, and its text rendering.
+"""
+
+import unittest
+from tvb.core.metrics import MetricsRegistry
+
+
+
+class MetricsTest(unittest.TestCase):
+    """
+    Test counters, gauges and histograms, as scraped from the rendered text.
+    """
+
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+
+    def _scrape(self):
+        """
+        :returns: dictionary {sample line without value: value}, parsed from the rendered text.
+        """
+        samples = {}
+        for line in self.registry.render().splitlines():
+            if line and not line.startswith("#"):
+                sample, value = line.rsplit(" ", 1)
+                samples[sample] = float(value)
+        return samples
+
+
+    def test_counter(self):
+        counter = self.registry.counter("tvb_test_total", "Test counter.", ("algorithm",))
+        counter.inc(algorithm="A")
+        counter.inc(2, algorithm="A")
+        counter.inc(algorithm='B"1')
+        self.assertEqual(3, counter.get(algorithm="A"))
+        self.assertRaises(ValueError, counter.inc, -1, algorithm="A")
+        self.assertRaises(ValueError, counter.inc, other="A")
+
+        text = self.registry.render()
+        self.assertTrue("# HELP tvb_test_total Test counter.\n# TYPE tvb_test_total counter\n" in text)
+        samples = self._scrape()
+        self.assertEqual(3, samples['tvb_test_total{algorithm="A"}'])
+        self.assertEqual(1, samples['tvb_test_total{algorithm="B\\"1"}'])
+
+
+    def test_gauge(self):
+        gauge = self.registry.gauge("tvb_test_open", "Test gauge.")
+        gauge.inc()
+        gauge.inc(4)
+        gauge.dec(2)
+        self.assertEqual(3, self._scrape()["tvb_test_open"])
+        queue = [1, 2]
+        gauge.set_function(lambda: len(queue))
+        queue.append(3)
+        self.assertEqual(3, self._scrape()["tvb_test_open"])
+        labeled = self.registry.gauge("tvb_test_labeled", "Test gauge.", ("mode",))
+        self.assertRaises(ValueError, labeled.set_function, lambda: 1)
+
+
+    def test_histogram(self):
+        histogram = self.registry.histogram("tvb_test_seconds", "Test histogram.", ("controller",), (0.1, 1))
+        for value in [0.05, 0.5, 0.7, 5]:
+            histogram.observe(value, controller="/project")
+        self.assertEqual((4, 6.25), histogram.get(controller="/project"))
+
+        samples = self._scrape()
+        self.assertEqual(1, samples['tvb_test_seconds_bucket{controller="/project",le="0.1"}'])
+        self.assertEqual(3, samples['tvb_test_seconds_bucket{controller="/project",le="1"}'])
+        self.assertEqual(4, samples['tvb_test_seconds_bucket{controller="/project",le="+Inf"}'])
+        self.assertEqual(4, samples['tvb_test_seconds_count{controller="/project"}'])
+        self.assertEqual(6.25, samples['tvb_test_seconds_sum{controller="/project"}'])
+
+
+    def test_register_again(self):
+        counter = self.registry.counter("tvb_test_total", "Test counter.")
+        self.assertTrue(counter is self.registry.counter("tvb_test_total", "Test counter."))
+        self.assertRaises(ValueError, self.registry.gauge, "tvb_test_total", "Test counter.")
+        self.assertRaises(ValueError, self.registry.counter, "tvb_test_total", "Test counter.", ("mode",))
+
+
+
+def suite():
+    """
+    Gather all the tests in a test suite.
+    """
+    test_suite = unittest.TestSuite()
+    test_suite.addTest(unittest.makeSuite(MetricsTest))
+    return test_suite
+
+
+if __name__ == "__main__":
+    #So you can run tests from this package individually.
+    TEST_RUNNER = unittest.TextTestRunner()
+    TEST_SUITE = suite()
+    TEST_RUNNER.run(TEST_SUITE)
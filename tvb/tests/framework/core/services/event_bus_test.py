@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Tests for the in-process Operation and Burst status notifications.
+"""
+
+import time
+import threading
+import unittest
+from tvb.core.entities import model
+from tvb.core.entities.storage import dao
+from tvb.core.services.event_bus import StatusEventBus, STATUS_EVENT_BUS, KIND_OPERATION, KIND_PROJECT
+from tvb.tests.framework.core.base_testcase import BaseTestCase
+from tvb.tests.framework.core.test_factory import TestFactory
+
+
+
+class StatusEventBusTest(BaseTestCase):
+    """
+    Test revisions, deltas and waiting for changes, on a bus independent of the application one.
+    """
+
+    def setUp(self):
+        self.clean_database()
+        self.test_user = TestFactory.create_user()
+        self.test_project = TestFactory.create_project(self.test_user)
+        self.event_bus = StatusEventBus()
+
+
+    def tearDown(self):
+        self.clean_database()
+
+
+    def test_changes_since_revision(self):
+        """
+        Only the events after the given revision are returned, per project.
+        """
+        self.assertEqual(0, self.event_bus.get_revision(self.test_project.id))
+        self.event_bus.publish(self.test_project.id, KIND_OPERATION, 1, model.STATUS_STARTED)
+        self.event_bus.publish(self.test_project.id + 1, KIND_OPERATION, 2, model.STATUS_STARTED)
+        self.event_bus.publish(self.test_project.id, KIND_OPERATION, 1, model.STATUS_FINISHED)
+
+        result = self.event_bus.get_changes(self.test_project.id, 1)
+        self.assertEqual(3, result['revision'])
+        self.assertEqual([{'kind': KIND_OPERATION, 'id': 1, 'status': model.STATUS_FINISHED}], result['changes'])
+        self.assertFalse(result['full_refresh'])
+        self.assertEqual([], self.event_bus.get_changes(self.test_project.id, 3)['changes'])
+
+
+    def test_full_refresh(self):
+        """
+        Clients behind the kept events, or from before a restart, should reload everything.
+        """
+        self.event_bus.MAX_EVENTS_PER_PROJECT = 2
+        for operation_id in xrange(4):
+            self.event_bus.publish(self.test_project.id, KIND_OPERATION, operation_id, model.STATUS_FINISHED)
+        self.assertTrue(self.event_bus.get_changes(self.test_project.id, 1)['full_refresh'])
+        self.assertFalse(self.event_bus.get_changes(self.test_project.id, 2)['full_refresh'])
+        self.assertTrue(self.event_bus.get_changes(self.test_project.id, 100)['full_refresh'])
+
+
+    def test_wait_for_changes(self):
+        """
+        A waiting request is woken up by a publish, and returns immediately when behind.
+        """
+        publisher = threading.Timer(0.5, self.event_bus.publish,
+                                    [self.test_project.id, KIND_OPERATION, 1, model.STATUS_STARTED])
+        publisher.start()
+        start = time.time()
+        result = self.event_bus.wait_for_changes(self.test_project.id, 0, 10)
+        self.assertTrue(time.time() - start < 5, "Waiting request was not woken up")
+        self.assertEqual(1, result['revision'])
+
+        start = time.time()
+        self.assertEqual(1, self.event_bus.wait_for_changes(self.test_project.id, 0, 10)['revision'])
+        self.assertTrue(time.time() - start < 1, "Request behind current revision should not wait")
+
+
+    def test_wait_limited_per_project(self):
+        """
+        Above the number of requests allowed to wait for a project, answer at once, with a retry hint.
+        """
+        self.event_bus.MAX_WAITING_PER_PROJECT = 0
+        start = time.time()
+        result = self.event_bus.wait_for_changes(self.test_project.id, 0, 10)
+        self.assertTrue(time.time() - start < 1, "Request above the limit should not wait")
+        self.assertEqual(self.event_bus.RETRY_AFTER, result['retry_after'])
+        self.assertEqual(0, result['revision'])
+
+
+    def test_changes_from_other_process(self):
+        """
+        Operation counters changed without a published transition produce a full refresh event.
+        """
+        self.event_bus.COUNTERS_CHECK_INTERVAL = 0
+        self.event_bus.wait_for_changes(self.test_project.id, 0, 0)
+        ## The transition is published on the application bus only, as if it happened in another process.
+        TestFactory.create_operation(test_user=self.test_user, test_project=self.test_project)
+
+        result = self.event_bus.wait_for_changes(self.test_project.id, 0, 1)
+        self.assertTrue(result['full_refresh'])
+        self.assertEqual(KIND_PROJECT, result['changes'][-1]['kind'])
+
+
+    def test_transitions_published_on_commit(self):
+        """
+        Storing an operation status change publishes it on the application bus.
+        """
+        operation = TestFactory.create_operation(test_user=self.test_user, test_project=self.test_project,
+                                                 operation_status=model.STATUS_STARTED)
+        revision = STATUS_EVENT_BUS.get_revision(self.test_project.id)
+        operation.mark_complete(model.STATUS_FINISHED)
+        dao.store_entity(operation)
+
+        result = STATUS_EVENT_BUS.get_changes(self.test_project.id, revision)
+        self.assertEqual([{'kind': KIND_OPERATION, 'id': operation.id, 'status': model.STATUS_FINISHED}],
+                         result['changes'])
+
+
+
+def suite():
+    """
+    Gather all the tests in a test suite.
+    """
+    test_suite = unittest.TestSuite()
+    test_suite.addTest(unittest.makeSuite(StatusEventBusTest))
+    return test_suite
+
+
+if __name__ == "__main__":
+    #So you can run tests from this package individually.
+    unittest.main()
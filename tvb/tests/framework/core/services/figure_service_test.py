@@ -40,9 +40,11 @@ if not hasattr(Image, 'open'):
 
 from tvb.tests.framework.core.base_testcase import TransactionalTestCase
 from tvb.core import utils
+from tvb.core.entities import model
 from tvb.core.entities.file.files_helper import FilesHelper
 from tvb.core.entities.storage import dao
 from tvb.core.services.figure_service import FigureService
+from tvb.core.services.ephemeral_displays import EphemeralDisplay, EPHEMERAL_DISPLAYS
 from tvb.tests.framework.core.test_factory import TestFactory
 
 
@@ -102,6 +104,25 @@ class FigureServiceTest(TransactionalTestCase):
         self.assertCanReadImage(image_path)
 
 
+    def test_store_image_from_ephemeral_display(self):
+        # test that a display launched without an Operation gets one when a figure is saved from it
+        test_operation = TestFactory.create_operation(test_user=self.user, test_project=self.project)
+        display = EphemeralDisplay(self.user.id, self.project.id, test_operation.fk_from_algo, '{}', '{}', 'launch')
+        display.mark_complete(model.STATUS_FINISHED)
+        EPHEMERAL_DISPLAYS.add(display)
+        self.assertTrue(display.operation_id is None)
+
+        self.figure_service.store_result_figure(self.project, self.user, "png", IMG_DATA, operation_id=display.key)
+        self.assertTrue(display.operation_id is not None)
+        operation = dao.get_operation_by_id(display.operation_id)
+        self.assertFalse(operation.visible)
+        self.assertEqual(model.STATUS_FINISHED, operation.status)
+        self.assertEqual(1, len(dao.get_figures_for_operation(display.operation_id)))
+
+        # saving another figure from the same display re-uses the stored Operation
+        self.assertEqual(display.operation_id, EPHEMERAL_DISPLAYS.persist(display.key))
+
+
     def test_store_and_retrieve_image(self):
         self.store_test_png()
         figures = self.retrieve_images()
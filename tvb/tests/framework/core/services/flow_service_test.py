@@ -212,6 +212,48 @@ class FlowServiceTest(TransactionalTestCase):
         self.assertEquals(interface[0]["default"], "0", "Bad interface!")
 
 
+    def test_prepare_parameters_resolution(self):
+        """
+        Test that a DataType type met in many branches of an input tree is queried only once,
+        and that display names are read in bulk.
+        """
+        operation = TestFactory.create_operation(test_user=self.test_user, test_project=self.test_project)
+        self._store_float_array(numpy.arange(5), "John Doe 1", operation.id)
+        self._store_float_array(numpy.arange(3), "John Doe 2", operation.id)
+        array_type = "tvb.datatypes.arrays.MappedArray"
+        input_tree = [{'name': 'array_1', 'type': array_type, 'required': True},
+                      {'name': 'choice', 'type': 'select', 'options': [
+                          {'name': 'option_1', 'value': 'option_1',
+                           'attributes': [{'name': 'array_2', 'type': MappedArray}]},
+                          {'name': 'option_2', 'value': 'option_2',
+                           'attributes': [{'name': 'array_3', 'type': array_type}]}]}]
+
+        calls = []
+
+        def _count_calls(method_name):
+            original_method = getattr(dao, method_name)
+
+            def _counted(*args, **kwargs):
+                calls.append(method_name)
+                return original_method(*args, **kwargs)
+            return _counted
+
+        dao.get_values_of_datatype = _count_calls("get_values_of_datatype")
+        dao.get_display_names_by_gids = _count_calls("get_display_names_by_gids")
+        try:
+            result = self.flow_service.prepare_parameters(input_tree, self.test_project.id, self.categ1.id)
+        finally:
+            del dao.get_values_of_datatype
+            del dao.get_display_names_by_gids
+
+        self.assertEqual(["get_values_of_datatype", "get_display_names_by_gids"], calls)
+        options_1 = result[0][ABCAdapter.KEY_OPTIONS]
+        self.assertEqual(3, len(options_1), "Expected the two arrays and the 'All' option")
+        self.assertTrue(options_1[-1][ABCAdapter.KEY_NAME].startswith("MappedArray - John Doe"))
+        for option in result[1][ABCAdapter.KEY_OPTIONS]:
+            self.assertEqual(options_1, option[ABCAdapter.KEY_ATTRIBUTES][0][ABCAdapter.KEY_OPTIONS])
+
+
     def test_fire_operation(self):
         """
         Test preparation of an adapter and launch mechanism.
@@ -163,6 +163,55 @@ class ImportServiceTest(TransactionalTestCase):
                           self.zip_path, self.test_user.id)
 
 
+    def test_import_export_parallel(self):
+        """
+        Test that a project exported in parallel mode gets an index of its operations and imports back.
+        """
+        expected_gids = [one_data.gid for one_data in self.get_all_datatypes()]
+        count_operations = dao.get_filtered_operations(self.test_project.id, None, is_count=True)
+
+        self.zip_path = ExportManager().export_project(self.test_project, parallel=True)
+        index = FilesHelper.read_export_index(self.zip_path)
+        self.assertTrue(index is not None, "Parallel export should write an index")
+        self.assertTrue(len(index['folders']) > 0, "Operation folders should be indexed")
+
+        self.project_service.remove_project(self.test_project.id)
+        self.import_service.import_project_structure(self.zip_path, self.test_user.id)
+        result = self.project_service.retrieve_projects_for_user(self.test_user.id)[0]
+        self.assertEqual(len(result), 1, "There should be only one project.")
+        self.test_project = result[0]
+
+        self.assertEqual(count_operations, dao.get_filtered_operations(self.test_project.id, None, is_count=True),
+                         "Invalid ops number after parallel export and import!")
+        for gid in expected_gids:
+            self.assertTrue(dao.get_datatype_by_gid(gid) is not None, "DataType not imported " + gid)
+
+
+    def test_import_parallel_scan(self):
+        """
+        Test that H5 files scanned with a pool of threads are imported back with the same details.
+        """
+        expected_results = {}
+        for one_data in self.get_all_datatypes():
+            expected_results[one_data.gid] = (one_data.module, one_data.type, one_data.disk_size)
+
+        self.zip_path = ExportManager().export_project(self.test_project)
+        self.project_service.remove_project(self.test_project.id)
+
+        self.import_service.PARALLEL_SCAN_MIN_FILES = 1
+        self.import_service.import_project_structure(self.zip_path, self.test_user.id)
+        result = self.project_service.retrieve_projects_for_user(self.test_user.id)[0]
+        self.assertEqual(len(result), 1, "There should be only one project.")
+
+        for gid in expected_results:
+            datatype = dao.get_datatype_by_gid(gid)
+            self.assertEqual(datatype.module, expected_results[gid][0], 'DataTypes not imported correctly')
+            self.assertEqual(datatype.type, expected_results[gid][1], 'DataTypes not imported correctly')
+            self.assertEqual(datatype.disk_size, expected_results[gid][2], 'Disk size not computed correctly')
+            parent_operation = dao.get_operation_by_id(datatype.fk_from_operation)
+            self.assertEqual(parent_operation.fk_launched_in, result[0].id, 'Wrong parent project')
+
+
     def _create_timeseries(self):
         """Launch adapter to persist a TimeSeries entity"""
         activity_data = numpy.array([[1, 2, 3], [4, 5, 6], [7, 8, 9], [10, 11, 12]])
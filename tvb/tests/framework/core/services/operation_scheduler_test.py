@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Deterministic tests for the admission of operations: a fake clock drives the scheduler,
+and fake adapters provide the memory and time estimates.
+"""
+
+import threading
+import unittest
+from tvb.core.services.operation_scheduler import OperationScheduler, ScheduledOperation
+from tvb.core.services.operation_scheduler import PRIORITY_INTERACTIVE, PRIORITY_BURST, PRIORITY_BULK
+
+GB = 2 ** 30
+
+
+
+class FakeClock(object):
+    """ Time which only moves when told so. """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+
+class FakeAdapter(object):
+    """ Adapter with fixed estimates, and a fixed real duration. """
+
+    def __init__(self, memory=0, duration=1.0, estimated_time=None):
+        self.memory = memory
+        self.duration = duration
+        self.estimated_time = duration if estimated_time is None else estimated_time
+
+    def get_required_memory_size(self, **kwargs):
+        return self.memory
+
+    def get_execution_time_approximation(self, **kwargs):
+        return self.estimated_time
+
+
+
+class OperationSchedulerTest(unittest.TestCase):
+    """
+    Verify the order in which operations start, and the total time for running them.
+    """
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+
+    def _simulate(self, scheduler, submissions):
+        """
+        Run on the fake clock a list of submissions (submit_time, operation_id, user_id, priority, FakeAdapter).
+        Every started operation is released after its adapter duration.
+
+        :returns: (list with the operation ids in their start order, time when the last one finished)
+        """
+        submissions = sorted(submissions, key=lambda entry: entry[0])
+        durations = {}
+        finish_times = {}
+        start_order = []
+        while submissions or finish_times:
+            next_submit = submissions[0][0] if submissions else float('inf')
+            next_finish = min(finish_times.values()) if finish_times else float('inf')
+            self.clock.now = min(next_submit, next_finish)
+            if next_finish <= next_submit:
+                for op_id in [op_id for op_id, end in finish_times.items() if end == next_finish]:
+                    del finish_times[op_id]
+                    scheduler.release(op_id)
+            else:
+                _, op_id, user_id, priority, adapter = submissions.pop(0)
+                durations[op_id] = adapter.duration
+                scheduler.submit(ScheduledOperation.from_adapter(op_id, user_id, priority, adapter))
+            for entry in scheduler.get_queue_state()['running']:
+                if entry['operation_id'] not in start_order:
+                    start_order.append(entry['operation_id'])
+                    finish_times[entry['operation_id']] = self.clock.now + durations[entry['operation_id']]
+        return start_order, self.clock.now
+
+
+    def test_interactive_before_bulk(self):
+        """
+        An interactive operation submitted behind a PSE batch starts at the first free slot.
+        """
+        scheduler = OperationScheduler(1, clock=self.clock)
+        submissions = [(0, op_id, 1, PRIORITY_BULK, FakeAdapter(duration=100)) for op_id in range(1, 5)]
+        submissions.append((1, 10, 2, PRIORITY_INTERACTIVE, FakeAdapter(duration=1)))
+        submissions.append((2, 20, 2, PRIORITY_BURST, FakeAdapter(duration=10)))
+        start_order, end_time = self._simulate(scheduler, submissions)
+        self.assertEqual([1, 10, 20, 2, 3, 4], start_order)
+        self.assertEqual(411, end_time)
+
+
+    def test_memory_budget(self):
+        """
+        Operations whose estimates exceed together the budget do not run in the same time,
+        and a small one does not overtake (in the same class) the operation waiting for memory.
+        """
+        scheduler = OperationScheduler(3, memory_budget=8 * GB, clock=self.clock)
+        submissions = [(0, 1, 1, PRIORITY_BURST, FakeAdapter(memory=5 * GB, duration=10)),
+                       (0, 2, 1, PRIORITY_BURST, FakeAdapter(memory=5 * GB, duration=10)),
+                       (0, 3, 1, PRIORITY_BURST, FakeAdapter(memory=1 * GB, duration=10))]
+        start_order, end_time = self._simulate(scheduler, submissions)
+        self.assertEqual([1, 2, 3], start_order)
+        self.assertEqual(20, end_time)
+
+
+    def test_only_interactive_bypass(self):
+        """
+        When the first operation in the queue waits for memory, bulk work does not overtake it, interactive does.
+        """
+        scheduler = OperationScheduler(3, memory_budget=8 * GB, clock=self.clock)
+        scheduler.submit(ScheduledOperation(1, 1, PRIORITY_BURST, 6 * GB, 10))
+        scheduler.submit(ScheduledOperation(2, 1, PRIORITY_BURST, 6 * GB, 10))
+        scheduler.submit(ScheduledOperation(3, 2, PRIORITY_BULK, 1 * GB, 10))
+        scheduler.submit(ScheduledOperation(4, 2, PRIORITY_INTERACTIVE, 7 * GB, 1))
+        scheduler.submit(ScheduledOperation(5, 2, PRIORITY_INTERACTIVE, 1 * GB, 1))
+        state = scheduler.get_queue_state()
+        self.assertEqual([1, 5], [entry['operation_id'] for entry in state['running']])
+        self.assertEqual([4, 2, 3], [entry['operation_id'] for entry in state['waiting']])
+        self.assertEqual(7 * GB, state['used_memory'])
+
+
+    def test_fair_share(self):
+        """
+        Between operations of the same class, the user with fewer running operations comes first.
+        """
+        scheduler = OperationScheduler(2, clock=self.clock)
+        submissions = [(0, 1, 1, PRIORITY_BULK, FakeAdapter(duration=10)),
+                       (0, 2, 1, PRIORITY_BULK, FakeAdapter(duration=20)),
+                       (0, 3, 1, PRIORITY_BULK, FakeAdapter(duration=10)),
+                       (0, 4, 1, PRIORITY_BULK, FakeAdapter(duration=10)),
+                       (1, 10, 2, PRIORITY_BULK, FakeAdapter(duration=10))]
+        start_order, end_time = self._simulate(scheduler, submissions)
+        self.assertEqual([1, 2, 10, 3, 4], start_order)
+        self.assertEqual(30, end_time)
+
+
+    def test_shorter_first(self):
+        """
+        Inside a class shorter operations go first, and those without any estimate go last.
+        """
+        scheduler = OperationScheduler(1, clock=self.clock)
+        scheduler.submit(ScheduledOperation(1, 1, PRIORITY_BURST, 0, 10))
+        scheduler.submit(ScheduledOperation(2, 1, PRIORITY_BULK, 0, 10))
+        scheduler.submit(ScheduledOperation(3, 1, PRIORITY_BURST, 0, -1))
+        scheduler.submit(ScheduledOperation(4, 1, PRIORITY_BURST, 0, 5))
+        self.assertEqual([4, 3, 2], [entry['operation_id'] for entry in scheduler.get_queue_state()['waiting']])
+
+
+    def test_aging(self):
+        """
+        Operations waiting long enough climb priority classes, thus bulk work is not starved.
+        """
+        scheduler = OperationScheduler(1, clock=self.clock)
+        scheduler.submit(ScheduledOperation(1, 1, PRIORITY_BURST, 0, 10))
+        scheduler.submit(ScheduledOperation(2, 1, PRIORITY_BULK, 0, 10))
+        self.clock.now = 2 * OperationScheduler.PRIORITY_AGING_INTERVAL
+        scheduler.submit(ScheduledOperation(3, 1, PRIORITY_BURST, 0, 1))
+        scheduler.release(1)
+        self.assertEqual([2], [entry['operation_id'] for entry in scheduler.get_queue_state()['running']])
+
+
+    def test_throughput(self):
+        """
+        With enough memory, all slots are used: 8 equal operations on 4 slots take twice one duration.
+        """
+        scheduler = OperationScheduler(4, memory_budget=8 * GB, clock=self.clock)
+        submissions = [(0, op_id, op_id % 3, PRIORITY_BURST, FakeAdapter(memory=GB, duration=60))
+                       for op_id in range(1, 9)]
+        start_order, end_time = self._simulate(scheduler, submissions)
+        self.assertEqual(8, len(start_order))
+        self.assertEqual(120, end_time)
+
+
+    def test_cancel_waiting(self):
+        """
+        A thread waiting for its turn is woken up when its operation is canceled, and never started.
+        """
+        scheduler = OperationScheduler(1, clock=self.clock)
+        self.assertTrue(scheduler.wait_for_turn(ScheduledOperation(1, 1, PRIORITY_BULK)))
+        result = []
+        waiting_thread = threading.Thread(target=lambda: result.append(
+            scheduler.wait_for_turn(ScheduledOperation(2, 1, PRIORITY_BULK))))
+        waiting_thread.start()
+        while not scheduler.get_queue_state()['waiting']:
+            waiting_thread.join(0.01)
+        self.assertTrue(scheduler.cancel(2))
+        waiting_thread.join(5)
+        self.assertEqual([False], result)
+        scheduler.release(1)
+        self.assertEqual([], scheduler.get_queue_state()['running'])
+        self.assertFalse(scheduler.cancel(2))
+
+
+
+def suite():
+    """
+    Gather all the tests in a test suite.
+    """
+    test_suite = unittest.TestSuite()
+    test_suite.addTest(unittest.makeSuite(OperationSchedulerTest))
+    return test_suite
+
+
+
+if __name__ == "__main__":
+    #So you can run tests from this package individually.
+    TEST_RUNNER = unittest.TextTestRunner()
+    TEST_SUITE = suite()
+    TEST_RUNNER.run(TEST_SUITE)
@@ -32,6 +32,8 @@
 .. moduleauthor:: Bogdan Neacsa <bogdan.neacsa@codemart.ro>
 """
 
+import os
+import re
 import unittest
 import json
 import numpy
@@ -44,13 +46,16 @@ from tvb.core.entities.transient.structure_entities import DataTypeMetaData
 from tvb.core.services.operation_service import OperationService
 from tvb.core.services.project_service import initialize_storage, ProjectService
 from tvb.core.services.flow_service import FlowService
+from tvb.core.services.ephemeral_displays import EPHEMERAL_DISPLAYS, is_ephemeral_key
+from tvb.core.operation_profiler import OperationProfiler
 from tvb.core.adapters.abcadapter import ABCAdapter
 from tvb.tests.framework.datatypes.datatype1 import Datatype1
 from tvb.tests.framework.datatypes.datatype2 import Datatype2
 from tvb.tests.framework.adapters.ndimensionarrayadapter import NDimensionArrayAdapter
 from tvb.tests.framework.core.base_testcase import BaseTestCase
 from tvb.tests.framework.core.test_factory import TestFactory
-from tvb.core.adapters.exceptions import NoMemoryAvailableException
+from tvb.tests.framework.datatypes.datatypes_factory import DatatypesFactory
+from tvb.core.adapters.exceptions import NoMemoryAvailableException, LaunchException
 
 
 
@@ -144,6 +149,44 @@ class OperationServiceTest(BaseTestCase):
         self.assertEqual(datatype.type, output_type, "Wrong data stored.")
 
 
+    def test_initiate_operation_reuse_results(self):
+        """
+        Launching again an algorithm with identical inputs should re-use the existing results, when enabled.
+        """
+        group = dao.find_group("tvb.tests.framework.adapters.testadapter1", "TestAdapter1")
+        adapter = FlowService().build_adapter_instance(group)
+        data = {"test1_val1": 5, "test1_val2": 5}
+        tmp_folder = FilesHelper().get_project_folder(self.test_project, "TEMP")
+        TvbProfile.current.REUSE_OPERATION_RESULTS = True
+        try:
+            first = self.operation_service.initiate_operation(self.test_user, self.test_project.id, adapter,
+                                                              tmp_folder, **data)
+            second = self.operation_service.initiate_operation(self.test_user, self.test_project.id, adapter,
+                                                               tmp_folder, **data)
+            self.assertTrue("re-using" not in first)
+            self.assertTrue("re-using" in second)
+            _, count = dao.get_values_of_datatype(self.test_project.id, Datatype1)
+            self.assertEqual(count, 1)
+            ## Results stay under the operation which computed them, and are only referenced by the second one
+            reused_id, cached_id = [int(number) for number in re.findall(r"\d+", second)]
+            self.assertEqual(0, dao.count_resulted_datatypes(reused_id))
+            self.assertEqual(1, dao.count_resulted_datatypes(cached_id))
+            self.assertTrue(str(cached_id) in dao.get_operation_by_id(reused_id).additional_info)
+
+            other_project = TestFactory.create_project(self.test_user, "other_project")
+            self.operation_service.initiate_operation(self.test_user, other_project.id, adapter, tmp_folder, **data)
+            dts, count = dao.get_values_of_datatype(other_project.id, Datatype1)
+            self.assertEqual(count, 1)
+            self.assertEqual(1, len(dao.get_links_for_datatype(dts[0][0])))
+
+            data["test1_val2"] = 6
+            third = self.operation_service.initiate_operation(self.test_user, self.test_project.id, adapter,
+                                                              tmp_folder, **data)
+            self.assertTrue("re-using" not in third)
+        finally:
+            TvbProfile.current.REUSE_OPERATION_RESULTS = False
+
+
     def test_delete_dt_free_HDD_space(self):
         """
         Launch two operations and give enough available space for user so that both should finish.
@@ -381,6 +424,89 @@ class OperationServiceTest(BaseTestCase):
         self.assertEqual(operation.status, model.STATUS_FINISHED, "Operation shouldn't have been canceled!")
 
 
+    def test_operation_counters(self):
+        """
+        Test that the per project operation counters follow status changes, and can be repaired when drifted.
+        """
+        self.assertEqual((0, 0, 0, 0, 0), dao.get_operation_numbers(self.test_project.id))
+        operation = TestFactory.create_operation(test_user=self.test_user, test_project=self.test_project,
+                                                 operation_status=model.STATUS_STARTED)
+        TestFactory.create_operation(test_user=self.test_user, test_project=self.test_project)
+        self.assertEqual((1, 1, 0, 0, 0), dao.get_operation_numbers(self.test_project.id))
+
+        self.operation_service.stop_operation(operation.id)
+        self.assertEqual((1, 0, 0, 1, 0), dao.get_operation_numbers(self.test_project.id))
+        dao.remove_entity(model.Operation, operation.id)
+        self.assertEqual((1, 0, 0, 0, 0), dao.get_operation_numbers(self.test_project.id))
+
+        counters = dao.get_generic_entity(model.OperationStatusCount, self.test_project.id, "fk_project")
+        for counter in counters:
+            counter.count = 7
+        dao.store_entities(counters)
+        self.assertEqual(len(model.ALL_STATUSES), dao.reconcile_operation_numbers(self.test_project.id))
+        self.assertEqual((1, 0, 0, 0, 0), dao.get_operation_numbers(self.test_project.id))
+
+
+    def test_ephemeral_display(self):
+        """
+        Test that visualizers are launched without storing an Operation, and are kept in the displays log.
+        """
+        datatypes_factory = DatatypesFactory()
+        user, project = datatypes_factory.get_user(), datatypes_factory.get_project()
+        _, connectivity = datatypes_factory.create_connectivity()
+        covariance = datatypes_factory.create_covariance(datatypes_factory.create_timeseries(connectivity))
+        operations_number = len(dao.get_generic_entity(model.Operation, project.id, "fk_launched_in"))
+
+        group = dao.find_group("tvb.adapters.visualizers.covariance", "CovarianceVisualizer")
+        adapter = FlowService().build_adapter_instance(group)
+        tmp_folder = FilesHelper().get_project_folder(project, "TEMP")
+        result = self.operation_service.initiate_operation(user, project.id, adapter, tmp_folder,
+                                                           datatype=covariance.gid)
+        self.assertTrue('matrix_data' in result)
+        self.assertTrue(is_ephemeral_key(adapter.operation_id))
+        display = EPHEMERAL_DISPLAYS.get(adapter.operation_id)
+        self.assertEqual(model.STATUS_FINISHED, display.status)
+        self.assertTrue(display.operation_id is None)
+        self.assertEqual(operations_number,
+                         len(dao.get_generic_entity(model.Operation, project.id, "fk_launched_in")))
+
+        def _failed_launch(**_):
+            raise LaunchException("Invalid input for display")
+        adapter = FlowService().build_adapter_instance(group)
+        adapter.launch = _failed_launch
+        self.assertRaises(LaunchException, self.operation_service.initiate_operation, user, project.id,
+                          adapter, tmp_folder, datatype=covariance.gid)
+        self.assertTrue(is_ephemeral_key(adapter.operation_id))
+        self.assertEqual(model.STATUS_ERROR, EPHEMERAL_DISPLAYS.get(adapter.operation_id).status)
+        self.assertEqual(operations_number,
+                         len(dao.get_generic_entity(model.Operation, project.id, "fk_launched_in")))
+
+
+    def test_profiled_operation(self):
+        """
+        Test that operations of a user selected for profiling store their profile next to the results.
+        """
+        group = dao.find_group("tvb.tests.framework.adapters.testadapter1", "TestAdapter1")
+        adapter = FlowService().build_adapter_instance(group)
+        tmp_folder = FilesHelper().get_project_folder(self.test_project, "TEMP")
+        TvbProfile.current.PROFILE_OPERATIONS_USERS = [self.test_user.username]
+        try:
+            self.operation_service.initiate_operation(self.test_user, self.test_project.id, adapter, tmp_folder,
+                                                      test1_val1=5, test1_val2=5)
+        finally:
+            TvbProfile.current.PROFILE_OPERATIONS_USERS = []
+
+        operation = dao.get_operation_by_id(dao.get_filtered_operations(self.test_project.id, None)[0][0])
+        self.assertEqual(model.STATUS_FINISHED, operation.status)
+        operation_folder = FilesHelper().get_operation_folder(self.test_project.name, operation.id)
+        self.assertTrue(os.path.exists(os.path.join(operation_folder, "profile.prof")))
+        summary = OperationProfiler.read_summary(operation_folder)
+        self.assertFalse(summary['failed'])
+        self.assertTrue(summary['peak_rss'] > 0)
+        self.assertTrue(len(summary['hotspots']) > 0)
+        self.assertTrue(len(ProjectService().get_operation_profile_fields(operation)) > 4)
+
+
     def test_array_from_string(self):
         """
         Simple test for parse array on 1d, 2d and 3d array.
@@ -563,7 +563,38 @@ class ProjectServiceTest(TransactionalTestCase):
         for link_gid in expected_links:
             self.assertTrue(link_gid in node_json, "Expected Link not present")
             self.assertTrue(link_gid in dts_in_tree, "Expected Link not present")
-            
+
+
+    def test_get_project_structure_level(self):
+        """
+        Tests the lazy project tree returns levels with counts, and all datatypes under their levels,
+        for levels on DataType columns, on the operation group and on the completion date.
+        """
+        dt_factory = datatypes_factory.DatatypesFactory()
+        self._create_datatypes(dt_factory, 3)
+        dt_factory.create_datatype_group()
+        project = dt_factory.project
+        dts_in_tree = dao.get_data_in_project(project.id)
+
+        for first_level, second_level in [(DataTypeMetaData.KEY_STATE, DataTypeMetaData.KEY_SUBJECT),
+                                          (DataTypeMetaData.KEY_CREATE_DATA_DAY, DataTypeMetaData.KEY_SUBJECT),
+                                          (DataTypeMetaData.KEY_CREATE_DATA_MONTH, DataTypeMetaData.KEY_OPERATION_TAG),
+                                          (DataTypeMetaData.KEY_OPERATION_TAG, DataTypeMetaData.KEY_DATATYPE_ID)]:
+            root_json = self.project_service.get_project_structure_level(project, None, first_level,
+                                                                         second_level, None)
+            self.assertTrue(project.name in root_json, "Project root node expected")
+            for dt in dts_in_tree:
+                self.assertFalse(dt.gid in root_json, "DataTypes should be loaded only with their folder")
+                meta = self.project_service._build_datatype_metadata(dt, project)
+                level, sublevel = str(meta[first_level]), str(meta[second_level])
+                self.assertTrue(level in root_json, "First level folder expected")
+                sublevel_json = self.project_service.get_project_structure_level(project, None, first_level,
+                                                                                 second_level, None, level)
+                self.assertTrue(sublevel in sublevel_json, "Second level folder expected")
+                leaves_json = self.project_service.get_project_structure_level(project, None, first_level,
+                                                                               second_level, None, level, sublevel)
+                self.assertTrue(dt.gid in leaves_json, "DataType expected under its folder")
+
 
 
 def suite():
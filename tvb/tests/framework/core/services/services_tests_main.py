@@ -34,11 +34,13 @@
 
 import unittest
 from tvb.tests.framework.core.services import burst_service_test
+from tvb.tests.framework.core.services import event_bus_test
 from tvb.tests.framework.core.services import event_handler_test
 from tvb.tests.framework.core.services import figure_service_test
 from tvb.tests.framework.core.services import flow_service_test
 from tvb.tests.framework.core.services import import_service_test
 from tvb.tests.framework.core.services import links_test
+from tvb.tests.framework.core.services import operation_scheduler_test
 from tvb.tests.framework.core.services import operation_service_test
 from tvb.tests.framework.core.services import project_service_test
 from tvb.tests.framework.core.services import project_structure_test
@@ -56,11 +58,13 @@ def suite():
     """
     test_suite = unittest.TestSuite()
     test_suite.addTest(burst_service_test.suite())
+    test_suite.addTest(event_bus_test.suite())
     test_suite.addTest(event_handler_test.suite())
     test_suite.addTest(figure_service_test.suite())
     test_suite.addTest(flow_service_test.suite())
     test_suite.addTest(import_service_test.suite())
     test_suite.addTest(links_test.suite())
+    test_suite.addTest(operation_scheduler_test.suite())
     test_suite.addTest(operation_service_test.suite())
     test_suite.addTest(project_service_test.suite())
     test_suite.addTest(project_structure_test.suite())
@@ -32,8 +32,10 @@
 .. moduleauthor:: bogdan.neacsa <bogdan.neacsa@codemart.ro>
 """
 
+import json
 import unittest
 from tvb.tests.framework.core.base_testcase import TransactionalTestCase
+from tvb.core.entities import model
 from tvb.core.entities.storage import dao
 from tvb.core.entities.file.files_helper import FilesHelper
 from tvb.core.entities.transient.structure_entities import DataTypeMetaData
@@ -77,11 +79,12 @@ class WorkflowTest(TransactionalTestCase):
         self.delete_project_folders()
 
 
-    def __create_complex_workflow(self, workflow_step_list):
+    def __create_complex_workflow(self, workflow_step_list, dispatch_steps=True):
         """
         Creates a burst with a complex workflow with a given list of workflow steps.
         :param workflow_step_list: a list of workflow steps that will be used in the
             creation of a new workflow for a new burst
+        :param dispatch_steps: when False, only the first step is executed
         """
         burst_config = TestFactory.store_burst(self.test_project.id)
 
@@ -106,6 +109,7 @@ class WorkflowTest(TransactionalTestCase):
                                                                     operations)
         #fire the first op
         if len(operations) > 0:
+            self.operation_service.dispatch_workflow_steps = dispatch_steps
             self.operation_service.launch_operation(operations[0].id, False)
         return burst_config.id
 
@@ -171,6 +175,69 @@ class WorkflowTest(TransactionalTestCase):
         self.assertEqual(error, 0, "Some operations finished with error status.")
 
 
+    def test_workflow_dag(self):
+        """
+        Test that the dependencies between steps are read from their dynamic parameters, and that steps
+        without any dynamic reference depend on the first step.
+        """
+        simulator_step = TestFactory.create_workflow_step("tvb.tests.framework.adapters.testadapter1",
+                                                          "TestAdapter1", step_index=0)
+        workflow_steps = [simulator_step]
+        for step_index, parent_index in [(1, 0), (2, 0), (3, 1), (4, None)]:
+            dynamic_kwargs = None
+            if parent_index is not None:
+                dynamic_kwargs = {"test": {wf_cfg.DATATYPE_INDEX_KEY: 0, wf_cfg.STEP_INDEX_KEY: parent_index}}
+            workflow_steps.append(TestFactory.create_workflow_step("tvb.tests.framework.adapters.testadapter3",
+                                                                   "TestAdapter3", step_index=step_index,
+                                                                   dynamic_kwargs=dynamic_kwargs))
+        dag = self.workflow_service.build_workflow_dag(workflow_steps)
+        self.assertEqual(dag, {0: set(), 1: set([0]), 2: set([0]), 3: set([1]), 4: set([0])}, "Invalid DAG %s" % dag)
+        self.assertEqual(self.workflow_service.get_downstream_steps(dag, 1), set([3]))
+        self.assertEqual(self.workflow_service.get_downstream_steps(dag, 0), set([1, 2, 3, 4]))
+        self.assertEqual(self.workflow_service.get_downstream_steps(dag, 2), set())
+
+
+    def test_prepare_next_steps(self):
+        """
+        Test that all the steps depending only on the finished first step are returned together to be launched,
+        that each of them is returned only once, and that a step depending on another analyzer has to wait for it.
+        """
+        workflow_step_list = [TestFactory.create_workflow_step("tvb.tests.framework.adapters.testadapter1",
+                                                               "TestAdapter1", step_index=1,
+                                                               static_kwargs={"test1_val1": 1, "test1_val2": 1}),
+                              TestFactory.create_workflow_step("tvb.tests.framework.adapters.testadapter2",
+                                                               "TestAdapter2", step_index=2,
+                                                               static_kwargs={"test2": 2}),
+                              TestFactory.create_workflow_step("tvb.tests.framework.adapters.testadapter3",
+                                                               "TestAdapter3", step_index=3,
+                                                               dynamic_kwargs={
+                                                                   "test": {wf_cfg.DATATYPE_INDEX_KEY: 0,
+                                                                            wf_cfg.STEP_INDEX_KEY: 1}})]
+        burst_id = self.__create_complex_workflow(workflow_step_list, dispatch_steps=False)
+        workflow = dao.get_workflows_for_burst(burst_id)[0]
+        steps = dict((step.step_index, step) for step in dao.get_workflow_steps(workflow.id))
+
+        next_ops = self.workflow_service.prepare_next_steps(steps[0].fk_operation)
+        self.assertEqual(sorted(next_ops), sorted([steps[1].fk_operation, steps[2].fk_operation]),
+                         "Both steps depending only on the first one should be ready.")
+        self.assertEqual([], self.workflow_service.prepare_next_steps(steps[0].fk_operation),
+                         "Steps already dispatched should not be returned again.")
+
+        self.operation_service.launch_operation(steps[2].fk_operation, False)
+        self.assertEqual([], self.workflow_service.prepare_next_steps(steps[2].fk_operation),
+                         "Last step depends on a step not finished yet.")
+        self.operation_service.launch_operation(steps[1].fk_operation, False)
+        self.assertEqual([steps[3].fk_operation], self.workflow_service.prepare_next_steps(steps[1].fk_operation))
+        last_operation = dao.get_operation_by_id(steps[3].fk_operation)
+        expected_gid = dao.get_results_for_operation(steps[1].fk_operation)[0].gid
+        self.assertEqual(json.loads(last_operation.parameters)["test"], expected_gid, "Dynamic parameter not filled.")
+        self.assertEqual(dao.get_burst_by_id(burst_id).status, model.BurstConfiguration.BURST_RUNNING)
+
+        self.operation_service.launch_operation(steps[3].fk_operation, False)
+        self.assertEqual([], self.workflow_service.prepare_next_steps(steps[3].fk_operation))
+        self.assertEqual(dao.get_burst_by_id(burst_id).status, model.BurstConfiguration.BURST_FINISHED)
+
+
     def test_configuration2workflow(self):
         """
         Test that building a WorkflowStep from a WorkflowStepConfiguration. Make sure all the data is
@@ -37,8 +37,9 @@
 import os
 import unittest
 import datetime
+import numpy
 from tvb.core.utils import path2url_part, get_unique_file_name, string2date, date2string, string2bool
-from tvb.core.utils import string2array
+from tvb.core.utils import string2array, read_text_matrix, count_text_rows
 from tvb.tests.framework.core.base_testcase import TransactionalTestCase
 
 
@@ -166,6 +167,48 @@ class UtilsTest(TransactionalTestCase):
             self.assertEqual(result_array[1], 2)
             self.assertEqual(result_array[2], 3)
 
+
+    def test_read_text_matrix(self):
+        """
+        Check that read_text_matrix gives the same result as numpy.loadtxt, also when parsing in small blocks.
+        """
+        expected = numpy.arange(300, dtype=numpy.float32).reshape((100, 3)) / 7
+        content = '\n'.join(' '.join(repr(float(value)) for value in row) for row in expected) + '\n'
+        for block_size in (64, 1000, len(content) + 1):
+            result = read_text_matrix(content, dtype=numpy.float32, block_size=block_size)
+            self.assertEqual(result.shape, (100, 3))
+            self.assertTrue(numpy.allclose(result, expected))
+
+        result = read_text_matrix("1 2\n\n# comment\n3 4", dtype=numpy.int32)
+        self.assertTrue(numpy.array_equal(result, [[1, 2], [3, 4]]))
+
+
+    def test_read_text_matrix_out(self):
+        """
+        Check that read_text_matrix writes in the preallocated array and rejects ragged content.
+        """
+        content = "1 2 3\n4 5 6\n"
+        out = numpy.zeros((count_text_rows(content) + 1, 3), dtype=numpy.int32)
+        result = read_text_matrix(content, dtype=numpy.int32, columns=3, out=out[1:])
+        self.assertEqual(result.shape, (2, 3))
+        self.assertTrue(numpy.array_equal(out, [[0, 0, 0], [1, 2, 3], [4, 5, 6]]))
+        self.assertRaises(ValueError, read_text_matrix, "1 2 3\n4 5\n")
+
+
+    def test_read_text_matrix_invalid(self):
+        """
+        Check that ragged rows are rejected also when the total number of values fits the matrix shape,
+        and that a missing file is not parsed as matrix text (while numbers like "1.e5" are).
+        """
+        self.assertRaises(ValueError, read_text_matrix, "1 2 3\n4 5 6 7\n8 9\n")
+        self.assertRaises(ValueError, read_text_matrix, "1 2\n\n3 4 5 6\n")
+        self.assertRaises(IOError, read_text_matrix, os.path.join("missing", "vertices.txt"))
+        self.assertRaises(IOError, read_text_matrix, "vertices.txt")
+        self.assertTrue(numpy.array_equal(read_text_matrix("1 2\n\n3 4\n", dtype=numpy.int32), [[1, 2], [3, 4]]))
+        self.assertTrue(numpy.array_equal(read_text_matrix("1.5 2e3", columns=2), [[1.5, 2000]]))
+        self.assertTrue(numpy.array_equal(read_text_matrix("3 1.e5"), [[3, 100000]]))
+        self.assertTrue(numpy.array_equal(read_text_matrix("2 4.E3"), [[2, 4000]]))
+
         
         
 def suite():
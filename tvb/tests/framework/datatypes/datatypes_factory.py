@@ -50,7 +50,7 @@ from tvb.core.services.operation_service import OperationService
 from tvb.datatypes.connectivity import Connectivity
 from tvb.datatypes.surfaces import CorticalSurface
 from tvb.datatypes.region_mapping import RegionMapping
-from tvb.datatypes.time_series import TimeSeries, TimeSeriesEEG, TimeSeriesRegion
+from tvb.datatypes.time_series import TimeSeries, TimeSeriesEEG, TimeSeriesRegion, TimeSeriesSurface
 from tvb.datatypes.graph import Covariance, ConnectivityMeasure
 from tvb.datatypes.spectral import CoherenceSpectrum
 from tvb.datatypes.temporal_correlations import CrossCorrelation
@@ -239,6 +239,19 @@ class DatatypesFactory():
         return time_series
 
 
+    def create_surface_timeseries(self, surface, time_length=10):
+        """
+        Create a stored TimeSeriesSurface entity, with one state variable and one mode.
+        """
+        operation, _, storage_path = self.__create_operation()
+        time_series = TimeSeriesSurface(storage_path=storage_path, surface=surface)
+        time_series.write_data_slice(numpy.random.random((time_length, 1, surface.number_of_vertices, 1)))
+        time_series.write_time_slice(numpy.arange(time_length))
+        adapter_instance = StoreAdapter([time_series])
+        OperationService().initiate_prelaunch(operation, adapter_instance, {})
+        return dao.get_datatype_by_gid(time_series.gid)
+
+
     def create_covariance(self, time_series):
         """
         :returns: a stored DataType Covariance.
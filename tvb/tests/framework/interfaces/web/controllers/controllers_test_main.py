@@ -37,10 +37,12 @@ from tvb.tests.framework.interfaces.web.controllers import figure_controller_tes
 from tvb.tests.framework.interfaces.web.controllers import flow_controller_test
 from tvb.tests.framework.interfaces.web.controllers import help_controller_test
 from tvb.tests.framework.interfaces.web.controllers import local_connectivity_controller_test
+from tvb.tests.framework.interfaces.web.controllers import metrics_controller_test
 from tvb.tests.framework.interfaces.web.controllers import project_controller_test
 from tvb.tests.framework.interfaces.web.controllers import region_model_parameters_controller_test
 from tvb.tests.framework.interfaces.web.controllers import region_stimulus_controller_test
 from tvb.tests.framework.interfaces.web.controllers import settings_controllers_test
+from tvb.tests.framework.interfaces.web.controllers import simulator_controller_test
 from tvb.tests.framework.interfaces.web.controllers import surface_model_parameters_controller_test
 from tvb.tests.framework.interfaces.web.controllers import surface_stimulus_controller_test
 from tvb.tests.framework.interfaces.web.controllers import users_controller_test
@@ -58,10 +60,12 @@ def suite():
     test_suite.addTest(flow_controller_test.suite())
     test_suite.addTest(local_connectivity_controller_test.suite())
     test_suite.addTest(help_controller_test.suite())
+    test_suite.addTest(metrics_controller_test.suite())
     test_suite.addTest(project_controller_test.suite())
     test_suite.addTest(region_model_parameters_controller_test.suite())
     test_suite.addTest(region_stimulus_controller_test.suite())
     test_suite.addTest(settings_controllers_test.suite())
+    test_suite.addTest(simulator_controller_test.suite())
     test_suite.addTest(surface_model_parameters_controller_test.suite())
     test_suite.addTest(surface_stimulus_controller_test.suite())
     test_suite.addTest(users_controller_test.suite())
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under 
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General 
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Scrape locally the /metrics page.
+"""
+
+import unittest
+import cherrypy
+from tvb.basic.profile import TvbProfile
+from tvb.core.entities import model
+from tvb.core.services.flow_service import FlowService
+from tvb.core.services.operation_service import OperationService
+from tvb.core.entities.file.files_helper import FilesHelper
+from tvb.core.entities.storage import dao
+from tvb.interfaces.web.request_handler import RequestHandler
+from tvb.interfaces.web.controllers.metrics_controller import MetricsController
+from tvb.tests.framework.interfaces.web.controllers.base_controller_test import BaseTransactionalControllerTest
+
+
+
+class MetricsControllerTest(BaseTransactionalControllerTest):
+    """
+    Unit tests for MetricsController class
+    """
+
+
+    def setUp(self):
+        self.init()
+        self.metrics_c = MetricsController()
+        TvbProfile.current.METRICS_ENABLED = True
+
+
+    def tearDown(self):
+        TvbProfile.current.METRICS_ENABLED = False
+        TvbProfile.current.METRICS_ALLOWED_ADDRESSES = ['127.0.0.1', '::1']
+        self.cleanup()
+
+
+    def _expect_http_error(self, status):
+        try:
+            self.metrics_c.index()
+            self.fail("Expected HTTP error %d" % status)
+        except cherrypy.HTTPError, error:
+            self.assertEqual(status, error.status)
+
+
+    def test_access(self):
+        TvbProfile.current.METRICS_ENABLED = False
+        self._expect_http_error(404)
+
+        TvbProfile.current.METRICS_ENABLED = True
+        TvbProfile.current.METRICS_ALLOWED_ADDRESSES = []
+        self._expect_http_error(403)
+
+        self.test_user.role = model.ROLE_ADMINISTRATOR
+        self.assertTrue("# TYPE tvb_operations_waiting gauge" in self.metrics_c.index())
+
+
+    def test_scrape(self):
+        group = dao.find_group("tvb.tests.framework.adapters.testadapter1", "TestAdapter1")
+        adapter = FlowService().build_adapter_instance(group)
+        tmp_folder = FilesHelper().get_project_folder(self.test_project, "TEMP")
+        OperationService().initiate_operation(self.test_user, self.test_project.id, adapter, tmp_folder,
+                                              test1_val1=5, test1_val2=5)
+        RequestHandler.start_request_timer()
+        RequestHandler.observe_request_duration()
+
+        text = self.metrics_c.index()
+        self.assertTrue(cherrypy.response.headers['Content-Type'].startswith("text/plain; version=0.0.4"))
+        self.assertTrue('tvb_operation_duration_seconds_count{algorithm="TestAdapter1",status="5-FINISHED"}' in text)
+        self.assertTrue("tvb_operations_running 0" in text)
+        self.assertTrue("# TYPE tvb_hdf5_file_opens_total counter" in text)
+        self.assertTrue('tvb_http_request_duration_seconds_count{controller="/",method="other"}' in text)
+
+
+
+def suite():
+    """
+    Gather all the tests in a test suite.
+    """
+    test_suite = unittest.TestSuite()
+    test_suite.addTest(unittest.makeSuite(MetricsControllerTest))
+    return test_suite
+
+
+if __name__ == "__main__":
+    #So you can run tests from this package individually.
+    TEST_RUNNER = unittest.TextTestRunner()
+    TEST_SUITE = suite()
+    TEST_RUNNER.run(TEST_SUITE)
@@ -259,6 +259,16 @@ class ProjectControllerTest(BaseTransactionalControllerTest):
         self.assertEqual(result_dict['secondLevelSelection'], 'Data_Subject')
 
 
+    def test_get_operations_queue_overlay(self):
+        """
+        The queue overlay receives the running and the waiting operations.
+        """
+        result_dict = self.project_c.get_operations_queue_overlay()
+        self.assertEqual(result_dict[common.KEY_OVERLAY_CONTENT_TEMPLATE], 'project/operations_queue_overlay')
+        self.assertTrue('running' in result_dict['queue_state'])
+        self.assertTrue('waiting' in result_dict['queue_state'])
+
+
 
 def suite():
     """
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2013, Baycrest Centre for Geriatric Care ("Baycrest")
+#
+# This program is free software; you can redistribute it and/or modify it under 
+# the terms of the GNU General Public License version 2 as published by the Free
+# Software Foundation. This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details. You should have received a copy of the GNU General 
+# Public License along with this program; if not, you can download it here
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Results streaming and jobs registry of the HTTP/JSON simulator API.
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import h5py
+import numpy
+from tvb.interfaces.web.controllers.api.simulator_controller import MonitorOutputWriter, SimulatorController
+from tvb.interfaces.web.controllers.api.simulator_controller import read_progress, STATUS_RUNNING, STATUS_FINISHED
+from tvb.interfaces.web.controllers.api.simulator_controller import STATUS_ERROR, STATUS_INTERRUPTED
+from tvb.interfaces.web.controllers.api.simulator_controller import REGISTRY_FILE_NAME
+from tvb.tests.framework.interfaces.web.controllers.base_controller_test import BaseTransactionalControllerTest
+
+
+
+class FakeMonitor(object):
+    """ Only the class name of a monitor is used by the writer. """
+
+
+
+def write_results(h5fname, status=STATUS_FINISHED):
+    """
+    Write a results file with 2 samples for one monitor, and its progress.
+    """
+    writer = MonitorOutputWriter(h5fname, [FakeMonitor()], 2.0)
+    writer.append([(1.0, numpy.zeros((2, 3)))])
+    writer.append([(2.0, numpy.ones((2, 3)))])
+    writer.flush(status=status)
+    return writer
+
+
+
+class MonitorOutputWriterTest(unittest.TestCase):
+    """
+    Unit tests for the MonitorOutputWriter class
+    """
+
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.h5fname = os.path.join(self.work_dir, "tvb_test.h5")
+
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+
+    def test_flush(self):
+        """
+        Buffered samples are appended to the file, and the progress counts only the complete ones.
+        """
+        writer = MonitorOutputWriter(self.h5fname, [FakeMonitor(), FakeMonitor()], 10.0)
+        progress = read_progress(self.h5fname)
+        self.assertEqual(STATUS_RUNNING, progress['status'])
+        self.assertEqual({'mon_0_FakeMonitor': 0, 'mon_1_FakeMonitor': 0}, progress['samples'])
+
+        writer.append([(1.0, numpy.zeros((2, 3))), None])
+        writer.append([(2.0, numpy.ones((2, 3))), (2.0, numpy.ones((2, 3)))])
+        self.assertEqual(0, read_progress(self.h5fname)['samples']['mon_0_FakeMonitor'])
+        self.assertTrue(writer.flush())
+        writer.append([(3.0, numpy.ones((2, 3))), None])
+        self.assertTrue(writer.flush(status=STATUS_FINISHED))
+
+        progress = read_progress(self.h5fname)
+        self.assertEqual(STATUS_FINISHED, progress['status'])
+        self.assertEqual(3.0, progress['t'])
+        self.assertEqual({'mon_0_FakeMonitor': 3, 'mon_1_FakeMonitor': 1}, progress['samples'])
+        h5 = h5py.File(self.h5fname, 'r')
+        try:
+            self.assertEqual((3, 2, 3), h5['mon_0_FakeMonitor/ys'].shape)
+            self.assertEqual([1.0, 2.0, 3.0], h5['mon_0_FakeMonitor/ts'][:].tolist())
+            self.assertEqual((1, 2, 3), h5['mon_1_FakeMonitor/ys'].shape)
+        finally:
+            h5.close()
+
+
+    def test_flush_error(self):
+        """
+        Samples which could not be written stay buffered, and are not counted in the progress.
+        """
+        writer = MonitorOutputWriter(self.h5fname, [FakeMonitor()], 10.0)
+        os.remove(self.h5fname)
+        writer.append([(1.0, numpy.zeros((2, 3)))])
+        self.assertFalse(writer.flush())
+        self.assertEqual(1, len(writer.buffers[0][0]))
+        self.assertFalse(writer.flush(status=STATUS_ERROR))
+
+        progress = read_progress(self.h5fname)
+        self.assertEqual(STATUS_ERROR, progress['status'])
+        self.assertEqual(0, progress['samples']['mon_0_FakeMonitor'])
+
+
+
+class SimulatorControllerTest(BaseTransactionalControllerTest):
+    """
+    Unit tests for the jobs registry of SimulatorController
+    """
+
+
+    def setUp(self):
+        self.init()
+        self.work_dir = tempfile.mkdtemp()
+        self.simulator_c = None
+
+
+    def tearDown(self):
+        if self.simulator_c is not None:
+            self.simulator_c.pool.terminate()
+        shutil.rmtree(self.work_dir)
+        self.cleanup()
+
+
+    def _write_registry(self, content):
+        with open(os.path.join(self.work_dir, REGISTRY_FILE_NAME), 'w') as registry_file:
+            registry_file.write(content)
+
+
+    def test_load_registry(self):
+        """
+        Jobs not finished by a previous run are marked as interrupted, unless their results are complete.
+        """
+        finished_h5 = os.path.join(self.work_dir, "tvb_finished.h5")
+        running_h5 = os.path.join(self.work_dir, "tvb_running.h5")
+        write_results(finished_h5)
+        write_results(running_h5, status=None)
+        sims = {1: {'ix': 1, 'h5': finished_h5},
+                2: {'ix': 2, 'h5': running_h5},
+                3: {'ix': 3, 'h5': os.path.join(self.work_dir, "tvb_missing.h5")},
+                4: {'ix': 4, 'h5': finished_h5, 'status': 'error'}}
+        self._write_registry(json.dumps(sims))
+
+        self.simulator_c = SimulatorController(nproc=1, work_dir=self.work_dir)
+        self.assertEqual(4, self.simulator_c.nsim)
+        self.assertEqual(True, self.simulator_c.sims[1]['status'])
+        self.assertEqual(finished_h5, self.simulator_c.sims[1]['result'])
+        self.assertEqual(STATUS_INTERRUPTED, self.simulator_c.sims[2]['status'])
+        self.assertEqual(STATUS_INTERRUPTED, self.simulator_c.sims[3]['status'])
+        self.assertEqual('error', self.simulator_c.sims[4]['status'])
+
+        progress = json.loads(self.simulator_c.progress(1))
+        self.assertEqual(STATUS_FINISHED, progress['file_status'])
+        self.assertEqual(1.0, progress['progress'])
+        partial = json.loads(self.simulator_c.partial(1, monitor=0, start=1))
+        self.assertEqual([2.0], partial['ts'])
+
+
+    def test_invalid_registry(self):
+        """
+        An unreadable registry is ignored, and replaced by the next job.
+        """
+        self._write_registry("not a registry")
+        self.simulator_c = SimulatorController(nproc=1, work_dir=self.work_dir)
+        self.assertEqual({}, self.simulator_c.sims)
+        self.assertEqual(0, self.simulator_c.nsim)
+
+
+
+def suite():
+    """
+    Gather all the tests in a test suite.
+    """
+    test_suite = unittest.TestSuite()
+    test_suite.addTest(unittest.makeSuite(MonitorOutputWriterTest))
+    test_suite.addTest(unittest.makeSuite(SimulatorControllerTest))
+    return test_suite
+
+
+if __name__ == "__main__":
+    #So you can run tests from this package individually.
+    TEST_RUNNER = unittest.TextTestRunner()
+    TEST_SUITE = suite()
+    TEST_RUNNER.run(TEST_SUITE)